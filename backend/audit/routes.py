@@ -2,18 +2,21 @@
 監査ログAPI
 フロントの重要操作を永続化
 """
-from datetime import datetime, timezone
-from typing import Any, Dict, List
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
 from auth.jwt_auth import get_current_active_user
 
+from .store import AuditLogStore
+
 router = APIRouter(prefix="/api/v1/audit", tags=["監査ログ"])
 
-# メモリストア（本番ではDB/Elasticsearch等に永続化）
-_audit_logs: List[Dict[str, Any]] = []
+# 月単位セグメントの追記専用ストア（SQLite WAL）
+audit_store = AuditLogStore()
 
 
 class AuditEntryCreate(BaseModel):
@@ -27,26 +30,42 @@ async def create_audit_entry(
     entry: AuditEntryCreate,
     current_user: Dict[str, Any] = Depends(get_current_active_user),
 ):
-    """監査ログを記録"""
-    item = {
-        "action": entry.action,
-        "detail": entry.detail,
-        "path": entry.path,
-        "username": current_user.get("username"),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    }
-    _audit_logs.append(item)
-    if len(_audit_logs) > 10000:
-        _audit_logs.pop(0)
+    """監査ログを記録（SQLite への書き込みはスレッドで実行）"""
+    await asyncio.to_thread(
+        audit_store.append,
+        action=entry.action,
+        detail=entry.detail,
+        path=entry.path,
+        username=current_user.get("username"),
+    )
     return {"ok": True}
 
 
 @router.get("")
 async def list_audit_logs(
     limit: int = 100,
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    path: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     current_user: Dict[str, Any] = Depends(get_current_active_user),
 ):
-    """監査ログ一覧（管理者向け・簡易実装）"""
+    """監査ログ一覧（管理者向け・新しい順、next_cursor で次ページ）"""
     if "admin" not in current_user.get("roles", []):
         return {"logs": [], "message": "Admin only"}
-    return {"logs": list(reversed(_audit_logs[-limit:]))}
+    try:
+        logs, next_cursor = await asyncio.to_thread(
+            audit_store.query,
+            username=username,
+            action=action,
+            path=path,
+            since=since,
+            until=until,
+            limit=max(1, min(limit, 1000)),
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"logs": logs, "next_cursor": next_cursor}
@@ -0,0 +1,308 @@
+"""
+監査ログストア
+月単位のSQLite（WAL）セグメントに追記し、ユーザー名・操作・パスで索引する
+
+各セグメントは追記のみで、行IDの順がそのまま記録順になる。一覧は新しい順に
+「(セグメント, 行ID) より前」のカーソルで辿るため、件数が増えても
+ページ位置によらず索引のシークだけで取得できる。保持期間を過ぎた
+セグメントはファイルごと削除する。
+
+接続とロックはセグメントごとに持つため、当月への追記と過去月の検索・
+チェックポイントは互いを待たない。
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUDIT_DIR = Path(__file__).resolve().parent.parent / "data" / "audit"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    username TEXT,
+    action TEXT NOT NULL,
+    path TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_username ON entries (username, id);
+CREATE INDEX IF NOT EXISTS idx_entries_action ON entries (action, id);
+CREATE INDEX IF NOT EXISTS idx_entries_path ON entries (path, id);
+CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp);
+"""
+
+_COLUMNS = ("id", "timestamp", "username", "action", "path", "detail")
+
+
+def _segment_name(moment: datetime) -> str:
+    return moment.strftime("%Y%m")
+
+
+def encode_cursor(segment: str, row_id: int) -> str:
+    return f"{segment}-{row_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """カーソルを (セグメント, 行ID) に変換（不正な値は ValueError）"""
+    segment, _, row_id = cursor.partition("-")
+    if len(segment) != 6 or not segment.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return segment, int(row_id)
+
+
+class _Segment:
+    """セグメントの接続と、その接続を直列化するロック"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.users = 0  # 貸出中の数（AuditLogStore._lock で保護）
+        self.retired = False  # 一覧から外れた（最後の利用者が閉じる）
+
+
+class AuditLogStore:
+    """月単位セグメントの追記専用監査ログストア"""
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        retention_days: Optional[int] = None,
+        max_open_segments: int = 12,
+    ):
+        """
+        監査ログストアを初期化
+
+        Args:
+            base_dir: セグメントの保存先（デフォルト: 環境変数 AUDIT_LOG_DIR
+                または backend/data/audit）
+            retention_days: 保持日数（0 で無期限。デフォルト: AUDIT_RETENTION_DAYS）
+            max_open_segments: 同時に開いておくセグメント数
+        """
+        self.base_dir = Path(
+            base_dir or os.getenv("AUDIT_LOG_DIR") or DEFAULT_AUDIT_DIR
+        )
+        self.retention_days = (
+            retention_days
+            if retention_days is not None
+            else int(os.getenv("AUDIT_RETENTION_DAYS", "0"))
+        )
+        self.max_open_segments = max_open_segments
+        self._segments: "OrderedDict[str, _Segment]" = OrderedDict()
+        self._lock = threading.Lock()  # _segments の出し入れのみ
+
+    def _path(self, segment: str) -> Path:
+        return self.base_dir / f"audit-{segment}.db"
+
+    def segments(self) -> List[str]:
+        """既存セグメント（新しい順）"""
+        names = (p.stem.split("-", 1)[1] for p in self.base_dir.glob("audit-*.db"))
+        return sorted((n for n in names if len(n) == 6 and n.isdigit()), reverse=True)
+
+    def _open(self, segment: str) -> sqlite3.Connection:
+        # 保存先は最初の書き込み・読み出し時に作る（インポート時には作らない）
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self._path(segment), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _retire(self, handle: _Segment) -> bool:
+        """ロック取得済みの前提で、一覧から外した接続を今すぐ閉じてよいか返す"""
+        handle.retired = True
+        return handle.users == 0
+
+    @contextmanager
+    def _connection(self, segment: str) -> Iterator[sqlite3.Connection]:
+        """
+        セグメントの接続を、そのセグメントのロックを保持した状態で貸し出す
+
+        上限を超えて追い出した接続は、貸出中なら返却時に閉じる（他セグメントの
+        処理を待たない）。
+        """
+        to_close: List[_Segment] = []
+        with self._lock:
+            handle = self._segments.get(segment)
+            if handle is None:
+                handle = _Segment(self._open(segment))
+                self._segments[segment] = handle
+                while len(self._segments) > self.max_open_segments:
+                    old = self._segments.popitem(last=False)[1]
+                    if self._retire(old):
+                        to_close.append(old)
+            else:
+                self._segments.move_to_end(segment)
+            handle.users += 1
+        for old in to_close:
+            old.conn.close()
+        try:
+            with handle.lock:
+                yield handle.conn
+        finally:
+            with self._lock:
+                handle.users -= 1
+                close = handle.retired and handle.users == 0
+            if close:
+                handle.conn.close()
+
+    def append(
+        self,
+        action: str,
+        username: Optional[str] = None,
+        path: Optional[str] = None,
+        detail: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """監査ログを追記し、記録した内容（カーソル付き）を返す"""
+        moment = timestamp or datetime.now(timezone.utc)
+        segment = _segment_name(moment)
+        with self._connection(segment) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO entries (timestamp, username, action, path, detail)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (moment.isoformat(), username, action, path, detail),
+            )
+        return {
+            "cursor": encode_cursor(segment, cursor.lastrowid),
+            "action": action,
+            "detail": detail,
+            "path": path,
+            "username": username,
+            "timestamp": moment.isoformat(),
+        }
+
+    def query(
+        self,
+        username: Optional[str] = None,
+        action: Optional[str] = None,
+        path: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        監査ログを新しい順に取得
+
+        Args:
+            username, action, path: 完全一致の絞り込み（索引を使用）
+            since, until: 期間（since 以上 until 未満）
+            limit: 最大件数
+            cursor: 前回の next_cursor（このエントリより前から取得）
+
+        Returns:
+            (エントリのリスト, 次ページのカーソル。最後なら None)
+        """
+        before_segment, before_id = decode_cursor(cursor) if cursor else (None, None)
+        conditions, params = [], []
+        for column, value in (
+            ("username", username),
+            ("action", action),
+            ("path", path),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since.astimezone(timezone.utc).isoformat())
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until.astimezone(timezone.utc).isoformat())
+
+        first = _segment_name(since.astimezone(timezone.utc)) if since else None
+        last = _segment_name(until.astimezone(timezone.utc)) if until else None
+        results: List[Dict[str, Any]] = []
+        for segment in self.segments():
+            if before_segment and segment > before_segment:
+                continue
+            if (last and segment > last) or (first and segment < first):
+                continue
+            where = list(conditions)
+            segment_params = list(params)
+            if segment == before_segment:
+                where.append("id < ?")
+                segment_params.append(before_id)
+            sql = "SELECT * FROM entries"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY id DESC LIMIT ?"
+            with self._connection(segment) as conn:
+                rows = conn.execute(
+                    sql, (*segment_params, limit - len(results))
+                ).fetchall()
+            for row in rows:
+                entry = dict(zip(_COLUMNS, row))
+                entry["cursor"] = encode_cursor(segment, entry.pop("id"))
+                results.append(entry)
+            if len(results) >= limit:
+                return results, results[-1]["cursor"]
+        return results, None
+
+    def count(self) -> int:
+        """全セグメントの件数"""
+        total = 0
+        for segment in self.segments():
+            with self._connection(segment) as conn:
+                total += conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return total
+
+    def apply_retention(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        保持期間を過ぎたセグメントを削除し、古いセグメントの WAL を畳む
+
+        Returns:
+            削除したセグメント
+        """
+        now = now or datetime.now(timezone.utc)
+        current = _segment_name(now)
+        cutoff = (
+            _segment_name(now - timedelta(days=self.retention_days))
+            if self.retention_days > 0
+            else None
+        )
+        removed = []
+        for segment in self.segments():
+            if cutoff and segment < cutoff:
+                with self._lock:
+                    handle = self._segments.pop(segment, None)
+                    close = handle is not None and self._retire(handle)
+                if close:
+                    handle.conn.close()
+                for suffix in ("", "-wal", "-shm"):
+                    Path(f"{self._path(segment)}{suffix}").unlink(missing_ok=True)
+                removed.append(segment)
+            elif segment < current:
+                # 書き込みの終わったセグメントは WAL をチェックポイントして統計を更新
+                with self._connection(segment) as conn:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    conn.execute("PRAGMA optimize")
+        return removed
+
+    async def run_maintenance(self, interval_sec: float = 3600.0) -> None:
+        """保持期間の適用を定期実行（バックグラウンドタスク）"""
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.apply_retention)
+                if removed:
+                    logger.info(f"Audit segments removed by retention: {removed}")
+            except Exception as e:
+                logger.error(f"Audit maintenance error: {e}")
+            await asyncio.sleep(interval_sec)
+
+    def close(self):
+        """すべての接続を閉じる"""
+        with self._lock:
+            handles = [h for h in self._segments.values() if self._retire(h)]
+            self._segments.clear()
+        for handle in handles:
+            handle.conn.close()
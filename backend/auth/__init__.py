@@ -4,6 +4,7 @@ UEP v5.0 - 認証・認可モジュール
 from .abac import ABAC, check_attribute_access
 from .jwt_auth import JWTAuth, get_current_active_user, get_current_user
 from .oauth2 import OAuth2Provider
+from .permissions import PermissionResolver
 from .rbac import RBAC, require_permission, require_role
 
 __all__ = [
@@ -12,6 +13,7 @@ __all__ = [
     "get_current_active_user",
     "OAuth2Provider",
     "RBAC",
+    "PermissionResolver",
     "require_permission",
     "require_role",
     "ABAC",
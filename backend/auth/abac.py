@@ -2,7 +2,7 @@
 ABAC（属性ベースアクセス制御）モジュール
 属性に基づくアクセス制御
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
 
 from fastapi import Depends, HTTPException, status
 
@@ -12,6 +12,46 @@ from .jwt_auth import get_current_user
 class ABAC:
     """ABAC（属性ベースアクセス制御）クラス"""
 
+    # ポリシー（キーの集合）→ コンパイル済みの述語
+    _compiled: Dict[frozenset, Callable[[Dict[str, Any]], Callable]] = {}
+
+    @staticmethod
+    def compile_policy(
+        policy: Dict[str, Any]
+    ) -> Callable[[Dict[str, Any]], Callable[[Dict[str, Any]], bool]]:
+        """
+        ポリシーを一度だけコンパイル
+
+        戻り値はユーザー属性を受け取り、そのユーザーに特化した
+        「リソース属性 → 許可されるか」の述語を返す関数。ポリシーの評価は
+        ルールのキーだけで決まるため、キーの集合ごとにキャッシュする。
+        """
+        key = frozenset(policy)
+        compiled = ABAC._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        department_match = "department_match" in key
+        security_level = "security_level" in key
+        # time_restriction は従来どおり評価しない（実装は簡略化）
+
+        def bind(user_attributes: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+            user_dept = user_attributes.get("department")
+            user_level = user_attributes.get("security_level", 0)
+            if department_match and security_level:
+                return lambda r: (
+                    r.get("department") == user_dept
+                    and not user_level < r.get("security_level", 0)
+                )
+            if department_match:
+                return lambda r: r.get("department") == user_dept
+            if security_level:
+                return lambda r: not user_level < r.get("security_level", 0)
+            return lambda r: True
+
+        ABAC._compiled[key] = bind
+        return bind
+
     @staticmethod
     def check_attribute_access(
         user_attributes: Dict[str, Any],
@@ -29,27 +69,43 @@ class ABAC:
         Returns:
             アクセスが許可されるかどうか
         """
-        # ポリシールールの評価
         # 例: ユーザーの部門がリソースの部門と一致する場合のみアクセス可能
-        if "department_match" in policy:
-            user_dept = user_attributes.get("department")
-            resource_dept = resource_attributes.get("department")
-            if user_dept != resource_dept:
-                return False
+        # 例: ユーザーの機密レベルがリソース以上の場合のみアクセス可能
+        return ABAC.compile_policy(policy)(user_attributes)(resource_attributes)
 
-        # 例: 機密レベルのチェック
-        if "security_level" in policy:
-            user_level = user_attributes.get("security_level", 0)
-            resource_level = resource_attributes.get("security_level", 0)
-            if user_level < resource_level:
-                return False
+    @staticmethod
+    def filter_accessible(
+        user_attributes: Dict[str, Any],
+        resources: Iterable[Any],
+        policy: Dict[str, Any],
+        attributes_of: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    ) -> List[Any]:
+        """
+        アクセス可能なリソースだけを一括で返す
+
+        ポリシーはユーザーに対して一度だけ束縛し、各リソースでは
+        束縛済みの述語を呼ぶだけにする。
 
-        # 例: 時間ベースのアクセス制御
-        if "time_restriction" in policy:
-            # 実装は簡略化（実際には時刻チェックが必要）
-            pass
+        Args:
+            user_attributes: ユーザーの属性
+            resources: リソースのリスト（既定ではリソース自体が属性の辞書）
+            policy: ポリシールール
+            attributes_of: リソースから属性の辞書を取り出す関数
+        """
+        allowed = ABAC.compile_policy(policy)(user_attributes)
+        if attributes_of is None:
+            return [r for r in resources if allowed(r)]
+        return [r for r in resources if allowed(attributes_of(r))]
 
-        return True
+    @staticmethod
+    def accessible_mask(
+        user_attributes: Dict[str, Any],
+        resource_attributes: Sequence[Dict[str, Any]],
+        policy: Dict[str, Any],
+    ) -> List[bool]:
+        """各リソースにアクセスできるか（入力と同じ順序）"""
+        allowed = ABAC.compile_policy(policy)(user_attributes)
+        return [allowed(r) for r in resource_attributes]
 
     @staticmethod
     def check_resource_ownership(user_id: str, resource_owner_id: str) -> bool:
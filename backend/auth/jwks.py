@@ -0,0 +1,175 @@
+"""
+JWT署名鍵セット
+HS256（共有シークレット）に加え、RS256/ES256 の鍵ペアと JWKS を扱う
+
+非対称鍵を設定すると公開鍵を JWKS として公開でき、他サービスは
+JWKS_URL から取得した鍵セットをメモリに保持してローカルに検証できる。
+鍵セットの取得はバックグラウンドスレッドで行い、検証の経路では待たない。
+"""
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwk, jwt
+
+logger = logging.getLogger(__name__)
+
+# 未知の kid による JWKS 再取得の最短間隔（秒）
+_JWKS_MIN_REFRESH_SEC = 30.0
+
+
+def load_pem(value: Optional[str], path: Optional[str]) -> Optional[str]:
+    """環境変数の PEM 文字列（\\n エスケープ可）またはファイルから鍵を読む"""
+    if value:
+        return value.replace("\\n", "\n")
+    if path:
+        return Path(path).read_text(encoding="utf-8")
+    return None
+
+
+class KeySet:
+    """署名鍵と検証鍵（kid 別）の集合"""
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret_key: str,
+        private_key: Optional[str] = None,
+        public_key: Optional[str] = None,
+        key_id: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        jwks_ttl: float = 300.0,
+    ):
+        """
+        鍵セットを初期化
+
+        Args:
+            algorithm: 署名アルゴリズム（HS256, RS256, ES256 等）
+            secret_key: HS系の共有シークレット
+            private_key: RS/ES系の秘密鍵（PEM）。署名するサービスのみ
+            public_key: RS/ES系の公開鍵（PEM）。省略時は秘密鍵から導出
+            key_id: JWT ヘッダーの kid（省略時は公開鍵のハッシュ）
+            jwks_url: 検証用 JWKS の取得先（他サービスの鍵で検証する場合）
+            jwks_ttl: 取得した JWKS の保持秒数
+        """
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.private_key = private_key
+        self.jwks_url = jwks_url
+        self.jwks_ttl = jwks_ttl
+        self._local_jwk: Optional[Dict[str, Any]] = None
+        self._remote_keys: Dict[str, Dict[str, Any]] = {}
+        self._remote_fetched_at = float("-inf")
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+        if self.asymmetric and (private_key or public_key):
+            source = public_key or private_key
+            public = jwk.construct(source, algorithm)
+            if not public_key:
+                public = public.public_key()
+            public_jwk = public.to_dict()
+            public_jwk = {
+                k: v.decode("ascii") if isinstance(v, bytes) else v
+                for k, v in public_jwk.items()
+            }
+            kid = (
+                key_id
+                or hashlib.sha256(
+                    "".join(f"{k}={public_jwk[k]}" for k in sorted(public_jwk)).encode()
+                ).hexdigest()[:16]
+            )
+            self._local_jwk = {**public_jwk, "kid": kid, "use": "sig"}
+
+    @property
+    def asymmetric(self) -> bool:
+        return not self.algorithm.startswith("HS")
+
+    @property
+    def key_id(self) -> Optional[str]:
+        return self._local_jwk["kid"] if self._local_jwk else None
+
+    def signing_key(self) -> Tuple[Any, Optional[Dict[str, str]]]:
+        """署名用の鍵と JWT ヘッダー"""
+        if not self.asymmetric:
+            return self.secret_key, None
+        if not self.private_key:
+            raise RuntimeError(
+                f"{self.algorithm} requires JWT_PRIVATE_KEY to issue tokens"
+            )
+        return self.private_key, {"kid": self.key_id}
+
+    def public_jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """公開用の JWKS（HS系では空）"""
+        return {"keys": [self._local_jwk] if self._local_jwk else []}
+
+    def _fetch_remote(self) -> Dict[str, Dict[str, Any]]:
+        import httpx
+
+        response = httpx.get(self.jwks_url, timeout=5.0)
+        response.raise_for_status()
+        return {key["kid"]: key for key in response.json().get("keys", [])}
+
+    def refresh_remote(self):
+        """JWKS_URL から鍵セットを再取得する（HTTP へ同期アクセス）"""
+        try:
+            keys = self._fetch_remote()
+        except Exception as e:
+            logger.warning(f"JWKS fetch failed: {e}")
+            return
+        with self._lock:
+            self._remote_keys = keys
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh_remote()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start_refresh(self):
+        """JWKS の再取得をバックグラウンドスレッドで開始（取得中なら何もしない）"""
+        with self._lock:
+            if not self.jwks_url or self._refreshing:
+                return
+            self._refreshing = True
+            self._remote_fetched_at = time.monotonic()
+        threading.Thread(
+            target=self._refresh_in_background, name="jwks-refresh", daemon=True
+        ).start()
+
+    def _remote_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        JWKS_URL の鍵をメモリ上の鍵セットから引く
+
+        期限切れ・未知の kid のときは再取得をバックグラウンドで開始し、
+        検証の経路では HTTP を待たない（新しい鍵は取得完了後の要求から使える）。
+        """
+        now = time.monotonic()
+        with self._lock:
+            keys = self._remote_keys
+            expired = now - self._remote_fetched_at > self.jwks_ttl
+            unknown = kid not in keys and (
+                now - self._remote_fetched_at > _JWKS_MIN_REFRESH_SEC
+            )
+        if expired or unknown:
+            self.start_refresh()
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        return keys.get(kid)
+
+    def verification_key(self, token: str) -> Any:
+        """トークンの検証鍵（ヘッダーの kid で選択）"""
+        if not self.asymmetric:
+            return self.secret_key
+        kid = jwt.get_unverified_header(token).get("kid")
+        if self._local_jwk and kid in (None, self.key_id):
+            return self._local_jwk
+        if self.jwks_url:
+            key = self._remote_key(kid)
+            if key is not None:
+                return key
+        raise JWTError(f"Unknown signing key: {kid}")
@@ -3,6 +3,7 @@ JWT認証モジュール
 JWTトークンの生成・検証を実装
 """
 import os
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional
 
@@ -11,6 +12,9 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from .jwks import KeySet, load_pem
+from .token_cache import RevocationList, VerifiedTokenCache, token_digest
+
 # パスワードハッシュ化の設定
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -19,10 +23,47 @@ security = HTTPBearer()
 
 # JWT設定
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")  # RS256/ES256 は鍵ペアを設定
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# 署名・検証鍵（非対称鍵の公開鍵は /api/v1/auth/jwks.json で公開）
+key_set = KeySet(
+    ALGORITHM,
+    SECRET_KEY,
+    private_key=load_pem(
+        os.getenv("JWT_PRIVATE_KEY"), os.getenv("JWT_PRIVATE_KEY_FILE")
+    ),
+    public_key=load_pem(os.getenv("JWT_PUBLIC_KEY"), os.getenv("JWT_PUBLIC_KEY_FILE")),
+    key_id=os.getenv("JWT_KEY_ID"),
+    jwks_url=os.getenv("JWKS_URL"),
+    jwks_ttl=float(os.getenv("JWKS_CACHE_TTL", "300")),
+)
+
+# 検証済みクレームのキャッシュと失効リスト
+token_cache = VerifiedTokenCache(
+    max_entries=int(os.getenv("JWT_VERIFY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("JWT_VERIFY_CACHE_TTL", "300")),
+)
+revocation_list = RevocationList(
+    sync_interval=float(os.getenv("JWT_REVOCATION_SYNC_SEC", "5"))
+)
+
+
+def _encode(claims: Dict[str, Any]) -> str:
+    """クレームに jti を付けて署名"""
+    key, headers = key_set.signing_key()
+    claims.setdefault("jti", uuid.uuid4().hex)
+    return jwt.encode(claims, key, algorithm=ALGORITHM, headers=headers)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 
 class JWTAuth:
     """JWT認証クラス"""
@@ -83,7 +124,7 @@ class JWTAuth:
             expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
         to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc), "type": "access"})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = _encode(to_encode)
         return encoded_jwt
 
     @staticmethod
@@ -92,20 +133,50 @@ class JWTAuth:
         to_encode = data.copy()
         expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc), "type": "refresh"})
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        return _encode(to_encode)
 
     @staticmethod
     def decode_access_token(token: str) -> Dict[str, Any]:
-        """アクセストークンのデコード"""
+        """
+        アクセストークンのデコード
+
+        検証済みのトークンはキャッシュから返し、署名検証を省く。
+        失効済み・期限切れのトークンは拒否する。
+        """
+        digest = token_digest(token)
+        payload = token_cache.get(digest)
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token, key_set.verification_key(token), algorithms=[ALGORITHM]
+                )
+            except JWTError:
+                raise _credentials_exception()
+            token_cache.set(digest, payload)
+        if revocation_list.is_revoked(payload.get("jti") or digest):
+            token_cache.discard(digest)
+            raise _credentials_exception()
+        return dict(payload)
+
+    @staticmethod
+    def revoke_token(token: str) -> bool:
+        """
+        トークンを失効させる（exp まで失効リストに保持）
+
+        Returns:
+            失効させたか（無効なトークンなら False）
+        """
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
-        except JWTError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            payload = JWTAuth.decode_access_token(token)
+        except HTTPException:
+            return False
+        digest = token_digest(token)
+        revocation_list.revoke(
+            payload.get("jti") or digest,
+            payload.get("exp") or datetime.now(timezone.utc).timestamp(),
+        )
+        token_cache.discard(digest)
+        return True
 
 
 async def get_current_user(
@@ -126,8 +197,9 @@ async def get_current_user(
     return {
         "username": username,
         "email": payload.get("email"),
-        "roles": payload.get("roles", []),
-        "permissions": payload.get("permissions", []),
+        # キャッシュ済みクレームを共有しないようリストは複製する
+        "roles": list(payload.get("roles", [])),
+        "permissions": list(payload.get("permissions", [])),
     }
 
 
@@ -151,8 +223,8 @@ async def get_current_user_websocket(websocket: WebSocket) -> Optional[Dict[str,
         if not token:
             return None
 
-        # トークンを検証
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # トークンを検証（検証済みキャッシュ・失効リストを使用）
+        payload = JWTAuth.decode_access_token(token)
         username: str = payload.get("sub")
 
         if username is None:
@@ -164,5 +236,5 @@ async def get_current_user_websocket(websocket: WebSocket) -> Optional[Dict[str,
             "email": payload.get("email"),
             "is_active": payload.get("is_active", True),
         }
-    except JWTError:
+    except HTTPException:
         return None
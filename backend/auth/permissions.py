@@ -0,0 +1,114 @@
+"""
+パーミッション解決モジュール
+ロール → パーミッションをビットセットに前計算し、チェックをビット演算で行う
+
+ロールの継承（ROLE_INHERITS）は推移閉包を一度だけ計算する。ロールの
+組み合わせごとのビットマスクはキャッシュし、同じロール構成のユーザーは
+集合の和を作り直さない。
+"""
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set
+
+
+class PermissionResolver:
+    """ロールのビットセットによるパーミッション解決"""
+
+    def __init__(
+        self,
+        role_permissions: Mapping[str, Iterable[str]],
+        role_inherits: Optional[Mapping[str, Iterable[str]]] = None,
+    ):
+        """
+        パーミッション解決を初期化
+
+        Args:
+            role_permissions: ロール → 直接付与されたパーミッション
+            role_inherits: ロール → 継承するロール
+        """
+        permissions = sorted({p for perms in role_permissions.values() for p in perms})
+        self._bits: Dict[str, int] = {p: 1 << i for i, p in enumerate(permissions)}
+        self._role_masks: Dict[str, int] = self._compile_roles(
+            role_permissions, role_inherits or {}
+        )
+        self._combination_masks: Dict[FrozenSet[str], int] = {}
+        self._mask_permissions: Dict[int, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def _compile_roles(
+        self,
+        role_permissions: Mapping[str, Iterable[str]],
+        role_inherits: Mapping[str, Iterable[str]],
+    ) -> Dict[str, int]:
+        """継承の推移閉包をたどってロールごとのビットマスクを作る"""
+        direct = {
+            role: self._mask_of(perms) for role, perms in role_permissions.items()
+        }
+        masks: Dict[str, int] = {}
+
+        def resolve(role: str, visiting: Set[str]) -> int:
+            if role in masks:
+                return masks[role]
+            if role in visiting:
+                raise ValueError(f"Cyclic role inheritance: {role}")
+            visiting.add(role)
+            mask = direct.get(role, 0)
+            for parent in role_inherits.get(role, ()):
+                mask |= resolve(parent, visiting)
+            visiting.discard(role)
+            masks[role] = mask
+            return mask
+
+        for role in set(role_permissions) | set(role_inherits):
+            resolve(role, set())
+        return masks
+
+    def _mask_of(self, permissions: Iterable[str]) -> int:
+        mask = 0
+        for permission in permissions:
+            mask |= self._bits.get(permission, 0)
+        return mask
+
+    def mask_for_roles(self, roles: Iterable[str]) -> int:
+        """ロールの組み合わせのビットマスク（組み合わせごとにキャッシュ）"""
+        key = roles if isinstance(roles, frozenset) else frozenset(roles)
+        mask = self._combination_masks.get(key)
+        if mask is None:
+            mask = 0
+            for role in key:
+                mask |= self._role_masks.get(role, 0)
+            with self._lock:
+                self._combination_masks[key] = mask
+        return mask
+
+    def permissions_for_roles(self, roles: Iterable[str]) -> FrozenSet[str]:
+        """ロールの組み合わせのパーミッション集合"""
+        mask = self.mask_for_roles(roles)
+        permissions = self._mask_permissions.get(mask)
+        if permissions is None:
+            permissions = frozenset(
+                name for name, bit in self._bits.items() if mask & bit
+            )
+            self._mask_permissions[mask] = permissions
+        return permissions
+
+    def has_permission(self, roles: Iterable[str], permission: str) -> bool:
+        """ロールの組み合わせがパーミッションを持つか"""
+        bit = self._bits.get(permission, 0)
+        return bool(bit) and bool(self.mask_for_roles(roles) & bit)
+
+    def has_all(self, roles: Iterable[str], permissions: Iterable[str]) -> bool:
+        """すべてのパーミッションを持つか（未知のパーミッションは持たない）"""
+        required = 0
+        for permission in permissions:
+            bit = self._bits.get(permission)
+            if bit is None:
+                return False
+            required |= bit
+        return self.mask_for_roles(roles) & required == required
+
+    def filter_permitted(
+        self, roles: Iterable[str], permissions: Iterable[str]
+    ) -> List[str]:
+        """持っているパーミッションだけを返す（一括チェック）"""
+        mask = self.mask_for_roles(roles)
+        return [p for p in permissions if mask & self._bits.get(p, 0)]
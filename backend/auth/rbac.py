@@ -9,6 +9,7 @@ from typing import Callable, Dict, List, Optional, Set
 from fastapi import Depends, HTTPException, status
 
 from .jwt_auth import get_current_user
+from .permissions import PermissionResolver
 
 
 class RBAC:
@@ -38,18 +39,37 @@ class RBAC:
         "user": {"read", "write_own"},
     }
 
+    # ロールの継承（ロール → 継承元ロール）。閉包はリゾルバーで前計算する
+    ROLE_INHERITS: Dict[str, Set[str]] = {}
+
+    _resolver: Optional[PermissionResolver] = None
+
+    @classmethod
+    def resolver(cls) -> PermissionResolver:
+        """ロールのビットセットを前計算したリゾルバー"""
+        if cls._resolver is None:
+            cls._resolver = PermissionResolver(cls.ROLE_PERMISSIONS, cls.ROLE_INHERITS)
+        return cls._resolver
+
+    @classmethod
+    def reload(cls):
+        """ROLE_PERMISSIONS / ROLE_INHERITS の変更を反映"""
+        cls._resolver = None
+
     @classmethod
     def get_permissions_for_role(cls, role: str) -> Set[str]:
         """ロールに紐づくパーミッションを取得"""
-        return cls.ROLE_PERMISSIONS.get(role, set())
+        return set(cls.resolver().permissions_for_roles((role,)))
 
     @classmethod
     def get_permissions_for_roles(cls, roles: List[str]) -> Set[str]:
         """複数のロールに紐づくパーミッションを取得（和集合）"""
-        permissions = set()
-        for role in roles:
-            permissions.update(cls.get_permissions_for_role(role))
-        return permissions
+        return set(cls.resolver().permissions_for_roles(roles))
+
+    @classmethod
+    def roles_have_permission(cls, roles: List[str], permission: str) -> bool:
+        """ロールの組み合わせがパーミッションを持つか（ビット演算で判定）"""
+        return cls.resolver().has_permission(roles, permission)
 
     @classmethod
     def has_permission(
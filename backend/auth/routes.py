@@ -9,15 +9,17 @@ from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
 
-from core.rate_limit import limiter
+from core.rate_limit import rate_limit
 
 from .jwt_auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     JWTAuth,
     get_current_active_user,
     get_current_user,
+    key_set,
+    security,
 )
 from .models import (
     LoginRequest,
@@ -213,7 +215,7 @@ async def register(user_data: UserCreate):
 
 
 @router.post("/login", response_model=TokenResponse)
-@limiter.limit("10/minute")  # ログイン試行を制限（ブルートフォース対策）
+@rate_limit(calls=10, period=60)  # ログイン試行を制限（ブルートフォース対策）
 async def login(request: Request, login_data: LoginRequest):
     """ログイン（JWTトークン発行）"""
     users = get_demo_users()
@@ -248,7 +250,9 @@ async def login(request: Request, login_data: LoginRequest):
         "department": user["department"],
         "security_level": user["security_level"],
     }
-    access_token = JWTAuth.create_access_token(data=token_data, expires_delta=access_token_expires)
+    access_token = JWTAuth.create_access_token(
+        data=token_data, expires_delta=access_token_expires
+    )
     refresh_token = JWTAuth.create_refresh_token(data={"sub": user["username"]})
 
     token_response = TokenResponse(
@@ -296,7 +300,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         "roles": user["roles"],
         "permissions": user["permissions"],
     }
-    access_token = JWTAuth.create_access_token(data=token_data, expires_delta=access_token_expires)
+    access_token = JWTAuth.create_access_token(
+        data=token_data, expires_delta=access_token_expires
+    )
     refresh_token = JWTAuth.create_refresh_token(data={"sub": user["username"]})
 
     return TokenResponse(
@@ -349,8 +355,12 @@ async def refresh_access_token(req: RefreshTokenRequest):
         "department": user["department"],
         "security_level": user.get("security_level", 1),
     }
-    access_token = JWTAuth.create_access_token(data=token_data, expires_delta=access_token_expires)
+    access_token = JWTAuth.create_access_token(
+        data=token_data, expires_delta=access_token_expires
+    )
     new_refresh = JWTAuth.create_refresh_token(data={"sub": user["username"]})
+    # ローテーション: 使用済みのリフレッシュトークンは失効させる
+    JWTAuth.revoke_token(req.refresh_token)
     return TokenResponse(
         access_token=access_token,
         refresh_token=new_refresh,
@@ -367,6 +377,24 @@ async def refresh_access_token(req: RefreshTokenRequest):
     )
 
 
+@router.post("/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """ログアウト（アクセストークンを失効させる）"""
+    if not JWTAuth.revoke_token(credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"message": "Logged out successfully"}
+
+
+@router.get("/jwks.json")
+async def get_jwks():
+    """JWT検証用の公開鍵セット（RS256/ES256 設定時。他サービスのローカル検証用）"""
+    return key_set.public_jwks()
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     current_user: Dict[str, Any] = Depends(get_current_active_user)
@@ -0,0 +1,178 @@
+"""
+検証済みトークンキャッシュ・失効リスト
+JWTの署名検証結果をトークンのダイジェストで保持し、毎リクエストの検証を省く
+
+キャッシュの有効期限はトークンの exp と最大TTLの早い方。失効したトークンは
+失効リストで判定し、Redis接続時は他ワーカーの失効もバックグラウンドで定期的に取り込む。
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKENS_KEY = "jwt:revoked"
+
+
+def token_digest(token: str) -> str:
+    """トークンのダイジェスト（キャッシュ・失効リストのキー）"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class VerifiedTokenCache:
+    """検証済みクレームの LRU + TTL キャッシュ"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        """
+        キャッシュを初期化
+
+        Args:
+            max_entries: 保持するトークン数の上限
+            ttl: 最大保持秒数（トークンの exp がそれより早ければ exp まで）
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """検証済みクレームを取得（期限切れ・未登録なら None）"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._misses += 1
+                return None
+            claims, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._hits += 1
+            return claims
+
+    def set(self, digest: str, claims: Dict[str, Any]):
+        """検証済みクレームを登録"""
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            self._entries[digest] = (claims, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest: str):
+        """トークンをキャッシュから除く"""
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        """キャッシュを空にする"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計"""
+        total = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / total, 4) if total else 0.0,
+        }
+
+
+class RevocationList:
+    """
+    失効済みトークンの一覧（jti またはダイジェスト → exp）
+
+    Redis接続時は sorted set（スコア = exp）に書き込み、sync_interval 秒ごとに
+    他ワーカーが失効させた分をバックグラウンドスレッドで取り込む。
+    is_revoked() はメモリ上の一覧だけを見るため、認証の経路で Redis を待たない。
+    """
+
+    def __init__(self, sync_interval: float = 5.0):
+        self.sync_interval = sync_interval
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._syncing = False
+
+    @staticmethod
+    def _redis():
+        """共有の同期Redisクライアント（未接続なら None）"""
+        try:
+            from core.cache import cache_strategy
+        except Exception:
+            return None
+        return cache_strategy.redis_client if cache_strategy.enabled else None
+
+    def revoke(self, token_id: str, expires_at: float):
+        """トークンを exp まで失効させる"""
+        with self._lock:
+            self._revoked[token_id] = expires_at
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(REVOKED_TOKENS_KEY, {token_id: expires_at})
+            pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Token revocation sync failed: {e}")
+
+    def sync(self):
+        """他ワーカーの失効を取り込み、期限切れを掃除する（Redis へ同期アクセス）"""
+        now = time.time()
+        client = self._redis()
+        remote = []
+        if client is not None:
+            try:
+                remote = client.zrangebyscore(
+                    REVOKED_TOKENS_KEY, now, "+inf", withscores=True
+                )
+            except Exception as e:
+                logger.warning(f"Token revocation sync failed: {e}")
+        with self._lock:
+            for token_id, expires_at in remote:
+                if isinstance(token_id, bytes):
+                    token_id = token_id.decode("utf-8")
+                self._revoked[token_id] = expires_at
+            for token_id in [k for k, v in self._revoked.items() if v <= now]:
+                del self._revoked[token_id]
+
+    def _sync_in_background(self):
+        try:
+            self.sync()
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def is_revoked(self, token_id: str) -> bool:
+        """失効済みか（同期の時期なら取り込みをバックグラウンドで開始する）"""
+        now = time.time()
+        with self._lock:
+            expires_at = self._revoked.get(token_id)
+            start = now >= self._next_sync and not self._syncing
+            if start:
+                self._next_sync = now + self.sync_interval
+                self._syncing = True
+        if start:
+            threading.Thread(
+                target=self._sync_in_background, name="jwt-revocation-sync", daemon=True
+            ).start()
+        return expires_at is not None and expires_at > now
+
+    def clear(self):
+        """ローカルの失効一覧を空にする"""
+        with self._lock:
+            self._revoked.clear()
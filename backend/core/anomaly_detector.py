@@ -2,9 +2,12 @@
 異常検知サービス
 閾値調整、特徴量追加、モデルアンサンブル
 """
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
 
 
 @dataclass
@@ -153,6 +156,256 @@ def ensemble_detect(
     }
 
 
+# 重大度コード（バッチ検知の結果配列で使用）
+SEVERITY_NONE, SEVERITY_LOW, SEVERITY_MEDIUM, SEVERITY_HIGH = 0, 1, 2, 3
+SEVERITY_LABELS = (None, "低", "中", "高")
+
+
+@dataclass
+class RunningStats:
+    """
+    系列ごとの累積統計（Welford法）
+
+    値の件数によらず O(1) の状態で平均・分散を保持できる。
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def push(self, value: float):
+        """1件を取り込む"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """母標準偏差"""
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+
+@dataclass
+class BatchDetection:
+    """バッチ異常検知の結果（入力と同じ順序の配列）"""
+
+    is_anomaly: np.ndarray
+    severity: np.ndarray  # SEVERITY_* コード
+    votes: np.ndarray
+    total: np.ndarray
+
+    def anomaly_indices(self) -> np.ndarray:
+        """異常と判定された入力のインデックス"""
+        return np.flatnonzero(self.is_anomaly)
+
+
+def _factorize(keys: Sequence[Any]):
+    """キー列を (一意なキーのリスト, 各要素のコード配列) に変換（出現順）"""
+    if isinstance(keys, np.ndarray):
+        keys = keys.tolist()
+    uniques = list(dict.fromkeys(keys))
+    code_of = {key: i for i, key in enumerate(uniques)}
+    codes = np.fromiter(map(code_of.__getitem__, keys), dtype=np.intp, count=len(keys))
+    return uniques, codes
+
+
+def _vector_threshold(
+    values: np.ndarray,
+    upper: np.ndarray,
+    lower: np.ndarray,
+    high_ratio: np.ndarray,
+    medium_ratio: np.ndarray,
+):
+    """閾値検知（_threshold_detector のベクトル版）"""
+    above = values > upper
+    below = values < lower
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(above, values / upper, lower / np.maximum(values, 0.001))
+    severity = np.where(
+        ratio >= high_ratio,
+        SEVERITY_HIGH,
+        np.where(ratio >= medium_ratio, SEVERITY_MEDIUM, SEVERITY_LOW),
+    )
+    hit = above | below
+    return hit, np.where(hit, severity, SEVERITY_NONE)
+
+
+def _vector_zscore(values: np.ndarray, mean: np.ndarray, std: np.ndarray, z_threshold):
+    """Z-score検知（_zscore_detector のベクトル版、std<=0 は判定しない）"""
+    valid = std > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(valid, np.abs(values - mean) / np.where(valid, std, 1.0), 0.0)
+    hit = valid & (z >= z_threshold)
+    severity = np.where(z >= z_threshold * 1.5, SEVERITY_HIGH, SEVERITY_MEDIUM)
+    return hit, np.where(hit, severity, SEVERITY_NONE)
+
+
+def _vector_rolling(
+    values: np.ndarray, series: np.ndarray, window: int, deviation: float
+):
+    """
+    ローリング検知（_rolling_detector のベクトル版）
+
+    系列ごとに入力順で直前 window 件を履歴とみなす。系列単位に並べ替えた
+    配列の累積和・累積二乗和の差から窓平均・分散を求めるため、窓幅によらず
+    全件を O(n) で評価できる。
+
+    Returns:
+        (検知結果, 重大度, 判定対象か)
+    """
+    n = values.size
+    keys, group = _factorize(series)
+    order = np.argsort(group, kind="stable")
+    sorted_group = group[order]
+    sorted_values = values[order]
+
+    counts = np.bincount(group, minlength=len(keys))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    position = np.arange(n) - starts[sorted_group]
+
+    eligible_sorted = position >= window
+    idx = np.flatnonzero(eligible_sorted)
+    mean = np.zeros(n)
+    std = np.zeros(n)
+    if idx.size:
+        # 桁落ちを抑えるため系列平均を引いてから累積する
+        shift = (np.bincount(group, weights=values, minlength=len(keys)) / counts)[
+            sorted_group
+        ]
+        shifted = sorted_values - shift
+        csum = np.concatenate(([0.0], np.cumsum(shifted)))
+        csq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+        # 値 j の履歴は sorted_values[j - window:j]
+        window_mean = (csum[idx] - csum[idx - window]) / window
+        window_sq = (csq[idx] - csq[idx - window]) / window
+        mean[idx] = window_mean + shift[idx]
+        std[idx] = np.sqrt(np.maximum(window_sq - window_mean * window_mean, 0.0))
+
+        # 同じ値だけの窓は丸め誤差で std > 0 にならないよう厳密に 0 とする
+        changed = np.ones(n, dtype=bool)
+        changed[1:] = sorted_values[1:] != sorted_values[:-1]
+        changed[starts] = True
+        run_start = np.maximum.accumulate(np.where(changed, np.arange(n), 0))
+        std[idx[run_start[idx - 1] <= idx - window]] = 0.0
+
+    hit_sorted, severity_sorted = _vector_zscore(sorted_values, mean, std, deviation)
+
+    hit = np.empty(n, dtype=bool)
+    severity = np.empty(n, dtype=np.int8)
+    eligible = np.empty(n, dtype=bool)
+    hit[order] = hit_sorted
+    severity[order] = severity_sorted
+    eligible[order] = eligible_sorted
+    return hit, severity, eligible
+
+
+def batch_detect(
+    metrics: Sequence[str],
+    values: Sequence[float],
+    series: Optional[Sequence[str]] = None,
+    thresholds: Optional[Dict[str, ThresholdConfig]] = None,
+    zscore_params: Optional[Dict[str, Dict[str, float]]] = None,
+    window: int = 10,
+    deviation: float = 2.0,
+) -> BatchDetection:
+    """
+    列指向の配列に対するバッチ異常検知（ensemble_detect のベクトル版）
+
+    閾値・Z-score・ローリングの各検知器をNumPyで一括評価し、
+    ensemble_detect と同じ多数決で判定する。
+
+    Args:
+        metrics: 各値のメトリック種別
+        values: 測定値
+        series: 系列キー（ローリング検知の履歴単位。None でメトリック単位）
+        thresholds: メトリック別の閾値設定（None でデフォルト使用）
+        zscore_params: メトリック別の平均・標準偏差・閾値
+        window: ローリング検知の窓幅
+        deviation: ローリング検知のZ-score閾値
+
+    Returns:
+        検知結果（入力と同じ順序の配列）
+    """
+    values = np.asarray(values, dtype=float)
+    metric_keys, metric_idx = _factorize(metrics)
+    configs = thresholds or DEFAULT_THRESHOLDS
+
+    def per_metric(getter) -> np.ndarray:
+        return np.array([getter(m) for m in metric_keys], dtype=float)[metric_idx]
+
+    def config_of(metric: str) -> ThresholdConfig:
+        config = configs.get(metric)
+        if isinstance(config, ThresholdConfig):
+            return config
+        return DEFAULT_THRESHOLDS.get(
+            metric, ThresholdConfig(metric, float("inf"), float("-inf"))
+        )
+
+    # 1. 閾値検知
+    hit, severity = _vector_threshold(
+        values,
+        per_metric(lambda m: config_of(m).upper),
+        per_metric(lambda m: config_of(m).lower),
+        per_metric(lambda m: config_of(m).severity_high_ratio),
+        per_metric(lambda m: config_of(m).severity_medium_ratio),
+    )
+    votes = hit.astype(np.int32)
+    total = np.ones(values.size, dtype=np.int32)
+    worst = severity.astype(np.int8)
+
+    # 2. Z-score検知（パラメータがあるメトリックのみ）
+    if zscore_params:
+        params = [zscore_params.get(m) for m in metric_keys]
+        has_params = np.array([p is not None for p in params])[metric_idx]
+        params = [p or {} for p in params]
+        z_hit, z_severity = _vector_zscore(
+            values,
+            np.array([p.get("mean", np.nan) for p in params])[metric_idx],
+            np.array([p.get("std", 1.0) for p in params])[metric_idx],
+            np.array([p.get("threshold", 3.0) for p in params])[metric_idx],
+        )
+        z_hit &= has_params
+        votes += z_hit
+        total += has_params
+        worst = np.maximum(worst, np.where(z_hit, z_severity, SEVERITY_NONE))
+
+    # 3. ローリング検知（直前 window 件の履歴がある値のみ）
+    keys = series if series is not None else metric_idx
+    r_hit, r_severity, eligible = _vector_rolling(values, keys, window, deviation)
+    votes += r_hit
+    total += eligible
+    worst = np.maximum(worst, np.where(r_hit, r_severity, SEVERITY_NONE))
+
+    # アンサンブル投票: 多数決
+    is_anomaly = votes >= np.maximum(1, total // 2)
+
+    return BatchDetection(
+        is_anomaly=is_anomaly,
+        severity=np.where(is_anomaly, worst, SEVERITY_NONE).astype(np.int8),
+        votes=votes,
+        total=total,
+    )
+
+
+def _series_key(item: Dict[str, Any]) -> str:
+    """ローリング検知の系列キー（メトリック + 設備・患者・センサー）"""
+    owner = (
+        item.get("series_id")
+        or item.get("sensor_id")
+        or item.get("equipment")
+        or item.get("patient_id")
+        or ""
+    )
+    return f"{item.get('metric', 'unknown')}:{owner}"
+
+
+class AnomalyDetectRequest(BaseModel):
+    """一括異常検知リクエスト（metric・value と系列キーを持つ測定値のリスト）"""
+
+    items: List[Dict[str, Any]] = []
+
+
 def get_anomaly_list(
     domain: str,
     items: List[Dict[str, Any]],
@@ -201,30 +454,37 @@ def get_anomaly_list(
         ]
 
     data = items if items else default_items
-    configs = thresholds or DEFAULT_THRESHOLDS
-    results = []
+    if not data:
+        return []
 
-    for item in data:
-        metric = item.get("metric", "unknown")
-        value = item.get("value", 0)
-        config = (
-            configs.get(metric)
-            if isinstance(configs.get(metric), ThresholdConfig)
-            else None
-        )
-        if not config:
-            config = DEFAULT_THRESHOLDS.get(metric, ThresholdConfig(metric, 999, -999))
-
-        det = ensemble_detect(value, metric, threshold_config=config)
-        if det["is_anomaly"]:
-            results.append(
-                {
-                    **item,
-                    "type": f"{config.metric}異常",
-                    "severity": det["severity"],
-                    "detected_at": det["detected_at"],
-                    "ensemble_votes": det.get("ensemble_votes", 1),
-                }
+    configs = dict(thresholds or DEFAULT_THRESHOLDS)
+    metrics = [item.get("metric", "unknown") for item in data]
+    for metric in set(metrics):
+        if not isinstance(configs.get(metric), ThresholdConfig):
+            configs[metric] = DEFAULT_THRESHOLDS.get(
+                metric, ThresholdConfig(metric, 999, -999)
             )
 
+    detection = batch_detect(
+        metrics,
+        [item.get("value", 0) for item in data],
+        series=[_series_key(item) for item in data],
+        thresholds=configs,
+    )
+
+    # 異常と判定された分だけ結果を組み立てる
+    detected_at = datetime.now(timezone.utc).isoformat()
+    results = []
+    for i in detection.anomaly_indices():
+        item = data[i]
+        results.append(
+            {
+                **item,
+                "type": f"{configs[metrics[i]].metric}異常",
+                "severity": SEVERITY_LABELS[detection.severity[i]],
+                "detected_at": detected_at,
+                "ensemble_votes": int(detection.votes[i]),
+            }
+        )
+
     return results
@@ -1,27 +1,180 @@
 """
 高度なキャッシング戦略モジュール
 Redisベースのマルチレベルキャッシング
+
+L1: ワーカープロセス内の上限付きLRU/TTLキャッシュ
+L2: Redis（ワーカー間で共有）
+L1の無効化はRedis pub/subで全ワーカーへブロードキャストする。
 """
-import hashlib
+import asyncio
+import fnmatch
 import json
 import logging
-import pickle
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
 
 import redis
 
+from core.cache_codec import CacheCodec, CacheEntry, derive_key
 from core.config import settings
+from core.redis_async import get_async_redis
+from core.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+class LocalCache:
+    """
+    ワーカー内L1キャッシュ（スレッドセーフ）
+
+    件数とおおよそのバイト数の両方で上限を設け、LRU順に追い出す。
+    各エントリはTTLを持ち、期限切れは参照時に破棄する。
+    """
+
+    def __init__(self, max_items: int, max_bytes: int, default_ttl: Optional[int]):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, expires_at(monotonic) or None, size)
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        # タグ -> キー、キー -> タグ（除去時にタグ側からも外す）
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(ヒットしたか, 値) を返す（Noneを値として保持できるようにするため）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ):
+        """L1に設定（上限を超えた分はLRU順に追い出す）"""
+        if size > self.max_bytes:
+            # 1件で上限を超える値はL1に載せない
+            self.delete(key)
+            return
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            tags = set(tags or ())
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+            while self._data and (
+                len(self._data) > self.max_items or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """L1から削除"""
+        with self._lock:
+            return self._pop(key)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """複数キーをL1から削除"""
+        with self._lock:
+            return sum(1 for key in keys if self._pop(key))
+
+    def delete_by_tag(self, tag: str) -> int:
+        """タグに紐づくキーをL1から削除"""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            return sum(1 for key in keys if self._pop(key))
+
+    def clear(self, pattern: Optional[str] = None) -> int:
+        """L1をクリア（patternはRedisと同じglob形式）"""
+        with self._lock:
+            if pattern is None:
+                count = len(self._data)
+                self._data.clear()
+                self._tags.clear()
+                self._key_tags.clear()
+                self._bytes = 0
+                return count
+            keys = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+            return sum(1 for key in keys if self._pop(key))
+
+    def _pop(self, key: str) -> bool:
+        """ロック取得済みの前提でエントリを除去"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """L1統計を取得"""
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "bytes": self._bytes,
+            "max_items": self.max_items,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total * 100) if total else 0,
+        }
+
+
 class CacheStrategy:
     """キャッシュ戦略クラス"""
 
     def __init__(self):
         """キャッシュ戦略を初期化"""
+        self._instance_id = uuid.uuid4().hex
+        self.codec = CacheCodec(
+            serializer=settings.CACHE_SERIALIZER,
+            compression=settings.CACHE_COMPRESSION,
+            compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+        )
+        self._pubsub = None
+        self._pubsub_thread = None
         try:
             self.redis_client = redis.from_url(
                 settings.REDIS_URL,
@@ -39,27 +192,165 @@ class CacheStrategy:
             logger.warning(f"Redis connection failed: {e}. Using in-memory cache.")
             self.redis_client = None
             self.enabled = False
-            self._memory_cache: Dict[str, Any] = {}
+
+        # Redis接続時はL1のTTLを短く抑え、他ワーカーの更新との乖離を限定する。
+        # 未接続時はL1が唯一の層になるため、呼び出し側のTTLをそのまま使う。
+        self.local_cache = LocalCache(
+            max_items=settings.CACHE_L1_MAX_ITEMS,
+            max_bytes=settings.CACHE_L1_MAX_BYTES,
+            default_ttl=settings.CACHE_L1_TTL if self.enabled else None,
+        )
+        if self.enabled:
+            self._start_invalidation_listener()
+
+    def _start_invalidation_listener(self):
+        """他ワーカーからのL1無効化通知の購読を開始"""
+        try:
+            self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(
+                **{settings.CACHE_INVALIDATION_CHANNEL: self._handle_invalidation}
+            )
+            self._pubsub_thread = self._pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True
+            )
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener failed to start: {e}")
+            self._pubsub = None
+            self._pubsub_thread = None
+
+    def _handle_invalidation(self, message: Dict[str, Any]):
+        """無効化通知を受信してL1から該当エントリを除去"""
+        try:
+            payload = json.loads(message["data"])
+        except Exception as e:
+            logger.error(f"Cache invalidation message error: {e}")
+            return
+        if payload.get("origin") == self._instance_id:
+            return
+        self._apply_invalidation(payload)
+
+    def _apply_invalidation(self, payload: Dict[str, Any]):
+        """無効化内容をL1に適用"""
+        if payload.get("keys"):
+            self.local_cache.delete_many(payload["keys"])
+        if payload.get("tag"):
+            self.local_cache.delete_by_tag(payload["tag"])
+        if payload.get("all"):
+            self.local_cache.clear()
+        elif payload.get("pattern"):
+            self.local_cache.clear(payload["pattern"])
+
+    def _publish_invalidation(self, pipe=None, **payload):
+        """L1無効化を全ワーカーへブロードキャスト（pipe指定時はパイプラインに積む）"""
+        if not self.enabled:
+            return
+        try:
+            payload["origin"] = self._instance_id
+            (pipe or self.redis_client).publish(
+                settings.CACHE_INVALIDATION_CHANNEL, json.dumps(payload, default=str)
+            )
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    def close(self):
+        """無効化リスナーを停止"""
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
 
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """キャッシュキーを生成"""
-        key_data = {"prefix": prefix, "args": args, "kwargs": kwargs}
-        key_string = json.dumps(key_data, sort_keys=True, default=str)
-        return f"{prefix}:{hashlib.md5(key_string.encode()).hexdigest()}"
+        return derive_key(prefix, args, kwargs)
+
+    def _async_client(self):
+        """共有の非同期クライアント（Redis未使用・未初期化なら None）"""
+        return get_async_redis() if self.enabled else None
+
+    def _load_from_l2(self, key: str, cached_data: Optional[bytes]) -> Optional[Any]:
+        """L2から取得したバイト列をデコードしてL1に載せる"""
+        if not cached_data:
+            return None
+        value = self.codec.decode(cached_data)
+        # L2の残りTTLは取得せず、L1の既定TTLで保持する
+        self.local_cache.set(key, value, size=len(cached_data))
+        return value
 
     def get(self, key: str) -> Optional[Any]:
-        """キャッシュから取得"""
-        if not self.enabled:
-            return self._memory_cache.get(key)
+        """キャッシュから取得（L1 → L2 の順）"""
+        hit, value = self.local_cache.get(key)
+        if hit or not self.enabled:
+            return value
 
         try:
-            cached_data = self.redis_client.get(key)
-            if cached_data:
-                return pickle.loads(cached_data)
+            return self._load_from_l2(key, self.redis_client.get(key))
         except Exception as e:
             logger.error(f"Cache get error: {e}")
         return None
 
+    async def aget(self, key: str) -> Optional[Any]:
+        """キャッシュから取得（非同期版）"""
+        client = self._async_client()
+        if client is None:
+            return self.get(key)
+        hit, value = self.local_cache.get(key)
+        if hit:
+            return value
+
+        try:
+            return self._load_from_l2(key, await client.get(key))
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+        return None
+
+    def _split_local_hits(self, keys: Iterable[str]) -> Tuple[Dict[str, Any], list]:
+        """L1で見つかった値と、L2に問い合わせるキーに分ける"""
+        result: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            hit, value = self.local_cache.get(key)
+            if hit:
+                result[key] = value
+            elif self.enabled:
+                missing.append(key)
+        return result, missing
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """複数キーを一括取得（L1で見つからない分はMGETの1往復で取得）"""
+        result, missing = self._split_local_hits(keys)
+        if not missing:
+            return result
+        try:
+            for key, cached_data in zip(missing, self.redis_client.mget(missing)):
+                value = self._load_from_l2(key, cached_data)
+                if value is not None:
+                    result[key] = value
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+        return result
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """複数キーを一括取得（非同期版）"""
+        client = self._async_client()
+        if client is None:
+            return self.get_many(keys)
+        result, missing = self._split_local_hits(keys)
+        if not missing:
+            return result
+        try:
+            for key, cached_data in zip(missing, await client.mget(missing)):
+                value = self._load_from_l2(key, cached_data)
+                if value is not None:
+                    result[key] = value
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+        return result
+
     def set(
         self,
         key: str,
@@ -68,71 +359,193 @@ class CacheStrategy:
         tags: Optional[list] = None,
     ):
         """キャッシュに設定"""
-        try:
-            serialized_value = pickle.dumps(value)
+        self.set_many({key: value}, ttl=ttl, tags=tags)
 
-            if self.enabled:
-                if ttl:
-                    self.redis_client.setex(key, ttl, serialized_value)
-                else:
-                    self.redis_client.set(key, serialized_value)
-
-                # タグ管理（タグでグループ化されたキーを管理）
-                if tags:
-                    for tag in tags:
-                        tag_key = f"tag:{tag}"
-                        self.redis_client.sadd(tag_key, key)
-                        if ttl:
-                            self.redis_client.expire(tag_key, ttl)
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[list] = None,
+    ):
+        """キャッシュに設定（非同期版）"""
+        await self.aset_many({key: value}, ttl=ttl, tags=tags)
+
+    def _queue_set_many(
+        self,
+        pipe,
+        encoded: Dict[str, bytes],
+        ttl: Optional[int],
+        tags: Optional[list],
+    ):
+        """値・タグ・無効化通知をパイプラインに積む（同期/非同期共通）"""
+        for key, serialized_value in encoded.items():
+            if ttl:
+                pipe.setex(key, ttl, serialized_value)
             else:
-                self._memory_cache[key] = value
+                pipe.set(key, serialized_value)
+
+        # タグ管理（タグでグループ化されたキーを管理）
+        if tags:
+            for tag in tags:
+                tag_key = f"tag:{tag}"
+                pipe.sadd(tag_key, *encoded)
+                if ttl:
+                    pipe.expire(tag_key, ttl)
+
+        # 他ワーカーのL1に残る古い値を破棄させる
+        self._publish_invalidation(pipe, keys=list(encoded))
+
+    def _store_local(
+        self,
+        mapping: Dict[str, Any],
+        encoded: Dict[str, bytes],
+        ttl: Optional[int],
+        tags: Optional[list],
+    ):
+        """L1に設定（Redis接続時はL1のTTLを短く抑える）"""
+        if self.enabled:
+            l1_ttl = min(ttl, settings.CACHE_L1_TTL) if ttl else None
+        else:
+            l1_ttl = ttl
+        for key, serialized_value in encoded.items():
+            self.local_cache.set(
+                key,
+                mapping[key],
+                size=len(serialized_value),
+                ttl=l1_ttl,
+                tags=tags,
+            )
+
+    def set_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[list] = None,
+    ):
+        """複数キーを一括設定（値・タグ・無効化通知を1つのパイプラインで送信）"""
+        if not mapping:
+            return
+        try:
+            encoded = {key: self.codec.encode(value) for key, value in mapping.items()}
+            if self.enabled:
+                pipe = self.redis_client.pipeline(transaction=False)
+                self._queue_set_many(pipe, encoded, ttl, tags)
+                pipe.execute()
+            self._store_local(mapping, encoded, ttl, tags)
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+
+    async def aset_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[list] = None,
+    ):
+        """複数キーを一括設定（非同期版）"""
+        client = self._async_client()
+        if client is None:
+            self.set_many(mapping, ttl=ttl, tags=tags)
+            return
+        if not mapping:
+            return
+        try:
+            encoded = {key: self.codec.encode(value) for key, value in mapping.items()}
+            pipe = client.pipeline(transaction=False)
+            self._queue_set_many(pipe, encoded, ttl, tags)
+            await pipe.execute()
+            self._store_local(mapping, encoded, ttl, tags)
         except Exception as e:
             logger.error(f"Cache set error: {e}")
 
     def delete(self, key: str) -> bool:
         """キャッシュを削除"""
         try:
+            deleted_local = self.local_cache.delete(key)
             if self.enabled:
-                return bool(self.redis_client.delete(key))
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.unlink(key)
+                self._publish_invalidation(pipe, keys=[key])
+                return bool(pipe.execute()[0])
             else:
-                return self._memory_cache.pop(key, None) is not None
+                return deleted_local
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
             return False
 
+    async def adelete(self, key: str) -> bool:
+        """キャッシュを削除（非同期版）"""
+        client = self._async_client()
+        if client is None:
+            return self.delete(key)
+        try:
+            self.local_cache.delete(key)
+            pipe = client.pipeline(transaction=False)
+            pipe.unlink(key)
+            self._publish_invalidation(pipe, keys=[key])
+            return bool((await pipe.execute())[0])
+        except Exception as e:
+            logger.error(f"Cache delete error: {e}")
+            return False
+
+    def _unlink_batch(self, keys: list, **invalidation) -> int:
+        """キーをUNLINKで一括削除し、同じパイプラインでL1無効化を通知"""
+        decoded_keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+        self.local_cache.delete_many(decoded_keys)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        self._publish_invalidation(pipe, keys=decoded_keys, **invalidation)
+        return pipe.execute()[0]
+
     def delete_by_tag(self, tag: str) -> int:
-        """タグでグループ化されたキャッシュを削除"""
+        """タグでグループ化されたキャッシュを削除（SSCANで分割して処理）"""
+        deleted_local = self.local_cache.delete_by_tag(tag)
         if not self.enabled:
-            return 0
+            return deleted_local
 
+        deleted = 0
         try:
             tag_key = f"tag:{tag}"
-            keys = self.redis_client.smembers(tag_key)
-            if keys:
-                deleted = self.redis_client.delete(*keys)
-                self.redis_client.delete(tag_key)
-                return deleted
+            batch = []
+            for key in self.redis_client.sscan_iter(
+                tag_key, count=settings.CACHE_SCAN_BATCH_SIZE
+            ):
+                batch.append(key)
+                if len(batch) >= settings.CACHE_SCAN_BATCH_SIZE:
+                    deleted += self._unlink_batch(batch, tag=tag)
+                    batch = []
+            if batch:
+                deleted += self._unlink_batch(batch, tag=tag)
+            self.redis_client.unlink(tag_key)
         except Exception as e:
             logger.error(f"Cache delete by tag error: {e}")
-        return 0
+        return deleted
 
     def clear(self, pattern: Optional[str] = None):
-        """キャッシュをクリア"""
+        """
+        キャッシュをクリア
+
+        パターン指定時はKEYSではなくSCANで少しずつ走査し、UNLINKで削除する
+        （キー空間全体をブロックしない）。全削除は FLUSHDB ASYNC を使う。
+        """
         try:
+            self.local_cache.clear(pattern)
             if self.enabled:
                 if pattern:
-                    keys = self.redis_client.keys(pattern)
-                    if keys:
-                        self.redis_client.delete(*keys)
-                else:
-                    self.redis_client.flushdb()
-            else:
-                if pattern:
-                    self._memory_cache = {
-                        k: v for k, v in self._memory_cache.items() if pattern in k
-                    }
+                    self._publish_invalidation(pattern=pattern)
+                    batch = []
+                    for key in self.redis_client.scan_iter(
+                        match=pattern, count=settings.CACHE_SCAN_BATCH_SIZE
+                    ):
+                        batch.append(key)
+                        if len(batch) >= settings.CACHE_SCAN_BATCH_SIZE:
+                            self.redis_client.unlink(*batch)
+                            batch = []
+                    if batch:
+                        self.redis_client.unlink(*batch)
                 else:
-                    self._memory_cache.clear()
+                    self._publish_invalidation(all=True)
+                    self.redis_client.flushdb(asynchronous=True)
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
 
@@ -154,14 +567,19 @@ class CacheStrategy:
                         )
                     )
                     * 100,
+                    "l1": self.local_cache.get_stats(),
+                    "codec": self.codec.get_stats(),
                 }
             else:
+                l1_stats = self.local_cache.get_stats()
                 return {
                     "enabled": False,
-                    "total_keys": len(self._memory_cache),
-                    "hits": 0,
-                    "misses": 0,
-                    "hit_rate": 0,
+                    "total_keys": len(self.local_cache),
+                    "hits": l1_stats["hits"],
+                    "misses": l1_stats["misses"],
+                    "hit_rate": l1_stats["hit_rate"],
+                    "l1": l1_stats,
+                    "codec": self.codec.get_stats(),
                 }
         except Exception as e:
             logger.error(f"Cache stats error: {e}")
@@ -172,54 +590,173 @@ class CacheStrategy:
 cache_strategy = CacheStrategy()
 
 
-def cached(ttl: int = 300, key_prefix: str = "cache", tags: Optional[list] = None):
+# @cached の同時ミスを合流させるシングルフライト
+_single_flight = SingleFlight()
+# バックグラウンド再計算タスクの参照（GC対策）
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _should_refresh_early(entry: CacheEntry, beta: float, now: float) -> bool:
+    """
+    確率的早期期限切れ（XFetch）の判定
+
+    期限が近く、再計算コストが大きいほど高い確率で早めに再計算する。
+    """
+    if beta <= 0 or entry.delta <= 0:
+        return False
+    return (
+        now - entry.delta * beta * math.log(1.0 - random.random()) >= entry.expires_at
+    )
+
+
+def _as_entry(cached_value: Any) -> Optional[CacheEntry]:
+    """キャッシュ値をエントリとして扱う（旧形式の値は期限なしとして扱う）"""
+    if cached_value is None:
+        return None
+    if not isinstance(cached_value, CacheEntry):
+        return CacheEntry(value=cached_value, expires_at=math.inf)
+    return cached_value
+
+
+def _lookup_entry(cache_key: str) -> Optional[CacheEntry]:
+    """キャッシュからエントリを取得"""
+    return _as_entry(cache_strategy.get(cache_key))
+
+
+async def _alookup_entry(cache_key: str) -> Optional[CacheEntry]:
+    """キャッシュからエントリを取得（非同期版）"""
+    return _as_entry(await cache_strategy.aget(cache_key))
+
+
+def _new_entry(result: Any, started: float, ttl: int) -> CacheEntry:
+    """計算結果から論理的な有効期限と再計算コストを持つエントリを作る"""
+    now = time.time()
+    return CacheEntry(value=result, expires_at=now + ttl, delta=now - started)
+
+
+def _store_entry(
+    cache_key: str,
+    result: Any,
+    started: float,
+    ttl: int,
+    stale_ttl: int,
+    tags: Optional[list],
+):
+    """計算結果をエントリとして保存（猶予期間ぶん物理TTLを延ばす）"""
+    if result is None:
+        return
+    entry = _new_entry(result, started, ttl)
+    cache_strategy.set(cache_key, entry, ttl=ttl + stale_ttl, tags=tags)
+
+
+async def _astore_entry(
+    cache_key: str,
+    result: Any,
+    started: float,
+    ttl: int,
+    stale_ttl: int,
+    tags: Optional[list],
+):
+    """計算結果をエントリとして保存（非同期版）"""
+    if result is None:
+        return
+    entry = _new_entry(result, started, ttl)
+    await cache_strategy.aset(cache_key, entry, ttl=ttl + stale_ttl, tags=tags)
+
+
+def cached(
+    ttl: int = 300,
+    key_prefix: str = "cache",
+    tags: Optional[list] = None,
+    stale_ttl: int = 0,
+    early_expiration_beta: float = 1.0,
+):
     """
     関数結果をキャッシュするデコレータ
 
+    同一キーの同時ミスはシングルフライトで1回の計算にまとめる。
+    stale_ttl > 0 の場合、期限切れ後その秒数までは古い値を返しつつ
+    バックグラウンドで再計算する（stale-while-revalidate）。
+    early_expiration_beta > 0 の場合、期限前でも確率的に再計算を始める。
+
     Usage:
-        @cached(ttl=600, tags=["users"])
+        @cached(ttl=600, tags=["users"], stale_ttl=60)
         def get_user(user_id: int):
             return db.query(User).filter(User.id == user_id).first()
     """
 
+    def needs_refresh(entry: CacheEntry) -> bool:
+        now = time.time()
+        return now >= entry.expires_at or _should_refresh_early(
+            entry, early_expiration_beta, now
+        )
+
     def decorator(func: Callable):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             cache_key = cache_strategy._generate_key(key_prefix, *args, **kwargs)
 
-            # キャッシュから取得を試みる
-            cached_value = cache_strategy.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-
-            # キャッシュにない場合は関数を実行
-            result = await func(*args, **kwargs)
+            async def compute(force: bool = False):
+                if not force:
+                    # 先行した計算が保存済みならそれを使う
+                    entry = await _alookup_entry(cache_key)
+                    if entry is not None:
+                        return entry.value
+                started = time.time()
+                result = await func(*args, **kwargs)
+                await _astore_entry(cache_key, result, started, ttl, stale_ttl, tags)
+                return result
+
+            async def refresh():
+                try:
+                    await _single_flight.do_async(cache_key, lambda: compute(True))
+                except Exception as e:
+                    logger.error(f"Cache background refresh error: {e}")
 
-            # 結果をキャッシュ
-            cache_strategy.set(cache_key, result, ttl=ttl, tags=tags)
+            # キャッシュから取得を試みる
+            entry = await _alookup_entry(cache_key)
+            if entry is not None:
+                if needs_refresh(entry) and not _single_flight.in_flight(cache_key):
+                    task = asyncio.get_running_loop().create_task(refresh())
+                    _background_tasks.add(task)
+                    task.add_done_callback(_background_tasks.discard)
+                return entry.value
 
-            return result
+            # キャッシュにない場合は関数を実行（同時ミスは合流）
+            return await _single_flight.do_async(cache_key, compute)
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             cache_key = cache_strategy._generate_key(key_prefix, *args, **kwargs)
 
-            # キャッシュから取得を試みる
-            cached_value = cache_strategy.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-
-            # キャッシュにない場合は関数を実行
-            result = func(*args, **kwargs)
+            def compute(force: bool = False):
+                if not force:
+                    # 先行した計算が保存済みならそれを使う
+                    entry = _lookup_entry(cache_key)
+                    if entry is not None:
+                        return entry.value
+                started = time.time()
+                result = func(*args, **kwargs)
+                _store_entry(cache_key, result, started, ttl, stale_ttl, tags)
+                return result
+
+            def refresh():
+                try:
+                    _single_flight.do(cache_key, lambda: compute(True))
+                except Exception as e:
+                    logger.error(f"Cache background refresh error: {e}")
 
-            # 結果をキャッシュ
-            cache_strategy.set(cache_key, result, ttl=ttl, tags=tags)
+            # キャッシュから取得を試みる
+            entry = _lookup_entry(cache_key)
+            if entry is not None:
+                if needs_refresh(entry) and not _single_flight.in_flight(cache_key):
+                    threading.Thread(target=refresh, daemon=True).start()
+                return entry.value
 
-            return result
+            # キャッシュにない場合は関数を実行（同時ミスは合流）
+            return _single_flight.do(cache_key, compute)
 
         # 非同期関数かどうかでラッパーを選択
-        import asyncio
-
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
         else:
@@ -0,0 +1,362 @@
+"""
+キャッシュ値のコーデックモジュール
+シリアライザ（msgpack / orjson / pickle）と圧縮（zstd / lz4 / zlib）を切り替える
+
+エンコード結果の先頭1バイトはヘッダで、下位4ビットがシリアライザ、
+次の2ビットが圧縮方式を表す。最上位ビットは使わないため、
+プロトコル2以上のpickle（先頭 0x80）で保存された旧形式の値もそのまま読める。
+"""
+import hashlib
+import json
+import logging
+import pickle
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame as lz4_frame
+
+    LZ4_AVAILABLE = True
+except ImportError:
+    lz4_frame = None
+    LZ4_AVAILABLE = False
+
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
+
+@dataclass
+class CacheEntry:
+    """@cached が保存する値（論理的な有効期限と再計算コストを保持）"""
+
+    value: Any
+    expires_at: float
+    delta: float = 0.0  # 再計算に要した秒数
+
+
+# ヘッダのシリアライザID（下位4ビット）
+SERIALIZER_PICKLE = 0x01
+SERIALIZER_MSGPACK = 0x02
+SERIALIZER_ORJSON = 0x03
+
+# ヘッダの圧縮ID（ビット4-5）
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x01
+COMPRESSION_ZSTD = 0x02
+COMPRESSION_LZ4 = 0x03
+
+# 旧形式（ヘッダなしpickle）の先頭バイト
+LEGACY_PICKLE_MARKER = 0x80
+
+_MSGPACK_EXT_CACHE_ENTRY = 1
+_ORJSON_CACHE_ENTRY_TAG = "__cache_entry__"
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """msgpackがネイティブに扱えない型の変換（CacheEntry以外は拒否してpickleへ）"""
+    if type(obj) is CacheEntry:
+        return msgpack.ExtType(
+            _MSGPACK_EXT_CACHE_ENTRY,
+            _msgpack_dumps([obj.value, obj.expires_at, obj.delta]),
+        )
+    raise TypeError(f"msgpack cannot encode {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _MSGPACK_EXT_CACHE_ENTRY:
+        value, expires_at, delta = _msgpack_loads(data)
+        return CacheEntry(value=value, expires_at=expires_at, delta=delta)
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    # strict_types: tuple や dict のサブクラスは default へ回し、型が変わる変換を避ける
+    return msgpack.packb(
+        value, use_bin_type=True, strict_types=True, default=_msgpack_default
+    )
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(
+        data, raw=False, strict_map_key=False, ext_hook=_msgpack_ext_hook
+    )
+
+
+def _orjson_default(obj: Any) -> Any:
+    """orjsonがネイティブに扱えない型の変換（CacheEntry以外は拒否してpickleへ）"""
+    if type(obj) is CacheEntry:
+        return {_ORJSON_CACHE_ENTRY_TAG: [obj.value, obj.expires_at, obj.delta]}
+    raise TypeError(f"orjson cannot encode {type(obj).__name__}")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    # dataclass・datetime・サブクラスは default へ回し、文字列化による型の欠落を避ける
+    # 注: tuple は配列として保存されるため、読み出し時は list になる
+    return orjson.dumps(
+        value,
+        default=_orjson_default,
+        option=orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+        | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def _orjson_loads(data: bytes) -> Any:
+    value = orjson.loads(data)
+    if type(value) is dict and len(value) == 1 and _ORJSON_CACHE_ENTRY_TAG in value:
+        inner, expires_at, delta = value[_ORJSON_CACHE_ENTRY_TAG]
+        return CacheEntry(value=inner, expires_at=expires_at, delta=delta)
+    return value
+
+
+def _pickle_dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# name -> (ID, dumps, loads)
+_SERIALIZERS: Dict[str, Tuple[int, Callable, Callable]] = {
+    "pickle": (SERIALIZER_PICKLE, _pickle_dumps, pickle.loads),
+}
+if MSGPACK_AVAILABLE:
+    _SERIALIZERS["msgpack"] = (SERIALIZER_MSGPACK, _msgpack_dumps, _msgpack_loads)
+if ORJSON_AVAILABLE:
+    _SERIALIZERS["orjson"] = (SERIALIZER_ORJSON, _orjson_dumps, _orjson_loads)
+
+# name -> (ID, compress, decompress)
+_COMPRESSORS: Dict[str, Tuple[int, Callable, Callable]] = {
+    "zlib": (COMPRESSION_ZLIB, lambda d: zlib.compress(d, 6), zlib.decompress),
+}
+if ZSTD_AVAILABLE:
+    _COMPRESSORS["zstd"] = (COMPRESSION_ZSTD, _zstd_compress, _zstd_decompress)
+if LZ4_AVAILABLE:
+    _COMPRESSORS["lz4"] = (
+        COMPRESSION_LZ4,
+        lz4_frame.compress,
+        lz4_frame.decompress,
+    )
+
+_SERIALIZER_NAMES = {v[0]: k for k, v in _SERIALIZERS.items()}
+_COMPRESSOR_NAMES = {v[0]: k for k, v in _COMPRESSORS.items()}
+
+
+def _resolve_serializer(name: str) -> str:
+    """設定値からシリアライザ名を決定（auto は msgpack → pickle）"""
+    if name == "auto":
+        # orjson は tuple を list に変えるため、明示指定時のみ使う
+        return "msgpack" if MSGPACK_AVAILABLE else "pickle"
+    if name not in _SERIALIZERS:
+        logger.warning(f"Cache serializer '{name}' is not available. Using pickle.")
+        return "pickle"
+    return name
+
+
+def _resolve_compressor(name: str) -> Optional[str]:
+    """設定値から圧縮方式を決定（auto は zstd → lz4 → zlib）"""
+    if name == "none":
+        return None
+    if name == "auto":
+        for candidate in ("zstd", "lz4", "zlib"):
+            if candidate in _COMPRESSORS:
+                return candidate
+    if name not in _COMPRESSORS:
+        logger.warning(f"Cache compression '{name}' is not available. Using zlib.")
+        return "zlib"
+    return name
+
+
+class CacheCodec:
+    """キャッシュ値のエンコーダ/デコーダ（コーデック別の処理時間を集計）"""
+
+    def __init__(
+        self,
+        serializer: str = "auto",
+        compression: str = "auto",
+        compression_threshold: int = 1024,
+    ):
+        self.serializer = _resolve_serializer(serializer)
+        self.compression = _resolve_compressor(compression)
+        self.compression_threshold = compression_threshold
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, name: str, op: str, elapsed: float, size: int):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {
+                "encode_count": 0,
+                "encode_seconds": 0.0,
+                "encode_bytes": 0,
+                "decode_count": 0,
+                "decode_seconds": 0.0,
+                "decode_bytes": 0,
+            }
+        stats[f"{op}_count"] += 1
+        stats[f"{op}_seconds"] += elapsed
+        stats[f"{op}_bytes"] += size
+
+    def encode(self, value: Any) -> bytes:
+        """値をヘッダ付きバイト列に変換"""
+        name = self.serializer
+        serializer_id, dumps, _ = _SERIALIZERS[name]
+        started = time.perf_counter()
+        try:
+            payload = dumps(value)
+        except (TypeError, ValueError, OverflowError):
+            # 高速シリアライザが扱えない型はpickleで保存する
+            name = "pickle"
+            serializer_id, dumps, _ = _SERIALIZERS[name]
+            started = time.perf_counter()
+            payload = dumps(value)
+        self._record(name, "encode", time.perf_counter() - started, len(payload))
+
+        compression_id = COMPRESSION_NONE
+        if self.compression and len(payload) >= self.compression_threshold:
+            compression_id, compress, _ = _COMPRESSORS[self.compression]
+            started = time.perf_counter()
+            compressed = compress(payload)
+            self._record(
+                self.compression,
+                "encode",
+                time.perf_counter() - started,
+                len(compressed),
+            )
+            if len(compressed) < len(payload):
+                payload = compressed
+            else:
+                compression_id = COMPRESSION_NONE
+
+        return bytes((serializer_id | (compression_id << 4),)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        """ヘッダ付きバイト列（または旧形式のpickle）を値に戻す"""
+        header = data[0]
+        if header == LEGACY_PICKLE_MARKER:
+            started = time.perf_counter()
+            value = pickle.loads(data)
+            self._record("pickle", "decode", time.perf_counter() - started, len(data))
+            return value
+
+        serializer_id = header & 0x0F
+        compression_id = (header >> 4) & 0x03
+        payload = memoryview(data)[1:]
+
+        if compression_id != COMPRESSION_NONE:
+            name = _COMPRESSOR_NAMES.get(compression_id)
+            if name is None:
+                raise ValueError(f"Unsupported cache compression id: {compression_id}")
+            started = time.perf_counter()
+            payload = _COMPRESSORS[name][2](payload)
+            self._record(name, "decode", time.perf_counter() - started, len(data))
+
+        name = _SERIALIZER_NAMES.get(serializer_id)
+        if name is None:
+            raise ValueError(f"Unsupported cache serializer id: {serializer_id}")
+        started = time.perf_counter()
+        value = _SERIALIZERS[name][2](payload)
+        self._record(name, "decode", time.perf_counter() - started, len(payload))
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """コーデック別の処理回数・時間・バイト数を取得"""
+        codecs = {}
+        for name, stats in self._stats.items():
+            codecs[name] = {
+                **stats,
+                "avg_encode_us": (
+                    stats["encode_seconds"] / stats["encode_count"] * 1e6
+                    if stats["encode_count"]
+                    else 0
+                ),
+                "avg_decode_us": (
+                    stats["decode_seconds"] / stats["decode_count"] * 1e6
+                    if stats["decode_count"]
+                    else 0
+                ),
+            }
+        return {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "compression_threshold": self.compression_threshold,
+            "codecs": codecs,
+        }
+
+
+_PRIMITIVE_TAGS = {str: b"s", int: b"i", float: b"f", bool: b"b", type(None): b"n"}
+
+
+def _stable_bytes(prefix: str, args: tuple, kwargs: dict) -> bytes:
+    """
+    引数の安定したバイナリ表現
+
+    プリミティブのみの引数は型タグ付きreprを連結する（json.dumpsを経由しない高速経路）。
+    それ以外は従来どおり json.dumps(sort_keys=True, default=str) を使う。
+    """
+    parts = [prefix.encode()]
+    for value in args:
+        tag = _PRIMITIVE_TAGS.get(type(value))
+        if tag is None:
+            break
+        parts.append(tag + repr(value).encode())
+    else:
+        for name in sorted(kwargs):
+            value = kwargs[name]
+            tag = _PRIMITIVE_TAGS.get(type(value))
+            if tag is None:
+                break
+            parts.append(b"k" + name.encode() + b"=" + tag + repr(value).encode())
+        else:
+            return b"\x1f".join(parts)
+
+    key_data = {"prefix": prefix, "args": args, "kwargs": kwargs}
+    return b"j" + json.dumps(key_data, sort_keys=True, default=str).encode()
+
+
+def derive_key(prefix: str, args: tuple, kwargs: dict) -> str:
+    """キャッシュキーを導出（xxhash があれば XXH3-128、なければ BLAKE2b-128）"""
+    data = _stable_bytes(prefix, args, kwargs)
+    if XXHASH_AVAILABLE:
+        digest = xxhash.xxh3_128_hexdigest(data)
+    else:
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"{prefix}:{digest}"
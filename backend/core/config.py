@@ -33,6 +33,34 @@ class Settings(BaseSettings):
     # Redis設定
     REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
     REDIS_PASSWORD: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
+    REDIS_MAX_CONNECTIONS: int = Field(default=50, env="REDIS_MAX_CONNECTIONS")
+
+    # キャッシュ設定（L1: ワーカー内LRU / L2: Redis）
+    CACHE_L1_MAX_ITEMS: int = Field(default=10000, env="CACHE_L1_MAX_ITEMS")
+    CACHE_L1_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, env="CACHE_L1_MAX_BYTES"
+    )  # 64MB
+    CACHE_L1_TTL: int = Field(default=60, env="CACHE_L1_TTL")
+    CACHE_INVALIDATION_CHANNEL: str = Field(
+        default="uep:cache:invalidate", env="CACHE_INVALIDATION_CHANNEL"
+    )
+    # シリアライザ: auto / msgpack / orjson / pickle（auto は msgpack → pickle）
+    CACHE_SERIALIZER: str = Field(default="auto", env="CACHE_SERIALIZER")
+    # 圧縮: auto / zstd / lz4 / zlib / none（auto は zstd → lz4 → zlib）
+    CACHE_COMPRESSION: str = Field(default="auto", env="CACHE_COMPRESSION")
+    CACHE_COMPRESSION_THRESHOLD: int = Field(
+        default=1024, env="CACHE_COMPRESSION_THRESHOLD"
+    )  # このバイト数以上の値のみ圧縮
+    CACHE_SCAN_BATCH_SIZE: int = Field(default=500, env="CACHE_SCAN_BATCH_SIZE")
+
+    # WebSocket 配信（接続ごとの送信キュー・遅い接続の扱い・ワーカー間 pub/sub）
+    WS_SEND_QUEUE_SIZE: int = Field(default=100, env="WS_SEND_QUEUE_SIZE")
+    WS_SEND_TIMEOUT: float = Field(default=5.0, env="WS_SEND_TIMEOUT")  # 秒
+    # キューあふれ時: disconnect（切断）/ drop_oldest（古いメッセージを破棄）
+    WS_SLOW_CONSUMER_POLICY: str = Field(
+        default="disconnect", env="WS_SLOW_CONSUMER_POLICY"
+    )
+    WS_PUBSUB_CHANNEL: str = Field(default="uep:ws", env="WS_PUBSUB_CHANNEL")
 
     # 本番ユーザー永続化（認証用）
     PRODUCTION_USERS_FILE: str = Field(
@@ -110,6 +138,18 @@ class Settings(BaseSettings):
         default="localhost:9092", env="KAFKA_BOOTSTRAP_SERVERS"
     )
 
+    # ストリーミング異常検知（系列ごとのリングバッファ）
+    ANOMALY_STREAM_WINDOW: int = Field(default=10, env="ANOMALY_STREAM_WINDOW")
+    ANOMALY_STREAM_MAX_SERIES: int = Field(
+        default=10000, env="ANOMALY_STREAM_MAX_SERIES"
+    )
+    ANOMALY_STREAM_TOPIC: Optional[str] = Field(
+        default=None, env="ANOMALY_STREAM_TOPIC"
+    )  # 設定時はこのトピックの測定値を常時取り込む
+    ANOMALY_EVENTS_TOPIC: str = Field(
+        default="anomaly-events", env="ANOMALY_EVENTS_TOPIC"
+    )
+
     # MinIO設定
     MINIO_ENDPOINT: str = Field(default="localhost:9000", env="MINIO_ENDPOINT")
     MINIO_ACCESS_KEY: str = Field(default="minioadmin", env="MINIO_ACCESS_KEY")
@@ -32,6 +32,7 @@ async def uep_exception_handler(request: Request, exc: UEPException):
 
     return JSONResponse(
         status_code=exc.status_code,
+        headers=exc.headers,
         content={
             "error": {
                 "code": exc.error_code,
@@ -16,11 +16,13 @@ class UEPException(Exception):
         status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
         error_code: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
         self.message = message
         self.status_code = status_code
         self.error_code = error_code or "INTERNAL_ERROR"
         self.details = details or {}
+        self.headers = headers
         super().__init__(self.message)
 
 
@@ -89,6 +91,9 @@ class RateLimitError(UEPException):
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             error_code="RATE_LIMIT_ERROR",
             details={"retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)}
+            if retry_after is not None
+            else None,
         )
 
 
@@ -2,8 +2,11 @@
 APIレート制限モジュール
 slowapiを使用した高度なレート制限
 """
+import asyncio
 import logging
-from typing import Callable
+import time
+from functools import wraps
+from typing import Callable, Dict, Tuple
 
 from fastapi import Request
 from slowapi import Limiter
@@ -11,6 +14,8 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from core.config import settings
+from core.exceptions import RateLimitError
+from core.redis_async import get_async_redis
 
 logger = logging.getLogger(__name__)
 
@@ -49,18 +54,100 @@ limiter = Limiter(
 )
 
 
+# 非同期Redis未接続時のフォールバック: key -> (ウィンドウ終了時刻, 回数)
+# 期限切れのウィンドウは定期的に掃除し、件数にも上限を設ける（古い順に破棄）
+_memory_windows: Dict[str, Tuple[int, int]] = {}
+_MEMORY_WINDOWS_MAX = 100000
+_MEMORY_SWEEP_INTERVAL = 60
+_next_memory_sweep = 0
+
+
+def _sweep_memory_windows(now: int):
+    """期限切れのウィンドウを削除し、追加の余地がなければ古い順に削除"""
+    global _next_memory_sweep
+    _next_memory_sweep = now + _MEMORY_SWEEP_INTERVAL
+    for key in [k for k, (end, _) in _memory_windows.items() if end <= now]:
+        del _memory_windows[key]
+    overflow = len(_memory_windows) - _MEMORY_WINDOWS_MAX + 1
+    if overflow > 0:
+        for key in list(_memory_windows)[:overflow]:
+            del _memory_windows[key]
+
+
+async def hit_rate_limit(key: str, calls: int, period: int) -> Tuple[bool, int]:
+    """
+    固定ウィンドウでリクエストを1回記録し、(許可するか, ウィンドウ終了までの秒数) を返す
+
+    共有の非同期Redis接続プールを使い、INCR と EXPIRE を1往復で送る。
+    未接続時はプロセス内メモリで数える。
+    """
+    now = int(time.time())
+    window = now - now % period
+    retry_after = window + period - now
+
+    client = get_async_redis()
+    if client is not None:
+        redis_key = f"ratelimit:{key}:{window}"
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.incr(redis_key)
+            pipe.expire(redis_key, period, nx=True)
+            count, _ = await pipe.execute()
+            return count <= calls, retry_after
+        except Exception as e:
+            logger.warning("レート制限のRedis操作に失敗したためメモリで判定します: %s", e)
+
+    if now >= _next_memory_sweep or len(_memory_windows) >= _MEMORY_WINDOWS_MAX:
+        _sweep_memory_windows(now)
+    end, count = _memory_windows.pop(key, (window + period, 0))
+    count = count + 1 if end == window + period else 1
+    # 末尾に入れ直して、上限超過時は最近使われていないキーから捨てる
+    _memory_windows[key] = (window + period, count)
+    return count <= calls, retry_after
+
+
+def _find_request(args: tuple, kwargs: dict) -> Request:
+    """エンドポイントの引数から Request を取り出す"""
+    for value in (*kwargs.values(), *args):
+        if isinstance(value, Request):
+            return value
+    raise RuntimeError("rate_limit を使うエンドポイントは request: Request 引数が必要です")
+
+
 def rate_limit(calls: int = 60, period: int = 60):
     """
     レート制限デコレータ
 
+    非同期エンドポイントは共有の非同期Redisで判定し、イベントループをブロックしない。
+    同期エンドポイントは従来どおり slowapi の Limiter を使う。
+
     Usage:
         @app.get("/api/v1/endpoint")
         @rate_limit(calls=10, period=60)  # 60秒間に10回
-        async def endpoint():
+        async def endpoint(request: Request):
             return {"message": "OK"}
     """
 
     def decorator(func: Callable):
-        return limiter.limit(f"{calls}/{period}seconds")(func)
+        if not asyncio.iscoroutinefunction(func):
+            return limiter.limit(f"{calls}/{period}seconds")(func)
+
+        scope = f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED:
+                request = _find_request(args, kwargs)
+                allowed, retry_after = await hit_rate_limit(
+                    f"{scope}:{get_limiter_key(request)}", calls, period
+                )
+                if not allowed:
+                    raise RateLimitError(
+                        message=f"Rate limit exceeded. Maximum {calls} requests per {period} seconds.",
+                        retry_after=retry_after,
+                    )
+            return await func(*args, **kwargs)
+
+        return wrapper
 
     return decorator
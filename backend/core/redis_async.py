@@ -0,0 +1,56 @@
+"""
+非同期Redisクライアントモジュール
+キャッシュ・LLMキャッシュ・レート制限で共有する redis.asyncio の接続プール
+
+アプリの lifespan で init_async_redis() / close_async_redis() を呼び出す。
+未初期化または Redis 未接続の間は get_async_redis() が None を返し、
+呼び出し側は同期クライアントやメモリにフォールバックする。
+"""
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_async_redis: Optional[aioredis.Redis] = None
+
+
+async def init_async_redis() -> Optional[aioredis.Redis]:
+    """共有接続プールを生成（接続できなければ None）"""
+    global _async_redis
+    if _async_redis is not None:
+        return _async_redis
+    client = aioredis.from_url(
+        settings.REDIS_URL,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=False,  # バイナリデータを扱うため
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        retry_on_timeout=True,
+        health_check_interval=30,
+    )
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Async Redis connection failed: {e}")
+        await client.aclose()
+        return None
+    _async_redis = client
+    return _async_redis
+
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """共有クライアントを取得（未初期化なら None）"""
+    return _async_redis
+
+
+async def close_async_redis():
+    """共有接続プールを破棄"""
+    global _async_redis
+    client, _async_redis = _async_redis, None
+    if client is not None:
+        await client.aclose()
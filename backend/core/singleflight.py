@@ -0,0 +1,107 @@
+"""
+シングルフライト（リクエスト合流）モジュール
+同一キーの同時計算を1回にまとめ、後続の呼び出しはその結果を待つ
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """実行側がキャンセルされた（待機側は合流をやり直す）"""
+
+
+class _Call:
+    """同期版の実行中呼び出し"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    キー単位のシングルフライト
+
+    プロセス内でのみ合流する（ワーカー間の合流は行わない）。
+    同期関数はスレッド間で、非同期関数は同一イベントループ内で合流する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        """キーの計算が実行中か"""
+        if key in self._calls:
+            return True
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            return False
+        return (loop_id, key) in self._async_calls
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """同期関数をキー単位で1回だけ実行し、結果を共有する"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """非同期関数をキー単位で1回だけ実行し、結果を共有する"""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        while True:
+            future = self._async_calls.get(flight_key)
+            if future is None:
+                break
+            try:
+                # 待機側のキャンセルが実行側に波及しないようにする
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # 実行側のキャンセル（クライアント切断等）は待機側に波及させず、
+                # 最初に再試行した待機側が新たな実行側になる
+                continue
+
+        future = loop.create_future()
+        self._async_calls[flight_key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 待機者がいない場合の "exception was never retrieved" を抑止
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._async_calls.pop(flight_key, None)
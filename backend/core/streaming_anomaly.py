@@ -0,0 +1,336 @@
+"""
+ストリーミング異常検知サービス
+(domain, series_id, metric) ごとにリングバッファと累積統計を保持する
+
+呼び出し側が毎回 history を渡す代わりに、系列の直近 window 件を固定長の
+NumPy配列に保持し、窓の平均・分散をスライディング版Welford法で O(1) 更新する。
+判定が変化した（正常→異常、重大度の変化、異常→正常）ときだけイベントを返す。
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.anomaly_detector import (
+    DEFAULT_THRESHOLDS,
+    SEVERITY_HIGH,
+    SEVERITY_LABELS,
+    SEVERITY_MEDIUM,
+    SEVERITY_NONE,
+    RunningStats,
+    ThresholdConfig,
+    _threshold_detector,
+)
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SeriesKey = Tuple[str, str, str]
+
+_SEVERITY_CODES = {label: code for code, label in enumerate(SEVERITY_LABELS)}
+
+
+def _default_threshold(metric: str) -> ThresholdConfig:
+    return DEFAULT_THRESHOLDS.get(
+        metric, ThresholdConfig(metric, float("inf"), float("-inf"))
+    )
+
+
+class _SeriesState:
+    """1系列の状態（固定長リングバッファ + 窓統計 + 全期間統計）"""
+
+    __slots__ = (
+        "buffer",
+        "head",
+        "size",
+        "mean",
+        "m2",
+        "updates",
+        "lifetime",
+        "severity",
+        "last_value",
+        "last_seen",
+    )
+
+    def __init__(self, window: int):
+        self.buffer = np.zeros(window, dtype=np.float64)
+        self.head = 0  # 次に書き込む位置
+        self.size = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+        self.lifetime = RunningStats()
+        self.severity = SEVERITY_NONE
+        self.last_value: Optional[float] = None
+        self.last_seen = 0.0
+
+    @property
+    def window_std(self) -> float:
+        return (max(self.m2, 0.0) / self.size) ** 0.5 if self.size else 0.0
+
+    def push(self, value: float):
+        """値を窓に追加（満杯なら最古の値と置き換え、統計を O(1) で更新）"""
+        capacity = self.buffer.size
+        if self.size < capacity:
+            self.size += 1
+            delta = value - self.mean
+            self.mean += delta / self.size
+            self.m2 += delta * (value - self.mean)
+        else:
+            old = float(self.buffer[self.head])
+            old_mean = self.mean
+            self.mean += (value - old) / capacity
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % capacity
+        self.lifetime.push(value)
+
+        # 浮動小数点誤差の蓄積を防ぐため、窓が一巡するごとに再計算する
+        self.updates += 1
+        if self.updates % capacity == 0 and self.size == capacity:
+            self.mean = float(self.buffer.mean())
+            self.m2 = float(((self.buffer - self.mean) ** 2).sum())
+
+    def nbytes(self) -> int:
+        """この系列が保持するメモリ量（概算）"""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.buffer)
+            + sys.getsizeof(self.lifetime)
+        )
+
+
+class StreamingAnomalyDetector:
+    """系列ごとの状態を保持するストリーミング異常検知"""
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        max_series: Optional[int] = None,
+        threshold_resolver: Optional[Callable[[str], ThresholdConfig]] = None,
+        z_threshold: float = 3.0,
+        deviation: float = 2.0,
+    ):
+        """
+        ストリーミング異常検知を初期化
+
+        Args:
+            window: 系列ごとのリングバッファ長（ローリング検知の窓幅）
+            max_series: 保持する系列数の上限（超えたら最も古い系列を破棄）
+            threshold_resolver: メトリック → 閾値設定（None でデフォルト閾値）
+            z_threshold: 全期間統計に対するZ-score閾値
+            deviation: 窓統計に対するZ-score閾値
+        """
+        self.window = window or settings.ANOMALY_STREAM_WINDOW
+        self.max_series = max_series or settings.ANOMALY_STREAM_MAX_SERIES
+        self.threshold_resolver = threshold_resolver or _default_threshold
+        self.z_threshold = z_threshold
+        self.deviation = deviation
+        self._series: "OrderedDict[SeriesKey, _SeriesState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def _state(self, key: SeriesKey) -> _SeriesState:
+        """系列の状態を取得（なければ作成し、上限を超えたら最古を破棄）"""
+        state = self._series.get(key)
+        if state is None:
+            state = _SeriesState(self.window)
+            self._series[key] = state
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self._evicted += 1
+        else:
+            self._series.move_to_end(key)
+        return state
+
+    def _score(self, state: _SeriesState, value: float, config: ThresholdConfig) -> int:
+        """
+        取り込み前の状態に対して値を判定し、重大度コードを返す
+
+        閾値・全期間Z-score・窓Z-scoreのアンサンブル（ensemble_detect と同じ多数決）。
+        統計系の検知器は窓が埋まってから投票に加わる。
+        """
+        severities = []
+        threshold = _threshold_detector(value, config)
+        severities.append(
+            _SEVERITY_CODES[threshold["severity"]]
+            if threshold["is_anomaly"]
+            else SEVERITY_NONE
+        )
+
+        if state.size >= self.window:
+            for mean, std, limit in (
+                (state.lifetime.mean, state.lifetime.std, self.z_threshold),
+                (state.mean, state.window_std, self.deviation),
+            ):
+                z = abs(value - mean) / std if std > 0 else 0.0
+                if z >= limit * 1.5:
+                    severities.append(SEVERITY_HIGH)
+                elif z >= limit:
+                    severities.append(SEVERITY_MEDIUM)
+                else:
+                    severities.append(SEVERITY_NONE)
+
+        votes = sum(1 for s in severities if s != SEVERITY_NONE)
+        if votes >= max(1, len(severities) // 2):
+            return max(severities)
+        return SEVERITY_NONE
+
+    def ingest(self, points: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        測定値を取り込み、判定が変化した系列のイベントを返す
+
+        Args:
+            points: {"domain", "series_id", "metric", "value"} のリスト
+
+        Returns:
+            状態変化イベントのリスト
+        """
+        events: List[Dict[str, Any]] = []
+        configs: Dict[str, ThresholdConfig] = {}
+        now = time.time()
+        with self._lock:
+            for point in points:
+                metric = point.get("metric", "unknown")
+                key = (
+                    str(point.get("domain", "default")),
+                    str(point.get("series_id", "")),
+                    metric,
+                )
+                value = float(point.get("value", 0))
+                config = configs.get(metric)
+                if config is None:
+                    config = configs[metric] = self.threshold_resolver(metric)
+
+                state = self._state(key)
+                severity = self._score(state, value, config)
+                state.push(value)
+                state.last_value = value
+                state.last_seen = now
+
+                if severity != state.severity:
+                    events.append(
+                        self._transition_event(key, config, value, state, severity)
+                    )
+                    state.severity = severity
+        return events
+
+    @staticmethod
+    def _transition_event(
+        key: SeriesKey,
+        config: ThresholdConfig,
+        value: float,
+        state: _SeriesState,
+        severity: int,
+    ) -> Dict[str, Any]:
+        domain, series_id, metric = key
+        return {
+            "domain": domain,
+            "series_id": series_id,
+            "metric": metric,
+            "type": f"{config.metric}異常",
+            "state": "anomaly" if severity != SEVERITY_NONE else "normal",
+            "severity": SEVERITY_LABELS[severity],
+            "previous_severity": SEVERITY_LABELS[state.severity],
+            "value": value,
+            "window_mean": round(state.mean, 6),
+            "window_std": round(state.window_std, 6),
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def get_series(self, domain: str, series_id: str, metric: str) -> Optional[Dict]:
+        """1系列の状態を取得"""
+        with self._lock:
+            state = self._series.get((domain, series_id, metric))
+            if state is None:
+                return None
+            return self._describe((domain, series_id, metric), state)
+
+    def _describe(self, key: SeriesKey, state: _SeriesState) -> Dict[str, Any]:
+        domain, series_id, metric = key
+        return {
+            "domain": domain,
+            "series_id": series_id,
+            "metric": metric,
+            "samples": state.lifetime.count,
+            "window_size": state.size,
+            "window_mean": round(state.mean, 6),
+            "window_std": round(state.window_std, 6),
+            "lifetime_mean": round(state.lifetime.mean, 6),
+            "lifetime_std": round(state.lifetime.std, 6),
+            "severity": SEVERITY_LABELS[state.severity],
+            "last_value": state.last_value,
+            "last_seen": state.last_seen,
+            "memory_bytes": state.nbytes(),
+        }
+
+    def get_stats(self, limit: int = 100) -> Dict[str, Any]:
+        """系列数とメモリ使用量を取得（系列は直近に更新されたものから limit 件）"""
+        with self._lock:
+            series = list(self._series.items())
+            memory_bytes = sum(state.nbytes() for _, state in series)
+            recent = [self._describe(k, s) for k, s in reversed(series[-limit:])]
+        return {
+            "series_count": len(series),
+            "max_series": self.max_series,
+            "window": self.window,
+            "evicted": self._evicted,
+            "anomalous_series": sum(
+                1 for _, s in series if s.severity != SEVERITY_NONE
+            ),
+            "memory_bytes": memory_bytes,
+            "series": recent,
+        }
+
+    def reset(self):
+        """すべての系列状態を破棄"""
+        with self._lock:
+            self._series.clear()
+            self._evicted = 0
+
+
+async def consume_measurements(
+    detector: StreamingAnomalyDetector,
+    kafka_client: Any,
+    topic: str,
+    events_topic: str,
+    group_id: str = "streaming-anomaly-detector",
+) -> None:
+    """
+    Kafkaトピックの測定値を常時取り込み、状態変化イベントを events_topic へ発行
+
+    メッセージの data（なければ値そのもの）を測定値として扱う。
+    """
+    async for batch in kafka_client.iter_events(topic, group_id):
+        try:
+            points = []
+            for message in batch:
+                value = message["value"]
+                data = value.get("data", value) if isinstance(value, dict) else None
+                if isinstance(data, dict):
+                    points.append(data)
+                elif isinstance(data, list):
+                    points.extend(p for p in data if isinstance(p, dict))
+            events = detector.ingest(points)
+            if events:
+                await kafka_client.apublish_many(
+                    events_topic,
+                    [
+                        {
+                            "event_type": "anomaly_state_changed",
+                            "data": event,
+                            "key": f"{event['domain']}:{event['series_id']}",
+                        }
+                        for event in events
+                    ],
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Streaming anomaly ingest error: {e}")
@@ -1,105 +1,274 @@
 """
 WebSocketサポートモジュール
-リアルタイム通信
+リアルタイム通信（接続ごとの送信キュー + Redis pub/sub によるワーカー間配信）
+
+送信は呼び出し元で待たず、接続ごとの有界キューに積んで専用の書き込みタスクが
+順に送る。遅い接続はキューあふれ・送信タイムアウトで切断（または古いメッセージを
+破棄）し、他の受信者を止めない。メッセージは1回だけ JSON にエンコードして全受信者で
+共有する。Redis 接続時はルーム・ユーザー宛ての配信を pub/sub で全ワーカーに届ける。
 """
 import asyncio
 import json
-from datetime import datetime
-from typing import Dict, List, Set
+import logging
+import uuid
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from core.config import settings
+from core.redis_async import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# 送信キューがあふれたときの方針
+SLOW_CONSUMER_DISCONNECT = "disconnect"
+SLOW_CONSUMER_DROP_OLDEST = "drop_oldest"
+
+# 遅い接続を切断するときのクローズコード（1013: Try Again Later）
+_CLOSE_SLOW_CONSUMER = 1013
+
+# pub/sub の再接続間隔（秒。失敗が続くと倍にして上限まで延ばす）
+_PUBSUB_RETRY_MIN_SEC = 1.0
+_PUBSUB_RETRY_MAX_SEC = 30.0
+
+
+def encode_message(message: dict) -> str:
+    """メッセージを JSON 文字列にエンコード（全受信者で共有する）"""
+    return json.dumps(message, ensure_ascii=False, default=str)
 
-from fastapi import Depends, WebSocket, WebSocketDisconnect
 
-from auth.jwt_auth import get_current_user_websocket
+class _Connection:
+    """1接続分の送信キューと書き込みタスク"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.rooms: Set[str] = set()
+        self.user_id: Optional[str] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
 
 
 class ConnectionManager:
     """WebSocket接続管理クラス"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        slow_consumer_policy: Optional[str] = None,
+        channel: Optional[str] = None,
+    ):
+        """
+        Args:
+            queue_size: 接続ごとの送信キューの上限（デフォルト: WS_SEND_QUEUE_SIZE）
+            send_timeout: 1メッセージの送信タイムアウト秒（デフォルト: WS_SEND_TIMEOUT）
+            slow_consumer_policy: キューあふれ時の方針 disconnect / drop_oldest
+                （デフォルト: WS_SLOW_CONSUMER_POLICY）
+            channel: ワーカー間配信の Redis チャネル（デフォルト: WS_PUBSUB_CHANNEL）
+        """
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT
+        self.slow_consumer_policy = (
+            slow_consumer_policy or settings.WS_SLOW_CONSUMER_POLICY
+        )
+        self.channel = channel or settings.WS_PUBSUB_CHANNEL
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.user_connections: Dict[str, Set[WebSocket]] = {}
+        self._connections: Dict[WebSocket, _Connection] = {}
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False  # pub/sub を購読中か（切断中はワーカー内のみ配信）
+        self.stats = {"sent": 0, "dropped": 0, "slow_disconnects": 0}
 
+    # === 接続管理 ===
     async def connect(
         self, websocket: WebSocket, room: str = "default", user_id: str = None
     ):
         """WebSocket接続を確立"""
         await websocket.accept()
 
-        if room not in self.active_connections:
-            self.active_connections[room] = set()
-        self.active_connections[room].add(websocket)
+        conn = self._connections.get(websocket)
+        if conn is None:
+            conn = self._connections[websocket] = _Connection(
+                websocket, self.queue_size
+            )
+            conn.writer = asyncio.create_task(self._writer(conn))
+
+        conn.rooms.add(room)
+        self.active_connections.setdefault(room, set()).add(websocket)
 
         if user_id:
-            if user_id not in self.user_connections:
-                self.user_connections[user_id] = set()
-            self.user_connections[user_id].add(websocket)
+            conn.user_id = user_id
+            self.user_connections.setdefault(user_id, set()).add(websocket)
 
     def disconnect(
         self, websocket: WebSocket, room: str = "default", user_id: str = None
     ):
-        """WebSocket接続を切断"""
-        if room in self.active_connections:
-            self.active_connections[room].discard(websocket)
-            if not self.active_connections[room]:
-                del self.active_connections[room]
+        """WebSocket接続を切断（送信キュー・書き込みタスクも破棄）"""
+        conn = self._connections.pop(websocket, None)
+        rooms = conn.rooms if conn else {room}
+        user_id = (conn.user_id if conn else None) or user_id
+        for name in rooms:
+            members = self.active_connections.get(name)
+            if members is not None:
+                members.discard(websocket)
+                if not members:
+                    del self.active_connections[name]
 
         if user_id and user_id in self.user_connections:
             self.user_connections[user_id].discard(websocket)
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """個人メッセージを送信"""
+        if conn and conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    async def _writer(self, conn: _Connection):
+        """送信キューから順に送る（失敗・タイムアウトで切断）"""
         try:
-            await websocket.send_json(message)
+            while True:
+                text = await conn.queue.get()
+                await asyncio.wait_for(
+                    conn.websocket.send_text(text), timeout=self.send_timeout
+                )
+                self.stats["sent"] += 1
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error sending message: {e}")
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["slow_disconnects"] += 1
+            self.disconnect(conn.websocket)
+            await self._close_socket(conn.websocket)
 
-    async def send_to_room(self, message: dict, room: str):
-        """ルーム内の全員にメッセージを送信"""
-        if room in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[room]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected.add(connection)
+    @staticmethod
+    async def _close_socket(websocket: WebSocket):
+        try:
+            await websocket.close(code=_CLOSE_SLOW_CONSUMER)
+        except Exception:
+            pass
+
+    def _enqueue(self, websocket: WebSocket, text: str):
+        """送信キューに積む（待たない）。あふれたら方針に従う"""
+        conn = self._connections.get(websocket)
+        if conn is None:
+            return
+        if conn.queue.full():
+            if self.slow_consumer_policy == SLOW_CONSUMER_DROP_OLDEST:
+                conn.queue.get_nowait()
+                conn.dropped += 1
+                self.stats["dropped"] += 1
+            else:
+                # 先に管理対象から外し、以降の配信では積まない
+                self.stats["slow_disconnects"] += 1
+                self.disconnect(websocket)
+                asyncio.create_task(self._close_socket(websocket))
+                return
+        conn.queue.put_nowait(text)
 
-            # 切断された接続を削除
-            for connection in disconnected:
-                self.active_connections[room].discard(connection)
+    # === ローカル配信 ===
+    def _deliver(self, target: str, key: Optional[str], text: str):
+        if target == "room":
+            recipients = self.active_connections.get(key, ())
+        elif target == "user":
+            recipients = self.user_connections.get(key, ())
+        else:
+            recipients = self._connections
+        for websocket in list(recipients):
+            self._enqueue(websocket, text)
+
+    async def _publish(self, target: str, key: Optional[str], message: dict):
+        """このワーカーの接続へ配信し、Redis 経由で他ワーカーにも届ける"""
+        text = encode_message(message)
+        self._deliver(target, key, text)
+        client = get_async_redis()
+        if client is None or not self._subscribed:
+            return
+        envelope = json.dumps(
+            {"origin": self._instance_id, "target": target, "key": key, "text": text}
+        )
+        try:
+            await client.publish(self.channel, envelope)
+        except Exception as e:
+            logger.warning(f"WebSocket pub/sub publish failed: {e}")
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """個人メッセージを送信"""
+        self._enqueue(websocket, encode_message(message))
+
+    async def send_to_room(self, message: dict, room: str):
+        """ルーム内の全員にメッセージを送信（全ワーカー）"""
+        await self._publish("room", room, message)
 
     async def send_to_user(self, message: dict, user_id: str):
-        """特定ユーザーにメッセージを送信"""
-        if user_id in self.user_connections:
-            disconnected = set()
-            for connection in self.user_connections[user_id]:
+        """特定ユーザーにメッセージを送信（全ワーカー）"""
+        await self._publish("user", user_id, message)
+
+    async def broadcast(self, message: dict):
+        """全接続にブロードキャスト（全ワーカー）"""
+        await self._publish("all", None, message)
+
+    # === ワーカー間配信 ===
+    async def _listen(self, client):
+        """購読を続ける（切断・エラー時は間隔を延ばしながら再購読する）"""
+        delay = _PUBSUB_RETRY_MIN_SEC
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed = True
+                delay = _PUBSUB_RETRY_MIN_SEC
+                async for message in pubsub.listen():
+                    try:
+                        envelope = json.loads(message["data"])
+                    except Exception as e:
+                        logger.error(f"WebSocket pub/sub message error: {e}")
+                        continue
+                    if envelope.get("origin") == self._instance_id:
+                        continue
+                    self._deliver(
+                        envelope["target"], envelope.get("key"), envelope["text"]
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 再購読までの間はワーカー内のみで配信する
+                logger.warning(f"WebSocket pub/sub unavailable: {e}")
+            finally:
+                self._subscribed = False
                 try:
-                    await connection.send_json(message)
+                    await pubsub.aclose()
                 except Exception:
-                    disconnected.add(connection)
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _PUBSUB_RETRY_MAX_SEC)
 
-            # 切断された接続を削除
-            for connection in disconnected:
-                self.user_connections[user_id].discard(connection)
+    async def start(self):
+        """Redis pub/sub の購読を開始（lifespan で呼ぶ。Redis 未接続ならワーカー内のみ）"""
+        client = get_async_redis()
+        if client is None or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen(client))
 
-    async def broadcast(self, message: dict):
-        """全接続にブロードキャスト"""
-        all_connections = set()
-        for room_connections in self.active_connections.values():
-            all_connections.update(room_connections)
+    async def stop(self):
+        """購読と全接続の書き込みタスクを停止"""
+        tasks = [conn.writer for conn in self._connections.values() if conn.writer]
+        if self._listener is not None:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-        disconnected = set()
-        for connection in all_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.add(connection)
-
-        # 切断された接続を削除
-        for connection in disconnected:
-            for room_connections in self.active_connections.values():
-                room_connections.discard(connection)
+    def get_stats(self) -> Dict[str, Any]:
+        """接続数・送信数・破棄数・遅い接続の切断数"""
+        return {
+            **self.stats,
+            "connections": len(self._connections),
+            "rooms": len(self.active_connections),
+            "queued": sum(c.queue.qsize() for c in self._connections.values()),
+            "pubsub": self._subscribed,
+        }
 
 
 # グローバルインスタンス
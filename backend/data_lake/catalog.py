@@ -81,6 +81,13 @@ class DataCatalog:
         """カタログエントリを取得"""
         return self._catalog.get(catalog_id)
 
+    def get_many(
+        self, catalog_ids: ListType[str]
+    ) -> ListType[Optional[DataCatalogEntry]]:
+        """複数エントリを一括取得（順序は catalog_ids に対応、未登録は None）"""
+        entries = self._catalog
+        return [entries.get(catalog_id) for catalog_id in catalog_ids]
+
     def list(
         self,
         data_type: Optional[str] = None,
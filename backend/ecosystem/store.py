@@ -100,6 +100,10 @@ class EcosystemStore:
     def get_partner(self, partner_id: str) -> Optional[dict]:
         return self.partners.get(partner_id)
 
+    def get_partners(self, partner_ids: List[str]) -> List[Optional[dict]]:
+        """複数パートナーを一括取得（順序は partner_ids に対応）"""
+        return [self.partners.get(pid) for pid in partner_ids]
+
     def list_partners(self, status: Optional[str] = None) -> List[dict]:
         items = list(self.partners.values())
         if status:
@@ -137,6 +141,17 @@ class EcosystemStore:
             items = [i for i in items if i["category"] == category]
         return sorted(items, key=lambda x: x["created_at"], reverse=True)
 
+    def list_marketplace_items_by_partner(
+        self, partner_ids: List[str]
+    ) -> Dict[str, List[dict]]:
+        """複数パートナーの出品を1回の走査でまとめて取得"""
+        wanted = set(partner_ids)
+        grouped: Dict[str, List[dict]] = {pid: [] for pid in wanted}
+        for item in self.marketplace_items.values():
+            if item["partner_id"] in wanted:
+                grouped[item["partner_id"]].append(item)
+        return grouped
+
     def get_marketplace_item(self, item_id: str) -> Optional[dict]:
         return self.marketplace_items.get(item_id)
 
@@ -206,5 +221,14 @@ class EcosystemStore:
     def list_forum_comments(self, post_id: str) -> List[dict]:
         return [c for c in self.forum_comments.values() if c["post_id"] == post_id]
 
+    def list_forum_comments_by_post(self, post_ids: List[str]) -> Dict[str, List[dict]]:
+        """複数投稿のコメントを1回の走査でまとめて取得"""
+        wanted = set(post_ids)
+        grouped: Dict[str, List[dict]] = {pid: [] for pid in wanted}
+        for comment in self.forum_comments.values():
+            if comment["post_id"] in wanted:
+                grouped[comment["post_id"]].append(comment)
+        return grouped
+
 
 ecosystem_store = EcosystemStore()
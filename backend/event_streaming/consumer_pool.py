@@ -0,0 +1,304 @@
+"""
+Kafkaコンシューマープール
+(topic, group_id) ごとに KafkaConsumer を生かしたまま再利用する
+
+呼び出しのたびに KafkaConsumer を作って閉じると、毎回グループのリバランスと
+consumer_timeout_ms の待ちが発生する。プールでは一度参加したコンシューマーを
+保持し、poll() でまとめて取得して手動コミットする。
+
+stream() は処理が終わったバッチだけをコミットするため、共有せずに専用の
+コンシューマーを貸し出す（他の呼び出しが取得した未処理分をコミットしない）。
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+try:
+    from kafka import KafkaConsumer
+
+    KAFKA_AVAILABLE = True
+except ImportError:
+    KafkaConsumer = None
+    KAFKA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _message_to_dict(message: Any) -> Dict[str, Any]:
+    """ConsumerRecord をAPIレスポンス用の辞書に変換"""
+    return {
+        "topic": message.topic,
+        "partition": message.partition,
+        "offset": message.offset,
+        "key": message.key,
+        "value": message.value,
+        "timestamp": message.timestamp,
+    }
+
+
+class _PooledConsumer:
+    """プール内のコンシューマー（KafkaConsumerはスレッドセーフでないためロックで保護）"""
+
+    def __init__(self, consumer: Any):
+        self.consumer = consumer
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.joined = False
+
+
+class ConsumerPool:
+    """(topic, group_id) 単位の長寿命コンシューマープール"""
+
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        client_id: str,
+        idle_timeout_sec: float = 300.0,
+        join_timeout_ms: int = 5000,
+    ):
+        """
+        コンシューマープールを初期化
+
+        Args:
+            bootstrap_servers: Kafkaブローカーのアドレス
+            client_id: クライアントID
+            idle_timeout_sec: この秒数使われなかったコンシューマーを閉じる
+            join_timeout_ms: 新規コンシューマーのグループ参加を待つ最大時間
+        """
+        self.bootstrap_servers = bootstrap_servers
+        self.client_id = client_id
+        self.idle_timeout_sec = idle_timeout_sec
+        self.join_timeout_ms = join_timeout_ms
+        self._consumers: Dict[Tuple[str, str], _PooledConsumer] = {}
+        # stream() に貸し出し中の専用コンシューマー
+        self._leased: Dict[int, Tuple[Tuple[str, str], _PooledConsumer]] = {}
+        # 生成中のキーごとのロック（同じキーのコンシューマーを重複して作らない）
+        self._creating: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _create_consumer(
+        self, topic: str, group_id: str, auto_offset_reset: str
+    ) -> _PooledConsumer:
+        if not KAFKA_AVAILABLE:
+            raise RuntimeError(
+                "Kafka is not available. Please install kafka-python and six packages."
+            )
+        consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=self.bootstrap_servers,
+            client_id=self.client_id,
+            group_id=group_id,
+            value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+            key_deserializer=lambda k: k.decode("utf-8") if k else None,
+            auto_offset_reset=auto_offset_reset,
+            enable_auto_commit=False,
+        )
+        return _PooledConsumer(consumer)
+
+    def _acquire(
+        self, topic: str, group_id: str, auto_offset_reset: str
+    ) -> _PooledConsumer:
+        """コンシューマーを取得（なければ作成し、放置されたものは閉じる）"""
+        key = (topic, group_id)
+        with self._lock:
+            idle = self._evict_idle()
+            pooled = self._consumers.get(key)
+            if pooled is None:
+                creating = self._creating.setdefault(key, threading.Lock())
+            else:
+                pooled.last_used = time.monotonic()
+        # close() はブローカーとの通信を伴うため、プールのロックを放してから行う
+        self._close_all(idle)
+        if pooled is None:
+            pooled = self._create_pooled(key, creating, auto_offset_reset)
+        return pooled
+
+    def _create_pooled(
+        self, key: Tuple[str, str], creating: threading.Lock, auto_offset_reset: str
+    ) -> _PooledConsumer:
+        """
+        KafkaConsumer の生成はブローカーとの通信で数秒かかることがあるため、
+        プールのロックの外で行う。同じキーの生成はキーごとのロックで1回にまとめる
+        """
+        with creating:
+            with self._lock:
+                pooled = self._consumers.get(key)
+            if pooled is None:
+                created = None
+                try:
+                    created = self._create_consumer(*key, auto_offset_reset)
+                finally:
+                    with self._lock:
+                        if self._creating.get(key) is creating:
+                            del self._creating[key]
+                        if created is not None:
+                            pooled = self._consumers.setdefault(key, created)
+                if pooled is not created:
+                    self._close_all([(key, created)])
+        pooled.last_used = time.monotonic()
+        return pooled
+
+    def _evict_idle(self) -> List[Tuple[Tuple[str, str], _PooledConsumer]]:
+        """ロック取得済みの前提で、アイドル時間を超えたコンシューマーをプールから外して返す"""
+        now = time.monotonic()
+        evicted = []
+        for key, pooled in list(self._consumers.items()):
+            if now - pooled.last_used > self.idle_timeout_sec and pooled.lock.acquire(
+                blocking=False
+            ):
+                pooled.lock.release()
+                del self._consumers[key]
+                evicted.append((key, pooled))
+        return evicted
+
+    @staticmethod
+    def _close_all(consumers: List[Tuple[Tuple[str, str], _PooledConsumer]]):
+        for key, pooled in consumers:
+            with pooled.lock:
+                try:
+                    pooled.consumer.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close consumer {key}: {e}")
+
+    @staticmethod
+    def _poll_locked(
+        pooled: _PooledConsumer, max_records: int, timeout_ms: int, join_timeout_ms: int
+    ) -> List[Dict[str, Any]]:
+        """ロック取得済みの前提でまとめて取得（参加直後は join_timeout_ms まで待つ）"""
+        deadline = (
+            time.monotonic() + (timeout_ms if pooled.joined else join_timeout_ms) / 1000
+        )
+        messages: List[Dict[str, Any]] = []
+        while True:
+            remaining_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+            batches = pooled.consumer.poll(
+                timeout_ms=remaining_ms, max_records=max_records - len(messages)
+            )
+            for records in batches.values():
+                messages.extend(_message_to_dict(r) for r in records)
+            if messages or remaining_ms == 0:
+                break
+            if not pooled.joined and pooled.consumer.assignment():
+                # 参加できたら以降は通常の待ち時間で打ち切る
+                pooled.joined = True
+                deadline = min(deadline, time.monotonic() + timeout_ms / 1000)
+        pooled.last_used = time.monotonic()
+        return messages
+
+    def poll(
+        self,
+        topic: str,
+        group_id: str,
+        max_records: int = 10,
+        timeout_ms: int = 200,
+        commit: bool = True,
+        auto_offset_reset: str = "earliest",
+    ) -> List[Dict[str, Any]]:
+        """
+        メッセージをまとめて取得
+
+        Args:
+            topic: トピック名
+            group_id: コンシューマーグループID
+            max_records: 最大取得件数
+            timeout_ms: ポーリングの待ち時間（参加直後は join_timeout_ms まで待つ）
+            commit: 取得後にオフセットを同期コミットするか
+            auto_offset_reset: コミット済みオフセットが無い場合の開始位置
+
+        Returns:
+            メッセージのリスト
+        """
+        pooled = self._acquire(topic, group_id, auto_offset_reset)
+        with pooled.lock:
+            messages = self._poll_locked(
+                pooled, max_records, timeout_ms, self.join_timeout_ms
+            )
+            if commit and messages:
+                pooled.consumer.commit()
+            return messages
+
+    async def stream(
+        self,
+        topic: str,
+        group_id: str,
+        max_records: int = 100,
+        timeout_ms: int = 1000,
+        auto_offset_reset: str = "earliest",
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        メッセージのバッチを非同期に順次返す
+
+        poll はスレッドで実行しイベントループをブロックしない。
+        ストリームごとに専用のコンシューマーを使い（プールとは共有しない）、
+        各バッチのオフセットは、ハンドラーが次のバッチを要求した時点で
+        コミットする（処理済みのものだけをコミットする at-least-once）。
+        ストリームを閉じるとコンシューマーも閉じる。
+
+        Usage:
+            async for batch in pool.stream("orders", "order-projector"):
+                for message in batch:
+                    await handle(message)
+        """
+        key = (topic, group_id)
+        pooled = await asyncio.to_thread(
+            self._create_consumer, topic, group_id, auto_offset_reset
+        )
+        with self._lock:
+            self._leased[id(pooled)] = (key, pooled)
+        try:
+            while True:
+                batch = await asyncio.to_thread(
+                    self._poll_leased, pooled, max_records, timeout_ms
+                )
+                if not batch:
+                    continue
+                yield batch
+                await asyncio.to_thread(self._commit_leased, pooled)
+        finally:
+            with self._lock:
+                self._leased.pop(id(pooled), None)
+            await asyncio.to_thread(self._close_all, [(key, pooled)])
+
+    def _poll_leased(
+        self, pooled: _PooledConsumer, max_records: int, timeout_ms: int
+    ) -> List[Dict[str, Any]]:
+        with pooled.lock:
+            return self._poll_locked(
+                pooled, max_records, timeout_ms, self.join_timeout_ms
+            )
+
+    @staticmethod
+    def _commit_leased(pooled: _PooledConsumer):
+        """専用コンシューマーが直前に返したバッチまでをコミット"""
+        with pooled.lock:
+            pooled.consumer.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """プールの状態を取得"""
+        now = time.monotonic()
+        return {
+            "consumers": [
+                {
+                    "topic": topic,
+                    "group_id": group_id,
+                    "joined": pooled.joined,
+                    "idle_sec": round(now - pooled.last_used, 1),
+                }
+                for (topic, group_id), pooled in self._consumers.items()
+            ],
+            "streams": [
+                {"topic": topic, "group_id": group_id, "joined": pooled.joined}
+                for (topic, group_id), pooled in self._leased.values()
+            ],
+            "idle_timeout_sec": self.idle_timeout_sec,
+        }
+
+    def close(self):
+        """すべてのコンシューマーを閉じる"""
+        with self._lock:
+            consumers = list(self._consumers.items())
+            self._consumers.clear()
+        self._close_all(consumers)
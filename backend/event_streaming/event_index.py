@@ -0,0 +1,199 @@
+"""
+イベントインデックス（SQLite）
+集約ID → バージョン順のイベントと、集約スナップショットをローカルに保持する
+
+Kafka のトピックは引き続き正のイベントログとし、このインデックスは
+集約単位の読み出しと再構築を高速化するための読み取りモデルとして使う。
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "event_store.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL UNIQUE,
+    aggregate_type TEXT NOT NULL,
+    aggregate_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    event_data TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_events_aggregate
+    ON events (aggregate_type, aggregate_id, version);
+CREATE TABLE IF NOT EXISTS snapshots (
+    aggregate_type TEXT NOT NULL,
+    aggregate_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (aggregate_type, aggregate_id)
+);
+"""
+
+
+class EventIndex:
+    """SQLiteによるイベントインデックスとスナップショットストア"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        イベントインデックスを初期化
+
+        Args:
+            db_path: SQLiteファイルのパス（デフォルト: 環境変数 EVENT_STORE_DB_PATH
+                または backend/data/event_store.db。":memory:" も可）
+        """
+        self.db_path = str(
+            db_path or os.getenv("EVENT_STORE_DB_PATH") or DEFAULT_DB_PATH
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        初回アクセス時に接続してスキーマを作成（呼び出し側で _lock を保持）
+
+        インポート時やストア生成時にはファイルを作らない。
+        """
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        """
+        イベントを追加（event_id・集約バージョンが重複する場合は無視）
+
+        Returns:
+            新たに追加されたか
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO events (event_id, aggregate_type, aggregate_id,"
+                " version, event_type, event_data, timestamp, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    event["event_id"],
+                    event["aggregate_type"],
+                    event["aggregate_id"],
+                    event["version"],
+                    event["event_type"],
+                    json.dumps(event["event_data"], default=str),
+                    event["timestamp"],
+                    json.dumps(event.get("metadata"), default=str),
+                ),
+            )
+            return cursor.rowcount > 0
+
+    def latest_version(self, aggregate_type: str, aggregate_id: str) -> int:
+        """集約の最新バージョン（イベントが無ければ 0）"""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT MAX(version) FROM events"
+                    " WHERE aggregate_type = ? AND aggregate_id = ?",
+                    (aggregate_type, aggregate_id),
+                )
+                .fetchone()
+            )
+        return row[0] or 0
+
+    def get_events(
+        self,
+        aggregate_type: str,
+        aggregate_id: Optional[str] = None,
+        after_version: int = 0,
+        limit: int = 100,
+        after_seq: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        イベントを取得
+
+        aggregate_id 指定時はインデックスを使ってバージョン順に、
+        未指定時は追加順（seq が after_seq より後）に返す。
+        """
+        with self._lock:
+            conn = self._connect()
+            if aggregate_id is not None:
+                rows = conn.execute(
+                    "SELECT * FROM events"
+                    " WHERE aggregate_type = ? AND aggregate_id = ? AND version > ?"
+                    " ORDER BY version LIMIT ?",
+                    (aggregate_type, aggregate_id, after_version, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM events WHERE aggregate_type = ? AND seq > ?"
+                    " ORDER BY seq LIMIT ?",
+                    (aggregate_type, after_seq, limit),
+                ).fetchall()
+        return [
+            {
+                "seq": row["seq"],
+                "event_id": row["event_id"],
+                "aggregate_id": row["aggregate_id"],
+                "aggregate_type": row["aggregate_type"],
+                "event_type": row["event_type"],
+                "event_data": json.loads(row["event_data"]),
+                "timestamp": row["timestamp"],
+                "version": row["version"],
+                "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+            }
+            for row in rows
+        ]
+
+    def save_snapshot(
+        self,
+        aggregate_type: str,
+        aggregate_id: str,
+        version: int,
+        state: Dict[str, Any],
+    ):
+        """集約スナップショットを保存（より新しいバージョンのみ上書き）"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO snapshots (aggregate_type, aggregate_id, version, state)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (aggregate_type, aggregate_id) DO UPDATE SET"
+                " version = excluded.version, state = excluded.state"
+                " WHERE excluded.version > snapshots.version",
+                (aggregate_type, aggregate_id, version, json.dumps(state, default=str)),
+            )
+
+    def get_snapshot(
+        self, aggregate_type: str, aggregate_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """最新の集約スナップショットを取得"""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT version, state FROM snapshots"
+                    " WHERE aggregate_type = ? AND aggregate_id = ?",
+                    (aggregate_type, aggregate_id),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return {"version": row["version"], "state": json.loads(row["state"])}
+
+    def close(self):
+        """接続を閉じる"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -2,14 +2,25 @@
 Event Sourcingモジュール
 イベントソーシングパターンの実装
 """
+import asyncio
+import logging
+import os
+import socket
+import time
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from pydantic import BaseModel
 
+from .event_index import EventIndex
 from .kafka_client import KafkaClient
 
+logger = logging.getLogger(__name__)
+
+# Kafkaからの取り込みに失敗した後、再試行までの秒数
+_CATCH_UP_RETRY_SEC = 60.0
+
 
 class EventType(str, Enum):
     """イベントタイプ"""
@@ -34,94 +45,170 @@ class DomainEvent(BaseModel):
 
 
 class EventStore:
-    """イベントストアクラス"""
+    """
+    イベントストアクラス
 
-    def __init__(self, kafka_client: KafkaClient):
+    イベントは Kafka に発行し、同時にローカルの EventIndex に書き込む。
+    読み出しはインデックスから集約ID・バージョンで引く。他プロセスが
+    発行したイベントは run_catch_up() がバックグラウンドで Kafka から
+    取り込む（読み出しのたびに Kafka を待たない）。
+    """
+
+    def __init__(self, kafka_client: KafkaClient, index: Optional[EventIndex] = None):
         """
         イベントストアを初期化
 
         Args:
             kafka_client: Kafkaクライアントインスタンス
+            index: イベントインデックス（デフォルト: SQLiteファイル）
         """
         self.kafka_client = kafka_client
         self.topic_prefix = "events-"
+        self.index = index or EventIndex()
+        self._catch_up_retry_at = 0.0
+        # 読み書きのあった集約タイプ（バックグラウンド取り込みの対象）
+        self._aggregate_types: Set[str] = set()
 
     def _get_topic_name(self, aggregate_type: str) -> str:
         """集約タイプからトピック名を生成"""
         return f"{self.topic_prefix}{aggregate_type}"
 
+    @staticmethod
+    def _to_payload(event: DomainEvent) -> Dict[str, Any]:
+        return {
+            "event_id": event.event_id,
+            "aggregate_id": event.aggregate_id,
+            "aggregate_type": event.aggregate_type,
+            "event_data": event.event_data,
+            "timestamp": event.timestamp.isoformat(),
+            "version": event.version,
+            "metadata": event.metadata,
+        }
+
     def append_event(self, event: DomainEvent) -> bool:
         """イベントを追加"""
         topic = self._get_topic_name(event.aggregate_type)
 
-        # トピックが存在しない場合は作成
+        # トピックが存在しない場合は作成（確認済みトピックはスキップ）
         try:
-            self.kafka_client.create_topic(topic)
+            self.kafka_client.ensure_topic(topic)
         except:
             pass  # 既に存在する場合は無視
 
-        return self.kafka_client.publish_event(
+        self._aggregate_types.add(event.aggregate_type)
+        payload = self._to_payload(event)
+        published = self.kafka_client.publish_event(
             topic=topic,
             event_type=event.event_type,
-            data={
-                "event_id": event.event_id,
-                "aggregate_id": event.aggregate_id,
-                "aggregate_type": event.aggregate_type,
-                "event_data": event.event_data,
-                "timestamp": event.timestamp.isoformat(),
-                "version": event.version,
-                "metadata": event.metadata,
-            },
+            data=payload,
             key=event.aggregate_id,
         )
+        if published:
+            self.index.append({**payload, "event_type": event.event_type})
+        return published
+
+    def catch_up(self, aggregate_type: str, max_records: int = 500) -> int:
+        """
+        他プロセスが発行したイベントを Kafka からインデックスへ取り込む
+
+        ホストごとのコンシューマーグループで読み、待たずに（timeout 0）取得できた
+        分だけを取り込む。Kafka に接続できない間は一定時間スキップする。
+
+        Returns:
+            新たに取り込んだイベント数
+        """
+        if time.monotonic() < self._catch_up_retry_at:
+            return 0
+        try:
+            messages = self.kafka_client.consume_events(
+                topic=self._get_topic_name(aggregate_type),
+                group_id=f"event-index-{aggregate_type}-{socket.gethostname()}",
+                max_messages=max_records,
+                timeout_ms=0,
+            )
+        except Exception as e:
+            logger.debug(f"Event index catch-up skipped: {e}")
+            self._catch_up_retry_at = time.monotonic() + _CATCH_UP_RETRY_SEC
+            return 0
+
+        added = 0
+        for msg in messages:
+            value = msg["value"]
+            data = value.get("data", value)
+            if "event_id" not in data:
+                continue
+            added += self.index.append(
+                {**data, "event_type": value.get("event_type", data.get("event_type"))}
+            )
+        return added
+
+    async def run_catch_up(self, interval_sec: float = 5.0) -> None:
+        """
+        読み書きのあった集約タイプを定期的に Kafka から取り込む（バックグラウンドタスク）
+
+        Kafka コンシューマーは同期 API のため、取り込みはスレッドで実行して
+        イベントループを止めない。
+        """
+        while True:
+            for aggregate_type in list(self._aggregate_types):
+                try:
+                    await asyncio.to_thread(self.catch_up, aggregate_type)
+                except Exception as e:
+                    logger.error(f"Event index catch-up error: {e}")
+            await asyncio.sleep(interval_sec)
+
+    def latest_version(self, aggregate_type: str, aggregate_id: str) -> int:
+        """集約の最新バージョン（イベントが無ければ 0）"""
+        self._aggregate_types.add(aggregate_type)
+        return self.index.latest_version(aggregate_type, aggregate_id)
 
     def get_events(
         self,
         aggregate_type: str,
         aggregate_id: Optional[str] = None,
         max_events: int = 100,
+        after_version: int = 0,
     ) -> List[DomainEvent]:
-        """イベントを取得"""
-        topic = self._get_topic_name(aggregate_type)
-        group_id = f"event-store-{aggregate_type}"
-
-        messages = self.kafka_client.consume_events(
-            topic=topic, group_id=group_id, max_messages=max_events
+        """イベントを取得（aggregate_id 指定時はバージョン順）"""
+        self._aggregate_types.add(aggregate_type)
+        rows = self.index.get_events(
+            aggregate_type,
+            aggregate_id=aggregate_id,
+            after_version=after_version,
+            limit=max_events,
         )
-
-        events = []
-        for msg in messages:
-            value = msg["value"]
-            if aggregate_id is None or value.get("aggregate_id") == aggregate_id:
-                events.append(
-                    DomainEvent(
-                        event_id=value["event_id"],
-                        aggregate_id=value["aggregate_id"],
-                        aggregate_type=value["aggregate_type"],
-                        event_type=value["event_type"],
-                        event_data=value["event_data"],
-                        timestamp=datetime.fromisoformat(value["timestamp"]),
-                        version=value["version"],
-                        metadata=value.get("metadata"),
-                    )
-                )
-
-        # バージョン順にソート
-        events.sort(key=lambda e: e.version)
-        return events
+        return [
+            DomainEvent(
+                event_id=row["event_id"],
+                aggregate_id=row["aggregate_id"],
+                aggregate_type=row["aggregate_type"],
+                event_type=row["event_type"],
+                event_data=row["event_data"],
+                timestamp=datetime.fromisoformat(row["timestamp"]),
+                version=row["version"],
+                metadata=row["metadata"],
+            )
+            for row in rows
+        ]
 
 
 class EventSourcingHandler:
     """イベントソーシングハンドラークラス"""
 
-    def __init__(self, event_store: EventStore):
+    def __init__(
+        self, event_store: EventStore, snapshot_interval: Optional[int] = None
+    ):
         """
         イベントソーシングハンドラーを初期化
 
         Args:
             event_store: イベントストアインスタンス
+            snapshot_interval: 何バージョンごとにスナップショットを保存するか
         """
         self.event_store = event_store
+        self.snapshot_interval = snapshot_interval or int(
+            os.getenv("EVENT_SNAPSHOT_INTERVAL", "50")
+        )
         self._aggregates: Dict[str, Dict[str, Any]] = {}  # 簡易的な集約状態ストア
 
     def apply_event(self, event: DomainEvent) -> Dict[str, Any]:
@@ -158,28 +245,46 @@ class EventSourcingHandler:
                 state["state"] = event.event_data["state"]
 
     def rebuild_aggregate(
-        self, aggregate_type: str, aggregate_id: str
+        self, aggregate_type: str, aggregate_id: str, page_size: int = 500
     ) -> Optional[Dict[str, Any]]:
-        """イベント履歴から集約を再構築"""
-        events = self.event_store.get_events(
-            aggregate_type=aggregate_type, aggregate_id=aggregate_id
-        )
+        """
+        イベント履歴から集約を再構築
 
-        if not events:
-            return None
+        最新のスナップショットから開始し、それ以降のイベントだけを適用する。
+        snapshot_interval 以上進んでいれば新しいスナップショットを保存する。
+        """
+        index = self.event_store.index
+        snapshot = index.get_snapshot(aggregate_type, aggregate_id)
+        snapshot_version = snapshot["version"] if snapshot else 0
 
-        # 最初のイベントから集約を作成
         aggregate = {
             "id": aggregate_id,
             "type": aggregate_type,
-            "version": 0,
-            "state": {},
+            "version": snapshot_version,
+            "state": snapshot["state"] if snapshot else {},
         }
 
-        # すべてのイベントを適用
-        for event in events:
-            self._apply_event_to_state(aggregate["state"], event)
-            aggregate["version"] = event.version
+        # スナップショット以降のイベントだけを適用
+        while True:
+            events = self.event_store.get_events(
+                aggregate_type=aggregate_type,
+                aggregate_id=aggregate_id,
+                max_events=page_size,
+                after_version=aggregate["version"],
+            )
+            for event in events:
+                self._apply_event_to_state(aggregate["state"], event)
+                aggregate["version"] = event.version
+            if len(events) < page_size:
+                break
+
+        if aggregate["version"] == 0:
+            return None
+
+        if aggregate["version"] - snapshot_version >= self.snapshot_interval:
+            index.save_snapshot(
+                aggregate_type, aggregate_id, aggregate["version"], aggregate["state"]
+            )
 
         return aggregate
 
@@ -24,10 +24,43 @@ except ImportError as e:
     NewTopic = None
     KafkaError = Exception
 
+import asyncio
 import json
 import os
+import threading
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .consumer_pool import ConsumerPool
+from .dead_letter_queue import push_to_dlq
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize_value(value: Dict[str, Any]) -> bytes:
+    """イベントをJSONバイト列に変換（orjsonがあれば使用）"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+def _serialize_key(key: Optional[str]) -> Optional[bytes]:
+    return key.encode("utf-8") if key else None
+
+
+def _record_delivery(topic: str, success: bool):
+    """配信結果をPrometheusメトリクスに記録（監視モジュールが無い場合は無視）"""
+    try:
+        from monitoring.metrics import metrics_collector
+
+        metrics_collector.record_kafka_delivery(topic, success)
+    except Exception:
+        pass
 
 
 class KafkaClient:
@@ -48,9 +81,26 @@ class KafkaClient:
         )
         self.client_id = client_id or "uep-v5-client"
 
+        # Producerのバッチ送信設定（スループット優先。環境変数で調整可能）
+        self.linger_ms = int(os.getenv("KAFKA_LINGER_MS", "5"))
+        self.batch_size = int(os.getenv("KAFKA_BATCH_SIZE", str(64 * 1024)))
+        self.compression_type = os.getenv("KAFKA_COMPRESSION_TYPE", "gzip") or None
+        self.acks = os.getenv("KAFKA_ACKS", "1")
+
         # ProducerとConsumerは必要に応じて作成
         self._producer: Optional[KafkaProducer] = None
         self._admin: Optional[KafkaAdminClient] = None
+        self._producer_lock = threading.Lock()
+
+        # 作成・確認済みトピック（発行のたびに管理APIを呼ばないため）
+        self._known_topics: Set[str] = set()
+
+        # (topic, group_id) ごとに生かしておくコンシューマー
+        self._consumer_pool = ConsumerPool(
+            bootstrap_servers=self.bootstrap_servers,
+            client_id=self.client_id,
+            idle_timeout_sec=float(os.getenv("KAFKA_CONSUMER_IDLE_SEC", "300")),
+        )
 
     def _get_producer(self) -> KafkaProducer:
         """Producerを取得（必要に応じて作成）"""
@@ -59,12 +109,18 @@ class KafkaClient:
                 "Kafka is not available. Please install kafka-python and six packages."
             )
         if self._producer is None:
-            self._producer = KafkaProducer(
-                bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-                key_serializer=lambda k: k.encode("utf-8") if k else None,
-                client_id=self.client_id,
-            )
+            with self._producer_lock:
+                if self._producer is None:
+                    self._producer = KafkaProducer(
+                        bootstrap_servers=self.bootstrap_servers,
+                        value_serializer=_serialize_value,
+                        key_serializer=_serialize_key,
+                        client_id=self.client_id,
+                        linger_ms=self.linger_ms,
+                        batch_size=self.batch_size,
+                        compression_type=self.compression_type,
+                        acks=self.acks if self.acks == "all" else int(self.acks),
+                    )
         return self._producer
 
     def _get_admin(self) -> KafkaAdminClient:
@@ -83,8 +139,9 @@ class KafkaClient:
         """トピック一覧を取得"""
         try:
             admin = self._get_admin()
-            metadata = admin.describe_topics()
-            return list(metadata.keys())
+            topics = admin.list_topics()
+            self._known_topics.update(topics)
+            return list(topics)
         except KafkaError as e:
             raise Exception(f"Failed to list topics: {str(e)}")
 
@@ -100,21 +157,71 @@ class KafkaClient:
                 replication_factor=replication_factor,
             )
             admin.create_topics([topic])
+            self._known_topics.add(topic_name)
             return True
         except KafkaError as e:
             if "already exists" in str(e).lower():
+                self._known_topics.add(topic_name)
                 return False
             raise Exception(f"Failed to create topic: {str(e)}")
 
+    def ensure_topic(self, topic_name: str) -> None:
+        """トピックの存在を保証（確認済みならAdmin APIを呼ばない）"""
+        if topic_name in self._known_topics:
+            return
+        self.create_topic(topic_name)
+
     def delete_topic(self, topic_name: str) -> bool:
         """トピックを削除"""
         try:
             admin = self._get_admin()
             admin.delete_topics([topic_name])
+            self._known_topics.discard(topic_name)
             return True
         except KafkaError as e:
             raise Exception(f"Failed to delete topic: {str(e)}")
 
+    @staticmethod
+    def _build_event(event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """発行するイベントのエンベロープを作成"""
+        return {
+            "event_type": event_type,
+            "data": data,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "version": "1.0",
+        }
+
+    def _send(
+        self,
+        topic: str,
+        event: Dict[str, Any],
+        key: Optional[str] = None,
+        dlq: bool = True,
+    ):
+        """
+        送信をキューに積み、配信結果をメトリクスとDLQへつなぐ
+
+        dlq=False は呼び出し側が再送・DLQ 送りを管理する場合（アウトボックス等）。
+        """
+        future = self._get_producer().send(topic, value=event, key=key)
+        future.add_callback(self._on_delivery_success, topic)
+        if dlq:
+            future.add_errback(self._on_delivery_error, topic, event, key)
+        else:
+            future.add_errback(lambda error: _record_delivery(topic, False))
+        return future
+
+    @staticmethod
+    def _on_delivery_success(topic: str, record_metadata: Any):
+        _record_delivery(topic, True)
+
+    @staticmethod
+    def _on_delivery_error(
+        topic: str, event: Dict[str, Any], key: Optional[str], error: Exception
+    ):
+        _record_delivery(topic, False)
+        push_to_dlq(topic, {"key": key, "value": event}, str(error))
+
     def publish_event(
         self,
         topic: str,
@@ -122,63 +229,130 @@ class KafkaClient:
         data: Dict[str, Any],
         key: Optional[str] = None,
     ) -> bool:
-        """イベントを発行"""
-        try:
-            producer = self._get_producer()
-            event = {
-                "event_type": event_type,
-                "data": data,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "version": "1.0",
-            }
+        """
+        イベントを発行
 
-            future = producer.send(topic, value=event, key=key)
-            # 送信完了を待つ（オプション）
-            # future.get(timeout=10)
+        送信はProducerのバッチに積むだけで完了を待たない。
+        配信失敗はコールバックでメトリクスとDLQに記録される。
+        """
+        try:
+            self._send(topic, self._build_event(event_type, data), key)
             return True
         except KafkaError as e:
             raise Exception(f"Failed to publish event: {str(e)}")
 
+    def publish_many(
+        self,
+        topic: str,
+        events: List[Dict[str, Any]],
+        flush: bool = False,
+        dlq: bool = True,
+    ) -> List[Any]:
+        """
+        複数イベントをまとめて発行
+
+        Args:
+            topic: トピック名
+            events: {"event_type", "data", "key"(任意)} のリスト
+            flush: True の場合、送信完了まで待つ
+            dlq: False の場合、配信失敗を DLQ に入れない（呼び出し側で再送する）
+
+        Returns:
+            各イベントの配信Future（kafka-pythonのFutureRecordMetadata）
+        """
+        try:
+            futures = [
+                self._send(
+                    topic,
+                    self._build_event(item["event_type"], item["data"]),
+                    item.get("key"),
+                    dlq,
+                )
+                for item in events
+            ]
+            if flush:
+                self.flush()
+            return futures
+        except KafkaError as e:
+            raise Exception(f"Failed to publish events: {str(e)}")
+
+    async def apublish_many(
+        self, topic: str, events: List[Dict[str, Any]], dlq: bool = True
+    ) -> List[bool]:
+        """
+        複数イベントを発行し、すべての配信結果を非同期に待つ
+
+        Returns:
+            入力と同じ順序の配信成否
+        """
+        loop = asyncio.get_running_loop()
+        futures = self.publish_many(topic, events, dlq=dlq)
+        results = await asyncio.gather(
+            *[self._wrap_future(loop, f) for f in futures], return_exceptions=True
+        )
+        return [not isinstance(r, BaseException) for r in results]
+
+    @staticmethod
+    def _wrap_future(loop: asyncio.AbstractEventLoop, future: Any) -> asyncio.Future:
+        """kafka-pythonのFutureをasyncioのFutureに変換（送信スレッドから通知）"""
+        aio_future = loop.create_future()
+
+        def _set_result(value):
+            if not aio_future.done():
+                aio_future.set_result(value)
+
+        def _set_exception(error):
+            if not aio_future.done():
+                aio_future.set_exception(error)
+
+        future.add_callback(lambda v: loop.call_soon_threadsafe(_set_result, v))
+        future.add_errback(lambda e: loop.call_soon_threadsafe(_set_exception, e))
+        return aio_future
+
+    def flush(self, timeout: Optional[float] = None):
+        """バッチに積まれた未送信イベントを送信"""
+        if self._producer:
+            self._producer.flush(timeout=timeout)
+
     def consume_events(
         self,
         topic: str,
         group_id: str,
         auto_offset_reset: str = "earliest",
         max_messages: int = 10,
+        timeout_ms: int = 200,
     ) -> List[Dict[str, Any]]:
-        """イベントを消費"""
+        """
+        イベントを消費
+
+        コンシューマープールの長寿命コンシューマーから poll し、取得分をコミットする。
+        """
         try:
-            consumer = KafkaConsumer(
+            return self._consumer_pool.poll(
                 topic,
-                bootstrap_servers=self.bootstrap_servers,
-                group_id=group_id,
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
-                key_deserializer=lambda k: k.decode("utf-8") if k else None,
+                group_id,
+                max_records=max_messages,
+                timeout_ms=timeout_ms,
                 auto_offset_reset=auto_offset_reset,
-                enable_auto_commit=True,
-                consumer_timeout_ms=5000,  # 5秒でタイムアウト
             )
-
-            messages = []
-            for message in consumer:
-                messages.append(
-                    {
-                        "topic": message.topic,
-                        "partition": message.partition,
-                        "offset": message.offset,
-                        "key": message.key,
-                        "value": message.value,
-                        "timestamp": message.timestamp,
-                    }
-                )
-                if len(messages) >= max_messages:
-                    break
-
-            consumer.close()
-            return messages
         except KafkaError as e:
             raise Exception(f"Failed to consume events: {str(e)}")
 
+    def iter_events(
+        self,
+        topic: str,
+        group_id: str,
+        max_records: int = 100,
+        auto_offset_reset: str = "earliest",
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """イベントのバッチを非同期イテレータで受け取る（処理後に自動コミット）"""
+        return self._consumer_pool.stream(
+            topic,
+            group_id,
+            max_records=max_records,
+            auto_offset_reset=auto_offset_reset,
+        )
+
     def get_topic_info(self, topic_name: str) -> Dict[str, Any]:
         """トピック情報を取得"""
         try:
@@ -201,6 +375,7 @@ class KafkaClient:
 
     def close(self):
         """リソースを解放"""
+        self._consumer_pool.close()
         if self._producer:
             self._producer.close()
         if self._admin:
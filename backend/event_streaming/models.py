@@ -24,6 +24,21 @@ class EventPublish(BaseModel):
     key: Optional[str] = None
 
 
+class EventPublishItem(BaseModel):
+    """一括発行の各イベント"""
+
+    event_type: str
+    data: Dict[str, Any]
+    key: Optional[str] = None
+
+
+class EventPublishBatch(BaseModel):
+    """イベント一括発行モデル"""
+
+    topic: str
+    events: List[EventPublishItem]
+
+
 class EventConsume(BaseModel):
     """イベント消費モデル"""
 
@@ -4,14 +4,71 @@
 """
 import asyncio
 import logging
+import os
 from typing import Optional
 
+from .dead_letter_queue import push_to_dlq
 from .kafka_client import KafkaClient
 from .saga import OutboxStore
 
 logger = logging.getLogger(__name__)
 
 
+# 配信失敗がこの回数に達したイベントは再送を諦めて DLQ に移す
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+
+async def publish_outbox_once(
+    kafka_client: KafkaClient, topic: str = "uep-outbox-events"
+) -> int:
+    """
+    未公開アウトボックスイベントを1回まとめて発行し、公開できた件数を返す
+
+    配信失敗は DLQ に入れず次回のポーリングで再送し、OUTBOX_MAX_ATTEMPTS 回
+    失敗したイベントだけを1件の DLQ エントリにする（再送のたびに DLQ が増えない）。
+    """
+    events = OutboxStore.get_unpublished()
+    if not events:
+        return 0
+    # まとめてバッチ送信し、配信が確認できたものだけ公開済みにする
+    results = await kafka_client.apublish_many(
+        topic,
+        [
+            {
+                "event_type": event.event_type,
+                "data": {
+                    "event_id": event.event_id,
+                    "aggregate_type": event.aggregate_type,
+                    "aggregate_id": event.aggregate_id,
+                    "payload": event.payload,
+                    "created_at": event.created_at.isoformat(),
+                },
+                "key": event.aggregate_id,
+            }
+            for event in events
+        ],
+        dlq=False,
+    )
+    published = 0
+    for event, success in zip(events, results):
+        if success:
+            OutboxStore.mark_published(event.event_id)
+            published += 1
+            logger.info(f"Outbox published: {event.event_id}")
+        elif OutboxStore.record_failure(event.event_id, OUTBOX_MAX_ATTEMPTS):
+            push_to_dlq(
+                topic,
+                {"key": event.aggregate_id, "value": event.model_dump(mode="json")},
+                f"outbox delivery failed {event.attempts} times",
+            )
+            logger.error(f"Outbox gave up: {event.event_id}")
+        else:
+            logger.warning(
+                f"Outbox publish failed {event.event_id} (attempt {event.attempts})"
+            )
+    return published
+
+
 async def poll_and_publish_outbox(
     kafka_client: KafkaClient,
     topic: str = "uep-outbox-events",
@@ -20,26 +77,7 @@ async def poll_and_publish_outbox(
     """未公開アウトボックスイベントを Kafka へ発行（バックグラウンドポーリング）"""
     while True:
         try:
-            events = OutboxStore.get_unpublished()
-            for event in events:
-                try:
-                    success = kafka_client.publish_event(
-                        topic=topic,
-                        event_type=event.event_type,
-                        data={
-                            "event_id": event.event_id,
-                            "aggregate_type": event.aggregate_type,
-                            "aggregate_id": event.aggregate_id,
-                            "payload": event.payload,
-                            "created_at": event.created_at.isoformat(),
-                        },
-                        key=event.aggregate_id,
-                    )
-                    if success:
-                        OutboxStore.mark_published(event.event_id)
-                        logger.info(f"Outbox published: {event.event_id}")
-                except Exception as e:
-                    logger.warning(f"Outbox publish failed {event.event_id}: {e}")
+            await publish_outbox_once(kafka_client, topic)
         except Exception as e:
             logger.error(f"Outbox poll error: {e}")
         await asyncio.sleep(interval_sec)
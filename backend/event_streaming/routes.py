@@ -1,6 +1,7 @@
 """
 イベントストリーミングAPIエンドポイント
 """
+import asyncio
 import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
@@ -17,6 +18,7 @@ from .models import (
     DomainEventCreate,
     EventConsume,
     EventPublish,
+    EventPublishBatch,
     OutboxCreate,
     QueryCreate,
     SagaCreate,
@@ -125,6 +127,38 @@ async def publish_event(
         )
 
 
+@router.post("/publish/batch")
+async def publish_events_batch(
+    batch: EventPublishBatch,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """イベントを一括発行（配信結果を待って件数を返す）"""
+    try:
+        from monitoring.tracing import tracing_handler
+
+        with tracing_handler.span(
+            "event_streaming.publish_batch",
+            {
+                "event.topic": batch.topic,
+                "event.count": len(batch.events),
+            },
+        ):
+            results = await kafka_client.apublish_many(
+                batch.topic, [item.model_dump() for item in batch.events]
+            )
+        delivered = sum(results)
+        return {
+            "message": "Events published",
+            "topic": batch.topic,
+            "delivered": delivered,
+            "failed": len(results) - delivered,
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
 @router.get("/consume")
 async def consume_events(
     topic: str,
@@ -134,8 +168,12 @@ async def consume_events(
 ):
     """イベントを消費"""
     try:
-        messages = kafka_client.consume_events(
-            topic=topic, group_id=group_id, max_messages=max_messages
+        # プールのコンシューマーで poll（ブロッキング呼び出しはスレッドで実行）
+        messages = await asyncio.to_thread(
+            kafka_client.consume_events,
+            topic=topic,
+            group_id=group_id,
+            max_messages=max_messages,
         )
         return {"messages": messages, "count": len(messages)}
     except Exception as e:
@@ -153,12 +191,12 @@ async def create_domain_event(
     """ドメインイベントを作成"""
     try:
         # 集約の現在のバージョンを取得
-        existing_events = event_store.get_events(
-            aggregate_type=event_data.aggregate_type,
-            aggregate_id=event_data.aggregate_id,
-            max_events=1,
+        next_version = (
+            event_store.latest_version(
+                event_data.aggregate_type, event_data.aggregate_id
+            )
+            + 1
         )
-        next_version = len(existing_events) + 1
 
         event = DomainEvent(
             event_id=str(uuid.uuid4()),
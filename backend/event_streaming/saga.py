@@ -97,6 +97,8 @@ class OutboxEvent(BaseModel):
     created_at: datetime
     published: bool = False
     published_at: Optional[datetime] = None
+    attempts: int = 0  # 配信に失敗した回数
+    dead: bool = False  # 再送を諦めた（DLQ へ移した）
 
 
 class OutboxStore:
@@ -112,8 +114,8 @@ class OutboxStore:
 
     @classmethod
     def get_unpublished(cls) -> List[OutboxEvent]:
-        """未公開イベントを取得"""
-        return [e for e in cls._events if not e.published]
+        """未公開イベントを取得（再送を諦めたものは除く）"""
+        return [e for e in cls._events if not e.published and not e.dead]
 
     @classmethod
     def mark_published(cls, event_id: str) -> None:
@@ -124,6 +126,17 @@ class OutboxStore:
                 e.published_at = datetime.now(timezone.utc)
                 break
 
+    @classmethod
+    def record_failure(cls, event_id: str, max_attempts: int) -> bool:
+        """配信失敗を記録し、上限に達したら再送対象から外す（外したら True）"""
+        for e in cls._events:
+            if e.event_id == event_id:
+                e.attempts += 1
+                if e.attempts >= max_attempts:
+                    e.dead = True
+                return e.dead
+        return False
+
 
 def create_outbox_event(
     aggregate_type: str,
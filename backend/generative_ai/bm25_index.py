@@ -0,0 +1,282 @@
+"""
+BM25 転置インデックス（SQLite 永続化）
+RAG のキーワード検索を、全文書の走査ではなくクエリ語のポスティングだけで行う
+
+トークン化は英数字を単語単位、日本語（ひらがな・カタカナ・漢字）を文字 bigram
+に分割する。スコアは文書長で正規化した Okapi BM25。文書数・総文書長は
+コレクションごとにメモリに保持し、追加・削除のたびに差分で更新する。
+"""
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent.parent / "data" / "rag_bm25.db"
+
+# 日本語の文字列（ひらがな・カタカナ・長音・漢字）、またはそれ以外の単語
+_CJK = "぀-ヿ㐀-䶿一-鿿々"
+_TOKEN_RE = re.compile(rf"(?P<cjk>[{_CJK}]+)|(?P<word>[^\W_{_CJK}]+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT,
+    PRIMARY KEY (collection, doc_id)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    collection TEXT NOT NULL,
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (collection, term, doc_id)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを検索語に分割
+
+    NFKC 正規化・小文字化のうえ、英数字等は単語、日本語は文字 bigram
+    （1文字だけの並びはその文字）にする。
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer(unicodedata.normalize("NFKC", text).lower()):
+        run = match.group()
+        if match.lastgroup == "word" or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """コレクション別の BM25 転置インデックス"""
+
+    def __init__(self, db_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        インデックスを初期化
+
+        Args:
+            db_path: SQLiteファイルのパス（デフォルト: 環境変数 RAG_BM25_DB_PATH
+                または backend/data/rag_bm25.db。":memory:" も可）
+            k1: 語頻度の飽和パラメータ
+            b: 文書長による正規化の強さ
+        """
+        self.db_path = str(
+            db_path or os.getenv("RAG_BM25_DB_PATH") or DEFAULT_INDEX_PATH
+        )
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # コレクション → [文書数, 総文書長]
+        self._stats: Dict[str, List[int]] = {}
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def _collection_stats(self, collection: str) -> List[int]:
+        """ロック取得済みの前提で、コレクションの文書数・総文書長を取得"""
+        stats = self._stats.get(collection)
+        if stats is None:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+                " WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+            stats = self._stats[collection] = [count, total]
+        return stats
+
+    def count(self, collection: str) -> int:
+        """コレクションの文書数"""
+        with self._lock:
+            return self._collection_stats(collection)[0]
+
+    def existing_ids(self, collection: str, doc_ids: Iterable[str]) -> Set[str]:
+        """索引済みの doc_id だけを返す"""
+        doc_ids = list(doc_ids)
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(doc_ids), 500):
+                chunk = doc_ids[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT doc_id FROM documents"
+                        f" WHERE collection = ? AND doc_id IN ({placeholders})",
+                        (collection, *chunk),
+                    )
+                )
+        return found
+
+    def add(
+        self,
+        collection: str,
+        doc_id: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """文書を追加（同じ doc_id があれば置き換え）"""
+        self.add_many(collection, [(doc_id, text, metadata)])
+
+    def add_many(
+        self,
+        collection: str,
+        documents: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+    ):
+        """複数の文書を1トランザクションで追加"""
+        rows = []
+        postings = []
+        # 同じバッチ内で doc_id が重複した場合は後のものを採用
+        latest = {doc_id: (text, metadata) for doc_id, text, metadata in documents}
+        for doc_id, (text, metadata) in latest.items():
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            rows.append(
+                (
+                    collection,
+                    doc_id,
+                    length,
+                    text,
+                    json.dumps(metadata or {}, ensure_ascii=False, default=str),
+                )
+            )
+            postings.extend(
+                (collection, term, doc_id, tf) for term, tf in terms.items()
+            )
+        if not rows:
+            return
+        with self._lock, self._conn:
+            stats = self._collection_stats(collection)
+            for row in rows:
+                self._remove_locked(collection, row[1], stats)
+            self._conn.executemany(
+                "INSERT INTO documents (collection, doc_id, length, text, metadata)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (collection, term, doc_id, tf) VALUES (?, ?, ?, ?)",
+                postings,
+            )
+            stats[0] += len(rows)
+            stats[1] += sum(row[2] for row in rows)
+
+    def _remove_locked(self, collection: str, doc_id: str, stats: List[int]) -> bool:
+        row = self._conn.execute(
+            "SELECT length, text FROM documents WHERE collection = ? AND doc_id = ?",
+            (collection, doc_id),
+        ).fetchone()
+        if row is None:
+            return False
+        length, text = row
+        # 文書の語だけを主キーで削除（ポスティング全体は走査しない）
+        self._conn.executemany(
+            "DELETE FROM postings WHERE collection = ? AND term = ? AND doc_id = ?",
+            [(collection, term, doc_id) for term in set(tokenize(text))],
+        )
+        self._conn.execute(
+            "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+            (collection, doc_id),
+        )
+        stats[0] -= 1
+        stats[1] -= length
+        return True
+
+    def remove(self, collection: str, doc_id: str) -> bool:
+        """文書を削除"""
+        with self._lock, self._conn:
+            return self._remove_locked(
+                collection, doc_id, self._collection_stats(collection)
+            )
+
+    def search(
+        self, collection: str, query: str, top_k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 で検索
+
+        Returns:
+            スコアの高い順の文書（text, metadata, id, bm25）
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        with self._lock:
+            doc_count, total_length = self._collection_stats(collection)
+            if doc_count == 0:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            rows = self._conn.execute(
+                "SELECT p.term, p.doc_id, p.tf, d.length FROM postings p"
+                " JOIN documents d ON d.collection = p.collection AND d.doc_id = p.doc_id"
+                f" WHERE p.collection = ? AND p.term IN ({placeholders})",
+                (collection, *terms),
+            ).fetchall()
+
+            by_term: Dict[str, List[Tuple[str, int, int]]] = defaultdict(list)
+            for term, doc_id, tf, length in rows:
+                by_term[term].append((doc_id, tf, length))
+
+            avg_length = total_length / doc_count or 1.0
+            k1, b = self.k1, self.b
+            scores: Dict[str, float] = defaultdict(float)
+            for postings in by_term.values():
+                df = len(postings)
+                idf = math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = k1 * (1.0 - b + b * length / avg_length)
+                    scores[doc_id] += idf * tf * (k1 + 1.0) / (tf + norm)
+
+            top = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
+            if not top:
+                return []
+            placeholders = ",".join("?" * len(top))
+            docs = {
+                doc_id: (text, metadata)
+                for doc_id, text, metadata in self._conn.execute(
+                    "SELECT doc_id, text, metadata FROM documents"
+                    f" WHERE collection = ? AND doc_id IN ({placeholders})",
+                    (collection, *(doc_id for doc_id, _ in top)),
+                )
+            }
+        return [
+            {
+                "id": doc_id,
+                "text": docs[doc_id][0],
+                "metadata": json.loads(docs[doc_id][1]) if docs[doc_id][1] else {},
+                "bm25": score,
+            }
+            for doc_id, score in top
+        ]
+
+    def clear(self, collection: str):
+        """コレクションの索引を削除"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM postings WHERE collection = ?", (collection,)
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE collection = ?", (collection,)
+            )
+            self._stats[collection] = [0, 0]
+
+    def close(self):
+        """接続を閉じる"""
+        with self._lock:
+            self._conn.close()
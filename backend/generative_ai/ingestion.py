@@ -0,0 +1,125 @@
+"""
+RAG 文書の一括投入パイプライン
+
+ファイルやイテラブルを逐次チャンク分割し、内容ハッシュを ID にして
+投入済みのチャンクを除外したうえで、バッチ単位でベクトルDBと BM25 索引に書き込む。
+埋め込みの計算はワーカースレッドで並行に行い、書き込みは投入順に1スレッドで行う。
+"""
+import hashlib
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .rag_enhancements import iter_chunks
+
+DEFAULT_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "256"))
+DEFAULT_MAX_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "4"))
+FILE_BLOCK_SIZE = 64 * 1024
+
+# (テキスト, メタデータ)。テキストは文字列か断片の列（ファイルの読み込みブロック等）
+SourceDocument = Tuple[Union[str, Iterable[str]], Optional[Dict[str, Any]]]
+# (doc_id, チャンク, メタデータ)
+Chunk = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class IngestionStats:
+    """一括投入の進捗・スループット"""
+
+    documents: int = 0
+    chunks: int = 0
+    added: int = 0
+    skipped_duplicates: int = 0
+    vector_failures: int = 0
+    batches: int = 0
+    elapsed_sec: float = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "chunks_per_sec": round(self.chunks_per_sec, 1),
+        }
+
+
+def content_id(text: str) -> str:
+    """チャンクの内容ハッシュ（同じ内容は同じ ID になり、再投入時に除外される）"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def iter_file_blocks(
+    path: Union[str, Path], block_size: int = FILE_BLOCK_SIZE, encoding: str = "utf-8"
+) -> Iterator[str]:
+    """ファイルをブロック単位で読み込む（全体をメモリに載せない）"""
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_file_documents(
+    paths: Iterable[Union[str, Path]],
+    metadata: Optional[Dict[str, Any]] = None,
+    encoding: str = "utf-8",
+) -> Iterator[SourceDocument]:
+    """ファイルを投入用の文書に変換（メタデータの source にパスを入れる）"""
+    for path in paths:
+        yield iter_file_blocks(path, encoding=encoding), {
+            **(metadata or {}),
+            "source": str(path),
+        }
+
+
+def iter_document_chunks(
+    documents: Iterable[SourceDocument],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    stats: Optional[IngestionStats] = None,
+) -> Iterator[Chunk]:
+    """
+    文書を逐次チャンク分割
+
+    chunk_size=0 なら分割しない。複数チャンクになった文書のみ
+    メタデータに chunk_index を付ける（add_document と同じ）。
+    """
+    for text, metadata in documents:
+        meta = metadata or {}
+        if stats is not None:
+            stats.documents += 1
+        if chunk_size <= 0:
+            text = text if isinstance(text, str) else "".join(text)
+            if text:
+                yield content_id(text), text, meta
+            continue
+        blocks = [text] if isinstance(text, str) else text
+        first: Optional[str] = None
+        index = 0
+        for chunk in iter_chunks(blocks, chunk_size, chunk_overlap):
+            if index == 0:
+                first = chunk
+            else:
+                if index == 1:
+                    yield content_id(first), first, {**meta, "chunk_index": 0}
+                yield content_id(chunk), chunk, {**meta, "chunk_index": index}
+            index += 1
+        if index == 1:
+            yield content_id(first), first, meta
+
+
+def iter_batches(chunks: Iterable[Chunk], batch_size: int) -> Iterator[List[Chunk]]:
+    """チャンクをバッチにまとめる"""
+    batch: List[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
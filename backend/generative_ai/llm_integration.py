@@ -11,9 +11,14 @@ from typing import Any, Dict, List, Optional
 import httpx
 from pydantic import BaseModel
 
+from core.redis_async import get_async_redis
+from core.singleflight import SingleFlight
+
 # 推論レイテンシ低減: キャッシュ（Redis またはメモリ）
 _llm_cache: Optional[Dict[str, Any]] = None
 _llm_cache_ttl = 3600  # 1時間
+# 同一プロンプトの同時リクエストを1回のLLM呼び出しにまとめる
+_llm_single_flight = SingleFlight()
 
 
 def _get_llm_cache():
@@ -78,6 +83,38 @@ def _set_cached(
         cache[key] = {"value": value, "expires": expires}
 
 
+async def _aget_cached(
+    prompt: str, model: str, max_tokens: int, temperature: float
+) -> Optional[Dict[str, Any]]:
+    """キャッシュから取得（共有の非同期Redisがあれば使用）"""
+    client = get_async_redis()
+    if client is None:
+        return _get_cached(prompt, model, max_tokens, temperature)
+    key = _llm_cache_key(prompt, model, max_tokens, temperature)
+    try:
+        val = await client.get(key)
+        if val:
+            return json.loads(val)
+    except Exception:
+        pass
+    return None
+
+
+async def _aset_cached(
+    prompt: str, model: str, max_tokens: int, temperature: float, value: Dict[str, Any]
+):
+    """キャッシュに保存（共有の非同期Redisがあれば使用）"""
+    client = get_async_redis()
+    if client is None:
+        _set_cached(prompt, model, max_tokens, temperature, value)
+        return
+    key = _llm_cache_key(prompt, model, max_tokens, temperature)
+    try:
+        await client.setex(key, _llm_cache_ttl, json.dumps(value))
+    except Exception:
+        pass
+
+
 class LLMProvider(str, Enum):
     """LLMプロバイダー"""
 
@@ -135,7 +172,37 @@ class LLMClient:
             生成結果
         """
         if use_cache:
-            cached = _get_cached(prompt, model, max_tokens, temperature)
+            cached = await _aget_cached(prompt, model, max_tokens, temperature)
+            if cached:
+                return {**cached, "cached": True}
+
+            # 同一キーの同時ミスは1回の生成にまとめる（結果は呼び出し側ごとに複製）
+            key = _llm_cache_key(prompt, model, max_tokens, temperature)
+            result = await _llm_single_flight.do_async(
+                key,
+                lambda: self._generate_uncached(
+                    prompt, model, max_tokens, temperature, use_cache, **kwargs
+                ),
+            )
+            return dict(result)
+
+        return await self._generate_uncached(
+            prompt, model, max_tokens, temperature, use_cache, **kwargs
+        )
+
+    async def _generate_uncached(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        use_cache: bool,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """キャッシュを参照せずに生成し、成功時は結果をキャッシュする"""
+        if use_cache:
+            # 先行した生成が保存済みならそれを使う
+            cached = await _aget_cached(prompt, model, max_tokens, temperature)
             if cached:
                 return {**cached, "cached": True}
 
@@ -171,7 +238,7 @@ class LLMClient:
             result = await _primary()
 
         if use_cache and result.get("text") and not result.get("error"):
-            _set_cached(prompt, model, max_tokens, temperature, result)
+            await _aset_cached(prompt, model, max_tokens, temperature, result)
         return result
 
     async def _generate_openai(
@@ -1,7 +1,7 @@
 """
 生成AI関連のデータモデル
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -26,6 +26,23 @@ class RAGRequest(BaseModel):
     top_k: int = 5
 
 
+class RAGDocument(BaseModel):
+    """RAG 投入ドキュメント"""
+
+    text: str
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class RAGBulkIngestRequest(BaseModel):
+    """RAG 一括投入リクエスト"""
+
+    collection: str
+    documents: List[RAGDocument]
+    chunk_size: int = 500
+    chunk_overlap: int = 50
+    batch_size: int = 256
+
+
 class ReasoningRequest(BaseModel):
     """推論リクエスト"""
 
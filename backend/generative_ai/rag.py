@@ -2,14 +2,43 @@
 RAG (Retrieval-Augmented Generation) モジュール
 ChromaDB によるベクトル検索 + ハイブリッド検索・再ランキング・チャンク分割
 """
+import logging
 import time
-import uuid
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from pydantic import BaseModel
 
+from .bm25_index import BM25Index
+from .ingestion import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_WORKERS,
+    Chunk,
+    IngestionStats,
+    SourceDocument,
+    iter_batches,
+    iter_document_chunks,
+    iter_file_documents,
+)
 from .llm_integration import LLMClient
-from .rag_enhancements import chunk_text, keyword_search_score, reciprocal_rank_fusion
+from .rag_enhancements import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+EmbeddingFunction = Callable[[List[str]], List[List[float]]]
 
 # ChromaDB の利用可否
 CHROMADB_AVAILABLE = False
@@ -59,10 +88,29 @@ def _get_or_create_collection(name: str):
 class RAGSystem:
     """RAGシステムクラス（ChromaDB ベクトル検索 + フォールバック）"""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        keyword_index: Optional[BM25Index] = None,
+        embedding_function: Optional[EmbeddingFunction] = None,
+    ):
+        """
+        Args:
+            llm_client: 回答生成に使う LLM クライアント
+            keyword_index: キーワード検索の索引（デフォルト: BM25Index）
+            embedding_function: 一括投入時に並行実行する埋め込み関数
+                （デフォルト: ChromaDB の標準埋め込み）
+        """
         self.llm_client = llm_client
+        self._embedding_function = embedding_function
+        self.last_ingestion: Optional[Dict[str, Any]] = None
         self._knowledge_base: Dict[str, List[Dict[str, Any]]] = {}
         self._use_chromadb = CHROMADB_AVAILABLE and _get_chroma_client() is not None
+        # キーワード検索用の BM25 索引（ChromaDB と同じく永続化。フォールバック時はメモリ）
+        self._keyword_index = keyword_index or BM25Index(
+            None if self._use_chromadb else ":memory:"
+        )
+        self._keyword_synced: set = set()
         self._ensure_default_docs()
 
     def _ensure_default_docs(self):
@@ -113,31 +161,160 @@ class RAGSystem:
         chunk_overlap: int = 50,
     ):
         """ドキュメントを追加（chunk_size>0 でチャンク分割して投入）"""
-        meta = metadata or {}
-        docs_to_add = [document]
-        if chunk_size > 0 and len(document) > chunk_size:
-            docs_to_add = chunk_text(document, chunk_size, chunk_overlap)
-
-        for idx, doc_text in enumerate(docs_to_add):
-            doc_id = str(uuid.uuid4())
-            doc_meta = {**meta, "chunk_index": idx} if len(docs_to_add) > 1 else meta
-
-            if self._use_chromadb:
-                coll = _get_or_create_collection(collection)
-                if coll:
-                    try:
-                        coll.add(
-                            documents=[doc_text], metadatas=[doc_meta], ids=[doc_id]
-                        )
-                        continue
-                    except Exception:
-                        pass
+        return self.ingest(
+            collection,
+            [(document, metadata)],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
 
-            if collection not in self._knowledge_base:
-                self._knowledge_base[collection] = []
-            self._knowledge_base[collection].append(
-                {"text": doc_text, "metadata": doc_meta, "id": doc_id}
+    def _get_embedding_function(self) -> Optional[EmbeddingFunction]:
+        """ワーカーで実行する埋め込み関数（取得できなければ ChromaDB の add に任せる）"""
+        if self._embedding_function is None and CHROMADB_AVAILABLE:
+            try:
+                from chromadb.utils import embedding_functions
+
+                self._embedding_function = (
+                    embedding_functions.DefaultEmbeddingFunction()
+                )
+            except Exception:
+                self._embedding_function = False
+        return self._embedding_function or None
+
+    def _existing_ids(self, collection: str, coll, doc_ids: List[str]) -> Set[str]:
+        """
+        投入済みの ID（ChromaDB 使用時はベクトル DB を正とする）
+
+        BM25 索引にはベクトル DB への書き込みに失敗したチャンクも入るため、
+        それを基準にすると失敗分が再投入されない。
+        """
+        if coll is not None:
+            try:
+                return set(coll.get(ids=doc_ids, include=[])["ids"])
+            except Exception as e:
+                logger.debug(f"RAG vector id lookup failed for {collection}: {e}")
+        return self._keyword_index.existing_ids(collection, doc_ids)
+
+    def _write_batch(
+        self,
+        collection: str,
+        coll,
+        batch: List[Chunk],
+        embeddings: Optional[Future],
+        stats: IngestionStats,
+    ):
+        """埋め込み済みのバッチをベクトルDB・BM25 索引に書き込む"""
+        ids = [doc_id for doc_id, _, _ in batch]
+        texts = [text for _, text, _ in batch]
+        metadatas = [meta for _, _, meta in batch]
+        stored = False
+        if coll is not None:
+            try:
+                kwargs = {"embeddings": embeddings.result()} if embeddings else {}
+                coll.add(ids=ids, documents=texts, metadatas=metadatas, **kwargs)
+                stored = True
+            except Exception as e:
+                logger.warning(f"RAG vector ingestion failed for {collection}: {e}")
+                stats.vector_failures += len(batch)
+        if not stored:
+            self._knowledge_base.setdefault(collection, []).extend(
+                {"text": text, "metadata": meta, "id": doc_id}
+                for doc_id, text, meta in batch
             )
+        # ベクトル書き込みに失敗してもキーワード検索では引けるよう索引する
+        # （重複判定はベクトル DB 基準なので次回の投入で再試行され、索引は置き換わる）
+        self._keyword_index.add_many(collection, batch)
+        stats.added += len(batch)
+        stats.batches += 1
+
+    def ingest(
+        self,
+        collection: str,
+        documents: Iterable[SourceDocument],
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        progress: Optional[Callable[[IngestionStats], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        文書を一括投入
+
+        チャンクは内容ハッシュを ID にし、投入済み（同じ内容）のものは除外する。
+        埋め込みはバッチごとにワーカーで並行計算し、書き込みは投入順に行う。
+
+        Args:
+            collection: コレクション名
+            documents: (テキストまたはテキスト断片の列, メタデータ) の列
+            chunk_size: チャンクの最大文字数（0 で分割しない）
+            chunk_overlap: オーバーラップ文字数
+            batch_size: 1回の書き込みのチャンク数
+            max_workers: 埋め込み計算の並行数（先読みするバッチ数）
+            progress: バッチを書き込むたびに呼ばれるコールバック
+
+        Returns:
+            投入結果（IngestionStats.to_dict）
+        """
+        stats = IngestionStats()
+        started = time.perf_counter()
+        coll = _get_or_create_collection(collection) if self._use_chromadb else None
+        embed = self._get_embedding_function() if coll is not None else None
+        chunks = iter_document_chunks(documents, chunk_size, chunk_overlap, stats)
+        # このジョブで投入予定の ID（書き込み前のバッチとの重複も除外する）
+        seen = set()
+        pending: Deque[Tuple[List[Chunk], Optional[Future]]] = deque()
+
+        def drain(keep: int):
+            while len(pending) > keep:
+                batch, embeddings = pending.popleft()
+                self._write_batch(collection, coll, batch, embeddings, stats)
+                stats.elapsed_sec = time.perf_counter() - started
+                if progress:
+                    progress(stats)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for batch in iter_batches(chunks, max(1, batch_size)):
+                stats.chunks += len(batch)
+                existing = self._existing_ids(
+                    collection, coll, [doc_id for doc_id, _, _ in batch]
+                )
+                fresh = []
+                for chunk in batch:
+                    if chunk[0] in existing or chunk[0] in seen:
+                        stats.skipped_duplicates += 1
+                        continue
+                    seen.add(chunk[0])
+                    fresh.append(chunk)
+                if not fresh:
+                    continue
+                embeddings = (
+                    pool.submit(embed, [text for _, text, _ in fresh])
+                    if embed
+                    else None
+                )
+                pending.append((fresh, embeddings))
+                drain(max(1, max_workers) - 1)
+            drain(0)
+
+        stats.elapsed_sec = time.perf_counter() - started
+        result = stats.to_dict()
+        self.last_ingestion = {"collection": collection, **result}
+        if stats.chunks >= batch_size:
+            logger.info(f"RAG ingestion into {collection}: {result}")
+        return result
+
+    def ingest_files(
+        self,
+        collection: str,
+        paths: Iterable[Union[str, Path]],
+        metadata: Optional[Dict[str, Any]] = None,
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """ファイルを逐次読み込みながら一括投入（引数は ingest と同じ）"""
+        return self.ingest(
+            collection, iter_file_documents(paths, metadata, encoding), **kwargs
+        )
 
     def _retrieve_vector(
         self, query: str, collection: str, top_k: int
@@ -175,40 +352,39 @@ class RAGSystem:
                     pass
         return []
 
+    def _sync_keyword_index(self, collection: str):
+        """索引導入前から ChromaDB にある文書を一度だけ索引に取り込む"""
+        if collection in self._keyword_synced or not self._use_chromadb:
+            return
+        self._keyword_synced.add(collection)
+        coll = _get_or_create_collection(collection)
+        if not coll:
+            return
+        try:
+            if coll.count() == self._keyword_index.count(collection):
+                return
+            all_data = coll.get(include=["documents", "metadatas"])
+        except Exception:
+            return
+        metadatas = all_data.get("metadatas") or [{}] * len(all_data["ids"])
+        self._keyword_index.add_many(
+            collection,
+            zip(all_data["ids"], all_data.get("documents") or [], metadatas),
+        )
+
     def _retrieve_keyword(
         self, query: str, collection: str, top_k: int
     ) -> List[Dict[str, Any]]:
-        """キーワード検索（スコア付き）"""
-        documents = self._knowledge_base.get(collection, [])
-        if self._use_chromadb:
-            coll = _get_or_create_collection(collection)
-            if coll:
-                try:
-                    all_data = coll.get(include=["documents", "metadatas"])
-                    if all_data and all_data.get("documents"):
-                        documents = [
-                            {
-                                "text": d,
-                                "metadata": all_data["metadatas"][i]
-                                if all_data.get("metadatas")
-                                else {},
-                                "id": all_data["ids"][i]
-                                if all_data.get("ids")
-                                else str(i),
-                            }
-                            for i, d in enumerate(all_data["documents"])
-                        ]
-                except Exception:
-                    pass
-
-        scored = []
-        for doc in documents:
-            text = doc.get("text", "")
-            score = keyword_search_score(query, text)
-            if score > 0:
-                scored.append({**doc, "score": round(score, 4)})
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored[:top_k]
+        """キーワード検索（BM25。スコアは最上位を 1.0 とした相対値）"""
+        self._sync_keyword_index(collection)
+        results = self._keyword_index.search(collection, query, top_k)
+        if not results:
+            return []
+        top = results[0]["bm25"] or 1.0
+        return [
+            {**doc, "bm25": round(doc["bm25"], 4), "score": round(doc["bm25"] / top, 4)}
+            for doc in results
+        ]
 
     async def retrieve(
         self,
@@ -3,7 +3,20 @@ RAG 精度向上モジュール
 ハイブリッド検索、再ランキング、チャンク分割の最適化
 """
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def _cut_chunk(chunk: str, chunk_size: int, separator: str) -> str:
+    """チャンクの末尾を区切り文字・句読点の位置に合わせて切り詰める"""
+    last_sep = chunk.rfind(separator)
+    if last_sep > chunk_size // 2:
+        return chunk[: last_sep + 1]
+    # 句読点で分割
+    for sep in ["。", ".", " ", "\n"]:
+        last_sep = chunk.rfind(sep)
+        if last_sep > chunk_size // 2:
+            return chunk[: last_sep + 1]
+    return chunk
 
 
 def chunk_text(
@@ -37,18 +50,8 @@ def chunk_text(
 
         if end < len(text):
             # 区切り文字で分割を調整
-            last_sep = chunk.rfind(separator)
-            if last_sep > chunk_size // 2:
-                chunk = chunk[: last_sep + 1]
-                end = start + len(chunk)
-            else:
-                # 句読点で分割
-                for sep in ["。", ".", " ", "\n"]:
-                    last_sep = chunk.rfind(sep)
-                    if last_sep > chunk_size // 2:
-                        chunk = chunk[: last_sep + 1]
-                        end = start + len(chunk)
-                        break
+            chunk = _cut_chunk(chunk, chunk_size, separator)
+            end = start + len(chunk)
 
         chunks.append(chunk.strip())
         start = end - chunk_overlap if end < len(text) else len(text)
@@ -56,6 +59,35 @@ def chunk_text(
     return [c for c in chunks if c]
 
 
+def iter_chunks(
+    blocks: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    separator: str = "\n",
+) -> Iterator[str]:
+    """
+    テキストの断片の列を逐次チャンク分割（chunk_text のストリーミング版）
+
+    ファイル全体をメモリに載せず、chunk_size を超えた分から順にチャンクを返す。
+
+    Args:
+        blocks: テキストの断片（ファイルの読み込みブロックなど）
+        chunk_size: チャンクの最大文字数
+        chunk_overlap: オーバーラップ文字数
+        separator: 分割の優先区切り文字
+    """
+    buffer = ""
+    for block in blocks:
+        buffer = (buffer + block) if buffer else block.lstrip()
+        while len(buffer) > chunk_size:
+            chunk = _cut_chunk(buffer[:chunk_size], chunk_size, separator)
+            if chunk.strip():
+                yield chunk.strip()
+            buffer = buffer[max(len(chunk) - chunk_overlap, 1) :]
+    if buffer.strip():
+        yield buffer.strip()
+
+
 def keyword_search_score(query: str, document: str) -> float:
     """
     キーワードマッチによるスコア（BM25簡易版）
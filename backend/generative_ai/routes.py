@@ -1,6 +1,7 @@
 """
 生成AI APIエンドポイント
 """
+import asyncio
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -11,6 +12,7 @@ from auth.rbac import require_permission
 from .llm_integration import LLMProvider, llm_client
 from .models import (
     GenerateRequest,
+    RAGBulkIngestRequest,
     RAGRequest,
     ReasoningRequest,
     ReasoningRoutingRequest,
@@ -137,6 +139,7 @@ async def rag_status(current_user: Dict[str, Any] = Depends(get_current_active_u
         "chromadb_connected": client is not None,
         "collections": collections,
         "backend": "vector" if getattr(system, "_use_chromadb", False) else "memory",
+        "last_ingestion": system.last_ingestion,
     }
 
 
@@ -160,3 +163,22 @@ async def add_document(
         chunk_overlap=chunk_overlap,
     )
     return {"message": "Document added successfully", "collection": collection}
+
+
+@router.post("/rag/documents/bulk")
+@require_permission("manage_ai")
+async def ingest_documents(
+    request: RAGBulkIngestRequest,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """ドキュメントを一括投入（内容が同じチャンクはスキップ。投入件数・スループットを返す）"""
+    system = get_rag_system()
+    result = await asyncio.to_thread(
+        system.ingest,
+        request.collection,
+        [(doc.text, doc.metadata) for doc in request.documents],
+        chunk_size=request.chunk_size,
+        chunk_overlap=request.chunk_overlap,
+        batch_size=request.batch_size,
+    )
+    return {"collection": request.collection, **result}
@@ -3,10 +3,14 @@ GraphQL バッチリゾルバ
 複数クエリを一括で解決し N+1 を抑制
 補強スキル: GraphQL バッチ処理
 """
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from strawberry.dataloader import DataLoader
 
+from data_lake.catalog import DataCatalogEntry, catalog
+from ecosystem.store import ecosystem_store
+from mlops.model_registry import MLModel, model_registry
+
 
 async def batch_load_users(keys: List[str]) -> List[Dict[str, Any]]:
     """ユーザーをバッチ取得"""
@@ -42,9 +46,43 @@ async def batch_load_projects(keys: List[str]) -> List[Dict[str, Any]]:
     return result
 
 
+async def batch_load_models(keys: List[str]) -> List[Optional[MLModel]]:
+    """MLモデルをバッチ取得（モデルレジストリへの一括参照）"""
+    return model_registry.get_models(keys)
+
+
+async def batch_load_catalog_entries(
+    keys: List[str],
+) -> List[Optional[DataCatalogEntry]]:
+    """データカタログエントリをバッチ取得"""
+    return catalog.get_many(keys)
+
+
+async def batch_load_partners(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """パートナーをバッチ取得"""
+    return ecosystem_store.get_partners(keys)
+
+
+async def batch_load_partner_items(keys: List[str]) -> List[List[Dict[str, Any]]]:
+    """パートナーごとのマーケットプレイス出品をバッチ取得"""
+    grouped = ecosystem_store.list_marketplace_items_by_partner(keys)
+    return [grouped[key] for key in keys]
+
+
+async def batch_load_post_comments(keys: List[str]) -> List[List[Dict[str, Any]]]:
+    """投稿ごとのフォーラムコメントをバッチ取得"""
+    grouped = ecosystem_store.list_forum_comments_by_post(keys)
+    return [grouped[key] for key in keys]
+
+
 def create_batch_loaders() -> Dict[str, DataLoader]:
-    """バッチ用 DataLoader を生成"""
+    """バッチ用 DataLoader を生成（リクエストごとに呼び出す）"""
     return {
         "user_loader": DataLoader(load_fn=batch_load_users),
         "project_loader": DataLoader(load_fn=batch_load_projects),
+        "model_loader": DataLoader(load_fn=batch_load_models),
+        "catalog_loader": DataLoader(load_fn=batch_load_catalog_entries),
+        "partner_loader": DataLoader(load_fn=batch_load_partners),
+        "partner_items_loader": DataLoader(load_fn=batch_load_partner_items),
+        "post_comments_loader": DataLoader(load_fn=batch_load_post_comments),
     }
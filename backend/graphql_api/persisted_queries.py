@@ -0,0 +1,115 @@
+"""
+GraphQL 自動永続化クエリ（Automatic Persisted Queries）
+検証済みのクエリ文書を SHA-256 ハッシュで保持し、解析と変数に依存しない検証を省略する
+
+Apollo の APQ プロトコル互換。クライアントは extensions.persistedQuery.sha256Hash
+だけを送り、未登録なら PERSISTED_QUERY_NOT_FOUND を受けてクエリ本文付きで
+再送する。ハッシュ指定のないクエリも本文のハッシュで同じキャッシュを使う。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from graphql import DocumentNode, GraphQLError
+from strawberry.extensions import SchemaExtension
+
+PERSISTED_QUERY_CACHE_SIZE = int(
+    os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", "1000")
+)
+
+
+def query_hash(query: str) -> str:
+    """クエリ本文の SHA-256（16進）"""
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class PersistedQueryStore:
+    """ハッシュ → 検証済みクエリ文書の LRU"""
+
+    def __init__(self, max_entries: int = PERSISTED_QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._documents: "OrderedDict[str, DocumentNode]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[DocumentNode]:
+        with self._lock:
+            document = self._documents.get(digest)
+            if document is not None:
+                self._documents.move_to_end(digest)
+            return document
+
+    def put(self, digest: str, document: DocumentNode):
+        with self._lock:
+            self._documents[digest] = document
+            self._documents.move_to_end(digest)
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+persisted_query_store = PersistedQueryStore()
+
+
+class PersistedQueryExtension(SchemaExtension):
+    """
+    登録済みハッシュのクエリは解析を省略するスキーマ拡張
+
+    検証は変数の値に依存するルール（request_dependent 属性を持つもの。複雑度など）
+    だけを要求ごとに実行し、文書だけで決まるルールは登録時の結果を使う。
+    """
+
+    store = persisted_query_store
+
+    def on_operation(self) -> Iterator[None]:
+        context = self.execution_context
+        persisted = (context.operation_extensions or {}).get("persistedQuery")
+        requested = persisted.get("sha256Hash") if isinstance(persisted, dict) else None
+
+        self._digest: Optional[str] = None
+        self._cached = False
+        if context.query:
+            self._digest = query_hash(context.query)
+            if requested and requested != self._digest:
+                raise GraphQLError(
+                    "provided sha does not match query",
+                    extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"},
+                )
+        elif requested:
+            self._digest = requested
+
+        if self._digest:
+            document = self.store.get(self._digest)
+            if document is not None:
+                context.graphql_document = document
+                self._cached = True
+            elif not context.query:
+                raise GraphQLError(
+                    "PersistedQueryNotFound",
+                    extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+                )
+        yield
+
+    def on_validate(self) -> Iterator[None]:
+        context = self.execution_context
+        if self._cached:
+            context.validation_rules = tuple(
+                rule
+                for rule in context.validation_rules
+                if getattr(rule, "request_dependent", False)
+            )
+        yield
+        if (
+            self._digest
+            and not self._cached
+            and not context.pre_execution_errors
+            and context.graphql_document is not None
+        ):
+            self.store.put(self._digest, context.graphql_document)
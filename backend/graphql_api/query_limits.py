@@ -0,0 +1,205 @@
+"""
+GraphQL クエリ制限
+クエリの深さ・複雑度の上限を検証ルールとして適用
+
+複雑度はフィールド1つを 1 とし、リストを返すフィールドの子は
+limit/first 引数（なければ既定の倍率）倍で数える。引数が変数ならリクエストの
+変数値（なければ操作の既定値）を使い、件数は MAX_LIST_LIMIT で頭打ちにする
+（リゾルバーも同じ上限で切り詰める）。フラグメントは展開して計算する。
+"""
+import os
+from typing import Any, Dict, Iterator, Optional, Set, Type
+
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    ValidationContext,
+    ValidationRule,
+    VariableNode,
+    get_named_type,
+)
+from strawberry.extensions import QueryDepthLimiter, SchemaExtension
+
+MAX_QUERY_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+MAX_QUERY_COMPLEXITY = int(os.getenv("GRAPHQL_MAX_COMPLEXITY", "1000"))
+DEFAULT_LIST_FACTOR = int(os.getenv("GRAPHQL_LIST_FACTOR", "10"))
+MAX_LIST_LIMIT = int(os.getenv("GRAPHQL_MAX_LIST_LIMIT", "500"))
+
+_SIZE_ARGUMENTS = ("limit", "first")
+
+
+def _is_list(type_) -> bool:
+    if isinstance(type_, GraphQLNonNull):
+        type_ = type_.of_type
+    return isinstance(type_, GraphQLList)
+
+
+def clamp_limit(limit: int) -> int:
+    """リストフィールドの limit 引数を 0〜MAX_LIST_LIMIT に丸める（リゾルバー用）"""
+    return min(max(limit, 0), MAX_LIST_LIMIT)
+
+
+def _list_multiplier(
+    field: FieldNode, list_factor: int, variables: Dict[str, Any]
+) -> int:
+    """リストフィールドの件数見積もり（limit/first のリテラル・変数を優先）"""
+    for argument in field.arguments or ():
+        if argument.name.value not in _SIZE_ARGUMENTS:
+            continue
+        value = argument.value
+        if isinstance(value, IntValueNode):
+            size = int(value.value)
+        elif isinstance(value, VariableNode):
+            size = variables.get(value.name.value)
+        else:
+            continue
+        if isinstance(size, int) and not isinstance(size, bool):
+            return min(max(size, 1), MAX_LIST_LIMIT)
+    return list_factor
+
+
+def selection_complexity(
+    context: ValidationContext,
+    selection_set: Optional[SelectionSetNode],
+    parent_type,
+    list_factor: int = DEFAULT_LIST_FACTOR,
+    visited_fragments: Optional[Set[str]] = None,
+    variables: Optional[Dict[str, Any]] = None,
+) -> int:
+    """選択セットの複雑度（variables は limit/first に渡された変数の値）"""
+    if selection_set is None:
+        return 0
+    variables = variables or {}
+    visited_fragments = visited_fragments if visited_fragments is not None else set()
+    fields = getattr(parent_type, "fields", None) or {}
+    cost = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith("__"):
+                continue
+            field_def = fields.get(name)
+            if field_def is None:
+                cost += 1  # 未定義フィールドは他の検証ルールがエラーにする
+                continue
+            child = selection_complexity(
+                context,
+                selection.selection_set,
+                get_named_type(field_def.type),
+                list_factor,
+                visited_fragments,
+                variables,
+            )
+            if child and _is_list(field_def.type):
+                child *= _list_multiplier(selection, list_factor, variables)
+            cost += 1 + child
+        elif isinstance(selection, InlineFragmentNode):
+            fragment_type = parent_type
+            if selection.type_condition is not None:
+                fragment_type = context.schema.get_type(
+                    selection.type_condition.name.value
+                )
+            cost += selection_complexity(
+                context,
+                selection.selection_set,
+                fragment_type,
+                list_factor,
+                visited_fragments,
+                variables,
+            )
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = context.get_fragment(name)
+            if fragment is None or name in visited_fragments:
+                continue
+            cost += selection_complexity(
+                context,
+                fragment.selection_set,
+                context.schema.get_type(fragment.type_condition.name.value),
+                list_factor,
+                visited_fragments | {name},
+                variables,
+            )
+    return cost
+
+
+def create_complexity_rule(
+    max_complexity: int,
+    list_factor: int = DEFAULT_LIST_FACTOR,
+    variables: Optional[Dict[str, Any]] = None,
+) -> Type[ValidationRule]:
+    """複雑度が上限を超える操作をエラーにする検証ルールを生成"""
+
+    class QueryComplexityRule(ValidationRule):
+        # 変数の値で結果が変わるため、永続化クエリでも要求ごとに実行する
+        request_dependent = True
+
+        def enter_operation_definition(
+            self, node: OperationDefinitionNode, *_args
+        ) -> None:
+            # 変数の既定値をリクエストの値で上書き
+            values: Dict[str, Any] = {}
+            for definition in node.variable_definitions or ():
+                if isinstance(definition.default_value, IntValueNode):
+                    values[definition.variable.name.value] = int(
+                        definition.default_value.value
+                    )
+            values.update(variables or {})
+            root_type = self.context.schema.get_root_type(node.operation)
+            complexity = selection_complexity(
+                self.context,
+                node.selection_set,
+                root_type,
+                list_factor,
+                variables=values,
+            )
+            if complexity > max_complexity:
+                name = node.name.value if node.name else "anonymous"
+                self.report_error(
+                    GraphQLError(
+                        f"'{name}' exceeds maximum query complexity of "
+                        f"{max_complexity} (got {complexity})",
+                        node,
+                    )
+                )
+
+    return QueryComplexityRule
+
+
+class QueryComplexityLimiter(SchemaExtension):
+    """リクエストの変数を反映した複雑度の検証ルールを追加するスキーマ拡張"""
+
+    def __init__(
+        self, max_complexity: int, list_factor: int = DEFAULT_LIST_FACTOR
+    ) -> None:
+        self.max_complexity = max_complexity
+        self.list_factor = list_factor
+
+    def on_operation(self) -> Iterator[None]:
+        rule = create_complexity_rule(
+            self.max_complexity,
+            self.list_factor,
+            self.execution_context.variables,
+        )
+        self.execution_context.validation_rules = (
+            *self.execution_context.validation_rules,
+            rule,
+        )
+        yield
+
+
+def query_limit_extensions(
+    max_depth: int = MAX_QUERY_DEPTH, max_complexity: int = MAX_QUERY_COMPLEXITY
+) -> list:
+    """深さ・複雑度の制限を行うスキーマ拡張（リクエストごとに生成するファクトリ）"""
+    return [
+        lambda: QueryDepthLimiter(max_depth=max_depth),
+        lambda: QueryComplexityLimiter(max_complexity),
+    ]
@@ -4,12 +4,20 @@ REST API の一部を GraphQL で提供
 補強スキル: GraphQL（DataLoader、サブスクリプション、フェデレーション）
 """
 import asyncio
-from typing import AsyncGenerator, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
 import strawberry
-from strawberry.dataloader import DataLoader
+from strawberry.scalars import JSON
 from strawberry.types import Info
 
+from data_lake.catalog import DataCatalogEntry, catalog
+from ecosystem.store import ecosystem_store
+from mlops.model_registry import MLModel as RegistryModel
+from mlops.model_registry import model_registry
+
+from .persisted_queries import PersistedQueryExtension
+from .query_limits import clamp_limit, query_limit_extensions
+
 
 @strawberry.type
 class User:
@@ -42,20 +50,41 @@ class ServiceDetail:
     endpoint_count: int
 
 
-async def batch_load_services(keys: List[str]) -> List[ServiceDetail]:
+# 登録サービス（名前 → 詳細）
+_SERVICES: Dict[str, ServiceDetail] = {
+    svc.name: svc
+    for svc in (
+        ServiceDetail(
+            name="backend-api",
+            url="http://backend:8000",
+            status="active",
+            endpoint_count=5,
+        ),
+        ServiceDetail(
+            name="mlops-service",
+            url="http://mlops-service:8003",
+            status="pending",
+            endpoint_count=5,
+        ),
+        ServiceDetail(
+            name="generative-ai-service",
+            url="http://generative-ai-service:8004",
+            status="pending",
+            endpoint_count=5,
+        ),
+        ServiceDetail(
+            name="security-service",
+            url="http://security-service:8005",
+            status="pending",
+            endpoint_count=5,
+        ),
+    )
+}
+
+
+async def batch_load_services(keys: List[str]) -> List[Optional[ServiceDetail]]:
     """DataLoader: 複数サービスの詳細をバッチ取得（N+1対策）"""
-    # 実装例: keys で一括取得し、順序を保持して返す
-    result = []
-    for key in keys:
-        result.append(
-            ServiceDetail(
-                name=key,
-                url=f"http://{key}:8000",
-                status="active",
-                endpoint_count=5,
-            )
-        )
-    return result
+    return [_SERVICES.get(key) for key in keys]
 
 
 @strawberry.type
@@ -78,6 +107,201 @@ class Project:
     owner_username: Optional[str] = None
 
 
+@strawberry.type
+class ModelVersion:
+    """MLモデルバージョン型"""
+
+    version: str
+    model_path: str
+    status: str
+    metrics: JSON
+    created_by: str
+    created_at: str
+
+
+@strawberry.type
+class MLModel:
+    """MLモデル型（モデルレジストリ）"""
+
+    id: str
+    name: str
+    description: Optional[str]
+    model_type: str
+    framework: str
+    current_version: Optional[str]
+    created_by: str
+    updated_at: str
+    versions: List[ModelVersion]
+
+    @classmethod
+    def from_registry(cls, model: RegistryModel) -> "MLModel":
+        return cls(
+            id=model.id,
+            name=model.name,
+            description=model.description,
+            model_type=model.model_type,
+            framework=model.framework,
+            current_version=model.current_version,
+            created_by=model.created_by,
+            updated_at=model.updated_at.isoformat(),
+            versions=[
+                ModelVersion(
+                    version=v.version,
+                    model_path=v.model_path,
+                    status=v.status.value,
+                    metrics=v.metrics,
+                    created_by=v.created_by,
+                    created_at=v.created_at.isoformat(),
+                )
+                for v in model.versions
+            ],
+        )
+
+
+@strawberry.type
+class DataAsset:
+    """データカタログエントリ型（データレイク）"""
+
+    id: str
+    name: str
+    description: Optional[str]
+    data_type: str
+    format: str
+    owner: str
+    tags: List[str]
+    size: int
+    version: int
+    updated_at: str
+
+    @classmethod
+    def from_entry(cls, entry: DataCatalogEntry) -> "DataAsset":
+        return cls(
+            id=entry.id,
+            name=entry.name,
+            description=entry.description,
+            data_type=entry.data_type,
+            format=entry.format,
+            owner=entry.owner,
+            tags=list(entry.tags),
+            size=entry.size,
+            version=entry.version,
+            updated_at=entry.updated_at.isoformat(),
+        )
+
+
+@strawberry.type
+class MarketplaceItem:
+    """マーケットプレイス出品型（エコシステム）"""
+
+    id: str
+    name: str
+    description: str
+    category: str
+    partner_id: str
+    price_type: str
+    download_count: int
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "MarketplaceItem":
+        return cls(
+            id=item["id"],
+            name=item["name"],
+            description=item["description"],
+            category=item["category"],
+            partner_id=item["partner_id"],
+            price_type=item["price_type"],
+            download_count=item.get("download_count", 0),
+        )
+
+    @strawberry.field
+    async def partner(self, info: Info) -> Optional["Partner"]:
+        """出品元パートナー（DataLoader経由）"""
+        partner = await info.context["partner_loader"].load(self.partner_id)
+        return Partner.from_dict(partner) if partner else None
+
+
+@strawberry.type
+class Partner:
+    """パートナー型（エコシステム）"""
+
+    id: str
+    name: str
+    organization: str
+    status: str
+    description: Optional[str]
+    created_at: str
+
+    @classmethod
+    def from_dict(cls, partner: Dict[str, Any]) -> "Partner":
+        return cls(
+            id=partner["id"],
+            name=partner["name"],
+            organization=partner["organization"],
+            status=partner["status"],
+            description=partner.get("description"),
+            created_at=partner["created_at"],
+        )
+
+    @strawberry.field
+    async def marketplace_items(self, info: Info) -> List[MarketplaceItem]:
+        """パートナーの出品（DataLoader経由）"""
+        items = await info.context["partner_items_loader"].load(self.id)
+        return [MarketplaceItem.from_dict(item) for item in items]
+
+
+@strawberry.type
+class ForumComment:
+    """フォーラムコメント型"""
+
+    id: str
+    post_id: str
+    content: str
+    author: str
+    created_at: str
+
+
+@strawberry.type
+class ForumPost:
+    """フォーラム投稿型"""
+
+    id: str
+    title: str
+    content: str
+    category: str
+    author: str
+    likes: int
+    comment_count: int
+    created_at: str
+
+    @classmethod
+    def from_dict(cls, post: Dict[str, Any]) -> "ForumPost":
+        return cls(
+            id=post["id"],
+            title=post["title"],
+            content=post["content"],
+            category=post["category"],
+            author=post["author"],
+            likes=post.get("likes", 0),
+            comment_count=post.get("comment_count", 0),
+            created_at=post["created_at"],
+        )
+
+    @strawberry.field
+    async def comments(self, info: Info) -> List[ForumComment]:
+        """投稿のコメント（DataLoader経由）"""
+        comments = await info.context["post_comments_loader"].load(self.id)
+        return [
+            ForumComment(
+                id=c["id"],
+                post_id=c["post_id"],
+                content=c["content"],
+                author=c["author"],
+                created_at=c["created_at"],
+            )
+            for c in comments
+        ]
+
+
 @strawberry.type
 class Query:
     """GraphQL クエリ"""
@@ -106,22 +330,79 @@ class Query:
     async def services(self) -> List[Service]:
         """登録サービス一覧"""
         return [
-            Service(name="backend-api", url="http://backend:8000", status="active"),
-            Service(
-                name="mlops-service", url="http://mlops-service:8003", status="pending"
-            ),
-            Service(
-                name="generative-ai-service",
-                url="http://generative-ai-service:8004",
-                status="pending",
-            ),
-            Service(
-                name="security-service",
-                url="http://security-service:8005",
-                status="pending",
-            ),
+            Service(name=svc.name, url=svc.url, status=svc.status)
+            for svc in _SERVICES.values()
         ]
 
+    @strawberry.field
+    async def models(
+        self, model_type: Optional[str] = None, limit: int = 100
+    ) -> List[MLModel]:
+        """MLモデル一覧（モデルレジストリ）"""
+        limit = clamp_limit(limit)
+        models = model_registry.list_models(model_type=model_type)[:limit]
+        return [MLModel.from_registry(m) for m in models]
+
+    @strawberry.field
+    async def model(self, info: Info, id: str) -> Optional[MLModel]:
+        """MLモデル（DataLoader経由。同一クエリ内の複数指定は一括取得）"""
+        model = await info.context["model_loader"].load(id)
+        return MLModel.from_registry(model) if model else None
+
+    @strawberry.field
+    async def data_assets(
+        self,
+        data_type: Optional[str] = None,
+        owner: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[DataAsset]:
+        """データカタログ一覧"""
+        limit = clamp_limit(limit)
+        entries = catalog.list(
+            data_type=data_type, owner=owner, tags=[tag] if tag else None
+        )
+        return [DataAsset.from_entry(e) for e in entries[:limit]]
+
+    @strawberry.field
+    async def data_asset(self, info: Info, id: str) -> Optional[DataAsset]:
+        """データカタログエントリ（DataLoader経由）"""
+        entry = await info.context["catalog_loader"].load(id)
+        return DataAsset.from_entry(entry) if entry else None
+
+    @strawberry.field
+    async def partners(
+        self, status: Optional[str] = None, limit: int = 100
+    ) -> List[Partner]:
+        """パートナー一覧"""
+        limit = clamp_limit(limit)
+        partners = ecosystem_store.list_partners(status=status)[:limit]
+        return [Partner.from_dict(p) for p in partners]
+
+    @strawberry.field
+    async def partner(self, info: Info, id: str) -> Optional[Partner]:
+        """パートナー（DataLoader経由）"""
+        partner = await info.context["partner_loader"].load(id)
+        return Partner.from_dict(partner) if partner else None
+
+    @strawberry.field
+    async def marketplace_items(
+        self, category: Optional[str] = None, limit: int = 100
+    ) -> List[MarketplaceItem]:
+        """マーケットプレイス出品一覧"""
+        limit = clamp_limit(limit)
+        items = ecosystem_store.list_marketplace_items(category=category)[:limit]
+        return [MarketplaceItem.from_dict(i) for i in items]
+
+    @strawberry.field
+    async def forum_posts(
+        self, category: Optional[str] = None, limit: int = 100
+    ) -> List[ForumPost]:
+        """フォーラム投稿一覧"""
+        limit = clamp_limit(limit)
+        posts = ecosystem_store.list_forum_posts(category=category)[:limit]
+        return [ForumPost.from_dict(p) for p in posts]
+
     @strawberry.field
     async def projects(self) -> List[Project]:
         """プロジェクト一覧"""
@@ -180,5 +461,9 @@ class Subscription:
             await asyncio.sleep(1.0)
 
 
-# スキーマ生成（Query + Subscription）
-schema = strawberry.Schema(query=Query, subscription=Subscription)
+# スキーマ生成（Query + Subscription、深さ・複雑度制限と永続化クエリ）
+schema = strawberry.Schema(
+    query=Query,
+    subscription=Subscription,
+    extensions=[*query_limit_extensions(), PersistedQueryExtension],
+)
@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
-    b'\n%grpc_service/proto/uep_internal.proto"\x0f\n\rHealthRequest"B\n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\t\x12\x0f\n\x07service\x18\x03 \x01(\t"&\n\x0eMetricsRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t"U\n\x0fMetricsResponse\x12\x15\n\rrequest_count\x18\x01 \x01(\x03\x12\x16\n\x0e\x61vg_latency_ms\x18\x02 \x01(\x01\x12\x13\n\x0b\x65rror_count\x18\x03 \x01(\x05\x32u\n\x12UepInternalService\x12.\n\x0bHealthCheck\x12\x0e.HealthRequest\x1a\x0f.HealthResponse\x12/\n\nGetMetrics\x12\x0f.MetricsRequest\x1a\x10.MetricsResponseb\x06proto3'
+    b'\n%grpc_service/proto/uep_internal.proto"\x0f\n\rHealthRequest"B\n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\t\x12\x0f\n\x07service\x18\x03 \x01(\t"&\n\x0eMetricsRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t"\xaf\x01\n\x0fMetricsResponse\x12\x15\n\rrequest_count\x18\x01 \x01(\x03\x12\x16\n\x0e\x61vg_latency_ms\x18\x02 \x01(\x01\x12\x13\n\x0b\x65rror_count\x18\x03 \x01(\x05\x12\x16\n\x0ep95_latency_ms\x18\x04 \x01(\x01\x12\x16\n\x0ep99_latency_ms\x18\x05 \x01(\x01\x12\x12\n\nerror_rate\x18\x06 \x01(\x01\x12\x14\n\x0ctimestamp_ms\x18\x07 \x01(\x03"X\n\x14MetricsStreamRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\x12\x13\n\x0binterval_ms\x18\x02 \x01(\r\x12\x15\n\rmax_snapshots\x18\x03 \x01(\r"\x95\x01\n\x13\x41nomalyScoreRequest\x12\x0f\n\x07metrics\x18\x01 \x03(\t\x12\x0e\n\x06values\x18\x02 \x03(\x01\x12\x0e\n\x06series\x18\x03 \x03(\t\x12\x0e\n\x06window\x18\x04 \x01(\r\x12\x11\n\tdeviation\x18\x05 \x01(\x01\x12\x12\n\nbatch_size\x18\x06 \x01(\r\x12\x16\n\x0e\x61nomalies_only\x18\x07 \x01(\x08"h\n\x11\x41nomalyScoreBatch\x12\x0f\n\x07indices\x18\x01 \x03(\r\x12\x12\n\nis_anomaly\x18\x02 \x03(\x08\x12\x10\n\x08severity\x18\x03 \x03(\x05\x12\r\n\x05votes\x18\x04 \x03(\r\x12\r\n\x05total\x18\x05 \x03(\r"s\n\rReplayRequest\x12\x16\n\x0e\x61ggregate_type\x18\x01 \x01(\t\x12\x14\n\x0c\x61ggregate_id\x18\x02 \x01(\t\x12\r\n\x05\x61\x66ter\x18\x03 \x01(\x03\x12\x11\n\tpage_size\x18\x04 \x01(\r\x12\x12\n\nmax_events\x18\x05 \x01(\r"\xbd\x01\n\x0b\x45ventRecord\x12\x10\n\x08sequence\x18\x01 \x01(\x03\x12\x10\n\x08\x65vent_id\x18\x02 \x01(\t\x12\x16\n\x0e\x61ggregate_type\x18\x03 \x01(\t\x12\x14\n\x0c\x61ggregate_id\x18\x04 \x01(\t\x12\x12\n\nevent_type\x18\x05 \x01(\t\x12\x0f\n\x07version\x18\x06 \x01(\x03\x12\x11\n\ttimestamp\x18\x07 \x01(\t\x12\x12\n\nevent_data\x18\x08 \x01(\x0c\x12\x10\n\x08metadata\x18\t \x01(\x0c\x32\x9f\x02\n\x12UepInternalService\x12.\n\x0bHealthCheck\x12\x0e.HealthRequest\x1a\x0f.HealthResponse\x12/\n\nGetMetrics\x12\x0f.MetricsRequest\x1a\x10.MetricsResponse\x12:\n\rStreamMetrics\x12\x15.MetricsStreamRequest\x1a\x10.MetricsResponse0\x01\x12<\n\x0eScoreAnomalies\x12\x14.AnomalyScoreRequest\x1a\x12.AnomalyScoreBatch0\x01\x12.\n\x0cReplayEvents\x12\x0e.ReplayRequest\x1a\x0c.EventRecord0\x01\x62\x06proto3'
 )
 
 _globals = globals()
@@ -30,8 +30,18 @@ if _descriptor._USE_C_DESCRIPTORS == False:
     _globals["_HEALTHRESPONSE"]._serialized_end = 124
     _globals["_METRICSREQUEST"]._serialized_start = 126
     _globals["_METRICSREQUEST"]._serialized_end = 164
-    _globals["_METRICSRESPONSE"]._serialized_start = 166
-    _globals["_METRICSRESPONSE"]._serialized_end = 251
-    _globals["_UEPINTERNALSERVICE"]._serialized_start = 253
-    _globals["_UEPINTERNALSERVICE"]._serialized_end = 370
+    _globals["_METRICSRESPONSE"]._serialized_start = 167
+    _globals["_METRICSRESPONSE"]._serialized_end = 342
+    _globals["_METRICSSTREAMREQUEST"]._serialized_start = 344
+    _globals["_METRICSSTREAMREQUEST"]._serialized_end = 432
+    _globals["_ANOMALYSCOREREQUEST"]._serialized_start = 435
+    _globals["_ANOMALYSCOREREQUEST"]._serialized_end = 584
+    _globals["_ANOMALYSCOREBATCH"]._serialized_start = 586
+    _globals["_ANOMALYSCOREBATCH"]._serialized_end = 690
+    _globals["_REPLAYREQUEST"]._serialized_start = 692
+    _globals["_REPLAYREQUEST"]._serialized_end = 807
+    _globals["_EVENTRECORD"]._serialized_start = 810
+    _globals["_EVENTRECORD"]._serialized_end = 999
+    _globals["_UEPINTERNALSERVICE"]._serialized_start = 1002
+    _globals["_UEPINTERNALSERVICE"]._serialized_end = 1289
 # @@protoc_insertion_point(module_scope)
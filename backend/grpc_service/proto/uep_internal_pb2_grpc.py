@@ -26,6 +26,21 @@ class UepInternalServiceStub(object):
             request_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsRequest.SerializeToString,
             response_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsResponse.FromString,
         )
+        self.StreamMetrics = channel.unary_stream(
+            "/UepInternalService/StreamMetrics",
+            request_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsStreamRequest.SerializeToString,
+            response_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsResponse.FromString,
+        )
+        self.ScoreAnomalies = channel.unary_stream(
+            "/UepInternalService/ScoreAnomalies",
+            request_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreRequest.SerializeToString,
+            response_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreBatch.FromString,
+        )
+        self.ReplayEvents = channel.unary_stream(
+            "/UepInternalService/ReplayEvents",
+            request_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.ReplayRequest.SerializeToString,
+            response_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.EventRecord.FromString,
+        )
 
 
 class UepInternalServiceServicer(object):
@@ -43,6 +58,24 @@ class UepInternalServiceServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def StreamMetrics(self, request, context):
+        """メトリクスのスナップショットを一定間隔で配信"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def ScoreAnomalies(self, request, context):
+        """異常検知スコアリング（結果を batch_size 件ずつ配信）"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def ReplayEvents(self, request, context):
+        """イベントリプレイ（イベントストアからページ単位で読み出して配信）"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_UepInternalServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -56,6 +89,21 @@ def add_UepInternalServiceServicer_to_server(servicer, server):
             request_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsRequest.FromString,
             response_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsResponse.SerializeToString,
         ),
+        "StreamMetrics": grpc.unary_stream_rpc_method_handler(
+            servicer.StreamMetrics,
+            request_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsStreamRequest.FromString,
+            response_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.MetricsResponse.SerializeToString,
+        ),
+        "ScoreAnomalies": grpc.unary_stream_rpc_method_handler(
+            servicer.ScoreAnomalies,
+            request_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreRequest.FromString,
+            response_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreBatch.SerializeToString,
+        ),
+        "ReplayEvents": grpc.unary_stream_rpc_method_handler(
+            servicer.ReplayEvents,
+            request_deserializer=grpc__service_dot_proto_dot_uep__internal__pb2.ReplayRequest.FromString,
+            response_serializer=grpc__service_dot_proto_dot_uep__internal__pb2.EventRecord.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "UepInternalService", rpc_method_handlers
@@ -124,3 +172,90 @@ class UepInternalService(object):
             timeout,
             metadata,
         )
+
+    @staticmethod
+    def StreamMetrics(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/UepInternalService/StreamMetrics",
+            grpc__service_dot_proto_dot_uep__internal__pb2.MetricsStreamRequest.SerializeToString,
+            grpc__service_dot_proto_dot_uep__internal__pb2.MetricsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def ScoreAnomalies(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/UepInternalService/ScoreAnomalies",
+            grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreRequest.SerializeToString,
+            grpc__service_dot_proto_dot_uep__internal__pb2.AnomalyScoreBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def ReplayEvents(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/UepInternalService/ReplayEvents",
+            grpc__service_dot_proto_dot_uep__internal__pb2.ReplayRequest.SerializeToString,
+            grpc__service_dot_proto_dot_uep__internal__pb2.EventRecord.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
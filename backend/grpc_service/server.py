@@ -1,15 +1,24 @@
 """
 gRPC サーバー
-マイクロサービス間の gRPC 通信を提供
+マイクロサービス間の gRPC 通信を提供（grpc.aio・サーバーストリーミング）
+
+大量の内部通信（異常検知のバッチスコアリング、イベントリプレイ、メトリクスの
+定期スナップショット）を JSON の REST ではなく protobuf のストリームで返す。
+メインアプリの lifespan から start_server で起動する。単体起動も可能。
 
 セットアップ: pip install grpcio-tools
 生成: python -m grpc_tools.protoc -I. --python_out=. --grpc_python_out=. grpc_service/proto/uep_internal.proto
 """
+import asyncio
+import json
+import logging
 import os
 import sys
-from concurrent import futures
+import time
+from typing import Any, List, Optional, Tuple
 
 import grpc
+import numpy as np
 
 # プロト生成コードのインポート（grpc_service/proto/ に生成される）
 try:
@@ -19,29 +28,221 @@ try:
 except ImportError:
     GRPC_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_INTERVAL_MS = 1000
+
+
+def server_options() -> List[Tuple[str, Any]]:
+    """キープアライブ・メッセージサイズのチャネルオプション（環境変数で設定）"""
+    max_message = int(float(os.getenv("GRPC_MAX_MESSAGE_MB", "16")) * 1024 * 1024)
+    return [
+        ("grpc.max_send_message_length", max_message),
+        ("grpc.max_receive_message_length", max_message),
+        ("grpc.keepalive_time_ms", int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "30000"))),
+        (
+            "grpc.keepalive_timeout_ms",
+            int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "10000")),
+        ),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.min_ping_interval_without_data_ms", 10000),
+        ("grpc.http2.max_pings_without_data", 0),
+        (
+            "grpc.max_concurrent_streams",
+            int(os.getenv("GRPC_MAX_CONCURRENT_STREAMS", "100")),
+        ),
+    ]
+
 
 if GRPC_AVAILABLE:
 
     class UepInternalServicer(uep_internal_pb2_grpc.UepInternalServiceServicer):
         """UEP 内部サービス実装"""
 
-        def HealthCheck(self, request, context):
+        def __init__(self, optimizer=None, event_store=None):
+            """
+            Args:
+                optimizer: メトリクスの取得元（デフォルト: performance_optimizer）
+                event_store: リプレイ元のイベントストア
+                    （デフォルト: event_streaming.routes.event_store）
+            """
+            self._optimizer = optimizer
+            self._event_store = event_store
+
+        @property
+        def optimizer(self):
+            if self._optimizer is None:
+                from optimization.performance import performance_optimizer
+
+                self._optimizer = performance_optimizer
+            return self._optimizer
+
+        @property
+        def event_store(self):
+            if self._event_store is None:
+                from event_streaming.routes import event_store
+
+                self._event_store = event_store
+            return self._event_store
+
+        def _metrics_snapshot(self, endpoint: str):
+            summary = self.optimizer.get_summary(endpoint or None)
+            return uep_internal_pb2.MetricsResponse(
+                request_count=summary["request_count"],
+                avg_latency_ms=summary["avg_response_time"] * 1000,
+                error_count=summary["error_count"],
+                p95_latency_ms=summary["p95_response_time"] * 1000,
+                p99_latency_ms=summary["p99_response_time"] * 1000,
+                error_rate=summary["error_rate"],
+                timestamp_ms=int(time.time() * 1000),
+            )
+
+        async def HealthCheck(self, request, context):
             return uep_internal_pb2.HealthResponse(
                 status="healthy",
                 version="5.0.0",
                 service="uep-grpc-internal",
             )
 
-        def GetMetrics(self, request, context):
-            return uep_internal_pb2.MetricsResponse(
-                request_count=0,
-                avg_latency_ms=0.0,
-                error_count=0,
+        async def GetMetrics(self, request, context):
+            return self._metrics_snapshot(request.service_name)
+
+        async def StreamMetrics(self, request, context):
+            interval = (request.interval_ms or DEFAULT_INTERVAL_MS) / 1000
+            sent = 0
+            while not request.max_snapshots or sent < request.max_snapshots:
+                yield self._metrics_snapshot(request.service_name)
+                sent += 1
+                if request.max_snapshots and sent >= request.max_snapshots:
+                    break
+                await asyncio.sleep(interval)
+
+        async def ScoreAnomalies(self, request, context):
+            from core.anomaly_detector import batch_detect
+
+            size = len(request.values)
+            if len(request.metrics) != size or (
+                request.series and len(request.series) != size
+            ):
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    "metrics, values and series must have the same length",
+                )
+            if size == 0:
+                return
+
+            # NumPy の一括評価はイベントループを止めないようスレッドで実行
+            result = await asyncio.to_thread(
+                batch_detect,
+                list(request.metrics),
+                list(request.values),
+                list(request.series) if request.series else None,
+                None,
+                None,
+                request.window or 10,
+                request.deviation or 2.0,
             )
+            if request.anomalies_only:
+                indices = result.anomaly_indices()
+            else:
+                indices = np.arange(size)
+            batch_size = request.batch_size or DEFAULT_BATCH_SIZE
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start : start + batch_size]
+                yield uep_internal_pb2.AnomalyScoreBatch(
+                    indices=chunk.tolist(),
+                    is_anomaly=result.is_anomaly[chunk].tolist(),
+                    severity=result.severity[chunk].tolist(),
+                    votes=result.votes[chunk].tolist(),
+                    total=result.total[chunk].tolist(),
+                )
+
+        async def ReplayEvents(self, request, context):
+            if not request.aggregate_type:
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT, "aggregate_type is required"
+                )
+            store = self.event_store
+            await asyncio.to_thread(store.catch_up, request.aggregate_type)
+
+            aggregate_id = request.aggregate_id or None
+            page_size = request.page_size or DEFAULT_PAGE_SIZE
+            position = request.after
+            sent = 0
+            while True:
+                limit = page_size
+                if request.max_events:
+                    limit = min(limit, request.max_events - sent)
+                    if limit <= 0:
+                        return
+                if aggregate_id:
+                    rows = await asyncio.to_thread(
+                        store.index.get_events,
+                        request.aggregate_type,
+                        aggregate_id,
+                        after_version=position,
+                        limit=limit,
+                    )
+                else:
+                    rows = await asyncio.to_thread(
+                        store.index.get_events,
+                        request.aggregate_type,
+                        after_seq=position,
+                        limit=limit,
+                    )
+                for row in rows:
+                    yield uep_internal_pb2.EventRecord(
+                        sequence=row["seq"],
+                        event_id=row["event_id"],
+                        aggregate_type=row["aggregate_type"],
+                        aggregate_id=row["aggregate_id"],
+                        event_type=row["event_type"],
+                        version=row["version"],
+                        timestamp=row["timestamp"],
+                        event_data=json.dumps(row["event_data"]).encode("utf-8"),
+                        metadata=(
+                            json.dumps(row["metadata"]).encode("utf-8")
+                            if row["metadata"] is not None
+                            else b""
+                        ),
+                    )
+                sent += len(rows)
+                if len(rows) < limit:
+                    return
+                position = rows[-1]["version" if aggregate_id else "seq"]
+
 
+async def start_server(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    servicer: Optional["UepInternalServicer"] = None,
+) -> Optional[grpc.aio.Server]:
+    """
+    grpc.aio サーバーを起動（呼び出し側のイベントループで動作）
 
-def serve(port: int = 50051):
-    """gRPC サーバーを起動"""
+    Returns:
+        起動したサーバー（proto 生成コードがない場合は None）
+    """
+    if not GRPC_AVAILABLE:
+        logger.warning("gRPC proto generated code not found; server not started")
+        return None
+    host = host or os.getenv("GRPC_HOST", "127.0.0.1")
+    port = port if port is not None else int(os.getenv("GRPC_PORT", "50051"))
+    server = grpc.aio.server(options=server_options())
+    uep_internal_pb2_grpc.add_UepInternalServiceServicer_to_server(
+        servicer or UepInternalServicer(), server
+    )
+    # デフォルトは 127.0.0.1 でバインド（IPv6 [::] が失敗する環境向け）
+    bound = server.add_insecure_port(f"{host}:{port}")
+    await server.start()
+    logger.info(f"gRPC server listening on {host}:{bound}")
+    return server
+
+
+async def serve(port: int = 50051):
+    """gRPC サーバーを起動して終了まで待機"""
     if not GRPC_AVAILABLE:
         print(
             "gRPC: proto 生成コードがありません。\n"
@@ -51,17 +252,11 @@ def serve(port: int = 50051):
             file=sys.stderr,
         )
         return
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    uep_internal_pb2_grpc.add_UepInternalServiceServicer_to_server(
-        UepInternalServicer(), server
-    )
-    # 127.0.0.1 でバインド（IPv6 [::] が失敗する環境向け）
-    server.add_insecure_port(f"127.0.0.1:{port}")
-    server.start()
+    server = await start_server(port=port)
     print(f"gRPC server listening on port {port}")
-    server.wait_for_termination()
+    await server.wait_for_termination()
 
 
 if __name__ == "__main__":
     port = int(os.getenv("GRPC_PORT", "50051"))
-    serve(port)
+    asyncio.run(serve(port))
@@ -52,6 +52,7 @@ from core.error_handler import (
 )
 from core.exceptions import UEPException
 from core.rate_limit import limiter
+from core.redis_async import close_async_redis, init_async_redis
 from core.security import SecurityHeadersMiddleware, csrf_protection
 
 try:
@@ -216,6 +217,13 @@ except Exception as e:
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
     # 起動時の処理
+    # 共有の非同期Redis接続プール（キャッシュ・LLMキャッシュ・レート制限で使用）
+    await init_async_redis()
+    # WebSocket のワーカー間配信（Redis pub/sub の購読）
+    from core.websocket import connection_manager
+
+    await connection_manager.start()
+
     # データベーステーブルの作成（本番・開発ともに実行）
     try:
         init_db()
@@ -261,6 +269,16 @@ async def lifespan(app: FastAPI):
     """
     )
 
+    # JWKS_URL の検証鍵を先に取得（検証の経路では取得を待たない）
+    try:
+        from auth.jwt_auth import key_set
+
+        key_set.start_refresh()
+    except Exception as e:
+        import logging
+
+        logging.getLogger(__name__).warning(f"JWKS prefetch not started: {e}")
+
     # アウトボックスポーラー（イベントストリーミング利用時）
     _outbox_task = None
     if EVENT_STREAMING_AVAILABLE and event_streaming_router:
@@ -276,11 +294,94 @@ async def lifespan(app: FastAPI):
 
             logging.getLogger(__name__).warning(f"Outbox poller not started: {e}")
 
+    # イベントインデックスへの Kafka 取り込み（読み出し経路では待たない）
+    _event_catch_up_task = None
+    if EVENT_STREAMING_AVAILABLE and event_streaming_router:
+        try:
+            from event_streaming.routes import event_store
+
+            _event_catch_up_task = asyncio.create_task(event_store.run_catch_up())
+        except Exception as e:
+            import logging
+
+            logging.getLogger(__name__).warning(f"Event catch-up not started: {e}")
+
+    # ストリーミング異常検知（測定値トピック設定時のみ常時取り込み）
+    _anomaly_stream_task = None
+    if EVENT_STREAMING_AVAILABLE and settings.ANOMALY_STREAM_TOPIC:
+        try:
+            from core.streaming_anomaly import consume_measurements
+            from event_streaming.routes import kafka_client
+            from optimization.routes import streaming_detector
+
+            _anomaly_stream_task = asyncio.create_task(
+                consume_measurements(
+                    streaming_detector,
+                    kafka_client,
+                    settings.ANOMALY_STREAM_TOPIC,
+                    settings.ANOMALY_EVENTS_TOPIC,
+                )
+            )
+        except Exception as e:
+            import logging
+
+            logging.getLogger(__name__).warning(
+                f"Streaming anomaly consumer not started: {e}"
+            )
+
+    # 監査ログの保持期間適用（期限切れセグメントの削除）
+    _audit_maintenance_task = None
+    try:
+        from audit.routes import audit_store
+
+        _audit_maintenance_task = asyncio.create_task(audit_store.run_maintenance())
+    except Exception as e:
+        import logging
+
+        logging.getLogger(__name__).warning(f"Audit maintenance not started: {e}")
+
+    # 内部 gRPC サーバー（grpc.aio、同じイベントループで動作）
+    _grpc_server = None
+    if os.getenv("GRPC_ENABLED", "true").lower() == "true":
+        try:
+            from grpc_service.server import start_server
+
+            _grpc_server = await start_server()
+        except Exception as e:
+            import logging
+
+            logging.getLogger(__name__).warning(f"gRPC server not started: {e}")
+
     yield
 
     # 終了時の処理
+    if _grpc_server is not None:
+        await _grpc_server.stop(grace=5)
     if _outbox_task and not _outbox_task.done():
         _outbox_task.cancel()
+    if _event_catch_up_task and not _event_catch_up_task.done():
+        _event_catch_up_task.cancel()
+    if _audit_maintenance_task and not _audit_maintenance_task.done():
+        _audit_maintenance_task.cancel()
+    if _anomaly_stream_task and not _anomaly_stream_task.done():
+        _anomaly_stream_task.cancel()
+    if EVENT_STREAMING_AVAILABLE and event_streaming_router:
+        try:
+            from event_streaming.routes import kafka_client
+
+            kafka_client.close()
+        except Exception as e:
+            print(f"Warning: Kafka client shutdown failed: {e}")
+    try:
+        from core.cache import cache_strategy
+
+        cache_strategy.close()
+    except Exception as e:
+        print(f"Warning: Cache shutdown failed: {e}")
+    await connection_manager.stop()
+    await close_async_redis()
+    # 未送信のログを Logstash へ送ってから終了（送信はスレッドで行う）
+    await asyncio.to_thread(logging_handler.shutdown)
     print("Shutting down UEP v5.0...")
 
 
@@ -706,12 +807,13 @@ async def api_version_info():
 async def grpc_status():
     """gRPC サービス状態（proto 生成コードの有無）"""
     try:
-        from grpc_service import uep_internal_pb2  # noqa: F401
+        from grpc_service.proto import uep_internal_pb2  # noqa: F401
 
         return {
             "available": True,
+            "enabled": os.getenv("GRPC_ENABLED", "true").lower() == "true",
             "port": int(os.getenv("GRPC_PORT", "50051")),
-            "message": "gRPC service ready. Start with: python -m grpc_service.server",
+            "message": "gRPC service runs in the app lifespan (GRPC_ENABLED). Standalone: python -m grpc_service.server",
         }
     except ImportError:
         return {
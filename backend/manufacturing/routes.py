@@ -8,6 +8,8 @@ from typing import Any, Dict, List
 from fastapi import APIRouter, Depends
 
 from auth.jwt_auth import get_current_active_user
+from core.anomaly_detector import AnomalyDetectRequest, get_anomaly_list
+
 
 router = APIRouter(prefix="/api/v1/manufacturing", tags=["製造・IoT"])
 
@@ -201,3 +203,13 @@ async def get_anomalies(
 ):
     """異常検知一覧を取得"""
     return {"items": _anomaly_list(), "total": len(_anomaly_list())}
+
+
+@router.post("/anomalies/detect")
+async def detect_anomalies(
+    request: AnomalyDetectRequest,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """センサーデータの一括異常検知（閾値・Z-score・ローリングのアンサンブル）"""
+    items = get_anomaly_list("manufacturing", request.items)
+    return {"items": items, "total": len(items)}
@@ -9,6 +9,8 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends
 
 from auth.jwt_auth import get_current_active_user
+from core.anomaly_detector import AnomalyDetectRequest, get_anomaly_list
+
 
 router = APIRouter(prefix="/api/v1/medical", tags=["医療"])
 
@@ -236,3 +238,13 @@ async def get_platform_stats(
 ):
     """医療プラットフォーム統計を取得"""
     return _platform_stats()
+
+
+@router.post("/anomaly-detection/detect")
+async def detect_anomalies(
+    request: AnomalyDetectRequest,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """バイタル・検査値の一括異常検知（閾値・Z-score・ローリングのアンサンブル）"""
+    items = get_anomaly_list("medical", request.items)
+    return {"items": items, "total": len(items)}
@@ -135,6 +135,11 @@ class ModelRegistry:
         """モデルを取得"""
         return self._models.get(model_id)
 
+    def get_models(self, model_ids: List[str]) -> List[Optional[MLModel]]:
+        """複数モデルを一括取得（順序は model_ids に対応、未登録は None）"""
+        models = self._models
+        return [models.get(model_id) for model_id in model_ids]
+
     def list_models(
         self, model_type: Optional[str] = None, status: Optional[ModelStatus] = None
     ) -> List[MLModel]:
@@ -2,16 +2,22 @@
 ログ管理モジュール
 構造化ログの収集と送信（JSON形式、機密情報マスキング）
 """
+import gzip
 import json
 import logging
 import os
 import re
+import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
 
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, List, Optional
 
 import httpx
 
+logger = logging.getLogger(__name__)
+
 # 機密情報マスキング用パターン
 _SENSITIVE_PATTERNS = [
     (
@@ -24,8 +30,15 @@ _SENSITIVE_PATTERNS = [
 ]
 
 
+# いずれかを含む場合だけマスキングの正規表現を適用する（小文字で判定）
+_SENSITIVE_MARKERS = ("pass", "secret", "token", "api_key", "bearer")
+
+
 def _mask_sensitive(msg: str) -> str:
     """機密情報をマスキング"""
+    lowered = msg.lower()
+    if not any(marker in lowered for marker in _SENSITIVE_MARKERS):
+        return msg
     for pattern, repl in _SENSITIVE_PATTERNS:
         msg = pattern.sub(repl, msg)
     return msg
@@ -56,65 +69,207 @@ class JsonFormatter(logging.Formatter):
 
 
 class LogstashHandler(logging.Handler):
-    """Logstashハンドラー"""
+    """
+    Logstashハンドラー（キュー方式のバッチ送信）
+
+    emit はレコードを有界のリングバッファに積むだけで、送信はバックグラウンド
+    スレッドが batch_size 件または flush_interval 秒ごとに NDJSON を gzip 圧縮して
+    まとめて POST する。バッファが満杯の場合は drop_policy に従って古いもの
+    （drop_oldest）または新しいもの（drop_newest）を捨て、件数を数える。
+    送信に失敗したバッチはバッファの先頭に戻し、間隔を空けて再送する。
+    """
 
-    def __init__(self, logstash_url: Optional[str] = None):
+    def __init__(
+        self,
+        logstash_url: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue_size: Optional[int] = None,
+        drop_policy: str = "drop_oldest",
+    ):
         """
         Logstashハンドラーを初期化
 
         Args:
             logstash_url: LogstashのURL（デフォルト: 環境変数から取得）
+            batch_size: 1回の POST に含める最大件数（LOGSTASH_BATCH_SIZE）
+            flush_interval: 送信間隔の秒数（LOGSTASH_FLUSH_INTERVAL）
+            max_queue_size: バッファの上限件数（LOGSTASH_QUEUE_SIZE）
+            drop_policy: 満杯時の破棄方針（drop_oldest / drop_newest）
         """
         super().__init__()
+        if drop_policy not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
         self.logstash_url = logstash_url or os.getenv(
             "LOGSTASH_URL", "http://logstash:8080"
         )
-        self.client = httpx.AsyncClient(timeout=5.0)
+        self.batch_size = batch_size or int(os.getenv("LOGSTASH_BATCH_SIZE", "500"))
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else float(os.getenv("LOGSTASH_FLUSH_INTERVAL", "1.0"))
+        )
+        self.max_queue_size = max_queue_size or int(
+            os.getenv("LOGSTASH_QUEUE_SIZE", "10000")
+        )
+        self.drop_policy = drop_policy
+        self.client = httpx.Client(timeout=5.0)
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._buffer_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+        self._retry_delay = 0.0
+        self._stats = {"enqueued": 0, "dropped": 0, "sent": 0, "failed_batches": 0}
+
+    def _record_to_dict(self, record: logging.LogRecord) -> Dict[str, Any]:
+        log_data = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _mask_sensitive(record.getMessage()),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+
+        # 追加のフィールド
+        if hasattr(record, "user_id"):
+            log_data["user_id"] = record.user_id
+
+        if hasattr(record, "request_id"):
+            log_data["request_id"] = record.request_id
+
+        if hasattr(record, "service"):
+            log_data["service"] = record.service
+
+        # 例外情報
+        if record.exc_info:
+            log_data["exception"] = self.format(record)
+        return log_data
 
     def emit(self, record: logging.LogRecord):
-        """ログレコードをLogstashに送信"""
+        """ログレコードを送信バッファに積む（ネットワーク I/O は行わない）"""
+        if record.name.startswith(("httpx", "httpcore", __name__)):
+            return  # 送信処理自身のログは送らない
         try:
-            log_data = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "level": record.levelname,
-                "logger": record.name,
-                "message": record.getMessage(),
-                "module": record.module,
-                "function": record.funcName,
-                "line": record.lineno,
-            }
-
-            # 追加のフィールド
-            if hasattr(record, "user_id"):
-                log_data["user_id"] = record.user_id
-
-            if hasattr(record, "request_id"):
-                log_data["request_id"] = record.request_id
-
-            if hasattr(record, "service"):
-                log_data["service"] = record.service
-
-            # 例外情報
-            if record.exc_info:
-                log_data["exception"] = self.format(record)
-
-            # 非同期で送信（実際の実装では適切に処理）
-            # ここでは簡易実装のため同期送信
-            try:
-                import asyncio
-
-                asyncio.create_task(self._send_log(log_data))
-            except:
-                pass  # エラー時は無視
+            log_data = self._record_to_dict(record)
+            with self._buffer_lock:
+                if len(self._buffer) >= self.max_queue_size:
+                    self._stats["dropped"] += 1
+                    if self.drop_policy == "drop_newest":
+                        return
+                    self._buffer.popleft()
+                self._buffer.append(log_data)
+                self._stats["enqueued"] += 1
+                pending = len(self._buffer)
+            if self._worker is None:
+                self._start_worker()
+            if pending >= self.batch_size:
+                self._wakeup.set()
         except Exception:
             self.handleError(record)
 
-    async def _send_log(self, log_data: Dict[str, Any]):
-        """ログをLogstashに送信"""
+    def _start_worker(self):
+        with self._send_lock:
+            if self._worker is None and not self._stopping.is_set():
+                self._worker = threading.Thread(
+                    target=self._run, name="logstash-shipper", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        """バックグラウンド送信ループ"""
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._buffer_lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        """送信に失敗したバッチを先頭に戻す（あふれた分は古い順に破棄）"""
+        with self._buffer_lock:
+            room = self.max_queue_size - len(self._buffer)
+            if room < len(batch):
+                self._stats["dropped"] += len(batch) - max(room, 0)
+                batch = batch[len(batch) - max(room, 0) :]
+            self._buffer.extendleft(reversed(batch))
+
+    def _post(self, batch: List[Dict[str, Any]]) -> bool:
+        body = "".join(
+            json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in batch
+        )
         try:
-            await self.client.post(self.logstash_url, json=log_data)
+            response = self.client.post(
+                self.logstash_url,
+                content=gzip.compress(body.encode("utf-8"), compresslevel=5),
+                headers={
+                    "Content-Type": "application/x-ndjson",
+                    "Content-Encoding": "gzip",
+                },
+            )
+            return response.status_code < 400
         except Exception:
-            pass  # エラー時は無視
+            return False
+
+    def flush(self, force: bool = False):
+        """
+        バッファの内容を送信
+
+        Args:
+            force: 再送待ちの間隔中でも送信を試みる（終了時用）。送信に失敗したら
+                残りは送らずに破棄し、破棄した件数をログに出す
+        """
+        with self._send_lock:
+            if not force and time.monotonic() < self._retry_at:
+                return
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                if self._post(batch):
+                    self._stats["sent"] += len(batch)
+                    self._retry_delay = 0.0
+                    continue
+                self._stats["failed_batches"] += 1
+                if force:
+                    # 失敗した送信先へ残りのバッチを送り続けて終了を遅らせない
+                    with self._buffer_lock:
+                        dropped = len(batch) + len(self._buffer)
+                        self._buffer.clear()
+                    self._stats["dropped"] += dropped
+                    logger.warning(
+                        f"Logstash unreachable on shutdown; dropped {dropped} log records"
+                    )
+                    return
+                self._requeue(batch)
+                self._retry_delay = min(max(self._retry_delay * 2, 1.0), 30.0)
+                self._retry_at = time.monotonic() + self._retry_delay
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """送信統計（バッファ件数・送信済み・破棄件数等）"""
+        with self._buffer_lock:
+            return {**self._stats, "pending": len(self._buffer)}
+
+    def close(self):
+        """送信スレッドを止め、残りを送信してから閉じる"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval + 10.0)
+        self.flush(force=True)
+        self.client.close()
+        super().close()
 
 
 class LoggingHandler:
@@ -137,12 +292,24 @@ class LoggingHandler:
         self.logger.addHandler(console_handler)
 
         # Logstashハンドラー（オプション）
+        self.logstash_handler: Optional[LogstashHandler] = None
         try:
-            logstash_handler = LogstashHandler()
-            self.logger.addHandler(logstash_handler)
+            self.logstash_handler = LogstashHandler()
+            self.logger.addHandler(self.logstash_handler)
         except Exception:
             pass  # Logstashが利用できない場合は無視
 
+    def get_shipping_stats(self) -> Dict[str, Any]:
+        """Logstash送信の統計"""
+        if self.logstash_handler is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.logstash_handler.get_stats()}
+
+    def shutdown(self):
+        """Logstashへ未送信のログを送信して停止"""
+        if self.logstash_handler is not None:
+            self.logstash_handler.close()
+
     def log_info(
         self,
         message: str,
@@ -45,6 +45,13 @@ class MetricsCollector:
             "errors_total", "Total errors", ["error_type", "service"]
         )
 
+        # Kafka配信メトリクス
+        self.kafka_messages_total = Counter(
+            "kafka_messages_total",
+            "Total Kafka messages by delivery result",
+            ["topic", "status"],
+        )
+
     def record_request(
         self, method: str, endpoint: str, status_code: int, duration: float
     ):
@@ -65,6 +72,12 @@ class MetricsCollector:
         """エラーを記録"""
         self.errors_total.labels(error_type=error_type, service=service).inc()
 
+    def record_kafka_delivery(self, topic: str, success: bool):
+        """Kafkaへの配信結果を記録"""
+        self.kafka_messages_total.labels(
+            topic=topic, status="success" if success else "failed"
+        ).inc()
+
     def set_active_users(self, count: int):
         """アクティブユーザー数を設定"""
         self.active_users.set(count)
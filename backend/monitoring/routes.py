@@ -196,5 +196,6 @@ async def get_stats(current_user: Dict[str, Any] = Depends(get_current_active_us
             ),
             "kibana": await _check_service("http://kibana:5601/api/status"),
         },
+        "log_shipping": logging_handler.get_shipping_stats(),
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
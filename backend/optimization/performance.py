@@ -77,6 +77,37 @@ class PerformanceOptimizer:
             timestamp=datetime.now(timezone.utc),
         )
 
+    def get_summary(self, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        全エンドポイント（または指定エンドポイント）の集計
+
+        件数・エラー数は累計、レイテンシは保持している直近のサンプルから計算する。
+        """
+        endpoints = [endpoint] if endpoint else list(self._metrics)
+        samples: List[float] = []
+        request_count = 0
+        error_count = 0
+        for name in endpoints:
+            samples.extend(self._metrics.get(name, ()))
+            request_count += self._request_counts.get(name, 0)
+            error_count += self._error_counts.get(name, 0)
+
+        summary = {
+            "request_count": request_count,
+            "error_count": error_count,
+            "error_rate": error_count / request_count if request_count else 0.0,
+            "avg_response_time": 0.0,
+            "p95_response_time": 0.0,
+            "p99_response_time": 0.0,
+        }
+        if samples:
+            samples.sort()
+            last = len(samples) - 1
+            summary["avg_response_time"] = sum(samples) / len(samples)
+            summary["p95_response_time"] = samples[min(int(len(samples) * 0.95), last)]
+            summary["p99_response_time"] = samples[min(int(len(samples) * 0.99), last)]
+        return summary
+
     def get_slow_endpoints(self, threshold: float = 1.0) -> List[Dict[str, Any]]:
         """遅いエンドポイントを取得"""
         slow_endpoints = []
@@ -23,6 +23,7 @@ from core.anomaly_detector import (
     ensemble_detect,
     get_anomaly_list,
 )
+from core.streaming_anomaly import StreamingAnomalyDetector
 from optimization.finops import get_cost_by_tag, get_cost_summary
 
 router = APIRouter(prefix="/api/v1/optimization", tags=["最適化"])
@@ -50,6 +51,10 @@ def _get_threshold_config(metric: str) -> ThresholdConfig:
     return base
 
 
+# 系列ごとの状態を保持するストリーミング異常検知（閾値オーバーライドを反映）
+streaming_detector = StreamingAnomalyDetector(threshold_resolver=_get_threshold_config)
+
+
 @router.get("/anomaly-detection/thresholds")
 async def get_thresholds(
     current_user: Dict[str, Any] = Depends(get_current_active_user),
@@ -147,5 +152,43 @@ async def batch_anomaly_detection(
     current_user: Dict[str, Any] = Depends(get_current_active_user),
 ):
     """バッチ異常検知（医療・製造ドメイン）"""
-    results = get_anomaly_list(request.domain, request.items)
+    metrics = set(DEFAULT_THRESHOLDS) | set(_threshold_overrides)
+    thresholds = {m: _get_threshold_config(m) for m in metrics}
+    results = get_anomaly_list(request.domain, request.items, thresholds=thresholds)
     return {"items": results, "total": len(results)}
+
+
+class StreamPoint(BaseModel):
+    """ストリーミング異常検知の測定値"""
+
+    series_id: str
+    metric: str
+    value: float
+
+
+class StreamIngestRequest(BaseModel):
+    """ストリーミング異常検知の取り込みリクエスト"""
+
+    domain: str = "manufacturing"
+    points: List[StreamPoint] = []
+
+
+@router.post("/anomaly-detection/stream")
+async def ingest_stream(
+    request: StreamIngestRequest,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """測定値を取り込み、状態が変化した系列のイベントを返す（履歴の送信は不要）"""
+    events = streaming_detector.ingest(
+        {"domain": request.domain, **point.model_dump()} for point in request.points
+    )
+    return {"accepted": len(request.points), "events": events}
+
+
+@router.get("/anomaly-detection/stream/series")
+async def get_stream_series(
+    limit: int = 100,
+    current_user: Dict[str, Any] = Depends(get_current_active_user),
+):
+    """ストリーミング異常検知の系列数・メモリ使用量・直近の系列状態"""
+    return streaming_detector.get_stats(limit=limit)
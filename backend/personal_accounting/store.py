@@ -1,38 +1,275 @@
 """
-個人会計データストア（JSONファイル永続化）
+個人会計データストア（追記専用 JSONL ジャーナル）
+
+登録・削除は1行ずつ personal_accounting.jsonl に追記し、全体の読み書きはしない。
+メモリ上には年月ごとの索引と、月別・カテゴリ別の合計を持ち、追記のたびに
+差分だけ更新する。ファイルが他プロセスの追記で伸びていれば末尾だけを読み込む。
+削除済みの行が増えたら一時ファイルに書き出して置き換える（圧縮）。
 """
 import json
 import os
+import threading
 import uuid
-from datetime import date, datetime
+from collections import defaultdict
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from .expense_categories import ALL_CATEGORIES, get_expense_judgment
 
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間ロックなし
+    fcntl = None
+
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
-DATA_FILE = DATA_DIR / "personal_accounting.json"
+DATA_FILE = DATA_DIR / "personal_accounting.jsonl"
+LEGACY_DATA_FILE = DATA_DIR / "personal_accounting.json"
+
+_KINDS = ("expenses", "income")
+
+# 削除済みの行がこの件数以上かつ有効件数以上になったら圧縮する
+_COMPACT_MIN_DEAD = 1000
+
+MonthKey = Tuple[int, int]
+
+
+def _month_key(date_str: str) -> MonthKey:
+    return int(date_str[:4]), int(date_str[5:7])
+
+
+class AccountingStore:
+    """年月索引と増分集計を持つ追記専用ストア"""
+
+    def __init__(self, path: Path = DATA_FILE, legacy_path: Optional[Path] = None):
+        """
+        Args:
+            path: ジャーナルファイル
+            legacy_path: 旧形式（JSON一括保存）のファイル。ジャーナルが無ければ取り込む
+        """
+        self.path = Path(path)
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._loaded_inode: Optional[int] = None
+        self._offset = 0
+        self._reset()
+
+    def _reset(self):
+        self._records: Dict[str, Dict[str, dict]] = {kind: {} for kind in _KINDS}
+        self._by_month: Dict[str, Dict[MonthKey, Dict[str, dict]]] = {
+            kind: defaultdict(dict) for kind in _KINDS
+        }
+        # (kind, 年, 月) → [合計金額, 件数]
+        self._totals: Dict[Tuple[str, int, int], List[int]] = defaultdict(
+            lambda: [0, 0]
+        )
+        # (年, 月) → カテゴリID → 経費合計
+        self._category_totals: Dict[MonthKey, Dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._dead = 0
 
+    # === 状態の更新（ジャーナルの1行を適用） ===
+    def _apply(self, entry: dict):
+        kind = entry["kind"]
+        if entry["op"] == "add":
+            item = entry["item"]
+            if item["id"] in self._records[kind]:
+                return
+            key = _month_key(item["date"])
+            self._records[kind][item["id"]] = item
+            self._by_month[kind][key][item["id"]] = item
+            totals = self._totals[(kind, *key)]
+            totals[0] += item["amount"]
+            totals[1] += 1
+            if kind == "expenses":
+                self._category_totals[key][item["category_id"]] += item["amount"]
+        elif entry["op"] == "delete":
+            item = self._records[kind].pop(entry["id"], None)
+            self._dead += 1  # 削除行自身
+            if item is None:
+                return
+            self._dead += 1  # 対応する追加行
+            key = _month_key(item["date"])
+            del self._by_month[kind][key][item["id"]]
+            totals = self._totals[(kind, *key)]
+            totals[0] -= item["amount"]
+            totals[1] -= 1
+            if kind == "expenses":
+                self._category_totals[key][item["category_id"]] -= item["amount"]
 
-def _ensure_data_dir():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # === ファイルとの同期 ===
+    def _migrate_legacy(self):
+        """旧形式の JSON からジャーナルを作成"""
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        for kind in _KINDS:
+            for item in data.get(kind, []):
+                self._apply({"op": "add", "kind": kind, "item": item})
+        self._write_snapshot()
 
+    def _refresh(self):
+        """ファイルの変化を取り込む（伸びた分だけ読む。置き換えられていれば再読込）"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if (
+                self._loaded_inode is None
+                and self.legacy_path
+                and self.legacy_path.exists()
+            ):
+                self._migrate_legacy()
+            return
+        if stat.st_ino != self._loaded_inode or stat.st_size < self._offset:
+            self._reset()
+            self._loaded_inode = stat.st_ino
+            self._offset = 0
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 書き込み途中の行は次回に読む
+                self._offset += len(line)
+                if line.strip():
+                    self._apply(json.loads(line))
 
-def _load_data() -> dict:
-    _ensure_data_dir()
-    if not DATA_FILE.exists():
-        return {"expenses": [], "income": []}
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"expenses": [], "income": []}
+    def _append(self, entry: dict):
+        """ジャーナルに1行追記し、メモリ上の状態にも反映"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # ロック待ちの間に圧縮で置き換えられていたら開き直す
+                if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                    continue
+                self._refresh()
+                os.write(fd, line)
+                self._offset += len(line)
+                self._apply(entry)
+                return
+            finally:
+                os.close(fd)
 
+    def _write_snapshot(self):
+        """有効なレコードだけを一時ファイルに書き、アトミックに置き換える"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.tmp")
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for kind in _KINDS:
+                for item in self._records[kind].values():
+                    entry = {"op": "add", "kind": kind, "item": item}
+                    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode(
+                        "utf-8"
+                    )
+                    f.write(line)
+                    size += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._loaded_inode = os.stat(self.path).st_ino
+        self._offset = size
+        self._dead = 0
 
-def _save_data(data: dict):
-    _ensure_data_dir()
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    def compact(self):
+        """削除済みの行を除いてジャーナルを書き直す"""
+        with self._lock:
+            if not self.path.exists():
+                return
+            with open(self.path, "rb") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                self._refresh()
+                self._write_snapshot()
+
+    def _maybe_compact(self):
+        live = sum(len(records) for records in self._records.values())
+        if self._dead >= _COMPACT_MIN_DEAD and self._dead >= live:
+            self.compact()
+
+    # === 書き込み ===
+    def add(self, kind: str, item: dict) -> dict:
+        with self._lock:
+            self._refresh()
+            self._append({"op": "add", "kind": kind, "item": item})
+        return dict(item)
+
+    def delete(self, kind: str, item_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            if item_id not in self._records[kind]:
+                return False
+            self._append({"op": "delete", "kind": kind, "id": item_id})
+            self._maybe_compact()
+            return True
+
+    # === 読み出し ===
+    def list(
+        self, kind: str, year: Optional[int] = None, month: Optional[int] = None
+    ) -> List[dict]:
+        """日付の新しい順（同日は登録順。月バケットは登録順を保つ）"""
+        with self._lock:
+            self._refresh()
+            if year is None and month is None:
+                items = list(self._records[kind].values())
+            else:
+                items = [
+                    item
+                    for (y, m), bucket in self._by_month[kind].items()
+                    if (year is None or y == year) and (month is None or m == month)
+                    for item in bucket.values()
+                ]
+            items = [dict(item) for item in items]
+        return sorted(items, key=lambda x: x["date"], reverse=True)
+
+    def recent(self, kind: str, limit: int) -> List[dict]:
+        """日付の新しい順に limit 件（月索引を新しい月から辿る）"""
+        with self._lock:
+            self._refresh()
+            result: List[dict] = []
+            for key in sorted(self._by_month[kind], reverse=True):
+                bucket = self._by_month[kind][key]
+                if not bucket:
+                    continue
+                result.extend(
+                    sorted(bucket.values(), key=lambda x: x["date"], reverse=True)
+                )
+                if len(result) >= limit:
+                    break
+            return [dict(item) for item in result[:limit]]
+
+    def totals(
+        self, kind: str, year: int, month: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """(合計金額, 件数)（増分更新済みの集計から取得）"""
+        with self._lock:
+            self._refresh()
+            months = [month] if month is not None else range(1, 13)
+            amount = count = 0
+            for m in months:
+                totals = self._totals.get((kind, year, m))
+                if totals:
+                    amount += totals[0]
+                    count += totals[1]
+            return amount, count
+
+    def category_totals(self, year: int, month: int) -> Dict[str, int]:
+        """月のカテゴリ別経費合計"""
+        with self._lock:
+            self._refresh()
+            totals = self._category_totals.get((year, month), {})
+            return {cat: amount for cat, amount in totals.items() if amount}
+
+
+_store = AccountingStore(DATA_FILE, legacy_path=LEGACY_DATA_FILE)
 
 
 def add_expense(
@@ -42,7 +279,6 @@ def add_expense(
     description: str = "",
     memo: Optional[str] = None,
 ) -> dict:
-    data = _load_data()
     cat = ALL_CATEGORIES.get(category_id, {})
     judgment = get_expense_judgment(category_id)
     item = {
@@ -56,9 +292,7 @@ def add_expense(
         "is_expense": judgment["is_expense"],
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
-    data["expenses"].append(item)
-    _save_data(data)
-    return item
+    return _store.add("expenses", item)
 
 
 def add_income(
@@ -68,7 +302,6 @@ def add_income(
     client_name: Optional[str] = None,
     memo: Optional[str] = None,
 ) -> dict:
-    data = _load_data()
     item = {
         "id": str(uuid.uuid4()),
         "date": date_str,
@@ -78,56 +311,37 @@ def add_income(
         "memo": memo,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
-    data["income"].append(item)
-    _save_data(data)
-    return item
+    return _store.add("income", item)
 
 
 def get_expenses(year: Optional[int] = None, month: Optional[int] = None) -> List[dict]:
-    data = _load_data()
-    items = data.get("expenses", [])
-    if year is not None:
-        items = [e for e in items if e["date"].startswith(f"{year}-")]
-    if month is not None:
-        items = [e for e in items if e["date"][5:7] == f"{month:02d}"]
-    return sorted(items, key=lambda x: x["date"], reverse=True)
+    return _store.list("expenses", year, month)
 
 
 def get_income(year: Optional[int] = None, month: Optional[int] = None) -> List[dict]:
-    data = _load_data()
-    items = data.get("income", [])
-    if year is not None:
-        items = [e for e in items if e["date"].startswith(f"{year}-")]
-    if month is not None:
-        items = [e for e in items if e["date"][5:7] == f"{month:02d}"]
-    return sorted(items, key=lambda x: x["date"], reverse=True)
+    return _store.list("income", year, month)
 
 
 def get_monthly_summary(year: int, month: int) -> dict:
-    expenses = get_expenses(year, month)
-    income = get_income(year, month)
-    total_expense = sum(e["amount"] for e in expenses)
-    total_income = sum(i["amount"] for i in income)
+    total_expense, expense_count = _store.totals("expenses", year, month)
+    total_income, income_count = _store.totals("income", year, month)
     return {
         "year": year,
         "month": month,
         "total_income": total_income,
         "total_expense": total_expense,
         "profit": total_income - total_expense,
-        "expense_count": len(expenses),
-        "income_count": len(income),
+        "expense_count": expense_count,
+        "income_count": income_count,
+        "expense_by_category": _store.category_totals(year, month),
     }
 
 
 def get_dashboard_summary() -> dict:
     today = date.today()
     this_month = get_monthly_summary(today.year, today.month)
-    ytd_income = sum(
-        i["amount"] for i in get_income() if i["date"].startswith(str(today.year))
-    )
-    ytd_expense = sum(
-        e["amount"] for e in get_expenses() if e["date"].startswith(str(today.year))
-    )
+    ytd_income, _ = _store.totals("income", today.year)
+    ytd_expense, _ = _store.totals("expenses", today.year)
     return {
         "this_month_income": this_month["total_income"],
         "this_month_expense": this_month["total_expense"],
@@ -135,26 +349,19 @@ def get_dashboard_summary() -> dict:
         "ytd_income": ytd_income,
         "ytd_expense": ytd_expense,
         "ytd_profit": ytd_income - ytd_expense,
-        "recent_expenses": get_expenses()[:10],
-        "recent_income": get_income()[:10],
+        "recent_expenses": _store.recent("expenses", 10),
+        "recent_income": _store.recent("income", 10),
     }
 
 
 def delete_expense(expense_id: str) -> bool:
-    data = _load_data()
-    orig = len(data["expenses"])
-    data["expenses"] = [e for e in data["expenses"] if e["id"] != expense_id]
-    if len(data["expenses"]) < orig:
-        _save_data(data)
-        return True
-    return False
+    return _store.delete("expenses", expense_id)
 
 
 def delete_income(income_id: str) -> bool:
-    data = _load_data()
-    orig = len(data["income"])
-    data["income"] = [i for i in data["income"] if i["id"] != income_id]
-    if len(data["income"]) < orig:
-        _save_data(data)
-        return True
-    return False
+    return _store.delete("income", income_id)
+
+
+def compact() -> None:
+    """ジャーナルを圧縮（削除済みの行を除く）"""
+    _store.compact()
@@ -0,0 +1,131 @@
+"""
+ポリシーインデックス
+リソースパターンのパスセグメント木と、CIDR 対応のIPプレフィックス表
+
+パターンは fnmatch 形式。リテラルのセグメントと末尾の "*" だけからなる
+パターン（"/api/v1/admin/*" 等）は木に登録し、それ以外は正規表現に
+コンパイルして照合する。複数一致した場合は最も具体的なものを選ぶ。
+"""
+import fnmatch
+import ipaddress
+import re
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+def pattern_specificity(pattern: str) -> Tuple[int, int]:
+    """パターンの具体性（リテラル文字数, ワイルドカードを含まないか）"""
+    literal = _GLOB_CHARS.sub("", pattern)
+    return len(literal), int(not _GLOB_CHARS.search(pattern))
+
+
+class _Node(Generic[T]):
+    __slots__ = ("children", "exact", "prefix")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node[T]"] = {}
+        self.exact: Optional[Tuple[Tuple[int, int], int, T]] = None
+        self.prefix: Optional[Tuple[Tuple[int, int], int, T]] = None
+
+
+class PathPatternIndex(Generic[T]):
+    """パスパターン → 値 の索引（最も具体的な一致を返す）"""
+
+    def __init__(self):
+        self._root: _Node[T] = _Node()
+        self._complex: List[Tuple[Tuple[int, int], int, "re.Pattern[str]", T]] = []
+        self._order = 0
+
+    def add(self, pattern: str, value: T):
+        """
+        パターンを登録
+
+        同じ具体性のパターンが複数一致した場合は先に登録したものを優先する。
+        """
+        entry_key = (pattern_specificity(pattern), -self._order)
+        self._order += 1
+        segments = pattern.split("/")
+        wildcard = segments[-1] == "*"
+        literal_segments = segments[:-1] if wildcard else segments
+
+        if any(_GLOB_CHARS.search(s) for s in literal_segments):
+            self._complex.append(
+                (*entry_key, re.compile(fnmatch.translate(pattern)), value)
+            )
+            return
+
+        node = self._root
+        for segment in literal_segments:
+            node = node.children.setdefault(segment, _Node())
+        entry = (*entry_key, value)
+        if wildcard:
+            if node.prefix is None or entry[:2] > node.prefix[:2]:
+                node.prefix = entry
+        elif node.exact is None or entry[:2] > node.exact[:2]:
+            node.exact = entry
+
+    def match(self, path: str) -> Optional[T]:
+        """パスに一致する最も具体的な値（なければ None）"""
+        node = self._root
+        best = node.prefix  # パターン "*" はすべてに一致
+        segments = path.split("/")
+        for i, segment in enumerate(segments):
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+            if i == len(segments) - 1:
+                if node.exact is not None and (
+                    best is None or node.exact[:2] > best[:2]
+                ):
+                    best = node.exact
+            elif node.prefix is not None and (
+                best is None or node.prefix[:2] > best[:2]
+            ):
+                # 末尾の "*" はこのセグメント以降の任意の文字列（"/" を含む）に一致
+                best = node.prefix
+
+        for specificity, order, regex, value in self._complex:
+            if (best is None or (specificity, order) > best[:2]) and regex.match(path):
+                best = (specificity, order, value)
+        return best[2] if best is not None else None
+
+
+class CidrSet:
+    """
+    IPアドレス・CIDR の集合
+
+    プレフィックス長ごとにネットワークアドレスの集合を持つ表で、照合は
+    登録されているプレフィックス長の数（最大 33/129）だけの集合参照で済む。
+    """
+
+    def __init__(self, entries: Optional[List[str]] = None):
+        self._tables: Dict[int, Dict[int, set]] = {4: {}, 6: {}}
+        for entry in entries or []:
+            self.add(entry)
+
+    def add(self, entry: str):
+        """IPアドレスまたは CIDR を追加"""
+        network = ipaddress.ip_network(entry.strip(), strict=False)
+        table = self._tables[network.version]
+        table.setdefault(network.prefixlen, set()).add(int(network.network_address))
+
+    def __bool__(self) -> bool:
+        return any(self._tables.values())
+
+    def contains(self, ip: Optional[str]) -> bool:
+        """IPアドレスが含まれるか（解釈できないアドレスは含まれない）"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except (TypeError, ValueError):
+            return False
+        value = int(address)
+        bits = address.max_prefixlen
+        for prefixlen, networks in self._tables[address.version].items():
+            shift = bits - prefixlen
+            if (value >> shift) << shift in networks:
+                return True
+        return False
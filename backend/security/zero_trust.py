@@ -2,12 +2,16 @@
 ゼロトラストアーキテクチャモジュール
 すべての通信を検証・認証
 """
+import threading
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from pydantic import BaseModel
 
+from .policy_index import CidrSet, PathPatternIndex
+
 
 class TrustLevel(str, Enum):
     """信頼レベル"""
@@ -37,12 +41,51 @@ class ZeroTrustPolicyModel(BaseModel):
     updated_at: datetime
 
 
+_TRUST_LEVEL_ORDER = {
+    TrustLevel.UNTRUSTED: 0,
+    TrustLevel.LOW: 1,
+    TrustLevel.MEDIUM: 2,
+    TrustLevel.HIGH: 3,
+    TrustLevel.VERIFIED: 4,
+}
+
+
+@dataclass(frozen=True)
+class _CompiledPolicy:
+    """評価用にコンパイルしたポリシー（集合・IPプレフィックス表）"""
+
+    policy: ZeroTrustPolicyModel
+    trust_rank: int
+    roles: FrozenSet[str]
+    permissions: FrozenSet[str]
+    ip_allow: CidrSet
+    ip_deny: CidrSet
+
+    @classmethod
+    def compile(cls, policy: ZeroTrustPolicyModel) -> "_CompiledPolicy":
+        return cls(
+            policy=policy,
+            trust_rank=_TRUST_LEVEL_ORDER.get(policy.required_trust_level, 0),
+            roles=frozenset(policy.required_roles),
+            permissions=frozenset(policy.required_permissions),
+            ip_allow=CidrSet(policy.ip_whitelist),
+            ip_deny=CidrSet(policy.ip_blacklist),
+        )
+
+
 class ZeroTrustPolicy:
     """ゼロトラストポリシークラス"""
 
+    # パス・判定キャッシュの上限（超えたら破棄して作り直す）
+    CACHE_MAX_ENTRIES = 10000
+
     def __init__(self):
         """ゼロトラストポリシーを初期化"""
         self._policies: Dict[str, ZeroTrustPolicyModel] = {}
+        self._lock = threading.Lock()
+        self._index: Optional[PathPatternIndex[_CompiledPolicy]] = None
+        self._path_cache: Dict[str, Optional[_CompiledPolicy]] = {}
+        self._decision_cache: Dict[Tuple, Tuple[bool, Optional[str]]] = {}
         self._initialize_default_policies()
 
     def _initialize_default_policies(self):
@@ -87,6 +130,43 @@ class ZeroTrustPolicy:
         for policy in default_policies:
             self._policies[policy.id] = policy
 
+    def add_policy(self, policy: ZeroTrustPolicyModel):
+        """ポリシーを追加・更新（コンパイル済みインデックスを破棄）"""
+        with self._lock:
+            self._policies[policy.id] = policy
+            self._invalidate()
+
+    def remove_policy(self, policy_id: str) -> bool:
+        """ポリシーを削除"""
+        with self._lock:
+            removed = self._policies.pop(policy_id, None) is not None
+            self._invalidate()
+        return removed
+
+    def list_policies(self) -> List[ZeroTrustPolicyModel]:
+        """ポリシー一覧"""
+        return list(self._policies.values())
+
+    def _invalidate(self):
+        self._index = None
+        self._path_cache = {}
+        self._decision_cache = {}
+
+    def _compiled_index(self) -> PathPatternIndex[_CompiledPolicy]:
+        """パスインデックスを取得（ポリシー変更後の初回にコンパイル）"""
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    index = PathPatternIndex()
+                    for policy in self._policies.values():
+                        index.add(
+                            policy.resource_pattern, _CompiledPolicy.compile(policy)
+                        )
+                    self._index = index
+                index = self._index
+        return index
+
     def evaluate_access(
         self,
         resource_path: str,
@@ -104,80 +184,93 @@ class ZeroTrustPolicy:
         Returns:
             (許可されるかどうか, 理由)
         """
-        # 適用可能なポリシーを検索
-        applicable_policy = self._find_applicable_policy(resource_path)
-        if not applicable_policy:
+        # 適用可能なポリシーを検索（最も具体的なパターン）
+        compiled = self._find_compiled_policy(resource_path)
+        if compiled is None:
             # ポリシーがない場合はデフォルトで拒否（ゼロトラスト）
             return False, "No policy found, access denied by default"
 
-        # 信頼レベルのチェック
-        user_trust_level = self._calculate_user_trust_level(user_attributes)
-        if (
-            self._compare_trust_levels(
-                user_trust_level, applicable_policy.required_trust_level
+        # 同じポリシー・同じ主体・同じIPの判定はキャッシュから返す
+        roles = tuple(user_attributes.get("roles") or ())
+        permissions = tuple(user_attributes.get("permissions") or ())
+        mfa_verified = bool(user_attributes.get("mfa_verified"))
+        client_ip = request_attributes.get("ip")
+        key = (compiled.policy.id, roles, permissions, mfa_verified, client_ip)
+        decision = self._decision_cache.get(key)
+        if decision is None:
+            decision = self._decide(
+                compiled,
+                frozenset(roles),
+                frozenset(permissions),
+                mfa_verified,
+                client_ip,
             )
-            < 0
-        ):
+            if len(self._decision_cache) >= self.CACHE_MAX_ENTRIES:
+                self._decision_cache = {}
+            self._decision_cache[key] = decision
+        return decision
+
+    def _decide(
+        self,
+        compiled: _CompiledPolicy,
+        roles: FrozenSet[str],
+        permissions: FrozenSet[str],
+        mfa_verified: bool,
+        client_ip: Optional[str],
+    ) -> Tuple[bool, Optional[str]]:
+        """コンパイル済みポリシーで判定"""
+        policy = compiled.policy
+
+        # 信頼レベルのチェック
+        user_trust_level = self._calculate_user_trust_level(
+            {"roles": roles, "mfa_verified": mfa_verified}
+        )
+        if _TRUST_LEVEL_ORDER[user_trust_level] < compiled.trust_rank:
             return (
                 False,
-                f"Insufficient trust level. Required: {applicable_policy.required_trust_level}",
+                f"Insufficient trust level. Required: {policy.required_trust_level}",
             )
 
         # ロールチェック
-        if applicable_policy.required_roles:
-            user_roles = user_attributes.get("roles", [])
-            if not any(role in applicable_policy.required_roles for role in user_roles):
-                return False, f"Required roles: {applicable_policy.required_roles}"
+        if compiled.roles and compiled.roles.isdisjoint(roles):
+            return False, f"Required roles: {policy.required_roles}"
 
         # パーミッションチェック
-        if applicable_policy.required_permissions:
-            user_permissions = user_attributes.get("permissions", [])
-            if not any(
-                perm in applicable_policy.required_permissions
-                for perm in user_permissions
-            ):
-                return (
-                    False,
-                    f"Required permissions: {applicable_policy.required_permissions}",
-                )
-
-        # IPチェック
-        client_ip = request_attributes.get("ip")
+        if compiled.permissions and compiled.permissions.isdisjoint(permissions):
+            return False, f"Required permissions: {policy.required_permissions}"
+
+        # IPチェック（CIDR 対応）
         if client_ip:
-            if (
-                applicable_policy.ip_blacklist
-                and client_ip in applicable_policy.ip_blacklist
-            ):
+            if compiled.ip_deny and compiled.ip_deny.contains(client_ip):
                 return False, "IP address is blacklisted"
 
-            if (
-                applicable_policy.ip_whitelist
-                and client_ip not in applicable_policy.ip_whitelist
-            ):
+            if compiled.ip_allow and not compiled.ip_allow.contains(client_ip):
                 return False, "IP address is not whitelisted"
 
         # MFAチェック
-        if applicable_policy.mfa_required:
-            mfa_verified = user_attributes.get("mfa_verified", False)
-            if not mfa_verified:
-                return False, "MFA verification required"
+        if policy.mfa_required and not mfa_verified:
+            return False, "MFA verification required"
 
         return True, None
 
+    def _find_compiled_policy(self, resource_path: str) -> Optional[_CompiledPolicy]:
+        """パスに適用するコンパイル済みポリシー（パス単位でキャッシュ）"""
+        try:
+            return self._path_cache[resource_path]
+        except KeyError:
+            pass
+        compiled = self._compiled_index().match(resource_path)
+        if len(self._path_cache) >= self.CACHE_MAX_ENTRIES:
+            self._path_cache = {}
+        self._path_cache[resource_path] = compiled
+        return compiled
+
     def _find_applicable_policy(
         self, resource_path: str
     ) -> Optional[ZeroTrustPolicyModel]:
         """適用可能なポリシーを検索"""
-        for policy in self._policies.values():
-            if self._match_pattern(resource_path, policy.resource_pattern):
-                return policy
-        return None
-
-    def _match_pattern(self, path: str, pattern: str) -> bool:
-        """パターンマッチング"""
-        import fnmatch
-
-        return fnmatch.fnmatch(path, pattern)
+        compiled = self._find_compiled_policy(resource_path)
+        return compiled.policy if compiled else None
 
     def _calculate_user_trust_level(
         self, user_attributes: Dict[str, Any]
@@ -197,14 +290,7 @@ class ZeroTrustPolicy:
 
     def _compare_trust_levels(self, level1: TrustLevel, level2: TrustLevel) -> int:
         """信頼レベルを比較"""
-        levels = {
-            TrustLevel.UNTRUSTED: 0,
-            TrustLevel.LOW: 1,
-            TrustLevel.MEDIUM: 2,
-            TrustLevel.HIGH: 3,
-            TrustLevel.VERIFIED: 4,
-        }
-        return levels.get(level1, 0) - levels.get(level2, 0)
+        return _TRUST_LEVEL_ORDER.get(level1, 0) - _TRUST_LEVEL_ORDER.get(level2, 0)
 
 
 # グローバルインスタンス
@@ -0,0 +1,82 @@
+"""
+異常検知（バッチエンジン）のテスト
+"""
+import random
+
+from core.anomaly_detector import (
+    SEVERITY_LABELS,
+    batch_detect,
+    ensemble_detect,
+    get_anomaly_list,
+)
+
+
+def test_batch_detect_matches_ensemble_detect():
+    """バッチ検知が逐次の ensemble_detect と同じ判定になることをテスト"""
+    rng = random.Random(42)
+    metrics = [rng.choice(["vibration", "pressure", "heart_rate"]) for _ in range(500)]
+    values = [
+        {"vibration": 0.1, "pressure": 5.0, "heart_rate": 80.0}[m]
+        * rng.uniform(0.5, 2.0)
+        for m in metrics
+    ]
+    series = [f"{m}:{rng.choice('ab')}" for m in metrics]
+    zscore_params = {"pressure": {"mean": 5.0, "std": 1.0, "threshold": 2.5}}
+
+    detection = batch_detect(
+        metrics, values, series=series, zscore_params=zscore_params
+    )
+
+    history = {}
+    for i, (metric, value, key) in enumerate(zip(metrics, values, series)):
+        past = history.setdefault(key, [])
+        expected = ensemble_detect(
+            value,
+            metric,
+            history=list(past) or None,
+            zscore_params=zscore_params.get(metric),
+        )
+        past.append(value)
+        assert bool(detection.is_anomaly[i]) == expected["is_anomaly"]
+        assert SEVERITY_LABELS[detection.severity[i]] == expected["severity"]
+
+
+def test_batch_rolling_large_offset_and_flat_windows():
+    """大きなオフセット・同値が続く窓でもローリング検知が逐次版と一致する"""
+    rng = random.Random(7)
+    values = []
+    for _ in range(60):
+        level = 1e6 + rng.randrange(8) * 0.25
+        values += [level] * rng.randrange(1, 15)
+    series = [f"s{i % 3}" for i in range(len(values))]
+
+    detection = batch_detect(["load"] * len(values), values, series=series)
+
+    history = {}
+    for i, (value, key) in enumerate(zip(values, series)):
+        past = history.setdefault(key, [])
+        expected = ensemble_detect(value, "load", history=list(past) or None)
+        past.append(value)
+        assert bool(detection.is_anomaly[i]) == expected["is_anomaly"]
+        assert SEVERITY_LABELS[detection.severity[i]] == expected["severity"]
+
+
+def test_get_anomaly_list_rolling_per_series():
+    """系列ごとのローリング検知で閾値内の急変も検出されることをテスト"""
+    items = [
+        {"id": f"v-{i}", "metric": "pressure", "value": 3.0, "equipment": "プレス機C"}
+        for i in range(10)
+    ]
+    items[3]["value"] = 3.1
+    items.append(
+        {"id": "v-spike", "metric": "pressure", "value": 4.5, "equipment": "プレス機C"}
+    )
+    items.append(
+        {"id": "v-other", "metric": "pressure", "value": 4.5, "equipment": "D"}
+    )
+
+    results = get_anomaly_list("manufacturing", items)
+
+    assert [r["id"] for r in results] == ["v-spike"]
+    assert results[0]["type"] == "圧力異常"
+    assert results[0]["severity"] == "高"
@@ -0,0 +1,110 @@
+"""監査ログストアのテスト"""
+from datetime import datetime, timezone
+
+import pytest
+
+from audit.store import AuditLogStore, decode_cursor
+
+
+def _at(year, month, day=1, hour=0):
+    return datetime(year, month, day, hour, tzinfo=timezone.utc)
+
+
+def test_append_and_filter(tmp_path):
+    """追記した監査ログを新しい順に取得し、索引列で絞り込める"""
+    store = AuditLogStore(base_dir=str(tmp_path))
+    store.append("login", username="alice", path="/login")
+    store.append("export", username="bob", path="/reports")
+    store.append("export", username="alice", path="/reports", detail="csv")
+
+    logs, next_cursor = store.query()
+    assert [log["action"] for log in logs] == ["export", "export", "login"]
+    assert next_cursor is None
+
+    logs, _ = store.query(username="alice", action="export")
+    assert len(logs) == 1
+    assert logs[0]["detail"] == "csv"
+    assert store.count() == 3
+    store.close()
+
+
+def test_cursor_pagination_across_segments(tmp_path):
+    """カーソルで月セグメントをまたいで重複なく辿れる"""
+    store = AuditLogStore(base_dir=str(tmp_path))
+    for month in (1, 2, 3):
+        for day in (1, 2):
+            store.append("view", username="alice", timestamp=_at(2026, month, day))
+    assert store.segments() == ["202603", "202602", "202601"]
+
+    seen = []
+    cursor = None
+    while True:
+        logs, cursor = store.query(limit=4, cursor=cursor)
+        seen.extend(log["timestamp"] for log in logs)
+        if cursor is None:
+            break
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == 6
+    store.close()
+
+
+def test_time_range(tmp_path):
+    """期間指定は対象外のセグメントを読まずに絞り込む"""
+    store = AuditLogStore(base_dir=str(tmp_path))
+    store.append("a", timestamp=_at(2026, 1, 15))
+    store.append("b", timestamp=_at(2026, 2, 15))
+    store.append("c", timestamp=_at(2026, 3, 15))
+
+    logs, _ = store.query(since=_at(2026, 2, 1), until=_at(2026, 3, 1))
+    assert [log["action"] for log in logs] == ["b"]
+    store.close()
+
+
+def test_retention_removes_old_segments(tmp_path):
+    """保持期間を過ぎたセグメントはファイルごと削除される"""
+    store = AuditLogStore(base_dir=str(tmp_path), retention_days=40)
+    store.append("old", timestamp=_at(2026, 1, 10))
+    store.append("recent", timestamp=_at(2026, 3, 10))
+
+    removed = store.apply_retention(now=_at(2026, 3, 20))
+    assert removed == ["202601"]
+    assert not (tmp_path / "audit-202601.db").exists()
+    logs, _ = store.query()
+    assert [log["action"] for log in logs] == ["recent"]
+    store.close()
+
+
+def test_segments_lock_independently_and_dir_is_created_lazily(tmp_path):
+    """過去月の処理中も当月へ追記でき、保存先は初回書き込みまで作られない"""
+    import threading
+
+    base = tmp_path / "audit"
+    store = AuditLogStore(base_dir=str(base), max_open_segments=1)
+    assert not base.exists()
+    store.append("old", timestamp=_at(2026, 1, 10))
+    assert base.exists()
+
+    appended = threading.Event()
+    with store._connection("202601"):
+        worker = threading.Thread(
+            target=lambda: (
+                store.append("new", timestamp=_at(2026, 2, 10)),
+                appended.set(),
+            )
+        )
+        worker.start()
+        assert appended.wait(5)  # 1月のロック保持中でも2月へ書ける
+    worker.join()
+
+    # 上限1で追い出された接続は閉じられ、次の利用時に開き直す
+    assert list(store._segments) == ["202602"]
+    logs, _ = store.query()
+    assert [log["action"] for log in logs] == ["new", "old"]
+    assert store.count() == 2
+    store.close()
+
+
+def test_invalid_cursor():
+    """不正なカーソルは ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor("bogus")
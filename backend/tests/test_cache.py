@@ -20,10 +20,7 @@ def test_cache_set_get():
 
 
 def test_cache_expiration():
-    """キャッシュの有効期限をテスト（Redis 利用時のみ。メモリキャッシュは TTL 非対応）"""
-    if not cache_strategy.enabled:
-        pytest.skip("Redis 未接続時はメモリキャッシュを使用（TTL 非対応）")
-
+    """キャッシュの有効期限をテスト（Redis 未接続時は L1 の TTL で失効する）"""
     key = "expire_test"
     value = "test_value"
 
@@ -68,3 +65,265 @@ def test_cache_stats():
     stats = cache_strategy.get_stats()
     assert "enabled" in stats
     assert "total_keys" in stats
+
+
+def test_local_cache_lru_eviction():
+    """L1キャッシュが件数上限を超えたらLRU順に追い出すことをテスト"""
+    from core.cache import LocalCache
+
+    l1 = LocalCache(max_items=2, max_bytes=1024, default_ttl=None)
+    l1.set("a", 1, size=1)
+    l1.set("b", 2, size=1)
+    assert l1.get("a") == (True, 1)  # a を最近使用に
+    l1.set("c", 3, size=1)
+
+    assert l1.get("b") == (False, None)
+    assert l1.get("a") == (True, 1)
+    assert l1.get("c") == (True, 3)
+    assert l1.get_stats()["evictions"] == 1
+
+
+def test_local_cache_byte_limit_and_ttl():
+    """L1キャッシュのバイト上限とTTLをテスト"""
+    from core.cache import LocalCache
+
+    l1 = LocalCache(max_items=100, max_bytes=10, default_ttl=None)
+    l1.set("big", "x", size=11)
+    assert l1.get("big") == (False, None)
+
+    l1.set("a", 1, size=6)
+    l1.set("b", 2, size=6)
+    assert l1.get("a") == (False, None)
+    assert l1.get("b") == (True, 2)
+
+    l1.set("short", 1, size=1, ttl=1)
+    time.sleep(1.1)
+    assert l1.get("short") == (False, None)
+
+
+def test_local_cache_tag_and_pattern_invalidation():
+    """L1キャッシュのタグ・パターン無効化をテスト"""
+    from core.cache import LocalCache
+
+    l1 = LocalCache(max_items=100, max_bytes=1024, default_ttl=None)
+    l1.set("users:1", 1, size=1, tags=["users"])
+    l1.set("users:2", 2, size=1, tags=["users"])
+    l1.set("orders:1", 3, size=1)
+
+    assert l1.delete_by_tag("users") == 2
+    assert l1.get("users:1") == (False, None)
+
+    l1.set("orders:2", 4, size=1)
+    assert l1.clear("orders:*") == 2
+    assert len(l1) == 0
+
+
+def test_local_cache_tags_released_on_eviction_and_reset():
+    """追い出し・再設定したキーはタグから外れる（タグが増え続けない）"""
+    from core.cache import LocalCache
+
+    l1 = LocalCache(max_items=2, max_bytes=1024, default_ttl=None)
+    for i in range(100):
+        l1.set(f"k{i}", i, size=1, tags=["t", f"t{i}"])
+    assert set(l1._tags) == {"t", "t98", "t99"}
+    assert l1._tags["t"] == {"k98", "k99"}
+
+    # タグなしで設定し直したキーは delete_by_tag の対象外
+    l1.set("k99", "new", size=1)
+    assert l1.delete_by_tag("t") == 1
+    assert l1.get("k99") == (True, "new")
+    assert l1._tags == {} and l1._key_tags == {}
+
+
+def test_cache_invalidation_message_clears_l1():
+    """他ワーカーからの無効化通知でL1がクリアされることをテスト"""
+    import json
+
+    cache_strategy.local_cache.set("remote_key", "v", size=1)
+    cache_strategy._handle_invalidation(
+        {"data": json.dumps({"origin": "other-worker", "keys": ["remote_key"]})}
+    )
+    assert cache_strategy.local_cache.get("remote_key") == (False, None)
+
+
+def test_single_flight_coalesces_threads():
+    """同期関数の同時呼び出しが1回の計算にまとまることをテスト"""
+    import threading
+
+    from core.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+        for _ in range(5)
+    ]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert results == [42] * 6
+    assert len(calls) == 1
+
+
+def test_single_flight_coalesces_coroutines():
+    """非同期関数の同時呼び出しが1回の計算にまとまることをテスト"""
+    import asyncio
+
+    from core.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def run():
+        return await asyncio.gather(*[flight.do_async("k", compute) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["v"] * 10
+    assert len(calls) == 1
+
+
+def test_single_flight_leader_cancel_hands_off_to_follower():
+    """実行側のキャンセルは待機側に波及せず、待機側が計算をやり直す"""
+    import asyncio
+
+    from core.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def run():
+        leader = asyncio.create_task(flight.do_async("k", compute))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.create_task(flight.do_async("k", compute)) for _ in range(5)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(run()) == ["v"] * 5
+    assert len(calls) == 2
+
+
+def test_cached_stale_while_revalidate():
+    """期限切れ後の猶予期間は古い値を返し、裏で再計算することをテスト"""
+    calls = []
+
+    @cached(ttl=1, key_prefix="test_swr", stale_ttl=30, early_expiration_beta=0)
+    def compute(x: int) -> int:
+        calls.append(x)
+        return len(calls)
+
+    assert compute(1) == 1
+    time.sleep(1.1)
+    assert compute(1) == 1  # 古い値を即座に返す
+    for _ in range(50):
+        if len(calls) == 2:
+            break
+        time.sleep(0.05)
+    time.sleep(0.05)
+    assert compute(1) == 2
+
+
+@pytest.mark.parametrize("serializer", ["auto", "pickle", "orjson", "msgpack"])
+def test_cache_codec_roundtrip(serializer):
+    """各シリアライザで値とCacheEntryが往復できることをテスト"""
+    from core.cache_codec import CacheCodec, CacheEntry
+
+    codec = CacheCodec(serializer=serializer, compression="none")
+    value = {"id": 1, "name": "テスト", "items": [1, 2.5, None, True]}
+    assert codec.decode(codec.encode(value)) == value
+
+    entry = CacheEntry(value=value, expires_at=123.0, delta=0.5)
+    assert codec.decode(codec.encode(entry)) == entry
+
+
+def test_cache_codec_falls_back_to_pickle_and_reads_legacy():
+    """高速シリアライザ非対応の型はpickleで保存し、旧形式のpickleも読めることをテスト"""
+    import pickle
+    from datetime import datetime, timezone
+
+    from core.cache_codec import CacheCodec
+
+    codec = CacheCodec(compression="none")
+    value = {"at": datetime(2025, 1, 1, tzinfo=timezone.utc), "pair": (1, 2)}
+    assert codec.decode(codec.encode(value)) == value
+    assert codec.decode(pickle.dumps(value)) == value
+
+
+def test_cache_codec_compresses_large_values():
+    """閾値以上の値が圧縮され、統計に記録されることをテスト"""
+    from core.cache_codec import CacheCodec
+
+    codec = CacheCodec(compression="auto", compression_threshold=256)
+    value = {"rows": [{"metric": "cpu", "value": i % 10} for i in range(500)]}
+    encoded = codec.encode(value)
+
+    assert encoded[0] >> 4 != 0
+    assert codec.decode(encoded) == value
+    stats = codec.get_stats()
+    assert stats["codecs"][stats["compression"]]["encode_count"] == 1
+
+
+def test_derive_key_is_stable():
+    """キー導出が引数順序に依存せず、型を区別することをテスト"""
+    from core.cache_codec import derive_key
+
+    assert derive_key("p", (1, "a"), {"x": 1, "y": 2}) == derive_key(
+        "p", (1, "a"), {"y": 2, "x": 1}
+    )
+    assert derive_key("p", (1,), {}) != derive_key("p", ("1",), {})
+    assert derive_key("p", ([1, 2],), {}) == derive_key("p", ([1, 2],), {})
+    assert derive_key("p", (1,), {}).startswith("p:")
+
+
+def test_cache_get_many_set_many():
+    """一括取得・一括設定をテスト"""
+    cache_strategy.set_many({"bulk:1": 1, "bulk:2": {"v": 2}}, ttl=60, tags=["bulk"])
+
+    result = cache_strategy.get_many(["bulk:1", "bulk:2", "bulk:missing"])
+    assert result == {"bulk:1": 1, "bulk:2": {"v": 2}}
+
+    cache_strategy.delete_by_tag("bulk")
+    assert cache_strategy.get_many(["bulk:1", "bulk:2"]) == {}
+
+
+def test_cache_async_api():
+    """非同期APIでの設定・取得・削除をテスト"""
+    import asyncio
+
+    async def run():
+        await cache_strategy.aset("async_key", {"v": 1}, ttl=60)
+        assert await cache_strategy.aget("async_key") == {"v": 1}
+        assert await cache_strategy.aget_many(["async_key", "async_missing"]) == {
+            "async_key": {"v": 1}
+        }
+        await cache_strategy.adelete("async_key")
+        assert await cache_strategy.aget("async_key") is None
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+"""
+Kafkaコンシューマープールのテスト（KafkaConsumer は偽物に差し替え）
+"""
+import asyncio
+import threading
+from collections import namedtuple
+
+from event_streaming import consumer_pool
+from event_streaming.consumer_pool import ConsumerPool
+
+_Record = namedtuple("_Record", "topic partition offset key value timestamp")
+
+
+class _FakeConsumer:
+    """poll のたびに続きのオフセットを返し、commit 時点の位置を記録する"""
+
+    instances = []
+
+    def __init__(self, topic, **kwargs):
+        self.topic = topic
+        self.position = 0
+        self.committed = []
+        self.closed = False
+        self.close_thread_holds_pool_lock = None
+        _FakeConsumer.instances.append(self)
+
+    def poll(self, timeout_ms, max_records):
+        records = [
+            _Record(self.topic, 0, self.position + i, None, {"n": i}, 0)
+            for i in range(max_records)
+        ]
+        self.position += max_records
+        return {("tp", 0): records}
+
+    def assignment(self):
+        return {("tp", 0)}
+
+    def commit(self):
+        self.committed.append(self.position)
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(monkeypatch, **kwargs):
+    _FakeConsumer.instances = []
+    monkeypatch.setattr(consumer_pool, "KafkaConsumer", _FakeConsumer)
+    monkeypatch.setattr(consumer_pool, "KAFKA_AVAILABLE", True)
+    return ConsumerPool("localhost:9092", "test", **kwargs)
+
+
+def test_stream_uses_exclusive_consumer(monkeypatch):
+    """ストリームは専用のコンシューマーを使い、他の poll と位置・コミットを共有しない"""
+    pool = _pool(monkeypatch)
+
+    async def run():
+        stream = pool.stream("orders", "g", max_records=3)
+        first = await stream.__anext__()
+        # 並行する poll はプールのコンシューマーから取得する
+        pool.poll("orders", "g", max_records=2)
+        second = await stream.__anext__()
+        await stream.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [m["offset"] for m in first] == [0, 1, 2]
+    assert [m["offset"] for m in second] == [3, 4, 5]
+    leased, pooled = _FakeConsumer.instances
+    # 1バッチ目の処理後のコミットは、そのストリームが返した分まで
+    assert leased.committed == [3]
+    assert leased.closed
+    assert pooled.committed == [2] and not pooled.closed
+    assert pool.stats()["streams"] == []
+
+
+def test_idle_consumers_are_closed_outside_pool_lock(monkeypatch):
+    """アイドルのコンシューマーはプールのロックを放してから閉じる"""
+    pool = _pool(monkeypatch, idle_timeout_sec=0)
+    pool.poll("a", "g", max_records=1)
+    idle = _FakeConsumer.instances[0]
+    seen = []
+    original_close = idle.close
+
+    def close():
+        acquired = pool._lock.acquire(blocking=False)
+        seen.append(acquired)
+        if acquired:
+            pool._lock.release()
+        original_close()
+
+    idle.close = close
+    pool.poll("b", "g", max_records=1)
+    assert idle.closed and seen == [True]
+    assert [key for key in pool._consumers] == [("b", "g")]
+
+
+def test_consumer_is_created_outside_pool_lock(monkeypatch):
+    """KafkaConsumer の生成中もプールのロックは保持せず、同じキーは1回だけ生成する"""
+    pool = _pool(monkeypatch)
+    started = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    class _SlowConsumer(_FakeConsumer):
+        def __init__(self, topic, **kwargs):
+            acquired = pool._lock.acquire(blocking=False)
+            seen.append(acquired)
+            if acquired:
+                pool._lock.release()
+            if topic == "slow":
+                started.set()
+                release.wait(5)
+            super().__init__(topic, **kwargs)
+
+    monkeypatch.setattr(consumer_pool, "KafkaConsumer", _SlowConsumer)
+    workers = [
+        threading.Thread(
+            target=pool.poll, args=("slow", "g"), kwargs={"max_records": 1}
+        )
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    assert started.wait(5)
+    # 生成が終わらないキーがあっても、別のキーは待たされない
+    assert pool.poll("fast", "g", max_records=1)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+    assert seen == [True, True]
+    assert sorted(c.topic for c in _FakeConsumer.instances) == ["fast", "slow"]
+    assert pool._creating == {}
@@ -0,0 +1,116 @@
+"""
+イベントストア（インデックス・スナップショット）のテスト
+"""
+import uuid
+from datetime import datetime
+
+from event_streaming.event_index import EventIndex
+from event_streaming.event_sourcing import (
+    DomainEvent,
+    EventSourcingHandler,
+    EventStore,
+    EventType,
+)
+
+
+class _FakeKafkaClient:
+    """発行のみ記録し、消費は常に空を返すKafkaクライアント"""
+
+    def __init__(self):
+        self.published = []
+
+    def ensure_topic(self, topic):
+        pass
+
+    def publish_event(self, topic, event_type, data, key=None):
+        self.published.append((topic, event_type, data))
+        return True
+
+    def consume_events(self, topic, group_id, max_messages=10, timeout_ms=200):
+        return []
+
+
+def _event(aggregate_id, version, event_type, data):
+    return DomainEvent(
+        event_id=str(uuid.uuid4()),
+        aggregate_id=aggregate_id,
+        aggregate_type="order",
+        event_type=event_type,
+        event_data=data,
+        timestamp=datetime.utcnow(),
+        version=version,
+    )
+
+
+def test_event_store_versions_and_tail_read():
+    """集約ごとのバージョン順読み出しと after_version 指定をテスト"""
+    store = EventStore(_FakeKafkaClient(), index=EventIndex(":memory:"))
+    for version in range(1, 6):
+        store.append_event(_event("o-1", version, EventType.UPDATED, {"n": version}))
+    store.append_event(_event("o-2", 1, EventType.CREATED, {"n": 0}))
+
+    assert store.latest_version("order", "o-1") == 5
+    assert store.latest_version("order", "missing") == 0
+    tail = store.get_events("order", "o-1", after_version=3)
+    assert [e.version for e in tail] == [4, 5]
+    assert len(store.get_events("order")) == 6
+
+
+def test_rebuild_aggregate_uses_snapshot():
+    """スナップショット以降のイベントだけで集約が再構築されることをテスト"""
+    index = EventIndex(":memory:")
+    store = EventStore(_FakeKafkaClient(), index=index)
+    handler = EventSourcingHandler(store, snapshot_interval=3)
+
+    store.append_event(_event("o-1", 1, EventType.CREATED, {"status": "new"}))
+    for version in range(2, 5):
+        store.append_event(_event("o-1", version, EventType.UPDATED, {"n": version}))
+
+    aggregate = handler.rebuild_aggregate("order", "o-1")
+    assert aggregate["version"] == 4
+    assert aggregate["state"] == {"status": "new", "n": 4}
+    assert index.get_snapshot("order", "o-1")["version"] == 4
+
+    store.append_event(_event("o-1", 5, EventType.UPDATED, {"status": "paid"}))
+    aggregate = handler.rebuild_aggregate("order", "o-1")
+    assert aggregate["version"] == 5
+    assert aggregate["state"] == {"status": "paid", "n": 4}
+
+    assert handler.rebuild_aggregate("order", "missing") is None
+
+
+def test_reads_do_not_consume_kafka_and_catch_up_runs_in_background(tmp_path):
+    """読み出しは Kafka を待たず、取り込みはバックグラウンドタスクで行う"""
+    import asyncio
+
+    class _RemoteKafkaClient(_FakeKafkaClient):
+        def __init__(self):
+            super().__init__()
+            self.consumed = []
+
+        def consume_events(self, topic, group_id, max_messages=10, timeout_ms=200):
+            self.consumed.append(topic)
+            remote = _event("o-9", 1, EventType.CREATED, {"n": 1})
+            payload = EventStore._to_payload(remote)
+            return [{"value": {"event_type": remote.event_type, "data": payload}}]
+
+    db_path = tmp_path / "events.db"
+    kafka = _RemoteKafkaClient()
+    store = EventStore(kafka, index=EventIndex(str(db_path)))
+    assert not db_path.exists()  # 生成時にはファイルを作らない
+
+    assert store.latest_version("order", "o-9") == 0
+    assert store.get_events("order") == []
+    assert kafka.consumed == []
+
+    async def run():
+        task = asyncio.create_task(store.run_catch_up(interval_sec=0.01))
+        for _ in range(100):
+            if store.latest_version("order", "o-9") == 1:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    assert kafka.consumed[0] == "events-order"
+    assert store.latest_version("order", "o-9") == 1
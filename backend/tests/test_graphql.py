@@ -0,0 +1,157 @@
+"""GraphQL（DataLoader・クエリ制限・永続化クエリ）のテスト"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("strawberry")
+
+from ecosystem.store import ecosystem_store  # noqa: E402
+from graphql_api.persisted_queries import (  # noqa: E402
+    persisted_query_store,
+    query_hash,
+)
+from graphql_api.routes import get_context  # noqa: E402
+from graphql_api.schema import schema  # noqa: E402
+from mlops.model_registry import model_registry  # noqa: E402
+
+
+def _execute(query=None, extensions=None, variables=None):
+    async def run():
+        return await schema.execute(
+            query,
+            variable_values=variables,
+            context_value=await get_context(),
+            operation_extensions=extensions,
+        )
+
+    return asyncio.run(run())
+
+
+def test_dashboard_query_uses_bulk_loaders(monkeypatch):
+    """ネストしたフィールドは DataLoader でまとめて1回ずつ取得される"""
+    for i in range(3):
+        ecosystem_store.create_marketplace_item(
+            {
+                "name": f"item {i}",
+                "description": "test",
+                "category": "api",
+                "partner_id": "partner-001",
+                "price_type": "free",
+            }
+        )
+    a = model_registry.register_model("a", "classification", "sklearn", "tester")
+    b = model_registry.register_model("b", "regression", "sklearn", "tester")
+
+    calls = []
+    original = ecosystem_store.get_partners
+
+    def counting(ids):
+        calls.append(list(ids))
+        return original(ids)
+
+    monkeypatch.setattr(ecosystem_store, "get_partners", counting)
+    result = _execute(
+        f"""{{
+            marketplaceItems {{ name partner {{ name }} }}
+            first: model(id: "{a.id}") {{ name }}
+            second: model(id: "{b.id}") {{ name }}
+            forumPosts {{ title comments {{ author }} }}
+        }}"""
+    )
+    assert result.errors is None
+    items = result.data["marketplaceItems"]
+    assert len(items) >= 4
+    assert all(i["partner"]["name"] == "AI Solutions Inc." for i in items)
+    assert calls == [["partner-001"]]
+    assert result.data["first"]["name"] == "a"
+    assert result.data["second"]["name"] == "b"
+
+
+def test_depth_and_complexity_limits():
+    """深さ・複雑度の上限を超えるクエリは実行前に拒否される"""
+    deep = "{ partners { marketplaceItems { partner { marketplaceItems { partner {"
+    deep += (
+        " marketplaceItems { partner { marketplaceItems { partner { marketplaceItems"
+    )
+    deep += " { partner { name } } } } } } } } } } } }"
+    result = _execute(deep)
+    assert result.errors
+    assert "depth" in result.errors[0].message
+
+    wide = "{ partners(limit: 1000) { marketplaceItems { partner { id name } } } }"
+    result = _execute(wide)
+    assert result.errors
+    assert "complexity" in result.errors[0].message
+
+
+def test_complexity_uses_variable_limits_and_resolvers_clamp(monkeypatch):
+    """変数で渡した limit も複雑度に数え、リゾルバーは上限で切り詰める"""
+    from graphql_api import query_limits
+
+    wide = (
+        "query Wide($n: Int!) { partners(limit: $n)"
+        " { marketplaceItems { partner { id name } } } }"
+    )
+    result = _execute(wide, variables={"n": 1000})
+    assert result.errors
+    assert "complexity" in result.errors[0].message
+    assert _execute(wide, variables={"n": 1}).errors is None
+
+    defaulted = (
+        "query Wide($n: Int = 1000) { partners(limit: $n)"
+        " { marketplaceItems { partner { id name } } } }"
+    )
+    assert "complexity" in _execute(defaulted).errors[0].message
+
+    monkeypatch.setattr(query_limits, "MAX_LIST_LIMIT", 1)
+    result = _execute("{ partners(limit: 1000) { id } forumPosts(limit: -5) { id } }")
+    assert result.errors is None
+    assert len(result.data["partners"]) == 1
+    assert result.data["forumPosts"] == []
+
+
+def test_automatic_persisted_queries():
+    """ハッシュのみの要求は未登録ならエラー、登録後は本文なしで実行できる"""
+    persisted_query_store.clear()
+    query = "{ services { name } }"
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+    result = _execute(extensions=extensions)
+    assert result.errors[0].extensions["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    result = _execute(query, extensions)
+    assert result.errors is None
+    assert len(persisted_query_store) == 1
+
+    result = _execute(extensions=extensions)
+    assert result.errors is None
+    assert result.data == {
+        "services": [
+            {"name": "backend-api"},
+            {"name": "mlops-service"},
+            {"name": "generative-ai-service"},
+            {"name": "security-service"},
+        ]
+    }
+
+    bad = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+    result = _execute(query, bad)
+    assert result.errors[0].extensions["code"] == "PERSISTED_QUERY_HASH_MISMATCH"
+
+
+def test_persisted_query_still_checks_complexity_with_current_variables():
+    """キャッシュ済みのハッシュでも、その要求の変数で複雑度を検証する"""
+    persisted_query_store.clear()
+    query = (
+        "query Q($n: Int!) { partners(limit: $n)"
+        " { id marketplaceItems { id name } } }"
+    )
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+    assert _execute(query, extensions, variables={"n": 1}).errors is None
+    assert len(persisted_query_store) == 1
+
+    result = _execute(extensions=extensions, variables={"n": 500})
+    assert result.errors
+    assert "complexity" in result.errors[0].message
+    assert _execute(extensions=extensions, variables={"n": 1}).errors is None
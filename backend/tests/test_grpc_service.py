@@ -0,0 +1,152 @@
+"""内部 gRPC サービス（grpc.aio・ストリーミング RPC）のテスト"""
+import asyncio
+import json
+import socket
+
+import pytest
+
+grpc = pytest.importorskip("grpc")
+
+from core.anomaly_detector import batch_detect  # noqa: E402
+from event_streaming.event_index import EventIndex  # noqa: E402
+from event_streaming.event_sourcing import EventStore  # noqa: E402
+from grpc_service.proto import uep_internal_pb2, uep_internal_pb2_grpc  # noqa: E402
+from grpc_service.server import UepInternalServicer, start_server  # noqa: E402
+from optimization.performance import PerformanceOptimizer  # noqa: E402
+
+
+class _FakeKafkaClient:
+    def publish_event(self, topic, event_type, data, key=None):
+        return True
+
+    def consume_events(self, topic, group_id, max_messages=10, timeout_ms=200):
+        return []
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run(scenario, optimizer=None, event_store=None):
+    """サーバーを起動し、スタブを渡してシナリオを実行"""
+
+    async def run():
+        port = _free_port()
+        servicer = UepInternalServicer(
+            optimizer=optimizer or PerformanceOptimizer(),
+            event_store=event_store,
+        )
+        server = await start_server(port=port, servicer=servicer)
+        try:
+            async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+                return await scenario(
+                    uep_internal_pb2_grpc.UepInternalServiceStub(channel)
+                )
+        finally:
+            await server.stop(grace=None)
+
+    return asyncio.run(run())
+
+
+def test_get_metrics_reports_optimizer_numbers():
+    """GetMetrics / StreamMetrics は PerformanceOptimizer の実測値を返す"""
+    optimizer = PerformanceOptimizer()
+    for duration in (0.010, 0.020, 0.030):
+        optimizer.record_request("/api/v1/items", duration)
+    optimizer.record_request("/api/v1/items", 0.040, is_error=True)
+
+    async def scenario(stub):
+        metrics = await stub.GetMetrics(uep_internal_pb2.MetricsRequest())
+        stream = stub.StreamMetrics(
+            uep_internal_pb2.MetricsStreamRequest(interval_ms=10, max_snapshots=3)
+        )
+        return metrics, [m async for m in stream]
+
+    metrics, snapshots = _run(scenario, optimizer=optimizer)
+    assert metrics.request_count == 4
+    assert metrics.error_count == 1
+    assert metrics.avg_latency_ms == pytest.approx(25.0)
+    assert metrics.error_rate == pytest.approx(0.25)
+    assert len(snapshots) == 3
+
+
+def test_score_anomalies_streams_batches():
+    """ScoreAnomalies は入力順のインデックス付きで batch_size 件ずつ返す"""
+    values = [50.0] * 25
+    values[7] = 150.0  # temperature の上限を超える
+
+    async def scenario(stub):
+        request = uep_internal_pb2.AnomalyScoreRequest(
+            metrics=["temperature"] * len(values), values=values, batch_size=10
+        )
+        return [batch async for batch in stub.ScoreAnomalies(request)]
+
+    batches = _run(scenario)
+    assert [len(b.indices) for b in batches] == [10, 10, 5]
+    assert [i for b in batches for i in b.indices] == list(range(len(values)))
+    expected = batch_detect(["temperature"] * len(values), values)
+    assert [a for b in batches for a in b.is_anomaly] == expected.is_anomaly.tolist()
+    assert [s for b in batches for s in b.severity] == expected.severity.tolist()
+    assert batches[0].is_anomaly[7]
+
+
+def test_score_anomalies_rejects_mismatched_columns():
+    """列の長さが揃っていない要求は INVALID_ARGUMENT"""
+
+    async def scenario(stub):
+        request = uep_internal_pb2.AnomalyScoreRequest(
+            metrics=["temperature"], values=[1.0, 2.0]
+        )
+        return [batch async for batch in stub.ScoreAnomalies(request)]
+
+    with pytest.raises(grpc.aio.AioRpcError) as excinfo:
+        _run(scenario)
+    assert excinfo.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_replay_events_pages_through_store():
+    """ReplayEvents は集約単位・タイプ全体の両方でページをまたいで配信する"""
+    index = EventIndex(":memory:")
+    for aggregate_id in ("o-1", "o-2"):
+        for version in range(1, 6):
+            index.append(
+                {
+                    "event_id": f"{aggregate_id}-{version}",
+                    "aggregate_type": "order",
+                    "aggregate_id": aggregate_id,
+                    "version": version,
+                    "event_type": "updated",
+                    "event_data": {"step": version},
+                    "timestamp": "2026-01-01T00:00:00",
+                }
+            )
+    store = EventStore(_FakeKafkaClient(), index=index)
+
+    async def scenario(stub):
+        single = stub.ReplayEvents(
+            uep_internal_pb2.ReplayRequest(
+                aggregate_type="order", aggregate_id="o-1", after=2, page_size=2
+            )
+        )
+        everything = stub.ReplayEvents(
+            uep_internal_pb2.ReplayRequest(aggregate_type="order", page_size=3)
+        )
+        limited = stub.ReplayEvents(
+            uep_internal_pb2.ReplayRequest(
+                aggregate_type="order", page_size=3, max_events=4
+            )
+        )
+        return (
+            [e async for e in single],
+            [e async for e in everything],
+            [e async for e in limited],
+        )
+
+    single, everything, limited = _run(scenario, event_store=store)
+    assert [e.version for e in single] == [3, 4, 5]
+    assert json.loads(single[0].event_data) == {"step": 3}
+    assert len(everything) == 10
+    assert [e.sequence for e in everything] == sorted(e.sequence for e in everything)
+    assert len(limited) == 4
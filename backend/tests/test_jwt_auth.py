@@ -0,0 +1,116 @@
+"""
+JWT認証（検証済みキャッシュ・失効・非対称鍵）のテスト
+"""
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwt
+
+from auth import jwt_auth
+from auth.jwks import KeySet
+from auth.jwt_auth import JWTAuth
+
+
+def test_decode_uses_verified_token_cache(monkeypatch):
+    """2回目以降のデコードで署名検証が省かれることをテスト"""
+    token = JWTAuth.create_access_token({"sub": "cache-user", "roles": ["viewer"]})
+    calls = []
+    original = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_auth.jwt, "decode", counting_decode)
+    first = JWTAuth.decode_access_token(token)
+    first["sub"] = "changed"  # 呼び出し側の変更はキャッシュに影響しない
+    second = JWTAuth.decode_access_token(token)
+
+    assert second["sub"] == "cache-user"
+    assert len(calls) == 1
+    assert jwt_auth.token_cache.get_stats()["hits"] >= 1
+
+
+def test_revoked_token_is_rejected():
+    """失効させたトークンがキャッシュ済みでも拒否されることをテスト"""
+    token = JWTAuth.create_access_token({"sub": "revoke-user"})
+    assert JWTAuth.decode_access_token(token)["sub"] == "revoke-user"
+
+    assert JWTAuth.revoke_token(token) is True
+    with pytest.raises(HTTPException):
+        JWTAuth.decode_access_token(token)
+    assert JWTAuth.revoke_token("not-a-token") is False
+
+
+def test_rs256_key_set_sign_and_verify():
+    """RS256 の鍵セットで署名・JWKS による検証ができることをテスト"""
+    private_pem = (
+        rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode("ascii")
+    )
+    issuer = KeySet("RS256", "unused", private_key=private_pem, key_id="k1")
+    key, headers = issuer.signing_key()
+    token = jwt.encode({"sub": "svc"}, key, algorithm="RS256", headers=headers)
+
+    jwks = issuer.public_jwks()
+    assert [k["kid"] for k in jwks["keys"]] == ["k1"]
+    assert "d" not in jwks["keys"][0]  # 秘密鍵の成分は公開しない
+
+    verifier = KeySet("RS256", "unused", jwks_url="http://issuer/jwks.json")
+    verifier._fetch_remote = lambda: {k["kid"]: k for k in jwks["keys"]}
+    verifier.refresh_remote()
+    claims = jwt.decode(token, verifier.verification_key(token), algorithms=["RS256"])
+    assert claims["sub"] == "svc"
+
+
+def test_jwks_and_revocation_refresh_off_the_request_path(monkeypatch):
+    """鍵セット・失効リストの取得を待たずにメモリ上の状態で判定することをテスト"""
+    from auth.token_cache import RevocationList
+
+    release = threading.Event()
+    fetched = threading.Event()
+
+    def slow_fetch():
+        release.wait(5)
+        fetched.set()
+        return {"k2": {"kid": "k2", "kty": "RSA"}}
+
+    verifier = KeySet("RS256", "unused", jwks_url="http://issuer/jwks.json")
+    verifier._fetch_remote = slow_fetch
+    started = time.monotonic()
+    assert verifier._remote_key("k2") is None  # 取得完了を待たない
+    assert time.monotonic() - started < 1
+    release.set()
+    assert fetched.wait(5)
+    for _ in range(100):
+        if verifier._remote_key("k2") is not None:
+            break
+        time.sleep(0.01)
+    assert verifier._remote_key("k2")["kid"] == "k2"
+
+    class _SlowRedis:
+        def zrangebyscore(self, key, low, high, withscores=False):
+            release.wait(5)
+            return [(b"remote-jti", time.time() + 60)]
+
+    release.clear()
+    revocations = RevocationList(sync_interval=60)
+    monkeypatch.setattr(RevocationList, "_redis", staticmethod(lambda: _SlowRedis()))
+    started = time.monotonic()
+    assert revocations.is_revoked("remote-jti") is False
+    assert time.monotonic() - started < 1
+    release.set()
+    for _ in range(100):
+        if revocations.is_revoked("remote-jti"):
+            break
+        time.sleep(0.01)
+    assert revocations.is_revoked("remote-jti") is True
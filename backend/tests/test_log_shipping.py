@@ -0,0 +1,110 @@
+"""Logstash送信（キュー方式）のテスト"""
+import gzip
+import json
+import logging
+
+import httpx
+
+from monitoring.logging import LogstashHandler, _mask_sensitive
+
+
+def _handler(requests, status_code=200, **kwargs):
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(status_code)
+
+    handler = LogstashHandler(
+        logstash_url="http://logstash.test/", flush_interval=60.0, **kwargs
+    )
+    handler.client = httpx.Client(transport=httpx.MockTransport(respond))
+    return handler
+
+
+def _record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+def _decode(request: httpx.Request):
+    body = gzip.decompress(request.content).decode("utf-8")
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_batches_as_gzip_ndjson():
+    """emit はバッファに積むだけで、flush で gzip NDJSON をまとめて送る"""
+    requests = []
+    handler = _handler(requests, batch_size=3)
+    for i in range(5):
+        handler.emit(_record(f"message {i}"))
+    handler.flush()
+
+    assert len(requests) == 2
+    assert requests[0].headers["Content-Encoding"] == "gzip"
+    assert requests[0].headers["Content-Type"] == "application/x-ndjson"
+    messages = [item["message"] for r in requests for item in _decode(r)]
+    assert messages == [f"message {i}" for i in range(5)]
+    assert handler.get_stats()["sent"] == 5
+    handler.close()
+
+
+def test_drop_policy_counts_dropped():
+    """バッファが満杯なら方針に従って捨て、件数を数える"""
+    requests = []
+    oldest = _handler(requests, max_queue_size=2)
+    newest = _handler(requests, max_queue_size=2, drop_policy="drop_newest")
+    for i in range(4):
+        oldest.emit(_record(f"m{i}"))
+        newest.emit(_record(f"m{i}"))
+
+    assert [d["message"] for d in oldest._buffer] == ["m2", "m3"]
+    assert [d["message"] for d in newest._buffer] == ["m0", "m1"]
+    assert oldest.get_stats()["dropped"] == 2
+    assert newest.get_stats()["dropped"] == 2
+    oldest.close()
+    newest.close()
+
+
+def test_failed_batch_is_requeued_and_flushed_on_close():
+    """送信失敗時はバッファに戻し、close で残りを送る"""
+    requests = []
+    handler = _handler(requests, status_code=503)
+    handler.emit(_record("keep me"))
+    handler.flush()
+    stats = handler.get_stats()
+    assert stats["failed_batches"] == 1
+    assert stats["pending"] == 1
+
+    handler.client = _handler(requests).client
+    handler.close()
+    assert _decode(requests[-1])[0]["message"] == "keep me"
+    assert handler.get_stats()["pending"] == 0
+
+
+def test_mask_sensitive_fast_path():
+    """マーカーを含まないメッセージはそのまま、含むものはマスキング"""
+    plain = "order 42 shipped"
+    assert _mask_sensitive(plain) is plain
+    assert "hunter2" not in _mask_sensitive("login password=hunter2")
+    assert _mask_sensitive("Authorization: Bearer abc.def") == (
+        "Authorization: Bearer ***MASKED***"
+    )
+
+
+def test_close_stops_at_first_failed_post_and_reports_dropped(caplog):
+    """close 時に送信が失敗したら残りは送らずに破棄し、件数をログに出す"""
+    requests = []
+    handler = _handler(requests, status_code=503, batch_size=2)
+    for i in range(7):
+        handler.emit(_record(f"m{i}"))
+    handler._stopping.set()
+    handler._wakeup.set()
+    if handler._worker is not None:
+        handler._worker.join()  # 送信スレッドの試行を終わらせてから数える
+    before = len(requests)
+
+    with caplog.at_level(logging.WARNING, logger="monitoring.logging"):
+        handler.close()
+
+    assert len(requests) == before + 1
+    stats = handler.get_stats()
+    assert stats["dropped"] == 7 and stats["pending"] == 0
+    assert "dropped 7 log records" in caplog.text
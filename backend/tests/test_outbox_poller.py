@@ -0,0 +1,56 @@
+"""
+アウトボックスの再送と DLQ のテスト
+"""
+import asyncio
+
+from event_streaming import dead_letter_queue, outbox_poller
+from event_streaming.outbox_poller import publish_outbox_once
+from event_streaming.saga import OutboxStore, create_outbox_event
+
+
+class _FakeKafkaClient:
+    """配信結果を順に返すだけのクライアント"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def apublish_many(self, topic, events, dlq=True):
+        self.calls.append(dlq)
+        return [self.outcomes.pop(0) for _ in events]
+
+
+def test_outbox_retries_without_dlq_until_it_gives_up(monkeypatch):
+    """再送中は DLQ に入れず、上限に達したら1件だけ DLQ に移す"""
+    monkeypatch.setattr(OutboxStore, "_events", [])
+    monkeypatch.setattr(dead_letter_queue, "_dlq_store", [])
+    monkeypatch.setattr(outbox_poller, "OUTBOX_MAX_ATTEMPTS", 3)
+    failing = create_outbox_event("order", "o1", "created", {"n": 1})
+    client = _FakeKafkaClient([False, False, False])
+
+    async def run():
+        for _ in range(5):
+            await publish_outbox_once(client)
+
+    asyncio.run(run())
+    assert client.calls == [False, False, False]
+    assert failing.dead and failing.attempts == 3
+    assert OutboxStore.get_unpublished() == []
+    entries = dead_letter_queue.list_dlq()
+    assert len(entries) == 1
+    assert entries[0]["event"]["value"]["event_id"] == failing.event_id
+
+
+def test_outbox_marks_published_after_retry(monkeypatch):
+    """一時的な失敗の後に配信できたイベントは DLQ に入らない"""
+    monkeypatch.setattr(OutboxStore, "_events", [])
+    monkeypatch.setattr(dead_letter_queue, "_dlq_store", [])
+    event = create_outbox_event("order", "o2", "created", {"n": 2})
+    client = _FakeKafkaClient([False, True])
+
+    async def run():
+        return [await publish_outbox_once(client) for _ in range(3)]
+
+    assert asyncio.run(run()) == [0, 1, 0]
+    assert event.published and event.attempts == 1
+    assert dead_letter_queue.list_dlq() == []
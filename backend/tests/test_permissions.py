@@ -0,0 +1,60 @@
+"""
+RBAC/ABAC パーミッション解決のテスト
+"""
+import pytest
+
+from auth.abac import ABAC
+from auth.permissions import PermissionResolver
+from auth.rbac import RBAC
+
+
+def test_resolver_role_closure():
+    """ロール継承の推移閉包とビット演算による判定をテスト"""
+    resolver = PermissionResolver(
+        {"viewer": {"read"}, "editor": {"write"}, "owner": {"delete"}},
+        {"editor": {"viewer"}, "owner": {"editor"}},
+    )
+    assert resolver.permissions_for_roles(["owner"]) == {"read", "write", "delete"}
+    assert resolver.has_permission(["editor"], "read")
+    assert not resolver.has_permission(["viewer"], "write")
+    assert not resolver.has_permission(["viewer"], "unknown")
+    assert resolver.has_all(["editor"], ["read", "write"])
+    assert resolver.filter_permitted(["editor"], ["delete", "write", "read"]) == [
+        "write",
+        "read",
+    ]
+
+    with pytest.raises(ValueError):
+        PermissionResolver({"a": {"x"}}, {"a": {"b"}, "b": {"a"}})
+
+
+def test_rbac_uses_resolver():
+    """RBAC の和集合がリゾルバー経由でも従来と同じになることをテスト"""
+    expected = RBAC.ROLE_PERMISSIONS["viewer"] | RBAC.ROLE_PERMISSIONS["developer"]
+    permissions = RBAC.get_permissions_for_roles(["viewer", "developer"])
+    assert permissions == expected
+    permissions.add("mutated")  # 返り値の変更はキャッシュに影響しない
+    assert "mutated" not in RBAC.get_permissions_for_roles(["viewer", "developer"])
+    assert RBAC.roles_have_permission(["user"], "write_own")
+
+
+def test_abac_bulk_filter_matches_single_checks():
+    """一括フィルタが個別の check_attribute_access と同じ結果になることをテスト"""
+    user = {"department": "製造", "security_level": 2}
+    resources = [
+        {"id": i, "department": ["製造", "医療"][i % 2], "security_level": i % 4}
+        for i in range(40)
+    ]
+    for policy in (
+        {"department_match": True},
+        {"security_level": True},
+        {"department_match": True, "security_level": True},
+        {},
+    ):
+        expected = [
+            r for r in resources if ABAC.check_attribute_access(user, r, policy)
+        ]
+        assert ABAC.filter_accessible(user, resources, policy) == expected
+        assert ABAC.accessible_mask(user, resources, policy) == [
+            r in expected for r in resources
+        ]
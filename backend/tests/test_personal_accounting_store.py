@@ -0,0 +1,89 @@
+"""個人会計ストア（追記専用ジャーナル）のテスト"""
+import json
+
+from personal_accounting.store import AccountingStore
+
+
+def _expense(item_id, date_str, amount, category_id="supplies"):
+    return {
+        "id": item_id,
+        "date": date_str,
+        "category_id": category_id,
+        "amount": amount,
+    }
+
+
+def test_append_index_and_incremental_totals(tmp_path):
+    """追記ごとに月索引と月別・カテゴリ別合計が更新される"""
+    store = AccountingStore(tmp_path / "pa.jsonl")
+    store.add("expenses", _expense("e1", "2026-01-10", 1000))
+    store.add("expenses", _expense("e2", "2026-01-20", 500, "travel"))
+    store.add("expenses", _expense("e3", "2026-02-01", 300))
+    store.add("income", {"id": "i1", "date": "2026-01-31", "amount": 5000})
+
+    assert [e["id"] for e in store.list("expenses", 2026, 1)] == ["e2", "e1"]
+    assert [e["id"] for e in store.list("expenses", 2026)] == ["e3", "e2", "e1"]
+    assert store.totals("expenses", 2026, 1) == (1500, 2)
+    assert store.totals("expenses", 2026) == (1800, 3)
+    assert store.totals("income", 2026) == (5000, 1)
+    assert store.category_totals(2026, 1) == {"supplies": 1000, "travel": 500}
+    assert [e["id"] for e in store.recent("expenses", 2)] == ["e3", "e2"]
+
+    assert store.delete("expenses", "e2")
+    assert not store.delete("expenses", "e2")
+    assert store.totals("expenses", 2026, 1) == (1000, 1)
+    assert store.category_totals(2026, 1) == {"supplies": 1000}
+
+    # 書き込みは1行ずつの追記
+    lines = (tmp_path / "pa.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[-1]) == {"op": "delete", "kind": "expenses", "id": "e2"}
+
+
+def test_other_process_appends_are_picked_up(tmp_path):
+    """別インスタンス（別プロセス相当）の追記は末尾だけ読み込んで反映される"""
+    path = tmp_path / "pa.jsonl"
+    writer = AccountingStore(path)
+    reader = AccountingStore(path)
+    writer.add("expenses", _expense("e1", "2026-03-01", 100))
+    assert reader.totals("expenses", 2026, 3) == (100, 1)
+    writer.add("expenses", _expense("e2", "2026-03-02", 200))
+    writer.delete("expenses", "e1")
+    assert reader.totals("expenses", 2026, 3) == (200, 1)
+    assert [e["id"] for e in reader.list("expenses")] == ["e2"]
+
+
+def test_compact_replaces_file_atomically(tmp_path):
+    """圧縮後は有効なレコードだけが残り、他インスタンスも再読込する"""
+    path = tmp_path / "pa.jsonl"
+    store = AccountingStore(path)
+    other = AccountingStore(path)
+    for i in range(5):
+        store.add("expenses", _expense(f"e{i}", "2026-04-01", 10))
+    for i in range(3):
+        store.delete("expenses", f"e{i}")
+    assert other.totals("expenses", 2026, 4) == (20, 2)
+
+    store.compact()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+    assert not list(tmp_path.glob("*.tmp"))
+    store.add("expenses", _expense("e9", "2026-04-02", 5))
+    assert other.totals("expenses", 2026, 4) == (25, 3)
+
+
+def test_migrates_legacy_json(tmp_path):
+    """旧形式の JSON ファイルはジャーナルに取り込まれる"""
+    legacy = tmp_path / "pa.json"
+    legacy.write_text(
+        json.dumps(
+            {
+                "expenses": [_expense("e1", "2025-12-24", 700)],
+                "income": [{"id": "i1", "date": "2025-12-25", "amount": 900}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    store = AccountingStore(tmp_path / "pa.jsonl", legacy_path=legacy)
+    assert store.totals("expenses", 2025, 12) == (700, 1)
+    assert store.totals("income", 2025) == (900, 1)
+    assert (tmp_path / "pa.jsonl").exists()
@@ -0,0 +1,58 @@
+"""RAG キーワード検索（BM25 転置インデックス）のテスト"""
+from generative_ai.bm25_index import BM25Index, tokenize
+from generative_ai.rag import RAGSystem
+
+
+def test_tokenize_words_and_japanese_bigrams():
+    """英数字は単語、日本語は文字 bigram に分割する"""
+    assert tokenize("Hello, RAG-System!") == ["hello", "rag", "system"]
+    assert tokenize("検索拡張") == ["検索", "索拡", "拡張"]
+    assert tokenize("ｶﾀｶﾅ") == ["カタ", "タカ", "カナ"]
+
+
+def test_bm25_ranking_uses_idf_and_length():
+    """希少語を含む文書・短い文書が上位になる"""
+    index = BM25Index(":memory:")
+    index.add("docs", "common", "kafka kafka stream stream stream")
+    index.add("docs", "rare", "kafka outbox")
+    index.add("docs", "long", "kafka " + "filler " * 50)
+
+    results = index.search("docs", "outbox kafka", top_k=3)
+    assert [r["id"] for r in results][0] == "rare"
+    assert index.search("docs", "kafka", top_k=3)[-1]["id"] == "long"
+    assert index.search("docs", "missing") == []
+
+
+def test_incremental_update_and_persistence(tmp_path):
+    """追加・置き換え・削除が索引と統計に反映され、再オープン後も残る"""
+    path = str(tmp_path / "bm25.db")
+    index = BM25Index(path)
+    index.add("docs", "a", "ゼロトラスト セキュリティ", {"source": "sec"})
+    index.add("docs", "b", "データレイク カタログ")
+    assert index.count("docs") == 2
+
+    index.add("docs", "b", "データレイク ガバナンス")  # 置き換え
+    assert index.search("docs", "カタログ") == []
+    assert index.remove("docs", "a")
+    assert not index.remove("docs", "a")
+    index.close()
+
+    reopened = BM25Index(path)
+    assert reopened.count("docs") == 1
+    [hit] = reopened.search("docs", "ガバナンス")
+    assert hit["id"] == "b"
+    assert hit["text"] == "データレイク ガバナンス"
+
+
+def test_rag_keyword_retrieval_uses_index():
+    """RAGSystem のキーワード検索は add_document で更新された索引を使う"""
+    rag = RAGSystem(llm_client=None, keyword_index=BM25Index(":memory:"))
+    rag.add_document("uep_docs", "Outbox パターンで Kafka への発行を保証します。")
+
+    results = rag._retrieve_keyword("ハルシネーション", "uep_docs", 3)
+    assert results[0]["metadata"]["source"] == "AI"
+    assert results[0]["score"] == 1.0
+
+    results = rag._retrieve_keyword("outbox", "uep_docs", 3)
+    assert len(results) == 1
+    assert "Outbox" in results[0]["text"]
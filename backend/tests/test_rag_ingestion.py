@@ -0,0 +1,126 @@
+"""RAG 一括投入パイプラインのテスト"""
+import threading
+
+from generative_ai import rag as rag_module
+from generative_ai.bm25_index import BM25Index
+from generative_ai.ingestion import content_id, iter_document_chunks
+from generative_ai.rag import RAGSystem
+from generative_ai.rag_enhancements import chunk_text, iter_chunks
+
+
+class FakeCollection:
+    """ChromaDB コレクションの代わり（add の呼び出しを記録）"""
+
+    def __init__(self):
+        self.calls = []
+        self.ids = set()
+        self.fail_adds = 0
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        if self.fail_adds:
+            self.fail_adds -= 1
+            raise RuntimeError("vector store unavailable")
+        self.calls.append((ids, documents, metadatas, embeddings))
+        self.ids.update(ids)
+
+    def get(self, ids, include=None):
+        return {"ids": [doc_id for doc_id in ids if doc_id in self.ids]}
+
+
+def _vector_rag(monkeypatch, embed):
+    coll = FakeCollection()
+    monkeypatch.setattr(rag_module, "_get_or_create_collection", lambda name: coll)
+    rag = RAGSystem(
+        llm_client=None,
+        keyword_index=BM25Index(":memory:"),
+        embedding_function=embed,
+    )
+    rag._use_chromadb = True
+    return rag, coll
+
+
+def test_streaming_chunks_match_chunk_text():
+    """断片に分けて渡しても chunk_text と同じチャンクになる"""
+    text = "。".join(f"第{i}段落の本文です" for i in range(200))
+    blocks = [text[i : i + 37] for i in range(0, len(text), 37)]
+    assert list(iter_chunks(blocks, 120, 20)) == chunk_text(text, 120, 20)
+
+
+def test_document_chunks_use_content_hash_and_chunk_index():
+    """チャンク ID は内容ハッシュ。複数チャンクのときだけ chunk_index を付ける"""
+    docs = [("短い文書", {"source": "a"}), ("長い文書です。" * 40, {"source": "b"})]
+    chunks = list(iter_document_chunks(docs, chunk_size=100, chunk_overlap=10))
+    assert chunks[0] == (content_id("短い文書"), "短い文書", {"source": "a"})
+    assert [meta["chunk_index"] for _, _, meta in chunks[1:]] == list(
+        range(len(chunks) - 1)
+    )
+
+
+def test_ingest_batches_embeddings_and_skips_duplicates(monkeypatch):
+    """バッチ単位で埋め込み・書き込みを行い、再投入では同じチャンクを除外する"""
+    threads = set()
+
+    def embed(texts):
+        threads.add(threading.get_ident())
+        return [[float(len(t))] for t in texts]
+
+    rag, coll = _vector_rag(monkeypatch, embed)
+    docs = [(f"社内文書 {i} の本文", {"n": i}) for i in range(25)]
+    progress = []
+
+    stats = rag.ingest(
+        "internal",
+        docs + docs[:5],
+        batch_size=10,
+        max_workers=3,
+        progress=lambda s: progress.append(s.added),
+    )
+    assert stats["documents"] == 30
+    assert stats["added"] == 25
+    assert stats["skipped_duplicates"] == 5
+    assert progress == [10, 20, 25]
+    assert threading.get_ident() not in threads
+
+    # 書き込みは投入順・埋め込み付き
+    written = [doc for ids, docs_, _, _ in coll.calls for doc in docs_]
+    assert written == [text for text, _ in docs]
+    assert all(len(emb) == len(ids) for ids, _, _, emb in coll.calls)
+
+    again = rag.ingest("internal", docs, batch_size=10)
+    assert again["added"] == 0
+    assert again["skipped_duplicates"] == 25
+    assert len(coll.calls) == 3
+    assert rag.last_ingestion["collection"] == "internal"
+
+
+def test_failed_vector_batch_is_retried_on_next_ingest(monkeypatch):
+    """ベクトル DB への書き込みに失敗したチャンクは次回の投入で再び書き込む"""
+    rag, coll = _vector_rag(monkeypatch, lambda texts: [[1.0] for _ in texts])
+    docs = [(f"手順書 {i}", {"n": i}) for i in range(6)]
+    coll.fail_adds = 1
+
+    first = rag.ingest("runbooks", docs, batch_size=3, max_workers=1)
+    assert first["vector_failures"] == 3
+    assert len(coll.ids) == 3
+    # 失敗分もキーワード検索では引ける
+    assert rag._keyword_index.count("runbooks") == 6
+
+    again = rag.ingest("runbooks", docs, batch_size=3, max_workers=1)
+    assert again["added"] == 3 and again["skipped_duplicates"] == 3
+    assert len(coll.ids) == 6
+    assert rag._keyword_index.count("runbooks") == 6
+
+
+def test_ingest_files_streams_and_indexes(tmp_path):
+    """ファイルを逐次読み込み、キーワード検索できる状態にする"""
+    path = tmp_path / "runbook.md"
+    path.write_text("障害対応手順。" * 300 + "最後にポストモーテムを書く。", "utf-8")
+    rag = RAGSystem(llm_client=None, keyword_index=BM25Index(":memory:"))
+
+    stats = rag.ingest_files("runbooks", [path], chunk_size=200, chunk_overlap=20)
+    assert stats["added"] > 1
+    assert stats["vector_failures"] == 0
+
+    [hit] = rag._retrieve_keyword("ポストモーテム", "runbooks", 1)
+    assert hit["metadata"]["source"] == str(path)
+    assert "chunk_index" in hit["metadata"]
@@ -0,0 +1,63 @@
+"""
+レート制限（固定ウィンドウ判定・429 応答）のテスト
+
+main をインポートせずに判定ロジックとエラーハンドラーだけを検証する。
+"""
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from core import rate_limit
+from core.error_handler import uep_exception_handler
+from core.exceptions import UEPException
+from core.rate_limit import hit_rate_limit
+
+
+def test_hit_rate_limit_fixed_window():
+    """固定ウィンドウのレート制限判定をテスト（非同期Redis未接続時はメモリで判定）"""
+
+    async def run():
+        return [await hit_rate_limit("test:fixed_window", 3, 60) for _ in range(5)]
+
+    results = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, True, False, False]
+    assert all(0 < retry_after <= 60 for _, retry_after in results)
+
+
+def test_memory_windows_are_pruned(monkeypatch):
+    """期限切れのウィンドウは掃除され、件数は上限を超えない"""
+    monkeypatch.setattr(rate_limit, "_memory_windows", {})
+    monkeypatch.setattr(rate_limit, "_MEMORY_WINDOWS_MAX", 50)
+    monkeypatch.setattr(rate_limit, "_next_memory_sweep", 0)
+    clock = [1_000_000]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+
+    async def run():
+        for i in range(200):
+            await hit_rate_limit(f"ip:{i}", 10, 60)
+        assert len(rate_limit._memory_windows) <= 50
+        # ウィンドウが過ぎたら次の掃除で空になる
+        clock[0] += 120
+        await hit_rate_limit("ip:new", 10, 60)
+        assert list(rate_limit._memory_windows) == ["ip:new"]
+
+    asyncio.run(run())
+
+
+def test_rate_limited_response_has_retry_after(monkeypatch):
+    """429 応答に Retry-After ヘッダーを付ける"""
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+    app.add_exception_handler(UEPException, uep_exception_handler)
+
+    @app.get("/limited")
+    @rate_limit.rate_limit(calls=1, period=60)
+    async def limited(request: Request):
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.get("/limited").status_code == 200
+    response = client.get("/limited")
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
@@ -0,0 +1,61 @@
+"""
+ストリーミング異常検知のテスト
+"""
+import random
+
+import numpy as np
+
+from core.streaming_anomaly import StreamingAnomalyDetector
+
+
+def _point(value, series_id="CNC設備A", metric="vibration"):
+    return {
+        "domain": "manufacturing",
+        "series_id": series_id,
+        "metric": metric,
+        "value": value,
+    }
+
+
+def test_window_statistics_match_buffer():
+    """リングバッファの窓統計が直近 window 件の平均・標準偏差と一致することをテスト"""
+    detector = StreamingAnomalyDetector(window=8, max_series=10)
+    rng = random.Random(0)
+    values = [rng.uniform(0.0, 0.1) for _ in range(100)]
+    detector.ingest(_point(v) for v in values)
+
+    series = detector.get_series("manufacturing", "CNC設備A", "vibration")
+    assert series["samples"] == 100
+    assert series["window_size"] == 8
+    assert abs(series["window_mean"] - np.mean(values[-8:])) < 1e-6
+    assert abs(series["window_std"] - np.std(values[-8:])) < 1e-6
+
+
+def test_events_emitted_only_on_state_change():
+    """判定が変化したときだけイベントが返ることをテスト"""
+    detector = StreamingAnomalyDetector(window=5, max_series=10)
+
+    assert detector.ingest(_point(0.05) for _ in range(10)) == []
+
+    events = detector.ingest([_point(0.4), _point(0.45)])
+    assert len(events) == 1
+    assert events[0]["state"] == "anomaly"
+    assert events[0]["severity"] == "高"
+
+    events = detector.ingest(_point(0.05) for _ in range(3))
+    assert [e["state"] for e in events] == ["normal"]
+    assert events[0]["previous_severity"] == "高"
+
+
+def test_series_memory_is_bounded():
+    """系列数の上限を超えると古い系列が破棄されることをテスト"""
+    detector = StreamingAnomalyDetector(window=16, max_series=3)
+    for i in range(5):
+        detector.ingest(_point(1.0, series_id=f"S{i}") for _ in range(100))
+
+    stats = detector.get_stats()
+    assert stats["series_count"] == 3
+    assert stats["evicted"] == 2
+    assert [s["series_id"] for s in stats["series"]] == ["S4", "S3", "S2"]
+    assert 0 < stats["memory_bytes"] < 3 * 2048
+    assert detector.get_series("manufacturing", "S0", "vibration") is None
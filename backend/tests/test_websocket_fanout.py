@@ -0,0 +1,197 @@
+"""
+WebSocket 配信（送信キュー・遅い接続・pub/sub）のテスト
+"""
+import asyncio
+import json
+
+from core.websocket import ConnectionManager
+
+
+class _FakeWebSocket:
+    """送信内容を記録するだけの WebSocket（delay 秒ずつ遅れて送る）"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_code = code
+
+
+def test_slow_consumer_does_not_block_room():
+    """遅い接続があっても他の接続へはすぐ届き、遅い接続は切断される"""
+
+    async def run():
+        manager = ConnectionManager(queue_size=3, send_timeout=5.0)
+        fast, slow = _FakeWebSocket(), _FakeWebSocket(delay=10)
+        await manager.connect(fast, room="r")
+        await manager.connect(slow, room="r")
+        for i in range(5):
+            await manager.send_to_room({"n": i}, "r")
+            await asyncio.sleep(0.01)
+        assert [json.loads(t)["n"] for t in fast.sent] == [0, 1, 2, 3, 4]
+        assert slow.closed_code == 1013
+        assert manager.active_connections["r"] == {fast}
+        assert manager.get_stats()["slow_disconnects"] == 1
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_drop_oldest_policy_keeps_connection():
+    """drop_oldest では切断せず、古いメッセージを捨てて新しいものを残す"""
+
+    async def run():
+        manager = ConnectionManager(
+            queue_size=2, send_timeout=5.0, slow_consumer_policy="drop_oldest"
+        )
+        ws = _FakeWebSocket(delay=0.01)
+        await manager.connect(ws, room="r", user_id="u1")
+        for i in range(6):
+            await manager.send_to_user({"n": i}, "u1")
+        await asyncio.sleep(0.1)
+        received = [json.loads(t)["n"] for t in ws.sent]
+        assert ws.closed_code is None
+        assert received[-2:] == [4, 5]
+        assert manager.get_stats()["dropped"] == 6 - len(received)
+        manager.disconnect(ws, room="r", user_id="u1")
+        assert manager.user_connections == {} and manager.active_connections == {}
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_send_timeout_disconnects():
+    """送信が WS_SEND_TIMEOUT を超えた接続は切断される"""
+
+    async def run():
+        manager = ConnectionManager(queue_size=10, send_timeout=0.02)
+        ws = _FakeWebSocket(delay=1)
+        await manager.connect(ws)
+        await manager.broadcast({"type": "ping"})
+        await asyncio.sleep(0.1)
+        assert ws.closed_code == 1013
+        assert manager.get_stats()["connections"] == 0
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_pubsub_envelope_delivered_except_own_origin():
+    """他ワーカーの配信は届け、自分が publish したものは二重に届けない"""
+
+    class _FakePubSub:
+        def __init__(self, messages):
+            self.messages = messages
+
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            for m in self.messages:
+                yield {"data": m}
+            raise asyncio.CancelledError
+
+        async def aclose(self):
+            pass
+
+    async def run():
+        manager = ConnectionManager()
+        ws = _FakeWebSocket()
+        await manager.connect(ws, room="r")
+        envelope = {"target": "room", "key": "r", "text": '{"n": 1}'}
+        messages = [
+            json.dumps({**envelope, "origin": "other"}),
+            json.dumps({**envelope, "origin": manager._instance_id}),
+            "broken",
+        ]
+
+        class _FakeRedis:
+            def pubsub(self, ignore_subscribe_messages=True):
+                return _FakePubSub(messages)
+
+        try:
+            await manager._listen(_FakeRedis())
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.01)
+        assert ws.sent == ['{"n": 1}']
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_pubsub_resubscribes_after_connection_loss(monkeypatch):
+    """購読が切れたら再購読し、切断中は他ワーカーへ publish しない"""
+    from core import websocket as websocket_module
+
+    monkeypatch.setattr(websocket_module, "_PUBSUB_RETRY_MIN_SEC", 0.01)
+
+    class _FakeRedis:
+        def __init__(self):
+            self.subscribes = 0
+            self.published = []
+            self.release = asyncio.Event()
+
+        def pubsub(self, ignore_subscribe_messages=True):
+            return _FakePubSub(self)
+
+        async def publish(self, channel, envelope):
+            self.published.append(envelope)
+
+    class _FakePubSub:
+        def __init__(self, redis):
+            self.redis = redis
+
+        async def subscribe(self, channel):
+            self.redis.subscribes += 1
+            if self.redis.subscribes == 1:
+                raise ConnectionError("redis down")
+
+        async def listen(self):
+            if self.redis.subscribes == 2:
+                await self.redis.release.wait()
+                raise ConnectionError("connection reset")
+            await asyncio.Event().wait()
+            yield  # pragma: no cover
+
+        async def aclose(self):
+            pass
+
+    async def run():
+        redis = _FakeRedis()
+        monkeypatch.setattr(websocket_module, "get_async_redis", lambda: redis)
+        manager = ConnectionManager()
+        await manager.broadcast({"n": 0})  # 未購読
+        await manager.start()
+        for _ in range(100):
+            if manager.get_stats()["pubsub"]:
+                break
+            await asyncio.sleep(0.01)
+        assert redis.subscribes == 2 and manager.get_stats()["pubsub"] is True
+        await manager.broadcast({"n": 1})
+
+        redis.release.set()  # 接続断 → 再購読
+        for _ in range(100):
+            if not manager.get_stats()["pubsub"]:
+                break
+            await asyncio.sleep(0)
+        assert manager.get_stats()["pubsub"] is False
+        for _ in range(100):
+            if redis.subscribes == 3 and manager.get_stats()["pubsub"]:
+                break
+            await asyncio.sleep(0.01)
+        assert manager.get_stats()["pubsub"] is True
+        assert [json.loads(e)["text"] for e in redis.published] == ['{"n": 1}']
+        await manager.stop()
+        assert manager.get_stats()["pubsub"] is False
+
+    asyncio.run(run())
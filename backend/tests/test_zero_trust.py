@@ -0,0 +1,81 @@
+"""
+ゼロトラストポリシー（コンパイル済みインデックス）のテスト
+"""
+from datetime import datetime, timezone
+
+from security.policy_index import CidrSet, PathPatternIndex
+from security.zero_trust import TrustLevel, ZeroTrustPolicy, ZeroTrustPolicyModel
+
+USER = {"roles": ["user"], "permissions": ["read"]}
+
+
+def _policy(policy_id, pattern, **kwargs):
+    now = datetime.now(timezone.utc)
+    return ZeroTrustPolicyModel(
+        id=policy_id,
+        name=policy_id,
+        resource_pattern=pattern,
+        required_trust_level=kwargs.pop("trust", TrustLevel.LOW),
+        created_at=now,
+        updated_at=now,
+        **kwargs,
+    )
+
+
+def test_path_index_most_specific_match():
+    """最も具体的なパターンが選ばれることをテスト"""
+    index = PathPatternIndex()
+    index.add("/api/v1/*", "api")
+    index.add("/api/v1/security/*", "security")
+    index.add("/api/v1/security/keys", "keys")
+    index.add("/api/v1/*/export", "export")
+
+    assert index.match("/api/v1/projects") == "api"
+    assert index.match("/api/v1/security/audit/1") == "security"
+    assert index.match("/api/v1/security/keys") == "keys"
+    assert index.match("/api/v1/reports/export") == "export"
+    assert index.match("/api/v1") is None
+    assert index.match("/health") is None
+
+
+def test_cidr_set():
+    """CIDR と単一アドレスの照合をテスト"""
+    cidrs = CidrSet(["10.0.0.0/8", "192.168.1.10", "2001:db8::/32"])
+    assert cidrs.contains("10.20.30.40")
+    assert cidrs.contains("192.168.1.10")
+    assert not cidrs.contains("192.168.1.11")
+    assert cidrs.contains("2001:db8::1")
+    assert not cidrs.contains("unknown")
+
+
+def test_evaluate_access_uses_specific_policy_and_ip_rules():
+    """具体的なポリシー・IP許可/拒否・ポリシー変更時の再評価をテスト"""
+    zt = ZeroTrustPolicy()
+    assert zt.evaluate_access("/api/v1/projects", USER, {"ip": "10.1.2.3"}) == (
+        True,
+        None,
+    )
+    # /api/v1/security/* は一般APIより具体的なため、そちらが適用される
+    allowed, reason = zt.evaluate_access("/api/v1/security/x", USER, {})
+    assert not allowed and "trust level" in reason
+
+    zt.add_policy(
+        _policy(
+            "reports",
+            "/api/v1/reports/*",
+            ip_whitelist=["192.168.0.0/16"],
+            ip_blacklist=["192.168.66.0/24"],
+        )
+    )
+    assert zt.evaluate_access("/api/v1/reports/1", USER, {"ip": "192.168.1.5"})[0]
+    assert zt.evaluate_access("/api/v1/reports/1", USER, {"ip": "192.168.66.5"}) == (
+        False,
+        "IP address is blacklisted",
+    )
+    assert zt.evaluate_access("/api/v1/reports/1", USER, {"ip": "10.1.2.3"}) == (
+        False,
+        "IP address is not whitelisted",
+    )
+
+    assert zt.remove_policy("reports")
+    assert zt.evaluate_access("/api/v1/reports/1", USER, {"ip": "10.1.2.3"})[0]
@@ -26,5 +26,15 @@ def get_config():
         "otlp_endpoint": os.getenv("OTLP_ENDPOINT", "http://localhost:4317"),
         "slack_webhook_url": os.getenv("SLACK_WEBHOOK_URL", ""),
         "alert_email": os.getenv("ALERT_EMAIL", ""),
+        "csv_import_batch_size": int(os.getenv("CSV_IMPORT_BATCH_SIZE", "1000")),
+        "csv_import_max_errors": int(os.getenv("CSV_IMPORT_MAX_ERRORS", "100")),
+        "weather_refresh_sec": int(os.getenv("WEATHER_REFRESH_SEC", "600")),
+        "weather_ttl_sec": int(os.getenv("WEATHER_TTL_SEC", "1800")),
+        "list_count_cache_sec": int(os.getenv("LIST_COUNT_CACHE_SEC", "60")),
+        "ws_send_queue_size": int(os.getenv("WS_SEND_QUEUE_SIZE", "100")),
+        "ws_send_timeout_sec": float(os.getenv("WS_SEND_TIMEOUT_SEC", "5")),
+        "ws_slow_consumer_policy": os.getenv("WS_SLOW_CONSUMER_POLICY", "disconnect"),  # disconnect / drop_oldest
+        "ws_pubsub_channel": os.getenv("WS_PUBSUB_CHANNEL", "unified:ws"),
+        "ws_refresh_debounce_ms": int(os.getenv("WS_REFRESH_DEBOUNCE_MS", "500")),
         "demo_login_enabled": os.getenv("DEMO_LOGIN_ENABLED", "false").lower() == "true",
     }
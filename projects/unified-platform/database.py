@@ -37,8 +37,14 @@ async def get_db():
 async def init_db():
     """Create tables if not exist"""
     import models  # noqa: F401 - register models
+    from services.flight_stats import install_flight_stats
+    from services.pagination import install_list_indexes
+    from services.search_index import install_search_index
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_list_indexes)
+        await conn.run_sync(install_flight_stats)
+        await conn.run_sync(install_search_index)
 
 
 async def check_db_health():
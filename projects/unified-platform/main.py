@@ -23,35 +23,12 @@ from models import User, Patient, AIDiagnosis, VitalSign, Flight, Airport, Satel
 from services.auth import get_current_user, require_auth, create_access_token, verify_password, hash_password
 from services.audit import write_audit
 from services.redis_client import cache_get, cache_set, login_attempt_incr, login_attempt_reset, is_login_locked, notification_mark_read, notification_read_ids
+from services.realtime import ws_manager, install_change_listeners  # WebSocket: データ変更時に refresh をプッシュ
 
 # Phase 5: Prometheus metrics (status_code for alerting)
 REQUEST_COUNT = Counter("unified_http_requests_total", "Total requests", ["method", "status_code"])
 REQUEST_LATENCY = Histogram("unified_http_request_duration_seconds", "Request latency")
 
-# WebSocket: 接続管理・リアルタイム配信
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, data: dict):
-        import json
-        msg = json.dumps(data)
-        for conn in list(self.active_connections):
-            try:
-                await conn.send_text(msg)
-            except Exception:
-                self.disconnect(conn)
-
-ws_manager = ConnectionManager()
-
 
 def setup_tracing():
     """Phase 5: OpenTelemetry"""
@@ -100,14 +77,19 @@ async def lifespan(app: FastAPI):
         logging.getLogger("uvicorn").info("Seed completed")
     except Exception as e:
         logging.getLogger("uvicorn").error(f"Seed failed: {e}")
-    # WebSocket ブロードキャストループ開始
-    _ws_task = asyncio.create_task(_ws_broadcast_loop())
+    # WebSocket: Redis pub/sub 購読とデータ変更の検知（seed 後に開始）
+    install_change_listeners()
+    await ws_manager.start()
+    # 遅延予測用の天候をバックグラウンドで定期取得
+    from services.weather import weather_refresh_loop
+    _weather_task = asyncio.create_task(weather_refresh_loop())
     yield
-    _ws_task.cancel()
+    _weather_task.cancel()
     try:
-        await _ws_task
+        await _weather_task
     except asyncio.CancelledError:
         pass
+    await ws_manager.stop()
 
 
 app = FastAPI(
@@ -268,13 +250,21 @@ def _summarize_finding(finding: str | None) -> str:
     return finding
 
 
+async def _list_page(db: AsyncSession, stmt, order_by, serialize, **params):
+    """一覧 API 共通: offset 方式 / cursor 方式（services/pagination.py）。不正なカーソルは 400"""
+    from services.pagination import InvalidPageRequest, list_page
+    try:
+        return await list_page(db, stmt, order_by, serialize, **params)
+    except InvalidPageRequest as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+
+
 @app.get("/api/v1/medical/patients")
-async def get_patients(limit: int = 100, offset: int = 0, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    cnt = await db.execute(select(func.count(Patient.id)))
-    total = cnt.scalar() or 0
-    r = await db.execute(select(Patient).limit(limit).offset(offset))
-    items = [{"id": x.id, "identifier": x.identifier, "family_name": x.family_name, "given_name": x.given_name, "gender": x.gender, "birth_date": x.birth_date} for x in r.scalars().all()]
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
+async def get_patients(limit: int = 100, offset: int = 0, cursor: Optional[str] = None, count: Optional[str] = None, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+    """患者一覧。cursor を指定（先頭ページは空文字）するとキーセット方式で next_cursor を返す。count: exact / estimated / none"""
+    def item(x):
+        return {"id": x.id, "identifier": x.identifier, "family_name": x.family_name, "given_name": x.given_name, "gender": x.gender, "birth_date": x.birth_date}
+    return await _list_page(db, select(Patient), [Patient.id], item, limit=limit, offset=offset, cursor=cursor, count=count)
 
 
 @app.get("/api/v1/medical/ai-diagnosis")
@@ -315,68 +305,55 @@ async def get_medical_stats(db: AsyncSession = Depends(get_db), _user: str = Dep
 
 
 # --- CSV インポート ---
+async def _import_csv(spec, file: UploadFile, db: AsyncSession, background: bool):
+    """ストリーミングでパースしバッチ UPSERT。background=true はジョブ ID を返し進捗は /api/v1/imports/{job_id}"""
+    from services.csv_import import run_import, start_import_job
+    if background:
+        job = await start_import_job(spec, file)
+        return JSONResponse(job, status_code=202)
+    job = await run_import(db, spec, file.file)
+    return {"imported": job["imported"], "failed": job["failed"], "batches": job["batches"], "errors": job["errors"], "status": job["status"]}
+
+
 @app.post("/api/v1/medical/patients/import")
-async def import_patients_csv(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+async def import_patients_csv(file: UploadFile = File(...), background: bool = False, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
     """CSV: id,identifier,family_name,given_name,gender,birth_date"""
-    import csv
-    import io
-    content = await file.read()
-    try:
-        text = content.decode("utf-8-sig")
-    except Exception:
-        text = content.decode("utf-8", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
-    added = 0
-    for row in reader:
-        pid = (row.get("id") or row.get("identifier") or "").strip()
-        if not pid:
-            continue
-        p = Patient(
-            id=pid[:32],
-            identifier=row.get("identifier", pid)[:64],
-            family_name=(row.get("family_name") or "")[:128],
-            given_name=(row.get("given_name") or "")[:128],
-            gender=(row.get("gender") or "")[:16],
-            birth_date=(row.get("birth_date") or "")[:16],
-        )
-        db.merge(p)
-        added += 1
-    await db.commit()
-    return {"imported": added}
+    from services.csv_import import PATIENT_IMPORT
+    return await _import_csv(PATIENT_IMPORT, file, db, background)
 
 
 @app.post("/api/v1/aviation/flights/import")
-async def import_flights_csv(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+async def import_flights_csv(file: UploadFile = File(...), background: bool = False, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
     """CSV: flight_id,route,departure,arrival,status,aircraft"""
-    import csv
-    import io
-    content = await file.read()
-    try:
-        text = content.decode("utf-8-sig")
-    except Exception:
-        text = content.decode("utf-8", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
-    added = 0
-    for row in reader:
-        fid = (row.get("flight_id") or "").strip()
-        if not fid:
-            continue
-        f = Flight(flight_id=fid[:32], route=(row.get("route") or "")[:32], departure=(row.get("departure") or "")[:16],
-                   arrival=(row.get("arrival") or "")[:16], status=(row.get("status") or "OnTime")[:64], aircraft=(row.get("aircraft") or "")[:32])
-        db.merge(f)
-        added += 1
-    await db.commit()
-    return {"imported": added}
+    from services.csv_import import FLIGHT_IMPORT
+    return await _import_csv(FLIGHT_IMPORT, file, db, background)
+
+
+@app.get("/api/v1/imports")
+async def list_imports(limit: int = 50, _user: str = Depends(require_auth)):
+    """CSV インポートジョブ一覧"""
+    from services.csv_import import list_import_jobs
+    return {"items": list_import_jobs(limit)}
+
+
+@app.get("/api/v1/imports/{job_id}")
+async def get_import(job_id: str, _user: str = Depends(require_auth)):
+    """CSV インポートジョブの進捗・エラー行"""
+    from services.csv_import import get_import_job
+    job = get_import_job(job_id)
+    if not job:
+        return JSONResponse({"detail": "Job not found"}, status_code=404)
+    return job
 
 
 # --- Aviation ---
 @app.get("/api/v1/aviation/flights")
-async def get_flights(limit: int = 100, offset: int = 0, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    cnt = await db.execute(select(func.count(Flight.id)))
-    total = cnt.scalar() or 0
-    r = await db.execute(select(Flight).limit(limit).offset(offset))
-    items = [{"flight_id": x.flight_id, "route": x.route, "departure": x.departure, "arrival": x.arrival, "status": x.status, "aircraft": x.aircraft} for x in r.scalars().all()]
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
+async def get_flights(limit: int = 100, offset: int = 0, cursor: Optional[str] = None, count: Optional[str] = None, status: Optional[str] = None, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+    """フライト一覧（status で絞り込み可。ページングは get_patients と同じ）"""
+    def item(x):
+        return {"flight_id": x.flight_id, "route": x.route, "departure": x.departure, "arrival": x.arrival, "status": x.status, "aircraft": x.aircraft}
+    stmt = select(Flight) if status is None else select(Flight).where(Flight.status == status)
+    return await _list_page(db, stmt, [Flight.id], item, limit=limit, offset=offset, cursor=cursor, count=count)
 
 
 @app.get("/api/v1/aviation/airports")
@@ -388,11 +365,12 @@ async def get_airports(db: AsyncSession = Depends(get_db), _user: str = Depends(
 
 @app.get("/api/v1/aviation/delays")
 async def get_delays(db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    r = await db.execute(select(Flight))
-    flights = r.scalars().all()
-    delayed = sum(1 for f in flights if f.status == "Delayed")
-    on_time = sum(1 for f in flights if f.status == "OnTime")
-    total = len(flights) or 1
+    """ステータス別件数は flight_status_stats（トリガーで増分更新）から取得。便数に依存しない"""
+    from services.flight_stats import get_status_counts
+    counts = await get_status_counts(db)
+    delayed = counts.get("Delayed", 0)
+    on_time = counts.get("OnTime", 0)
+    total = sum(counts.values()) or 1
     return {
         "on_time_rate": round(on_time / total, 2) if total else 0.92,
         "avg_delay_minutes": 8,
@@ -403,48 +381,20 @@ async def get_delays(db: AsyncSession = Depends(get_db), _user: str = Depends(re
 
 @app.get("/api/v1/aviation/delay-prediction")
 async def get_delay_prediction(db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    """遅延予測: Open-Meteo天候 + 空港混雑の簡易モデル"""
-    import httpx
-    r = await db.execute(select(Airport))
-    airports = r.scalars().all()
-    r2 = await db.execute(select(Flight))
-    flights = r2.scalars().all()
-    delayed = sum(1 for f in flights if f.status == "Delayed")
-    total = len(flights) or 1
+    """遅延予測: Open-Meteo天候（バックグラウンド取得のキャッシュ）+ 空港混雑の簡易モデル"""
+    from services.flight_stats import get_status_counts
+    from services.weather import get_cached_weather
+    counts = await get_status_counts(db)
+    delayed = counts.get("Delayed", 0)
+    total = sum(counts.values()) or 1
     delay_ratio = delayed / total if total else 0.1
 
-    # 東京（NRT/HND）の天候を Open-Meteo で取得（APIキー不要）
-    weather_risk = 0
-    weather_desc = "Unknown"
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(
-                "https://api.open-meteo.com/v1/forecast",
-                params={"latitude": 35.77, "longitude": 140.39, "current": "weather_code,precipitation"},
-            )
-            if resp.status_code == 200:
-                j = resp.json()
-                wc = j.get("current", {}).get("weather_code", 0)
-                # WMO codes: 0=clear, 1-3=clouds, 61-67=rain, 80-82=showers, 95-99=thunderstorm
-                if wc >= 95:
-                    weather_risk, weather_desc = 35, "Thunderstorm"
-                elif wc >= 80 or 61 <= wc <= 67:
-                    weather_risk, weather_desc = 25, "Rain"
-                elif 51 <= wc <= 57:
-                    weather_risk, weather_desc = 15, "Drizzle"
-                elif 1 <= wc <= 3:
-                    weather_risk, weather_desc = 5, "Cloudy"
-                else:
-                    weather_desc = "Clear"
-    except Exception:
-        weather_desc = "N/A"
+    weather = get_cached_weather()
+    weather_risk = weather["weather_risk"]
 
-    congestion_risk = 0
-    for a in airports:
-        if a.congestion == "High":
-            congestion_risk += 20
-        elif a.congestion == "Medium":
-            congestion_risk += 8
+    r = await db.execute(select(Airport.congestion, func.count()).group_by(Airport.congestion))
+    congestion = dict(r.all())
+    congestion_risk = congestion.get("High", 0) * 20 + congestion.get("Medium", 0) * 8
 
     delay_ratio_risk = 15 if delay_ratio > 0.2 else (8 if delay_ratio > 0.1 else 0)
     risk_score = min(100, int(weather_risk + congestion_risk + delay_ratio_risk))
@@ -453,8 +403,10 @@ async def get_delay_prediction(db: AsyncSession = Depends(get_db), _user: str =
     return {
         "risk_score": risk_score,
         "level": level,
-        "weather": weather_desc,
+        "weather": weather["weather"],
         "weather_risk": weather_risk,
+        "weather_stale": weather["weather_stale"],
+        "weather_fetched_at": weather["weather_fetched_at"],
         "congestion_risk": congestion_risk,
         "delay_ratio_risk": delay_ratio_risk,
         "last_updated": datetime.utcnow().isoformat(),
@@ -470,12 +422,12 @@ async def get_aviation_stats(db: AsyncSession = Depends(get_db), _user: str = De
 
 # --- Space ---
 @app.get("/api/v1/space/satellites")
-async def get_satellites(limit: int = 100, offset: int = 0, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    cnt = await db.execute(select(func.count(Satellite.id)))
-    total = cnt.scalar() or 0
-    r = await db.execute(select(Satellite).limit(limit).offset(offset))
-    items = [{"id": x.satellite_id, "name": x.name, "orbit_km": x.orbit_km, "inclination": x.inclination, "period_min": x.period_min, "status": x.status} for x in r.scalars().all()]
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
+async def get_satellites(limit: int = 100, offset: int = 0, cursor: Optional[str] = None, count: Optional[str] = None, status: Optional[str] = None, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+    """衛星一覧（status で絞り込み可。ページングは get_patients と同じ）"""
+    def item(x):
+        return {"id": x.satellite_id, "name": x.name, "orbit_km": x.orbit_km, "inclination": x.inclination, "period_min": x.period_min, "status": x.status}
+    stmt = select(Satellite) if status is None else select(Satellite).where(Satellite.status == status)
+    return await _list_page(db, stmt, [Satellite.id], item, limit=limit, offset=offset, cursor=cursor, count=count)
 
 
 @app.get("/api/v1/space/satellites/{satellite_id}")
@@ -1069,31 +1021,18 @@ async def mark_notification_read(notif_id: int, user: str = Depends(require_auth
 # --- 全ドメイン横断検索 ---
 @app.get("/api/v1/search")
 async def search(q: str = "", limit: int = 20, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    """患者・フライト・衛星を横断検索"""
+    """患者・フライト・衛星を横断検索（search_documents の trigram インデックス。前方一致を優先して順位付け）"""
+    from services.search_index import search as search_index
+    q = (q or "").strip()[:100]
+    return await search_index(db, q, min(max(limit, 1), 100))
+
+
+@app.get("/api/v1/search/suggest")
+async def search_suggest(q: str = "", limit: int = 10, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+    """検索ボックスの補完候補（ラベルの前方一致）"""
+    from services.search_index import suggest
     q = (q or "").strip()[:100]
-    results = []
-    if len(q) < 1:
-        return {"items": results, "total": 0}
-    q_like = f"%{q}%"
-    # Patients
-    r = await db.execute(select(Patient).where(
-        (Patient.identifier.ilike(q_like)) | (Patient.family_name.ilike(q_like)) | (Patient.given_name.ilike(q_like))
-    ).limit(limit))
-    for x in r.scalars().all():
-        results.append({"domain": "medical", "type": "patient", "id": x.id, "label": f"{x.family_name or ''} {x.given_name or ''}".strip() or x.identifier, "detail": x.identifier})
-    # Flights
-    r = await db.execute(select(Flight).where(
-        (Flight.flight_id.ilike(q_like)) | (Flight.route.ilike(q_like))
-    ).limit(limit))
-    for x in r.scalars().all():
-        results.append({"domain": "aviation", "type": "flight", "id": x.flight_id, "label": f"{x.flight_id} {x.route}", "detail": x.route})
-    # Satellites
-    r = await db.execute(select(Satellite).where(
-        (Satellite.satellite_id.ilike(q_like)) | (Satellite.name.ilike(q_like))
-    ).limit(limit))
-    for x in r.scalars().all():
-        results.append({"domain": "space", "type": "satellite", "id": x.satellite_id, "label": x.name or x.satellite_id, "detail": x.satellite_id})
-    return {"items": results[:limit], "total": len(results)}
+    return {"items": await suggest(db, q, min(max(limit, 1), 50))}
 
 
 # --- 天気・カレンダー・TODO（ウィジェット用） ---
@@ -1125,11 +1064,10 @@ async def get_calendar(_user: str = Depends(require_auth)):
 
 # --- Phase 3: 監査ログ API ---
 @app.get("/api/v1/admin/audit-logs")
-async def get_audit_logs(limit: int = 100, offset: int = 0, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
-    """監査ログ取得（管理者用）"""
-    r = await db.execute(select(AuditLog).order_by(AuditLog.timestamp.desc()).limit(limit).offset(offset))
-    items = [
-        {
+async def get_audit_logs(limit: int = 100, offset: int = 0, cursor: Optional[str] = None, count: Optional[str] = None, user_id: Optional[str] = None, db: AsyncSession = Depends(get_db), _user: str = Depends(require_auth)):
+    """監査ログ取得（管理者用・新しい順。user_id で絞り込み可。ページングは get_patients と同じ）"""
+    def item(x):
+        return {
             "id": x.id,
             "timestamp": x.timestamp.isoformat(),
             "user_id": x.user_id,
@@ -1139,11 +1077,8 @@ async def get_audit_logs(limit: int = 100, offset: int = 0, db: AsyncSession = D
             "details": x.details,
             "ip_address": x.ip_address,
         }
-        for x in r.scalars().all()
-    ]
-    cnt = await db.execute(select(func.count(AuditLog.id)))
-    total = cnt.scalar() or 0
-    return {"items": items, "total": total}
+    stmt = select(AuditLog) if user_id is None else select(AuditLog).where(AuditLog.user_id == user_id)
+    return await _list_page(db, stmt, [AuditLog.timestamp, AuditLog.id], item, limit=limit, offset=offset, cursor=cursor, count=count, descending=True)
 
 
 # --- アラート通知（Slack Webhook） ---
@@ -1171,8 +1106,7 @@ async def run_seed(force: bool = False):
 # --- WebSocket: リアルタイム更新 ---
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """クライアント接続。30秒ごとに refresh をブロードキャスト"""
-    import asyncio
+    """クライアント接続。データ変更時に refresh（domains: 変更のあったドメイン）を受け取る"""
     import json
     await ws_manager.connect(websocket)
     try:
@@ -1181,23 +1115,15 @@ async def websocket_endpoint(websocket: WebSocket):
             try:
                 payload = json.loads(data)
                 if payload.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong", "ts": datetime.utcnow().isoformat()}))
+                    await ws_manager.send(websocket, {"type": "pong", "ts": datetime.utcnow().isoformat()})
             except json.JSONDecodeError:
                 pass
     except WebSocketDisconnect:
+        pass
+    finally:
         ws_manager.disconnect(websocket)
 
 
-async def _ws_broadcast_loop():
-    """30秒ごとに refresh をブロードキャスト（接続中クライアント向け）"""
-    import asyncio
-    import json
-    while True:
-        await asyncio.sleep(30)
-        if ws_manager.active_connections:
-            await ws_manager.broadcast({"type": "refresh", "ts": datetime.utcnow().isoformat()})
-
-
 # --- Health (Phase 3: K8s probes) ---
 @app.get("/health")
 async def health():
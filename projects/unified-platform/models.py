@@ -1,6 +1,6 @@
 """Phase 1: SQLAlchemy Models - Medical, Aviation, Space"""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, JSON, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -31,6 +31,11 @@ class Notification(Base):
 class AuditLog(Base):
     """Phase 2: Audit Log - Compliance"""
     __tablename__ = "audit_logs"
+    # 一覧（新しい順）のキーセットページング用
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     user_id = Column(String(64), nullable=True)
@@ -77,6 +82,7 @@ class VitalSign(Base):
 # --- Aviation ---
 class Flight(Base):
     __tablename__ = "flights"
+    __table_args__ = (Index("ix_flights_status_id", "status", "id"),)  # status で絞った一覧のキーセットページング用
     id = Column(Integer, primary_key=True, autoincrement=True)
     flight_id = Column(String(32), unique=True)
     route = Column(String(32))
@@ -87,6 +93,13 @@ class Flight(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class FlightStatusStat(Base):
+    """便ステータス別の件数 - flights のトリガーで増分更新（services/flight_stats.py）"""
+    __tablename__ = "flight_status_stats"
+    status = Column(String(64), primary_key=True)  # NULL は空文字
+    flight_count = Column(Integer, nullable=False, default=0)
+
+
 class Airport(Base):
     __tablename__ = "airports"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -101,6 +114,7 @@ class Airport(Base):
 # --- Space ---
 class Satellite(Base):
     __tablename__ = "satellites"
+    __table_args__ = (Index("ix_satellites_status_id", "status", "id"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     satellite_id = Column(String(64), unique=True)
     name = Column(String(128))
@@ -120,3 +134,18 @@ class Launch(Base):
     vehicle = Column(String(64))
     status = Column(String(32))
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# --- Search ---
+class SearchDocument(Base):
+    """横断検索インデックス - 各テーブルのトリガーで更新（services/search_index.py）"""
+    __tablename__ = "search_documents"
+    __table_args__ = (UniqueConstraint("type", "entity_id", name="uq_search_documents_entity"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    domain = Column(String(16), nullable=False)
+    type = Column(String(16), nullable=False)
+    entity_id = Column(String(64), nullable=False)
+    label = Column(String(256), nullable=False)
+    detail = Column(String(128))
+    search_text = Column(Text, nullable=False)  # 小文字化した検索対象テキスト
+    label_key = Column(String(256), nullable=False, index=True)  # 前方一致用（小文字）
@@ -45,7 +45,7 @@ def seed(force: bool = False):
         if not force and s.execute(select(Patient)).scalars().first():
             return
         if force:
-            for t in ["notifications", "ai_diagnoses", "vital_signs", "patients", "flights", "airports", "satellites", "launches"]:
+            for t in ["notifications", "ai_diagnoses", "vital_signs", "patients", "flights", "flight_status_stats", "airports", "satellites", "launches", "search_documents"]:
                 try:
                     s.execute(text(f"TRUNCATE TABLE {t} CASCADE"))
                 except Exception:
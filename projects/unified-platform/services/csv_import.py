@@ -0,0 +1,217 @@
+"""CSV 一括インポート - ストリーミング読み込み・バッチ検証・一括 UPSERT・バックグラウンドジョブ"""
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_config
+from models import Flight, Patient
+from services.realtime import notify_tables
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ImportSpec:
+    """インポート対象テーブルの定義"""
+    name: str
+    model: Type
+    key: str  # UPSERT の競合判定列（主キーまたは UNIQUE）
+    parse_row: Callable[[Dict[str, str]], Dict[str, Any]]  # 不正な行は ValueError
+
+
+def _text(row: Dict[str, str], column: str, max_len: int, default: str = "") -> str:
+    return ((row.get(column) or default).strip())[:max_len]
+
+
+def _parse_patient(row: Dict[str, str]) -> Dict[str, Any]:
+    """CSV: id,identifier,family_name,given_name,gender,birth_date"""
+    pid = (row.get("id") or row.get("identifier") or "").strip()
+    if not pid:
+        raise ValueError("id or identifier is required")
+    birth_date = _text(row, "birth_date", 16)
+    if birth_date:
+        try:
+            date.fromisoformat(birth_date)
+        except ValueError:
+            raise ValueError(f"invalid birth_date: {birth_date}")
+    return {
+        "id": pid[:32],
+        "identifier": _text(row, "identifier", 64, pid),
+        "family_name": _text(row, "family_name", 128),
+        "given_name": _text(row, "given_name", 128),
+        "gender": _text(row, "gender", 16),
+        "birth_date": birth_date,
+    }
+
+
+def _parse_flight(row: Dict[str, str]) -> Dict[str, Any]:
+    """CSV: flight_id,route,departure,arrival,status,aircraft"""
+    fid = (row.get("flight_id") or "").strip()
+    if not fid:
+        raise ValueError("flight_id is required")
+    return {
+        "flight_id": fid[:32],
+        "route": _text(row, "route", 32),
+        "departure": _text(row, "departure", 16),
+        "arrival": _text(row, "arrival", 16),
+        "status": _text(row, "status", 64) or "OnTime",
+        "aircraft": _text(row, "aircraft", 32),
+    }
+
+
+PATIENT_IMPORT = ImportSpec("patients", Patient, "id", _parse_patient)
+FLIGHT_IMPORT = ImportSpec("flights", Flight, "flight_id", _parse_flight)
+
+
+def iter_csv_batches(fileobj, spec: ImportSpec, batch_size: int) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    バイナリのファイルを逐次デコード・パースし、(有効行, エラー行) をバッチ単位で返す。
+    バッチ内で同じキーの行は後の行を採用（1つの UPSERT で同じ行を2回更新しない）。
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text)
+        rows: Dict[Any, Dict[str, Any]] = {}
+        errors: List[Dict[str, Any]] = []
+        for row in reader:
+            try:
+                values = spec.parse_row(row)
+                rows[values[spec.key]] = values
+            except ValueError as e:
+                errors.append({"line": reader.line_num, "error": str(e)})
+            if len(rows) + len(errors) >= batch_size:
+                yield list(rows.values()), errors
+                rows, errors = {}, []
+        if rows or errors:
+            yield list(rows.values()), errors
+    finally:
+        text.detach()  # 元のファイルは呼び出し側が閉じる
+
+
+def upsert_statement(spec: ImportSpec, dialect: str):
+    """INSERT ... ON CONFLICT (key) DO UPDATE（PostgreSQL / SQLite）"""
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(spec.model.__table__)
+    columns = [c.name for c in spec.model.__table__.columns if c.name not in (spec.key, "id", "created_at")]
+    return stmt.on_conflict_do_update(
+        index_elements=[spec.key],
+        set_={c: stmt.excluded[c] for c in columns},
+    )
+
+
+def _new_job(spec: ImportSpec, filename: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": f"import-{uuid.uuid4().hex[:12]}",
+        "target": spec.name,
+        "filename": filename,
+        "status": "running",
+        "rows_processed": 0,
+        "imported": 0,
+        "failed": 0,
+        "batches": 0,
+        "errors": [],
+        "started_at": datetime.utcnow().isoformat(),
+        "completed_at": None,
+    }
+
+
+async def run_import(db: AsyncSession, spec: ImportSpec, fileobj, job: Optional[Dict[str, Any]] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    ファイルをバッチごとに検証・UPSERT・コミットする（メモリ使用量はバッチサイズで一定）。
+    パースはスレッドで行い、イベントループを止めない。job には進捗を書き込む。
+    """
+    cfg = get_config()
+    batch_size = batch_size or cfg["csv_import_batch_size"]
+    max_errors = cfg["csv_import_max_errors"]
+    job = job if job is not None else _new_job(spec, None)
+    stmt = upsert_statement(spec, db.bind.dialect.name)
+    batches = iter_csv_batches(fileobj, spec, batch_size)
+    try:
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            rows, errors = batch
+            job["rows_processed"] += len(rows) + len(errors)
+            job["failed"] += len(errors)
+            job["errors"].extend(errors[: max_errors - len(job["errors"])])
+            if rows:
+                try:
+                    await db.execute(stmt, rows)
+                    await db.commit()
+                    job["imported"] += len(rows)
+                    notify_tables([spec.model.__tablename__])
+                except Exception as e:
+                    await db.rollback()
+                    job["failed"] += len(rows)
+                    if len(job["errors"]) < max_errors:
+                        job["errors"].append({"batch": job["batches"] + 1, "rows": len(rows), "error": str(e)[:500]})
+            job["batches"] += 1
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)[:500]
+    finally:
+        batches.close()
+        job["completed_at"] = datetime.utcnow().isoformat()
+    return job
+
+
+# --- バックグラウンドジョブ ---
+_import_jobs: Dict[str, Dict[str, Any]] = {}
+_import_tasks: Dict[str, asyncio.Task] = {}
+_MAX_JOBS = 100
+
+
+async def spool_upload(upload) -> str:
+    """アップロードを一時ファイルへチャンク単位でコピー（リクエスト終了後も読めるように）"""
+    fd, path = tempfile.mkstemp(prefix="csv-import-", suffix=".csv")
+    with os.fdopen(fd, "wb") as f:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+    return path
+
+
+async def _run_job(spec: ImportSpec, path: str, job: Dict[str, Any]):
+    from database import AsyncSessionLocal
+    try:
+        with open(path, "rb") as f:
+            async with AsyncSessionLocal() as db:
+                await run_import(db, spec, f, job)
+    finally:
+        os.unlink(path)
+        _import_tasks.pop(job["id"], None)
+
+
+async def start_import_job(spec: ImportSpec, upload) -> Dict[str, Any]:
+    """アップロードを一時保存し、インポートをバックグラウンドで開始する"""
+    path = await spool_upload(upload)
+    job = _new_job(spec, getattr(upload, "filename", None))
+    _import_jobs[job["id"]] = job
+    finished = [jid for jid, j in _import_jobs.items() if j["status"] != "running"]
+    for jid in finished[: max(0, len(_import_jobs) - _MAX_JOBS)]:
+        _import_jobs.pop(jid, None)
+    _import_tasks[job["id"]] = asyncio.create_task(_run_job(spec, path, job))
+    return job
+
+
+def get_import_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _import_jobs.get(job_id)
+
+
+def list_import_jobs(limit: int = 50) -> List[Dict[str, Any]]:
+    jobs = sorted(_import_jobs.values(), key=lambda j: j["started_at"], reverse=True)
+    return [{k: v for k, v in j.items() if k != "errors"} for j in jobs[:limit]]
@@ -0,0 +1,72 @@
+"""航空: 便ステータス別件数の集計テーブル - トリガーで増分更新し、集計 API は件数表を読むだけ"""
+from typing import Dict
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Flight, FlightStatusStat
+
+# INSERT / DELETE / status の UPDATE（CSV インポートの UPSERT を含む）を件数表に反映
+_SQLITE_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS trg_flight_stats_insert AFTER INSERT ON flights BEGIN
+        INSERT INTO flight_status_stats (status, flight_count) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET flight_count = flight_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_flight_stats_delete AFTER DELETE ON flights BEGIN
+        UPDATE flight_status_stats SET flight_count = flight_count - 1 WHERE status = COALESCE(OLD.status, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_flight_stats_update AFTER UPDATE OF status ON flights
+    WHEN COALESCE(OLD.status, '') <> COALESCE(NEW.status, '') BEGIN
+        UPDATE flight_status_stats SET flight_count = flight_count - 1 WHERE status = COALESCE(OLD.status, '');
+        INSERT INTO flight_status_stats (status, flight_count) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET flight_count = flight_count + 1;
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """CREATE OR REPLACE FUNCTION flight_status_stats_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE flight_status_stats SET flight_count = flight_count - 1 WHERE status = COALESCE(OLD.status, '');
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO flight_status_stats (status, flight_count) VALUES (COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (status) DO UPDATE SET flight_count = flight_status_stats.flight_count + 1;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS trg_flight_stats_insert_delete ON flights",
+    """CREATE TRIGGER trg_flight_stats_insert_delete AFTER INSERT OR DELETE ON flights
+    FOR EACH ROW EXECUTE FUNCTION flight_status_stats_apply()""",
+    "DROP TRIGGER IF EXISTS trg_flight_stats_update ON flights",
+    """CREATE TRIGGER trg_flight_stats_update AFTER UPDATE OF status ON flights
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status) EXECUTE FUNCTION flight_status_stats_apply()""",
+]
+
+
+def rebuild_flight_stats(conn) -> None:
+    """件数表を flights の GROUP BY で作り直す（トリガー導入前のデータ・TRUNCATE 後の復旧用）"""
+    conn.execute(delete(FlightStatusStat))
+    conn.execute(
+        insert(FlightStatusStat).from_select(
+            ["status", "flight_count"],
+            select(func.coalesce(Flight.status, ""), func.count()).group_by(func.coalesce(Flight.status, "")),
+        )
+    )
+
+
+def install_flight_stats(conn) -> None:
+    """トリガーを作成し、件数表が空なら既存の便から集計する（init_db から run_sync で呼ぶ）"""
+    ddl = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(conn.dialect.name)
+    if ddl is None:
+        return
+    for stmt in ddl:
+        conn.execute(text(stmt))
+    if conn.execute(select(FlightStatusStat.status).limit(1)).first() is None:
+        rebuild_flight_stats(conn)
+
+
+async def get_status_counts(db: AsyncSession) -> Dict[str, int]:
+    """ステータス → 便数（件数表の数行を読むだけ）"""
+    r = await db.execute(select(FlightStatusStat.status, FlightStatusStat.flight_count).where(FlightStatusStat.flight_count > 0))
+    return {status: count for status, count in r.all()}
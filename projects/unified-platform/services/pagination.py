@@ -0,0 +1,154 @@
+"""一覧 API のページング - キーセット（カーソル）方式と件数の概算
+
+- cursor を指定するとキーセット方式: 並び順の列（末尾は一意な列）で WHERE (k1, k2) > (...) して LIMIT のみ。
+  どのページも複合インデックスの範囲走査になり、深いページでも1ページ目と同じコスト
+- カーソルは最終行のキー値を base64url(JSON) にした不透明な文字列（next_cursor をそのまま渡す）
+- 件数 count: exact（COUNT(*)）/ estimated（PostgreSQL は pg_class.reltuples、その他は COUNT を一定時間キャッシュ）/ none
+  キャッシュのキーは絞り込み条件（利用者の入力値を含む）なので、件数は COUNT_CACHE_SIZE までの LRU
+"""
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_config
+from database import Base
+
+MAX_LIMIT = 500
+COUNT_CACHE_SIZE = 256
+COUNT_MODES = ("exact", "estimated", "none")
+
+
+class InvalidPageRequest(ValueError):
+    """カーソルの形式が不正・並び順と一致しない、または count の指定が不正"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """カーソルをキー値に戻す（列の型に合わせて datetime を復元）"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidPageRequest("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidPageRequest("invalid cursor")
+    out = []
+    for col, v in zip(columns, values):
+        try:
+            py_type = col.type.python_type
+        except NotImplementedError:
+            py_type = object
+        if v is not None and py_type is datetime:
+            try:
+                v = datetime.fromisoformat(v)
+            except (TypeError, ValueError):
+                raise InvalidPageRequest("invalid cursor")
+        elif v is not None and py_type in (int, str) and not isinstance(v, py_type):
+            raise InvalidPageRequest("invalid cursor")
+        out.append(v)
+    return out
+
+
+def _table_name(stmt) -> str:
+    return stmt.get_final_froms()[0].name
+
+
+# --- 件数 ---
+_count_cache: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+
+
+async def _exact_count(db: AsyncSession, stmt) -> int:
+    r = await db.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    return r.scalar() or 0
+
+
+async def count_rows(db: AsyncSession, stmt, mode: str = "exact") -> Tuple[Optional[int], bool]:
+    """(件数, 概算かどうか)。estimated はフィルタなしならテーブル統計、それ以外は一定時間キャッシュした COUNT"""
+    if mode == "none":
+        return None, False
+    if mode != "estimated":
+        return await _exact_count(db, stmt), False
+    table = _table_name(stmt)
+    if db.bind.dialect.name == "postgresql" and stmt.whereclause is None:
+        r = await db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table})
+        estimate = r.scalar()
+        if estimate is not None and estimate >= 0:  # -1 は未 ANALYZE
+            return int(estimate), True
+    try:
+        key = (table, str(stmt.whereclause.compile(compile_kwargs={"literal_binds": True})) if stmt.whereclause is not None else "")
+    except Exception:
+        return await _exact_count(db, stmt), False
+    cached = _count_cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[1] < get_config()["list_count_cache_sec"]:
+        _count_cache.move_to_end(key)
+        return cached[0], True
+    value = await _exact_count(db, stmt)
+    _count_cache[key] = (value, now)
+    _count_cache.move_to_end(key)
+    while len(_count_cache) > COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+    return value, True
+
+
+# --- ページ取得 ---
+async def keyset_page(db: AsyncSession, stmt, order_by: Sequence, cursor: str, limit: int, descending: bool = False) -> Tuple[list, Optional[str]]:
+    """キーセット方式で1ページ取得し (行, 次ページのカーソル) を返す。cursor が空なら先頭ページ"""
+    if cursor:
+        after = decode_cursor(cursor, order_by)
+        if len(order_by) == 1:
+            key, after = order_by[0], after[0]
+        else:
+            key, after = tuple_(*order_by), tuple_(*after)
+        stmt = stmt.where(key < after if descending else key > after)
+    stmt = stmt.order_by(*(c.desc() if descending else c.asc() for c in order_by)).limit(limit + 1)
+    rows = list((await db.execute(stmt)).scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in order_by])
+
+
+async def list_page(
+    db: AsyncSession,
+    stmt,
+    order_by: Sequence,
+    serialize: Callable[[Any], Dict[str, Any]],
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """
+    一覧 API の共通処理。cursor が None なら従来の LIMIT/OFFSET（件数はデフォルト exact）、
+    cursor を指定（先頭は空文字）するとキーセット方式（件数はデフォルト estimated）。
+    """
+    limit = min(max(limit, 1), MAX_LIMIT)
+    count = count or ("exact" if cursor is None else "estimated")
+    if count not in COUNT_MODES:
+        raise InvalidPageRequest(f"count must be one of {', '.join(COUNT_MODES)}")
+    total, estimated = await count_rows(db, stmt, count)
+    if cursor is None:
+        ordered = stmt.order_by(*(c.desc() if descending else c.asc() for c in order_by))
+        rows = (await db.execute(ordered.limit(limit).offset(max(offset, 0)))).scalars().all()
+        return {"items": [serialize(x) for x in rows], "total": total, "total_estimated": estimated, "limit": limit, "offset": offset}
+    rows, next_cursor = await keyset_page(db, stmt, order_by, cursor, limit, descending)
+    return {"items": [serialize(x) for x in rows], "total": total, "total_estimated": estimated, "limit": limit, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+
+
+def install_list_indexes(conn) -> None:
+    """既存テーブルに後から追加したインデックスを作成（create_all は既存テーブルのインデックスを作らない）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
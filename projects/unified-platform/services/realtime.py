@@ -0,0 +1,249 @@
+"""WebSocket リアルタイム配信 - 接続ごとの送信キュー・遅い接続の切断・Redis pub/sub でワーカー間配信
+
+- 送信は接続ごとの有界キューに積み、書き込みタスクが順に送る（遅い接続が他の接続を止めない）
+- キューあふれ: ws_slow_consumer_policy = disconnect（1013 で切断）/ drop_oldest（古いものを破棄）
+- メッセージは1回だけ JSON にエンコードし、全接続で共有
+- データ変更（ORM のコミット・CSV インポート）で refresh を送る。短時間の変更は ws_refresh_debounce_ms でまとめる
+"""
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import get_config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_CLOSE_SLOW_CONSUMER = 1013  # Try Again Later
+
+# テーブル → refresh で通知するドメイン
+TABLE_DOMAINS = {
+    "patients": "medical", "ai_diagnoses": "medical", "vital_signs": "medical",
+    "flights": "aviation", "airports": "aviation",
+    "satellites": "space", "launches": "space",
+    "notifications": "notifications",
+}
+
+
+class _Connection:
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+
+
+class ConnectionManager:
+    """WebSocket 接続管理（ワーカー内の接続 + Redis pub/sub で他ワーカーへ）"""
+
+    def __init__(self, queue_size: Optional[int] = None, send_timeout: Optional[float] = None, policy: Optional[str] = None, channel: Optional[str] = None, debounce_ms: Optional[int] = None):
+        cfg = get_config()
+        self.queue_size = queue_size or cfg["ws_send_queue_size"]
+        self.send_timeout = send_timeout or cfg["ws_send_timeout_sec"]
+        self.policy = policy or cfg["ws_slow_consumer_policy"]
+        self.channel = channel or cfg["ws_pubsub_channel"]
+        self.debounce = (cfg["ws_refresh_debounce_ms"] if debounce_ms is None else debounce_ms) / 1000
+        self.connections: Dict[WebSocket, _Connection] = {}
+        self.stats = {"sent": 0, "dropped": 0, "slow_disconnects": 0}
+        self._origin = uuid.uuid4().hex
+        self._redis = None  # 購読できたときだけ publish する
+        self._listener: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def active_connections(self):
+        return list(self.connections)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        conn = self.connections[websocket] = _Connection(websocket, self.queue_size)
+        conn.writer = asyncio.create_task(self._writer(conn))
+
+    def disconnect(self, websocket: WebSocket):
+        conn = self.connections.pop(websocket, None)
+        if conn and conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    async def _writer(self, conn: _Connection):
+        try:
+            while True:
+                text = await conn.queue.get()
+                await asyncio.wait_for(conn.websocket.send_text(text), timeout=self.send_timeout)
+                self.stats["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["slow_disconnects"] += 1
+            self.disconnect(conn.websocket)
+            await _close(conn.websocket)
+
+    def _enqueue(self, websocket: WebSocket, text: str):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        if conn.queue.full():
+            if self.policy == "drop_oldest":
+                conn.queue.get_nowait()
+                self.stats["dropped"] += 1
+            else:
+                self.stats["slow_disconnects"] += 1
+                self.disconnect(websocket)
+                asyncio.create_task(_close(websocket))
+                return
+        conn.queue.put_nowait(text)
+
+    def _deliver(self, text: str):
+        for websocket in list(self.connections):
+            self._enqueue(websocket, text)
+
+    async def send(self, websocket: WebSocket, data: dict):
+        """1接続にだけ送る（pong など）"""
+        self._enqueue(websocket, json.dumps(data, default=str))
+
+    async def broadcast(self, data: dict):
+        """全ワーカーの全接続へ送る"""
+        text = json.dumps(data, default=str)
+        self._deliver(text)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(self.channel, json.dumps({"origin": self._origin, "text": text}))
+            except Exception as e:
+                logger.warning(f"WebSocket publish failed: {e}")
+
+    # --- ワーカー間配信 ---
+    async def _listen(self, client):
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._redis = client
+                async for message in pubsub.listen():
+                    try:
+                        envelope = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if envelope.get("origin") != self._origin:
+                        self._deliver(envelope["text"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis 未接続の間はワーカー内のみで配信し、定期的に再接続する
+                logger.warning(f"WebSocket pub/sub unavailable: {e}")
+            finally:
+                self._redis = None
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(30)
+
+    async def start(self):
+        """lifespan から呼ぶ: pub/sub の購読開始と変更通知の受け付け"""
+        self._loop = asyncio.get_running_loop()
+        client = await get_redis()
+        if client is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen(client))
+
+    async def stop(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._loop = None
+        tasks = [c.writer for c in self.connections.values() if c.writer]
+        if self._listener is not None:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.connections.clear()
+
+    # --- データ変更の通知 ---
+    def notify_change(self, domains: Iterable[str]):
+        """変更のあったドメインを登録し、デバウンス後に refresh を送る（どのスレッドからでも呼べる）"""
+        domains = set(domains)
+        loop = self._loop
+        if not domains or loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._mark(domains)
+        else:
+            loop.call_soon_threadsafe(self._mark, domains)
+
+    def _mark(self, domains: Set[str]):
+        self._pending |= domains
+        if self._flush_handle is None and self._loop is not None:
+            self._flush_handle = self._loop.call_later(self.debounce, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        self._flush_handle = None
+        domains, self._pending = sorted(self._pending), set()
+        if domains:
+            await self.broadcast({"type": "refresh", "domains": domains, "ts": datetime.utcnow().isoformat()})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "connections": len(self.connections), "queued": sum(c.queue.qsize() for c in self.connections.values()), "pubsub": self._redis is not None}
+
+
+async def _close(websocket: WebSocket):
+    try:
+        await websocket.close(code=_CLOSE_SLOW_CONSUMER)
+    except Exception:
+        pass
+
+
+ws_manager = ConnectionManager()
+
+
+def notify_tables(tables: Iterable[str]):
+    """テーブル名から対応ドメインの refresh を通知"""
+    ws_manager.notify_change({TABLE_DOMAINS[t] for t in tables if t in TABLE_DOMAINS})
+
+
+# --- ORM の変更検知: flush で変更テーブルを記録し、commit 後に通知（rollback なら破棄） ---
+_listeners_lock = threading.Lock()
+_listeners_installed = False
+
+
+def _after_flush(session, flush_context):
+    tables = session.info.setdefault("realtime_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in TABLE_DOMAINS:
+            tables.add(table)
+
+
+def _after_commit(session):
+    tables = session.info.pop("realtime_tables", None)
+    if tables:
+        notify_tables(tables)
+
+
+def _after_rollback(session):
+    session.info.pop("realtime_tables", None)
+
+
+def install_change_listeners():
+    """Session（同期・非同期とも）に変更検知フックを登録"""
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _listeners_installed = True
@@ -0,0 +1,211 @@
+"""横断検索インデックス - 患者・フライト・衛星を search_documents に集約し、trigram で部分一致検索
+
+- search_documents は各テーブルのトリガーで更新（ORM・CSV インポートの UPSERT・削除すべて）
+- SQLite: FTS5（tokenize='trigram'）の外部コンテンツテーブル search_fts
+- PostgreSQL: pg_trgm の GIN インデックス（search_text）
+- 3文字以上は部分一致（日本語も文字単位の trigram）、1〜2文字はラベルの前方一致（補完）
+- 1〜2文字でも日本語（かな・漢字）・ハングルを含む語は部分一致も行う（「花子」「藤」で「佐藤 花子」）。
+  trigram にならないため LIKE で探す（PostgreSQL は pg_trgm の GIN、SQLite は走査）。候補数は CANDIDATE_LIMIT まで
+"""
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import SearchDocument
+
+TRIGRAM_MIN_CHARS = 3
+# 部分一致の候補数の上限（この中で順位付けする。件数が増えても検索時間を一定に保つ）
+CANDIDATE_LIMIT = 200
+_PREFIX_END = "\U0010ffff"
+# 単語を空白で区切らない文字（かな・漢字・ハングル）。短い語でも部分一致の対象にする
+_CJK = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af\uff66-\uff9f]")
+
+# 検索対象: (テーブル, 種別, ドメイン, ID, ラベル, 詳細, 検索テキスト)。{r} は NEW / OLD / テーブル名
+_SOURCES = [
+    (
+        "patients", "patient", "medical", "{r}.id",
+        "COALESCE(NULLIF(TRIM(COALESCE({r}.family_name, '') || ' ' || COALESCE({r}.given_name, '')), ''), {r}.identifier, {r}.id)",
+        "COALESCE({r}.identifier, '')",
+        "{r}.id || ' ' || COALESCE({r}.identifier, '') || ' ' || COALESCE({r}.family_name, '') || ' ' || COALESCE({r}.given_name, '')",
+    ),
+    (
+        "flights", "flight", "aviation", "{r}.flight_id",
+        "TRIM({r}.flight_id || ' ' || COALESCE({r}.route, ''))",
+        "COALESCE({r}.route, '')",
+        "{r}.flight_id || ' ' || COALESCE({r}.route, '')",
+    ),
+    (
+        "satellites", "satellite", "space", "{r}.satellite_id",
+        "COALESCE(NULLIF({r}.name, ''), {r}.satellite_id)",
+        "{r}.satellite_id",
+        "{r}.satellite_id || ' ' || COALESCE({r}.name, '')",
+    ),
+]
+
+_COLUMNS = "domain, type, entity_id, label, detail, search_text, label_key"
+
+
+def _upsert(source, r: str, on_conflict: str = "UPDATE") -> str:
+    """search_documents への INSERT ... SELECT（ID が NULL の行は対象外）"""
+    _, type_, domain, entity, label, detail, body = (s.format(r=r) for s in source)
+    sql = (
+        f"INSERT INTO search_documents ({_COLUMNS}) "
+        f"SELECT '{domain}', '{type_}', {entity}, {label}, {detail}, lower({body}), lower({label})"
+        + (f" FROM {r}" if r == source[0] else "")
+        + f" WHERE {entity} IS NOT NULL ON CONFLICT (type, entity_id) DO "
+    )
+    if on_conflict == "NOTHING":
+        return sql + "NOTHING"
+    return sql + (
+        "UPDATE SET label = excluded.label, detail = excluded.detail, "
+        "search_text = excluded.search_text, label_key = excluded.label_key"
+    )
+
+
+def _delete(source, r: str) -> str:
+    return f"DELETE FROM search_documents WHERE type = '{source[1]}' AND entity_id = {source[3].format(r=r)}"
+
+
+def _sqlite_ddl() -> List[str]:
+    ddl = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+        "search_text, content='search_documents', content_rowid='id', tokenize='trigram')",
+        """CREATE TRIGGER IF NOT EXISTS trg_search_fts_insert AFTER INSERT ON search_documents BEGIN
+            INSERT INTO search_fts (rowid, search_text) VALUES (NEW.id, NEW.search_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_search_fts_delete AFTER DELETE ON search_documents BEGIN
+            INSERT INTO search_fts (search_fts, rowid, search_text) VALUES ('delete', OLD.id, OLD.search_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_search_fts_update AFTER UPDATE OF search_text ON search_documents BEGIN
+            INSERT INTO search_fts (search_fts, rowid, search_text) VALUES ('delete', OLD.id, OLD.search_text);
+            INSERT INTO search_fts (rowid, search_text) VALUES (NEW.id, NEW.search_text);
+        END""",
+    ]
+    for source in _SOURCES:
+        table, entity = source[0], source[3]
+        ddl += [
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_insert AFTER INSERT ON {table} BEGIN {_upsert(source, 'NEW')}; END",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_search_{table}_update AFTER UPDATE ON {table} BEGIN
+                {_delete(source, 'OLD')} AND {entity.format(r='OLD')} IS NOT {entity.format(r='NEW')};
+                {_upsert(source, 'NEW')};
+            END""",
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_delete AFTER DELETE ON {table} BEGIN {_delete(source, 'OLD')}; END",
+        ]
+    return ddl
+
+
+def _postgres_ddl() -> List[str]:
+    ddl = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents USING gin (search_text gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_label_prefix ON search_documents (label_key text_pattern_ops)",
+    ]
+    for source in _SOURCES:
+        table, entity = source[0], source[3]
+        ddl += [
+            f"""CREATE OR REPLACE FUNCTION search_index_{table}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND {entity.format(r='OLD')} IS DISTINCT FROM {entity.format(r='NEW')}) THEN
+                    {_delete(source, 'OLD')};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    {_upsert(source, 'NEW')};
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql""",
+            f"DROP TRIGGER IF EXISTS trg_search_{table} ON {table}",
+            f"""CREATE TRIGGER trg_search_{table} AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION search_index_{table}()""",
+        ]
+    return ddl
+
+
+def rebuild_search_index(conn) -> None:
+    """search_documents を元テーブルから作り直す（トリガー導入前のデータ・TRUNCATE 後の復旧用）"""
+    conn.execute(text("DELETE FROM search_documents"))
+    for source in _SOURCES:
+        conn.execute(text(_upsert(source, source[0], on_conflict="NOTHING")))
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("INSERT INTO search_fts (search_fts) VALUES ('rebuild')"))
+
+
+def install_search_index(conn) -> None:
+    """インデックス・トリガーを作成し、空なら既存データから構築する（init_db から run_sync で呼ぶ）"""
+    ddl = {"sqlite": _sqlite_ddl, "postgresql": _postgres_ddl}.get(conn.dialect.name)
+    if ddl is None:
+        return
+    for stmt in ddl():
+        conn.execute(text(stmt))
+    if conn.execute(select(SearchDocument.id).limit(1)).first() is None:
+        rebuild_search_index(conn)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_filter(dialect: str, key: str):
+    if dialect == "postgresql":
+        return SearchDocument.label_key.like(_like_escape(key) + "%", escape="\\")
+    # SQLite: 範囲条件で label_key のインデックスを使う
+    return (SearchDocument.label_key >= key) & (SearchDocument.label_key < key + _PREFIX_END)
+
+
+def _item(doc: SearchDocument) -> Dict[str, Any]:
+    return {"domain": doc.domain, "type": doc.type, "id": doc.entity_id, "label": doc.label, "detail": doc.detail}
+
+
+def _rank(key: str, doc: SearchDocument):
+    """ID・ラベル完全一致 > ラベル前方一致 > 単語の前方一致 > 部分一致。同順位は出現位置・短いラベル順"""
+    if doc.entity_id.lower() == key or doc.label_key == key:
+        tier = 0
+    elif doc.label_key.startswith(key):
+        tier = 1
+    elif f" {key}" in f" {doc.search_text}":
+        tier = 2
+    else:
+        tier = 3
+    pos = doc.search_text.find(key)
+    return tier, pos if pos >= 0 else len(doc.search_text), len(doc.label), doc.label
+
+
+async def suggest(db: AsyncSession, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """ラベルの前方一致（オートコンプリート）"""
+    key = q.strip().lower()
+    if not key:
+        return []
+    r = await db.execute(
+        select(SearchDocument).where(_prefix_filter(db.bind.dialect.name, key)).order_by(SearchDocument.label_key).limit(limit)
+    )
+    return [_item(d) for d in r.scalars().all()]
+
+
+async def search(db: AsyncSession, q: str, limit: int = 20) -> Dict[str, Any]:
+    """横断検索（前方一致 + 部分一致の候補を順位付け）"""
+    key = q.strip().lower()
+    if not key:
+        return {"items": [], "total": 0}
+    dialect = db.bind.dialect.name
+    r = await db.execute(select(SearchDocument).where(_prefix_filter(dialect, key)).order_by(SearchDocument.label_key).limit(limit))
+    candidates = {d.id: d for d in r.scalars().all()}
+    if len(key) >= TRIGRAM_MIN_CHARS or _CJK.search(key):
+        if dialect == "sqlite" and len(key) >= TRIGRAM_MIN_CHARS:
+            matched = (
+                select(text("rowid")).select_from(text("search_fts"))
+                .where(text("search_fts MATCH :match")).limit(CANDIDATE_LIMIT)
+            )
+            stmt = select(SearchDocument).where(SearchDocument.id.in_(matched))
+            params = {"match": '"' + key.replace('"', '""') + '"'}
+        else:
+            stmt = select(SearchDocument).where(
+                SearchDocument.search_text.like(f"%{_like_escape(key)}%", escape="\\")
+            ).limit(CANDIDATE_LIMIT)
+            params = {}
+        r = await db.execute(stmt, params)
+        for d in r.scalars().all():
+            candidates.setdefault(d.id, d)
+    ranked = sorted(candidates.values(), key=lambda d: _rank(key, d))
+    return {"items": [_item(d) for d in ranked[:limit]], "total": len(ranked)}
+
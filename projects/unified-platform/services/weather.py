@@ -0,0 +1,69 @@
+"""航空: 空港周辺の天候キャッシュ - Open-Meteo をバックグラウンドで定期取得し、API は最後の値を返す"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from config import get_config
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+# 東京（NRT/HND）
+_LOCATION = {"latitude": 35.77, "longitude": 140.39}
+
+_cache: Dict[str, Any] = {"weather_risk": 0, "weather": "Unknown", "weather_code": None, "fetched_at": None}
+_lock = asyncio.Lock()
+
+
+def classify_weather(code: int) -> Tuple[int, str]:
+    """WMO codes: 0=clear, 1-3=clouds, 61-67=rain, 80-82=showers, 95-99=thunderstorm"""
+    if code >= 95:
+        return 35, "Thunderstorm"
+    if code >= 80 or 61 <= code <= 67:
+        return 25, "Rain"
+    if 51 <= code <= 57:
+        return 15, "Drizzle"
+    if 1 <= code <= 3:
+        return 5, "Cloudy"
+    return 0, "Clear"
+
+
+async def refresh_weather(client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
+    """Open-Meteo から現在の天候を取得してキャッシュを更新（失敗時は前回の値を保持）"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=5.0) as c:
+            return await refresh_weather(c)
+    async with _lock:
+        try:
+            resp = await client.get(OPEN_METEO_URL, params={**_LOCATION, "current": "weather_code,precipitation"})
+            resp.raise_for_status()
+            code = int(resp.json().get("current", {}).get("weather_code", 0))
+            risk, desc = classify_weather(code)
+            _cache.update(weather_risk=risk, weather=desc, weather_code=code, fetched_at=time.time())
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Weather refresh failed: {e}")
+        return dict(_cache)
+
+
+def get_cached_weather() -> Dict[str, Any]:
+    """最後に取得した天候。TTL を過ぎた値は stale=True（リスクは加算しない）"""
+    ttl = get_config()["weather_ttl_sec"]
+    fetched_at = _cache["fetched_at"]
+    stale = fetched_at is None or time.time() - fetched_at > ttl
+    return {
+        "weather_risk": 0 if stale else _cache["weather_risk"],
+        "weather": ("N/A" if fetched_at else "Unknown") if stale else _cache["weather"],
+        "weather_stale": stale,
+        "weather_fetched_at": datetime.utcfromtimestamp(fetched_at).isoformat() if fetched_at else None,
+    }
+
+
+async def weather_refresh_loop():
+    """weather_refresh_sec ごとに天候を更新（lifespan で起動）"""
+    interval = get_config()["weather_refresh_sec"]
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        while True:
+            await refresh_weather(client)
+            await asyncio.sleep(interval)
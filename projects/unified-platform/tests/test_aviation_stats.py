@@ -0,0 +1,85 @@
+"""Aviation: flight status stats maintained by triggers, cached weather"""
+import asyncio
+import io
+import os
+import time
+os.environ["TESTING"] = "true"
+
+import httpx
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import Flight
+from services import weather
+from services.csv_import import FLIGHT_IMPORT, run_import
+from services.flight_stats import get_status_counts, install_flight_stats
+
+
+def _run(scenario, seed=()):
+    """インメモリ SQLite で実行。seed の便はトリガー導入前に入れる（バックフィルの確認用）"""
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                for f in seed:
+                    await conn.execute(Flight.__table__.insert().values(**f))
+                await conn.run_sync(install_flight_stats)
+            await scenario(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+async def _group_by(db):
+    r = await db.execute(select(func.coalesce(Flight.status, ""), func.count()).group_by(func.coalesce(Flight.status, "")))
+    return dict(r.all())
+
+
+def test_status_counts_follow_inserts_upserts_and_deletes():
+    async def scenario(Session):
+        async with Session() as db:
+            db.add_all([Flight(flight_id="JL001", status="OnTime"), Flight(flight_id="JL002", status="Delayed"), Flight(flight_id="JL003")])
+            await db.commit()
+            assert await get_status_counts(db) == {"OnTime": 1, "Delayed": 1, "": 1}
+
+            data = "flight_id,status\nJL001,Delayed\nNH010,OnTime\nNH011,Boarding\n"
+            await run_import(db, FLIGHT_IMPORT, io.BytesIO(data.encode()))
+            await db.execute(update(Flight).where(Flight.flight_id == "JL003").values(status="OnTime"))
+            await db.execute(delete(Flight).where(Flight.flight_id == "NH011"))
+            await db.commit()
+            assert await get_status_counts(db) == {"Delayed": 2, "OnTime": 2}
+            assert await get_status_counts(db) == {k: v for k, v in (await _group_by(db)).items() if v}
+    _run(scenario)
+
+
+def test_install_backfills_existing_flights():
+    async def scenario(Session):
+        async with Session() as db:
+            assert await get_status_counts(db) == {"OnTime": 2, "Delayed": 1}
+    _run(scenario, seed=[{"flight_id": "A", "status": "OnTime"}, {"flight_id": "B", "status": "OnTime"}, {"flight_id": "C", "status": "Delayed"}])
+
+
+def test_weather_cache_refresh_and_ttl(monkeypatch):
+    def handler(request):
+        assert request.url.host == "api.open-meteo.com"
+        return httpx.Response(200, json={"current": {"weather_code": 63}})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await weather.refresh_weather(client)
+        cached = weather.get_cached_weather()
+        assert (cached["weather"], cached["weather_risk"], cached["weather_stale"]) == ("Rain", 25, False)
+
+        # 取得失敗時は前回の値を保持
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(503))) as client:
+            await weather.refresh_weather(client)
+        assert weather.get_cached_weather()["weather"] == "Rain"
+
+        monkeypatch.setitem(weather._cache, "fetched_at", time.time() - 10_000)
+        stale = weather.get_cached_weather()
+        assert (stale["weather"], stale["weather_risk"], stale["weather_stale"]) == ("N/A", 0, True)
+    asyncio.run(scenario())
+    assert weather.classify_weather(96) == (35, "Thunderstorm")
+    assert weather.classify_weather(0) == (0, "Clear")
@@ -0,0 +1,96 @@
+"""CSV streaming import - batch UPSERT and background jobs"""
+import asyncio
+import io
+import os
+os.environ["TESTING"] = "true"
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import database
+from database import Base
+from models import Flight, Patient
+from services import csv_import
+from services.csv_import import FLIGHT_IMPORT, PATIENT_IMPORT, run_import, start_import_job
+
+
+def _run(scenario):
+    """インメモリ SQLite のセッションファクトリでシナリオを実行（終了時にエンジンを破棄）"""
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await scenario(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def test_patient_import_upserts_in_batches_and_reports_errors():
+    async def scenario(Session):
+        csv_bytes = (
+            "﻿id,identifier,family_name,given_name,gender,birth_date\n"
+            "P1,ID1,山田,太郎,male,1980-01-02\n"
+            "P2,ID2,\"佐藤\n（旧姓）\",花子,female,1990-05-06\n"
+            ",,,,,\n"
+            "P3,ID3,鈴木,一郎,male,not-a-date\n"
+            "P4,ID4,田中,次郎,male,\n"
+            "P1,ID1,山田,太郎,male,1981-01-02\n"
+        ).encode("utf-8")
+        async with Session() as db:
+            job = await run_import(db, PATIENT_IMPORT, io.BytesIO(csv_bytes), batch_size=2)
+        assert job["status"] == "completed"
+        assert job["imported"] == 4  # P1 は2回 UPSERT
+        assert job["failed"] == 2
+        assert [e["line"] for e in job["errors"]] == [5, 6]
+        assert job["batches"] == 3
+
+        async with Session() as db:
+            patients = {p.id: p for p in (await db.execute(select(Patient))).scalars()}
+        assert sorted(patients) == ["P1", "P2", "P4"]
+        assert patients["P1"].birth_date == "1981-01-02"
+        assert patients["P2"].family_name == "佐藤\n（旧姓）"
+    _run(scenario)
+
+
+def test_flight_import_updates_by_flight_id():
+    async def scenario(Session):
+        async with Session() as db:
+            db.add(Flight(flight_id="JL001", route="HND-SFO", status="OnTime"))
+            await db.commit()
+            data = "flight_id,route,departure,arrival,status,aircraft\nJL001,HND-SFO,10:00,18:00,Delayed,B787\nNH002,NRT-LAX,11:00,19:00,,A350\n"
+            job = await run_import(db, FLIGHT_IMPORT, io.BytesIO(data.encode()))
+        assert job["imported"] == 2
+        async with Session() as db:
+            flights = {f.flight_id: f for f in (await db.execute(select(Flight))).scalars()}
+        assert len(flights) == 2
+        assert flights["JL001"].status == "Delayed"
+        assert flights["NH002"].status == "OnTime"
+    _run(scenario)
+
+
+class _Upload:
+    filename = "flights.csv"
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buf.read(size)
+
+
+def test_background_job_reports_progress(monkeypatch):
+    async def scenario(Session):
+        monkeypatch.setattr(database, "AsyncSessionLocal", Session)
+        lines = ["flight_id,route"] + [f"F{i:05d},R{i}" for i in range(2500)] + [",missing"]
+        job = await start_import_job(FLIGHT_IMPORT, _Upload("\n".join(lines).encode()))
+        assert job["status"] == "running"
+        await csv_import._import_tasks[job["id"]]
+        done = csv_import.get_import_job(job["id"])
+        assert done["status"] == "completed"
+        assert done["imported"] == 2500
+        assert done["failed"] == 1
+        assert done["rows_processed"] == 2501
+        assert any(j["id"] == job["id"] for j in csv_import.list_import_jobs())
+    _run(scenario)
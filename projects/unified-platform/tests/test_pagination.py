@@ -0,0 +1,139 @@
+"""List endpoints - keyset (cursor) pagination, estimated counts, composite indexes"""
+import asyncio
+import os
+os.environ["TESTING"] = "true"
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import AuditLog, Flight
+from services import pagination
+from services.pagination import InvalidPageRequest, count_rows, install_list_indexes, list_page
+
+
+def _run(scenario):
+    """インメモリ SQLite のセッションでシナリオを実行（終了時にエンジンを破棄）"""
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                await scenario(db)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def _flight(x):
+    return {"id": x.id, "status": x.status}
+
+
+def test_cursor_pages_walk_all_rows_in_order():
+    async def scenario(db):
+        await db.execute(insert(Flight), [{"flight_id": f"JL{i}", "status": "Delayed" if i % 3 == 0 else "OnTime"} for i in range(250)])
+        await db.commit()
+        seen, cursor = [], ""
+        while True:
+            page = await list_page(db, select(Flight), [Flight.id], _flight, limit=40, cursor=cursor, count="none")
+            seen += [x["id"] for x in page["items"]]
+            if not page["has_more"]:
+                assert page["next_cursor"] is None
+                break
+            cursor = page["next_cursor"]
+        assert seen == sorted(seen) and len(seen) == len(set(seen)) == 250
+
+        # 絞り込み + キーセット
+        stmt = select(Flight).where(Flight.status == "Delayed")
+        first = await list_page(db, stmt, [Flight.id], _flight, limit=50, cursor="")
+        second = await list_page(db, stmt, [Flight.id], _flight, limit=50, cursor=first["next_cursor"])
+        assert second["has_more"] is False and len(first["items"]) + len(second["items"]) == 84
+        assert first["total"] == 84 and first["total_estimated"] is True
+        assert {x["status"] for x in first["items"] + second["items"]} == {"Delayed"}
+
+        # offset 方式は従来どおり exact な total
+        page = await list_page(db, select(Flight), [Flight.id], _flight, limit=10, offset=240)
+        assert page["total"] == 250 and page["total_estimated"] is False and len(page["items"]) == 10
+    _run(scenario)
+
+
+def test_descending_composite_cursor_breaks_timestamp_ties():
+    async def scenario(db):
+        base = datetime(2026, 1, 1)
+        # 同じ timestamp の行が複数あっても id で順序が決まる
+        await db.execute(insert(AuditLog), [{"timestamp": base + timedelta(minutes=i // 4), "action": "read", "resource": "x", "user_id": f"u{i % 2}"} for i in range(30)])
+        await db.commit()
+        order_by = [AuditLog.timestamp, AuditLog.id]
+        seen, cursor = [], ""
+        while cursor is not None:
+            page = await list_page(db, select(AuditLog), order_by, lambda x: (x.timestamp, x.id), limit=7, cursor=cursor, descending=True)
+            seen += page["items"]
+            cursor = page["next_cursor"]
+        assert seen == sorted(seen, reverse=True) and len(set(seen)) == 30
+    _run(scenario)
+
+
+def test_invalid_cursor_and_count_are_rejected():
+    async def scenario(db):
+        for bad in ("not-a-cursor", pagination.encode_cursor(["x", 1]), pagination.encode_cursor(["abc"])):
+            with pytest.raises(InvalidPageRequest):
+                await list_page(db, select(Flight), [Flight.id], _flight, cursor=bad)
+        with pytest.raises(InvalidPageRequest):
+            await list_page(db, select(Flight), [Flight.id], _flight, count="all")
+    _run(scenario)
+
+
+def test_estimated_count_is_cached(monkeypatch):
+    async def scenario(db):
+        pagination._count_cache.clear()
+        await db.execute(insert(Flight), [{"flight_id": "A", "status": "OnTime"}])
+        await db.commit()
+        assert await count_rows(db, select(Flight), "estimated") == (1, True)
+        await db.execute(insert(Flight), [{"flight_id": "B", "status": "OnTime"}])
+        await db.commit()
+        assert await count_rows(db, select(Flight), "estimated") == (1, True)  # キャッシュ
+        assert await count_rows(db, select(Flight), "exact") == (2, False)
+        monkeypatch.setitem(pagination.get_config(), "list_count_cache_sec", 0)
+        assert await count_rows(db, select(Flight), "estimated") == (2, True)
+    _run(scenario)
+
+
+
+def test_count_cache_is_bounded_lru(monkeypatch):
+    async def scenario(db):
+        pagination._count_cache.clear()
+        monkeypatch.setattr(pagination, "COUNT_CACHE_SIZE", 2)
+        await db.execute(insert(Flight), [{"flight_id": f"F{i}", "status": f"S{i % 3}"} for i in range(9)])
+        await db.commit()
+        base = select(Flight)
+        assert await count_rows(db, base, "estimated") == (9, True)
+        assert await count_rows(db, base.where(Flight.status == "S0"), "estimated") == (3, True)
+        assert await count_rows(db, base, "estimated") == (9, True)  # 最近使用に
+        assert await count_rows(db, base.where(Flight.status == "S1"), "estimated") == (3, True)
+        assert [where for _, where in pagination._count_cache] == ["", "flights.status = 'S1'"]
+        # 利用者ごとに異なる絞り込み値が来ても上限を超えない（古いものから追い出す）
+        for i in range(20):
+            await count_rows(db, base.where(Flight.flight_id == f"X{i}"), "estimated")
+        assert len(pagination._count_cache) == 2
+    _run(scenario)
+
+
+def test_keyset_queries_use_composite_indexes():
+    async def scenario(db):
+        await db.run_sync(lambda s: install_list_indexes(s.connection()))  # 既存テーブルに対して冪等
+        plans = []
+        for sql in (
+            "SELECT * FROM flights WHERE status = 'OnTime' AND id > 100 ORDER BY id LIMIT 51",
+            "SELECT * FROM audit_logs WHERE (timestamp, id) < ('2026-01-01', 5) ORDER BY timestamp DESC, id DESC LIMIT 51",
+            "SELECT * FROM audit_logs WHERE user_id = 'u1' AND (timestamp, id) < ('2026-01-01', 5) ORDER BY timestamp DESC, id DESC LIMIT 51",
+        ):
+            rows = (await db.execute(text("EXPLAIN QUERY PLAN " + sql))).all()
+            plans.append(" ".join(r[-1] for r in rows))
+        assert "ix_flights_status_id" in plans[0]
+        assert "ix_audit_logs_timestamp_id" in plans[1]
+        assert "ix_audit_logs_user_timestamp_id" in plans[2]
+        assert all("TEMP B-TREE" not in p for p in plans)  # ソートなし
+    _run(scenario)
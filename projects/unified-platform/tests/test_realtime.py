@@ -0,0 +1,150 @@
+"""WebSocket fan-out - per-connection queues, slow consumers, change-driven refresh"""
+import asyncio
+import io
+import json
+import os
+os.environ["TESTING"] = "true"
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import Flight, Patient
+from services import realtime
+from services.csv_import import FLIGHT_IMPORT, run_import
+from services.realtime import ConnectionManager, install_change_listeners
+
+
+class FakeWebSocket:
+    """送信内容を記録する WebSocket（delay 秒遅れて送る）"""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_code = code
+
+
+def test_slow_consumer_is_disconnected_without_blocking_others():
+    async def main():
+        manager = ConnectionManager(queue_size=3, send_timeout=5.0, policy="disconnect")
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=10)
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(5):
+            await manager.broadcast({"n": i})
+            await asyncio.sleep(0.01)
+        assert [m["n"] for m in fast.sent] == [0, 1, 2, 3, 4]
+        assert slow.closed_code == 1013
+        assert manager.active_connections == [fast]
+        await manager.stop()
+    asyncio.run(main())
+
+
+def test_drop_oldest_and_send_timeout():
+    async def main():
+        manager = ConnectionManager(queue_size=2, send_timeout=5.0, policy="drop_oldest")
+        ws = FakeWebSocket(delay=0.01)
+        await manager.connect(ws)
+        for i in range(6):
+            await manager.broadcast({"n": i})
+        await asyncio.sleep(0.1)
+        assert ws.closed_code is None and [m["n"] for m in ws.sent][-2:] == [4, 5]
+        assert manager.get_stats()["dropped"] == 6 - len(ws.sent)
+        await manager.stop()
+
+        manager = ConnectionManager(queue_size=10, send_timeout=0.02)
+        stuck = FakeWebSocket(delay=1)
+        await manager.connect(stuck)
+        await manager.broadcast({"type": "refresh"})
+        await asyncio.sleep(0.1)
+        assert stuck.closed_code == 1013 and manager.get_stats()["connections"] == 0
+        await manager.stop()
+    asyncio.run(main())
+
+
+def test_orm_commits_and_csv_import_push_debounced_refresh(monkeypatch):
+    manager = ConnectionManager(debounce_ms=20)
+    monkeypatch.setattr(realtime, "ws_manager", manager)
+    install_change_listeners()
+
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            await manager.start()
+            ws = FakeWebSocket()
+            await manager.connect(ws)
+
+            # 短時間の複数コミットは1回の refresh にまとまる
+            async with Session() as db:
+                db.add(Patient(id="P1", identifier="ID1"))
+                await db.commit()
+                db.add(Flight(flight_id="JL1", status="OnTime"))
+                await db.commit()
+            await asyncio.sleep(0.1)
+            assert [(m["type"], m["domains"]) for m in ws.sent] == [("refresh", ["aviation", "medical"])]
+
+            # ロールバックされた変更は通知しない
+            async with Session() as db:
+                db.add(Patient(id="P2", identifier="ID2"))
+                await db.flush()
+                await db.rollback()
+            await asyncio.sleep(0.1)
+            assert len(ws.sent) == 1
+
+            # CSV インポート（Core の UPSERT）もバッチのコミットで通知
+            async with Session() as db:
+                await run_import(db, FLIGHT_IMPORT, io.BytesIO(b"flight_id,status\nJL2,Delayed\n"))
+            await asyncio.sleep(0.1)
+            assert ws.sent[-1]["domains"] == ["aviation"] and len(ws.sent) == 2
+        finally:
+            await manager.stop()
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def test_pubsub_messages_from_other_workers_are_delivered():
+    class FakePubSub:
+        def __init__(self, messages):
+            self.messages = messages
+
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            for m in self.messages:
+                yield {"data": m}
+            raise asyncio.CancelledError
+
+        async def aclose(self):
+            pass
+
+    async def main():
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws)
+        text = json.dumps({"type": "refresh", "domains": ["space"]})
+        messages = [json.dumps({"origin": "other", "text": text}), json.dumps({"origin": manager._origin, "text": text}), "broken"]
+
+        class FakeRedis:
+            def pubsub(self, ignore_subscribe_messages=True):
+                return FakePubSub(messages)
+
+        try:
+            await manager._listen(FakeRedis())
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.01)
+        assert ws.sent == [{"type": "refresh", "domains": ["space"]}]
+        await manager.stop()
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Cross-domain search index - triggers, trigram matching, ranking, prefix suggest"""
+import asyncio
+import io
+import os
+os.environ["TESTING"] = "true"
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import Flight, Patient, Satellite
+from services.csv_import import PATIENT_IMPORT, run_import
+from services.search_index import install_search_index, search, suggest
+
+
+def _run(scenario, seed=()):
+    """インメモリ SQLite で実行。seed の行はトリガー導入前に入れる（初回構築の確認用）"""
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                for table, values in seed:
+                    await conn.execute(table.insert().values(**values))
+                await conn.run_sync(install_search_index)
+            await scenario(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def _ids(result):
+    return [item["id"] for item in result["items"]]
+
+
+def test_search_tracks_crud_and_import():
+    async def scenario(Session):
+        async with Session() as db:
+            db.add_all([
+                Patient(id="P001", identifier="MRN-001", family_name="山田", given_name="太郎"),
+                Flight(flight_id="JL001", route="NRT-LAX"),
+                Satellite(satellite_id="ISS", name="International Space Station"),
+            ])
+            await db.commit()
+            assert _ids(await search(db, "山田太")) == []  # ラベルは「山田 太郎」
+            assert _ids(await search(db, "山田 太")) == ["P001"]
+            assert _ids(await search(db, "nrt-l")) == ["JL001"]
+            assert (await search(db, "space"))["items"][0]["label"] == "International Space Station"
+
+            csv_data = "id,identifier,family_name,given_name\nP001,MRN-001,佐藤,太郎\nP002,MRN-002,高橋,美咲\n"
+            await run_import(db, PATIENT_IMPORT, io.BytesIO(csv_data.encode()))
+            assert _ids(await search(db, "山田 太")) == []
+            assert _ids(await search(db, "mrn-00")) == ["P001", "P002"]
+
+            await db.execute(update(Flight).where(Flight.flight_id == "JL001").values(flight_id="JL009"))
+            await db.execute(delete(Satellite))
+            await db.commit()
+            assert _ids(await search(db, "jl00")) == ["JL009"]
+            assert _ids(await search(db, "station")) == []
+    _run(scenario)
+
+
+def test_ranking_and_prefix_suggest():
+    async def scenario(Session):
+        async with Session() as db:
+            db.add_all([
+                Flight(flight_id="NH100", route="HND-JLA"),
+                Flight(flight_id="JL100", route="HND-SFO"),
+                Satellite(satellite_id="JL1", name="JL1"),
+            ])
+            await db.commit()
+            # 完全一致 > 前方一致 > 部分一致
+            assert _ids(await search(db, "jl1")) == ["JL1", "JL100"]
+            assert _ids(await search(db, "hnd-")) == ["JL100", "NH100"]
+            # 2文字以下は前方一致のみ
+            assert [s["id"] for s in await suggest(db, "jl")] == ["JL1", "JL100"]
+            assert _ids(await search(db, "j")) == ["JL1", "JL100"]
+    _run(scenario)
+
+
+
+def test_short_japanese_queries_match_inside_words():
+    async def scenario(Session):
+        async with Session() as db:
+            db.add_all([
+                Patient(id="P010", identifier="MRN-010", family_name="佐藤", given_name="花子"),
+                Patient(id="P011", identifier="MRN-011", family_name="花田", given_name="一郎"),
+            ])
+            await db.commit()
+            # 1〜2文字の日本語は単語の途中・後ろでも一致（ラベルの前方一致が先）
+            assert _ids(await search(db, "花子")) == ["P010"]
+            assert _ids(await search(db, "藤")) == ["P010"]
+            assert _ids(await search(db, "花")) == ["P011", "P010"]
+            # 英数字の1〜2文字は従来どおり前方一致のみ
+            assert _ids(await search(db, "mr")) == []
+    _run(scenario)
+
+
+def test_install_builds_index_from_existing_rows():
+    async def scenario(Session):
+        async with Session() as db:
+            assert _ids(await search(db, "hubble")) == ["HUBBLE"]
+    _run(scenario, seed=[(Satellite.__table__, {"satellite_id": "HUBBLE", "name": "Hubble Space Telescope"})])